@@ -168,6 +168,12 @@ class MCTF_parser(argparse.ArgumentParser):
     def update_factor(self, update_factor):
         self.add_argument("--update_factor", help="weight of the update step. (Default = {})".format(update_factor))
 
+    ## Command-line interface for a parameter.
+    # @param self Refers to object.
+    # @param threads Number of pictures processed concurrently in the motion compensation and update steps.
+    def threads(self, threads):
+        self.add_argument("--threads", help="number of pictures processed concurrently in the motion compensation and update steps. (Default = {})".format(threads))
+
     ## Command-line interface for a parameter.
     # @param self Refers to object.
     # @param FPS Frames per second.
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file MCTF_profile.py
+#  Merges the profiles written by the kernels into a profile of the run.
+#
+#  When the environment variable MCTF_PROFILE is defined, each
+#  execution of a kernel (motion_estimate, decorrelate, update,
+#  split, ...) writes its timers and counters in the file
+#  "$MCTF_PROFILE/<program>.<pid>.json". At the end of a run, the
+#  driver (compress or expand) adds up these files, by program, in
+#  "$MCTF_PROFILE/<run>.json" and removes them.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package MCTF_profile
+#  Merges the profiles written by the kernels into a profile of the run.
+
+import os
+import re
+import json
+import time
+
+## Name of the files written by the kernels.
+sidecar = re.compile(r"^(.+)\.(\d+)\.json$")
+
+## Directory where the profiles are written (None if profiling is
+#  disabled).
+#  @return The directory.
+def directory():
+    return os.environ.get("MCTF_PROFILE") or None
+
+## Profile of a run.
+class MCTF_profile:
+
+    ## Starts measuring the run.
+    # @param self Refers to object.
+    # @param run Name of the run (for example, "compress").
+    def __init__(self, run):
+        ## Name of the run.
+        self.run = run
+        ## Starting time.
+        self.start = time.time()
+
+    ## Adds up the profiles written by the kernels and writes the
+    #  profile of the run.
+    # @param self Refers to object.
+    # @returns The profile of the run (None if profiling is disabled).
+    def merge(self):
+        path = directory()
+        if path is None:
+            return None
+        programs = {}
+        invocations = 0
+        for name in sorted(os.listdir(path)):
+            if not sidecar.match(name):
+                continue
+            with open(os.path.join(path, name)) as f:
+                kernel = json.load(f)
+            os.remove(os.path.join(path, name))
+            invocations += 1
+            program = programs.setdefault(kernel["program"],
+                                          {"invocations": 0,
+                                           "timers": {},
+                                           "counters": {}})
+            program["invocations"] += 1
+            for timer, value in kernel["timers"].items():
+                total = program["timers"].setdefault(timer,
+                                                     {"seconds": 0.0,
+                                                      "calls": 0})
+                total["seconds"] += value["seconds"]
+                total["calls"] += value["calls"]
+            for counter, value in kernel["counters"].items():
+                program["counters"][counter] = \
+                    program["counters"].get(counter, 0) + value
+        profile = {"run": self.run,
+                   "seconds": time.time() - self.start,
+                   "invocations": invocations,
+                   "programs": programs}
+        with open(os.path.join(path, self.run + ".json"), "w") as f:
+            json.dump(profile, f, indent=1, sort_keys=True)
+        return profile
@@ -53,6 +53,9 @@ subpixel_accuracy = 0
 TRLs              = 4
 ## Level update. For example, a value equal to 1/4 means that the high-frequency subband is 4 times less important than the low-frequency subband.
 update_factor     = 0 # 1.0/4
+## Number of pictures processed concurrently in the motion
+## compensation and update steps.
+threads           = 1
 
 ## The parser module provides an interface to Python's internal parser and byte-code compiler.
 parser = MCTF_parser(description="Performs the temporal analysis of a picture sequence.")
@@ -68,6 +71,7 @@ parser.search_range(search_range)
 parser.subpixel_accuracy(subpixel_accuracy)
 parser.TRLs(TRLs)
 parser.update_factor(update_factor)
+parser.threads(threads)
 
 ## A script may only parse a few of the command-line arguments, passing the remaining arguments on to another script or program.
 args = parser.parse_known_args()[0]
@@ -103,6 +107,8 @@ if args.TRLs:
     TRLs = int(args.TRLs)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
 
 ## Initializes the class GOP (Group Of Pictures).
 gop=GOP()
@@ -135,6 +141,7 @@ while temporal_subband < TRLs:
                    + " --subpixel_accuracy=" + str(subpixel_accuracy)
                    + " --temporal_subband="  + str(temporal_subband)
                    + " --update_factor="     + str(update_factor)
+                   + " --threads="           + str(threads)
                    , shell=True)
     except CalledProcessError:
         sys.exit(-1)
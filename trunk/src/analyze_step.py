@@ -17,6 +17,8 @@
 
 import sys
 import os
+import StringIO
+import motion_format
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
@@ -56,6 +58,9 @@ search_range        = 4
 subpixel_accuracy   = 0
 ## Level update. For example, a value equal to 1/4 means that the high-frequency subband is 4 times less important than the low-frequency subband.
 update_factor       = 0 # 1.0/4
+## Number of pictures processed concurrently in the motion
+## compensation and update steps.
+threads             = 1
 
 
 ## The parser module provides an interface to Python's internal parser and byte-code compiler.
@@ -73,6 +78,7 @@ parser.pictures(pictures)
 parser.search_range(search_range)
 parser.subpixel_accuracy(subpixel_accuracy)
 parser.update_factor(update_factor)
+parser.threads(threads)
 
 ## A script may only parse a few of the command-line arguments, passing the remaining arguments on to another script or program.
 args = parser.parse_known_args()[0]
@@ -110,31 +116,26 @@ if args.subpixel_accuracy:
     subpixel_accuracy = int(args.subpixel_accuracy)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
 
 
-try :
-    # Lazzy transform.
-    check_call("mctf split"
-               + " --even_fn="     + "even_" + str(temporal_subband)
-               + " --low_fn="      + "low_"  + str(temporal_subband-1)
-               + " --odd_fn="      + "odd_"  + str(temporal_subband)
-               + " --pictures="    + str(pictures)
-               + " --pixels_in_x=" + str(pixels_in_x)
-               + " --pixels_in_y=" + str(pixels_in_y)
-               , shell=True)
-except CalledProcessError :
-    sys.exit(-1)
-
+# Lazzy transform. The even and the odd pictures are not copied
+# (split): the kernels read them directly in the (interleaved)
+# low-subband of the previous temporal level.
+even_fn = "low_" + str(temporal_subband-1)
+odd_fn  = "low_" + str(temporal_subband-1)
 
 try :
     # Motion estimation.
     check_call("mctf motion_estimate"
                + " --block_size="        + str(block_size)
                + " --border_size="       + str(border_size)
-               + " --even_fn="           + "even_"    + str(temporal_subband)
+               + " --even_fn="           + even_fn
                + " --imotion_fn="        + "imotion_" + str(temporal_subband)
                + " --motion_fn="         + "motion_"  + str(temporal_subband)
-               + " --odd_fn="            + "odd_"     + str(temporal_subband)
+               + " --odd_fn="            + odd_fn
+               + " --interleaved=1"
                + " --pictures="          + str(pictures)
                + " --pixels_in_x="       + str(pixels_in_x)
                + " --pixels_in_y="       + str(pixels_in_y)
@@ -150,8 +151,8 @@ except CalledProcessError :
 ## Additional code for research work. Expressed as a percentage of the amount of motion vectors that do not indicate a linear motion between frames.
 def amount_motion () :
 
-    # Motion vectors file.
-    f_motion = open ("motion_" + str(temporal_subband), 'r')
+    # Motion vectors (uncompressed).
+    f_motion = StringIO.StringIO (motion_format.read ("motion_" + str(temporal_subband))[1].tostring ())
     # f_image  = open ("motion_" + str(temporal_subband) + "_importance_image", 'w')
     f_sub    = open ("motion_" + str(temporal_subband) + "_importance_sub"  , 'w')
 
@@ -196,18 +197,20 @@ try :
     check_call("mctf decorrelate"
                + " --block_overlaping="  + str(block_overlaping)
                + " --block_size="        + str(block_size)
-               + " --even_fn="           + "even_"            + str(temporal_subband)
+               + " --even_fn="           + even_fn
                + " --frame_types_fn="    + "frame_types_"     + str(temporal_subband)
                + " --high_fn="           + "high_"            + str(temporal_subband)
                + " --motion_in_fn="      + "motion_"          + str(temporal_subband)
                + " --motion_out_fn="     + "motion_filtered_" + str(temporal_subband)
-               + " --odd_fn="            + "odd_"             + str(temporal_subband)
+               + " --odd_fn="            + odd_fn
+               + " --interleaved=1"
                + " --pictures="          + str(pictures)
                + " --pixels_in_x="       + str(pixels_in_x)
                + " --pixels_in_y="       + str(pixels_in_y)
                + " --search_range="      + str(search_range)
                + " --subpixel_accuracy=" + str(subpixel_accuracy)
                + " --always_B="          + str(always_B)
+               + " --threads="           + str(threads)
                , shell=True)
 except CalledProcessError :
     sys.exit(-1)
@@ -217,7 +220,8 @@ try :
     # Eliminate the temporal aliasing (smoothing).
     check_call("mctf update"
                + " --block_size="        + str(block_size)
-               + " --even_fn="           + "even_"            + str(temporal_subband)
+               + " --even_fn="           + even_fn
+               + " --interleaved=1"
                + " --frame_types_fn="    + "frame_types_"     + str(temporal_subband)
                + " --high_fn="           + "high_"            + str(temporal_subband)
                + " --low_fn="            + "low_"             + str(temporal_subband)
@@ -227,6 +231,7 @@ try :
                + " --pixels_in_y="       + str(pixels_in_y)
                + " --subpixel_accuracy=" + str(subpixel_accuracy)
                + " --update_factor="     + str(update_factor)
+               + " --threads="           + str(threads)
                , shell=True)
 except CalledProcessError :
     sys.exit(-1)
@@ -60,13 +60,7 @@ void decorrelate_field
  */
 int main(int argc, char *argv[]) {
 
-#if defined DEBUG
-  info("%s: ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
 
   int blocks_in_x = 11;                  /* blocks_in_x Dimension 'X' of blocks in a picture. */
   int blocks_in_y = 9;                   /* blocks_in_y Dimension 'Y' of blocks in a picture. */
@@ -110,37 +104,27 @@ int main(int argc, char *argv[]) {
       
     case 'x':
       blocks_in_x = atoi(optarg);
-#if defined INFO
-      info("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
-#endif
+      log_debug("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
       break;
       
     case 'y':
       blocks_in_y = atoi(optarg);
-#if defined INFO
-      info("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
- #endif
+      log_debug("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
      break;
 
     case 'f':
       fields = atoi(optarg);
-#if defined INFO
-      info("%s: fields=%d\n", argv[0], fields);
-#endif
+      log_debug("%s: fields=%d\n", argv[0], fields);
       break;
       
     case 'i':
       input_fn = optarg;
-#if defined INFO
-      info("%s: input = \"%s\"\n", argv[0], input_fn);
-#endif
+      log_debug("%s: input = \"%s\"\n", argv[0], input_fn);
       break;
 
     case 'o':
       output_fn = optarg;
-#if defined INFO
-      info("%s: output = \"%s\"\n", argv[0], output_fn);
- #endif
+      log_debug("%s: output = \"%s\"\n", argv[0], output_fn);
      break;
 
     case '?':
@@ -179,15 +163,15 @@ int main(int argc, char *argv[]) {
   
   /* RUN. */
   
-  FILE *input_fd = fopen( input_fn, "r" );
-  if(!input_fd) {
+  motion_file input;
+  if(!input.open_read(input_fn, blocks_in_y, blocks_in_x)) {
     error("%s: unable to read \"%s\" ... aborting!\n",
 	  argv[0], input_fn);
     abort();
   }
 
-  FILE *output_fd = fopen( output_fn, "w" );
-  if(!output_fd) {
+  motion_file output;
+  if(!output.open_write(output_fn, blocks_in_y, blocks_in_x, input.block_size)) {
     error("%s: unable to write \"%s\" ... aborting!\n",
 	  argv[0], output_fn);
     abort();
@@ -200,17 +184,18 @@ int main(int argc, char *argv[]) {
   
   for(int i=0; i<fields; i++) {
     
-#if defined INFO
-    info("%s: %d\n",argv[0], i);
-#endif
-    motion.read(input_fd, field, blocks_in_y, blocks_in_x);
+    log_info("%s: %d\n",argv[0], i);
+    input.read(field);
 
     decorrelate_field
       (blocks_in_x,
        blocks_in_y,
        field);
 
-    motion.write(output_fd, field, blocks_in_y, blocks_in_x);
+    output.write(field);
 
   }
+
+  input.close();
+  output.close();
 }
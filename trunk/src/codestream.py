@@ -0,0 +1,374 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file codestream.py
+#  Parses the markers and the packets of a J2K codestream (compressed
+#  with Cuse_sop=yes).
+#
+#  The packets are found with their SOP markers and assigned to a
+#  layer, a resolution level and a component using the progression
+#  order of the codestream. Only one precinct per resolution level
+#  (the default of kdu_compress) is supported.
+#
+#  A codestream with layer progression can be truncated to a number of
+#  quality layers in the same process (see truncate()), as
+#  kdu_transcode Clayers=N does.
+#
+#  The codestreams can be a string or a mmap. The codestreams of the
+#  files are mapped in memory and the results are cached while the
+#  file (its modification time and size) does not change.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package codestream
+#  Parses the markers and the packets of a J2K codestream.
+
+import os
+import mmap
+import time
+import struct
+
+## Start of codestream.
+SOC = 0xFF4F
+## Image and tile size.
+SIZ = 0xFF51
+## Coding style default.
+COD = 0xFF52
+## Start of tile-part.
+SOT = 0xFF90
+## Start of packet.
+SOP = 0xFF91
+## Start of data.
+SOD = 0xFF93
+## End of codestream.
+EOC = 0xFFD9
+## Markers with the lengths of the tile-parts or of the packets, which
+#  would be wrong in a truncated codestream (TLM, PLM, PLT, PPM and PPT).
+LENGTH_MARKERS = (0xFF55, 0xFF57, 0xFF58, 0xFF60, 0xFF61)
+
+## A SOP marker segment starts with the marker and its length (4).
+SOP_SEGMENT = "\xff\x91\x00\x04"
+## Bytes of a SOP marker segment.
+SOP_LENGTH = 6
+## Bytes of an empty packet (the SOP marker segment and a packet header
+#  of one byte).
+EMPTY_PACKET = SOP_LENGTH + 1
+
+## Progression orders (of the COD marker). Each one is the order of
+#  the loops (from the outer to the inner one): "L"ayer,
+#  "R"esolution, "C"omponent and "P"recinct.
+PROGRESSIONS = ["LRCP", "RLCP", "RPCL", "PCRL", "CPRL"]
+
+## A packet of a codestream.
+class packet:
+
+    ## Builds a packet.
+    # @param self Refers to object.
+    # @param offset Position of the SOP marker in the codestream.
+    # @param length Bytes of the packet (with the SOP marker).
+    def __init__(self, offset, length):
+        ## Position of the SOP marker.
+        self.offset = offset
+        ## Bytes of the packet.
+        self.length = length
+        ## Quality layer.
+        self.layer = 0
+        ## Resolution level.
+        self.resolution = 0
+        ## Component.
+        self.component = 0
+
+## The structure of a J2K codestream.
+class codestream:
+
+    ## Parses a codestream.
+    # @param self Refers to object.
+    # @param data The codestream (a string).
+    def __init__(self, data):
+        ## Bytes of the codestream.
+        self.length = len(data)
+        ## Number of components.
+        self.components = 0
+        ## Subsampling (X, Y) of each component.
+        self.sampling = []
+        ## Number of quality layers.
+        self.layers = 0
+        ## Number of resolution levels (DWT levels + 1).
+        self.resolutions = 0
+        ## Progression order.
+        self.progression = "LRCP"
+        ## Position of the first packet (the bytes of the main and
+        #  the tile-part headers).
+        self.first_packet = 0
+        ## The packets.
+        self.packets = []
+
+        if struct.unpack(">H", data[0:2])[0] != SOC:
+            raise ValueError("not a J2K codestream")
+        precincts = False
+        tile_parts = []
+        i = 2
+        while i < len(data):
+            marker, = struct.unpack(">H", data[i:i + 2])
+            if marker == EOC:
+                break
+            length, = struct.unpack(">H", data[i + 2:i + 4])
+            if marker == SIZ:
+                self.components, = struct.unpack(">H", data[i + 38:i + 40])
+                for c in range(self.components):
+                    x, y = struct.unpack(">BB", data[i + 41 + 3 * c:i + 43 + 3 * c])
+                    self.sampling.append((x, y))
+            elif marker == COD:
+                scod, progression, self.layers, mct, levels = \
+                    struct.unpack(">BBHBB", data[i + 4:i + 10])
+                self.progression = PROGRESSIONS[progression]
+                self.resolutions = levels + 1
+                precincts = (scod & 1) != 0
+            elif marker == SOT:
+                psot, = struct.unpack(">I", data[i + 6:i + 10])
+                end = i + psot if psot else len(data)
+                j = i + length + 2
+                # The tile-part header.
+                while struct.unpack(">H", data[j:j + 2])[0] != SOD:
+                    j += 2 + struct.unpack(">H", data[j + 2:j + 4])[0]
+                tile_parts.append((j + 2, end))
+                i = end
+                continue
+            i += 2 + length
+        if precincts:
+            raise ValueError("only one precinct per resolution level is supported")
+
+        # The packets (from a SOP marker to the next one).
+        for start, end in tile_parts:
+            if struct.unpack(">H", data[end - 2:end])[0] == EOC:
+                end -= 2
+            sop = start
+            while sop < end:
+                next_sop = data.find(SOP_SEGMENT, sop + SOP_LENGTH, end)
+                if next_sop < 0:
+                    next_sop = end
+                self.packets.append(packet(sop, next_sop - sop))
+                sop = next_sop
+        if self.packets:
+            self.first_packet = self.packets[0].offset
+
+        # Layer, resolution and component of each packet.
+        order = self.sequence()
+        if len(order) != len(self.packets):
+            raise ValueError("%d packets found (%d expected)" % (len(self.packets), len(order)))
+        for p, (l, r, c) in zip(self.packets, order):
+            p.layer, p.resolution, p.component = l, r, c
+
+    ## The sequence of packets of the codestream.
+    # @param self Refers to object.
+    # @return A list of (layer, resolution, component).
+    def sequence(self):
+        ranges = {"L": range(self.layers),
+                  "R": range(self.resolutions),
+                  "C": range(self.components),
+                  "P": [0]}
+        order = self.progression
+        sequence = []
+        for a in ranges[order[0]]:
+            for b in ranges[order[1]]:
+                for c in ranges[order[2]]:
+                    for d in ranges[order[3]]:
+                        index = dict(zip(order, (a, b, c, d)))
+                        sequence.append((index["L"], index["R"], index["C"]))
+        return sequence
+
+    ## Bytes of the packets of each component.
+    # @param self Refers to object.
+    # @param headers If False, the SOP marker segments and the empty
+    # packets are not counted (as header_size()), so the sum is the
+    # length of the codestream without its headers.
+    # @return A list with the bytes of each component.
+    def component_sizes(self, headers=True):
+        sizes = [0] * self.components
+        for p in self.packets:
+            if headers:
+                sizes[p.component] += p.length
+            elif p.length != EMPTY_PACKET:
+                sizes[p.component] += p.length - SOP_LENGTH
+        return sizes
+
+    ## Bytes of the packets of each quality layer.
+    # @param self Refers to object.
+    # @return A list with the bytes of each layer.
+    def layer_sizes(self):
+        sizes = [0] * self.layers
+        for p in self.packets:
+            sizes[p.layer] += p.length
+        return sizes
+
+    ## End of each quality layer, relative to the beginning of the
+    #  codestream (the "layers" of the entries of the containers, see
+    #  container.py).
+    # @param self Refers to object.
+    # @return A list with the end of each layer.
+    def layer_ends(self):
+        ends = []
+        end = self.first_packet
+        for size in self.layer_sizes():
+            end += size
+            ends.append(end)
+        return ends
+
+    ## Bytes of the packets of each quality layer and resolution level,
+    #  without the SOP marker segments and the empty packets (as
+    #  header_size()). They are the "layer_bytes" of the entries of the
+    #  containers (see container.py).
+    # @param self Refers to object.
+    # @return A list per layer with the bytes of each resolution level
+    #  (from the lowest one).
+    def layer_bytes(self):
+        sizes = [[0] * self.resolutions for layer in range(self.layers)]
+        for p in self.packets:
+            if p.length != EMPTY_PACKET:
+                sizes[p.layer][p.resolution] += p.length - SOP_LENGTH
+        return sizes
+
+    ## Position of the first packet of each quality layer (the packets
+    #  of a layer are consecutive with the progression LRCP).
+    # @param self Refers to object.
+    # @return A list with the offset of each layer (None if the layer
+    #  has no packets).
+    def layer_offsets(self):
+        offsets = [None] * self.layers
+        for p in self.packets:
+            if offsets[p.layer] is None:
+                offsets[p.layer] = p.offset
+        return offsets
+
+## Positions of the SOP markers of a codestream.
+#  @param data The codestream.
+#  @return A list with the offset of each SOP marker.
+def sops(data):
+    offsets = []
+    sop = data.find(SOP_SEGMENT)
+    while sop >= 0:
+        offsets.append(sop)
+        sop = data.find(SOP_SEGMENT, sop + SOP_LENGTH)
+    return offsets
+
+## Bytes of a codestream which are not packet data (as header_size.c):
+#  the bytes before the first packet, the SOP marker segments, the
+#  packet headers of the empty packets and the EOC marker.
+#  @param data The codestream.
+#  @return The bytes of the headers.
+def header_size(data):
+    offsets = sops(data)
+    if not offsets:
+        return len(data)
+    # The last packet ends at the EOC marker.
+    ends = offsets[1:] + [len(data) - 2]
+    total = offsets[0] + 2
+    for start, end in zip(offsets, ends):
+        if end - start == EMPTY_PACKET:
+            total += EMPTY_PACKET
+        else:
+            total += SOP_LENGTH
+    return total
+
+## Truncates a codestream to a number of quality layers (as
+#  kdu_transcode Clayers=N). The packets of the rest of layers are
+#  removed, the SOP markers are renumbered and the number of layers
+#  (COD) and the length of the tile-part (SOT) are rewritten.
+#  @param data The codestream.
+#  @param layers Number of quality layers.
+#  @return The truncated codestream (a string).
+#  @exception ValueError The codestream has more than one tile-part or
+#  markers with lengths of packets.
+def truncate(data, layers):
+    stream = codestream(data)
+    if layers >= stream.layers:
+        return data[:]
+    # The main header.
+    header = [data[0:2]]
+    i = 2
+    while True:
+        marker, length = struct.unpack(">HH", data[i:i + 4])
+        if marker == SOT:
+            break
+        if marker in LENGTH_MARKERS:
+            raise ValueError("markers with lengths are not supported")
+        if marker == COD:
+            header.append(data[i:i + 6] + struct.pack(">H", layers) + data[i + 8:i + 2 + length])
+        else:
+            header.append(data[i:i + 2 + length])
+        i += 2 + length
+    # The tile-part header.
+    sot = i
+    psot, = struct.unpack(">I", data[sot + 6:sot + 10])
+    end = sot + psot if psot else len(data)
+    if end < len(data) and struct.unpack(">H", data[end:end + 2])[0] != EOC:
+        raise ValueError("only one tile-part is supported")
+    i = sot + 2 + length
+    while True:
+        marker, = struct.unpack(">H", data[i:i + 2])
+        if marker == SOD:
+            break
+        if marker in LENGTH_MARKERS:
+            raise ValueError("markers with lengths are not supported")
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    sod = i + 2
+    # The packets of the layers.
+    body = []
+    for p in stream.packets:
+        if p.layer < layers:
+            body.append(SOP_SEGMENT + struct.pack(">H", len(body) & 0xFFFF)
+                        + data[p.offset + SOP_LENGTH:p.offset + p.length])
+    body = "".join(body)
+    if psot:
+        psot = sod - sot + len(body)
+    return ("".join(header) + data[sot:sot + 6] + struct.pack(">I", psot)
+            + data[sot + 10:sod] + body + struct.pack(">H", EOC))
+
+## Results already computed for the files: (file name, function) ->
+#  ((inode, modification time, change time, size), result).
+_cache = {}
+## Seconds after its modification while a file is not cached (its
+#  stamp could be unchanged if it is rewritten with the same size, for
+#  example in a file system with a resolution of 1 second).
+RACY_SECONDS = 2
+
+## Applies a function to the codestream of a file, which is mapped in
+#  memory. The result is cached while the file does not change.
+#  @param file_name Name of the file.
+#  @param function The function (of the codestream).
+#  @return The result of the function.
+def _cached(file_name, function):
+    status = os.stat(file_name)
+    stamp = (status.st_ino, status.st_mtime, status.st_ctime, status.st_size)
+    key = (os.path.abspath(file_name), function)
+    if key in _cache and _cache[key][0] == stamp:
+        return _cache[key][1]
+    with open(file_name, "rb") as f:
+        if status.st_size == 0:
+            result = function("")
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                result = function(data)
+            finally:
+                data.close()
+    if time.time() - max(status.st_mtime, status.st_ctime) > RACY_SECONDS:
+        _cache[key] = (stamp, result)
+    return result
+
+## Parses a codestream stored in a file.
+#  @param file_name Name of the file.
+#  @return The codestream.
+def read(file_name):
+    return _cached(file_name, codestream)
+
+## Bytes of the headers of a codestream stored in a file (see
+#  header_size()).
+#  @param file_name Name of the file.
+#  @return The bytes of the headers.
+def header(file_name):
+    return _cached(file_name, header_size)
@@ -49,10 +49,12 @@ import os
 import array
 import display
 import string
+import rate_control
 from GOP import GOP
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
+from MCTF_profile import MCTF_profile
 
 ## Refers to Full-HD resolution. Is used as a boundary between the use
 #  of a block size of 16 or 32 by default.
@@ -99,8 +101,23 @@ SRLs                 = 5
 nLayers              = 5
 ## Weight of the update step.
 update_factor        = 1.0/4
+## Number of pictures processed concurrently in the motion
+#  compensation and update steps.
+threads              = 1
+## Bit-rate of the compressed sequence, in Kbps. If it is not 0, the
+#  slopes of the textures are searched to meet it (see
+#  rate_control.py) and quantization_texture is only the starting
+#  point.
+target_kbps          = 0
+## Frames per second (used with target_kbps).
+FPS                  = 30
+## Maximum relative error of the bit-rate, without a corrective pass.
+rate_tolerance       = 0.05
 
 
+## Profile of the run (only if MCTF_PROFILE is defined).
+profile = MCTF_profile("compress")
+
 ## The parser module provides an interface to Python's internal parser
 #  and byte-code compiler.
 parser = MCTF_parser(description="Encodes a sequence of pictures.")
@@ -122,6 +139,9 @@ parser.TRLs(TRLs)
 parser.SRLs(SRLs)
 parser.nLayers(nLayers)
 parser.update_factor(update_factor)
+parser.threads(threads)
+parser.FPS(FPS)
+parser.add_argument("--target_kbps", help="bit-rate of the compressed sequence in Kbps (0 = use quantization_texture). (Default = {})".format(target_kbps))
 
 ## A script may only parse a few of the command-line arguments,
 #  passing the remaining arguments on to another script or program.
@@ -170,6 +190,12 @@ if args.nLayers:
     nLayers = int(args.nLayers)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
+if args.FPS:
+    FPS = float(args.FPS)
+if args.target_kbps:
+    target_kbps = float(args.target_kbps)
 
 
 
@@ -190,6 +216,7 @@ if TRLs > 1:
                    + " --subpixel_accuracy=" + str(subpixel_accuracy)
                    + " --TRLs="              + str(TRLs)
                    + " --update_factor="     + str(update_factor)
+                   + " --threads="           + str(threads)
                    , shell=True)
     except CalledProcessError:
         sys.exit(-1)
@@ -211,20 +238,53 @@ if TRLs > 1:
     except CalledProcessError:
         sys.exit(-1)
 
-try:
-    # Compressed textures. Quality layers are used, with loss.
-    #---------------------------------------------------------
-    check_call("mctf texture_compress"
-               + " --GOPs="                + str(GOPs)
-               + " --pixels_in_x="         + str(pixels_in_x)
-               + " --pixels_in_y="         + str(pixels_in_y)
-               + " --quantization=\""      + str(quantization_texture) + "\""
-               + " --quantization_step="   + str(quantization_step)
-               + " --SRLs="                + str(SRLs)
-               + " --TRLs="                + str(TRLs)
-               + " --nLayers="             + str(nLayers)
-               , shell=True)
-except CalledProcessError:
-    sys.exit(-1)
+## Compressed textures. Quality layers are used, with loss.
+#  @param slopes Slope of the first quality layer of each subband
+#  (None = computed from quantization_texture).
+def texture_compress(slopes=None):
+    try:
+        check_call("mctf texture_compress"
+                   + " --GOPs="                + str(GOPs)
+                   + " --pixels_in_x="         + str(pixels_in_x)
+                   + " --pixels_in_y="         + str(pixels_in_y)
+                   + " --quantization=\""      + str(quantization_texture) + "\""
+                   + " --quantization_step="   + str(quantization_step)
+                   + " --SRLs="                + str(SRLs)
+                   + " --TRLs="                + str(TRLs)
+                   + " --nLayers="             + str(nLayers)
+                   + " --update_factor="       + str(update_factor)
+                   + (" --slopes=" + ",".join(map(str, slopes)) if slopes else "")
+                   , shell=True)
+    except CalledProcessError:
+        sys.exit(-1)
 
+if target_kbps <= 0:
+    texture_compress()
+else:
+    # Bit-rate control. The slopes are searched with a model of the
+    # size of each subband, built from a sample of pictures, and the
+    # model is corrected at most once with the real size.
+    #------------------------------------------------------------------
+    pictures = GOPs * GOP().get_size(TRLs) + 1
+    target = target_kbps * 1000 / 8 * pictures / FPS - rate_control.motion_bytes(TRLs)
+    if target <= 0:
+        display.error("compress: the motion needs more than " + str(target_kbps) + " Kbps\n")
+    try:
+        models = rate_control.first_pass(TRLs, GOPs, pixels_in_x, pixels_in_y, SRLs,
+                                         int(str(quantization_texture).split(',')[0]))
+    except (ValueError, ImportError) as e:
+        display.error("compress: the bit-rate control is not available (" + str(e) + ")\n")
+    distances = rate_control.offsets(TRLs, update_factor)
+    slopes = rate_control.solve(models, distances, target)
+    texture_compress(slopes)
+    measured = rate_control.texture_bytes(TRLs, GOPs)
+    display.log_info("compress: target = " + str(int(target)) + " bytes, textures = " + str(measured) + " bytes, slopes = " + str(slopes) + "\n")
+    if abs(measured - target) > rate_tolerance * target:
+        rate_control.correct(models, slopes, measured)
+        slopes = rate_control.solve(models, distances, target)
+        texture_compress(slopes)
+        display.log_info("compress: textures = " + str(rate_control.texture_bytes(TRLs, GOPs)) + " bytes, slopes = " + str(slopes) + "\n")
 
+# Adds up the profiles of the kernels.
+#-------------------------------------
+profile.merge()
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file container.py
+#  Stores the codestreams of a subband (all the pictures and all the
+#  components) in one file.
+#
+#  The file starts with an index:\n
+#  - "MCTC" (4 bytes).
+#  - The number of pictures (4 bytes).
+#  - The number of codestreams (4 bytes).
+#  - For each codestream: the picture (4 bytes), the component (8
+#    bytes, for example "Y" or "comp2"), the position in the file (8
+#    bytes), the length (4 bytes), the bytes of the header (4 bytes),
+#    the number of layers and of resolution levels (2 bytes each), the
+#    end of each layer (4 bytes per layer, relative to the beginning
+#    of the codestream) and the bytes without headers of each layer
+#    and resolution level (4 bytes each, layer by layer).
+#
+#  followed by the codestreams. All the integers are little endian.
+#  The layers and the resolution levels are optional (0 if they are
+#  unknown). They are taken from the SOP markers of the J2K
+#  codestreams (see codestream_entry()), so that the bytes of any
+#  combination of layers and resolution levels are computed without
+#  truncating the codestreams (see truncated_bytes()).
+#
+#  External codecs (kdu_expand, kdu_transcode, ...) work with
+#  files. extract() writes a codestream in a (temporal) file.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package container
+#  Stores the codestreams of a subband in one file.
+
+import os
+import struct
+import shutil
+import codestream
+
+## Identifier of the containers.
+MAGIC = "MCTC"
+## Extension of the containers.
+EXTENSION = "mcc"
+## Format of the beginning of the index.
+HEADER = "<4sII"
+## Bytes of the beginning of the index.
+HEADER_BYTES = struct.calcsize(HEADER)
+## Format of an entry of the index (without the layers).
+ENTRY = "<I8sQIIHH"
+## Bytes of an entry of the index (without the layers).
+ENTRY_BYTES = struct.calcsize(ENTRY)
+
+## A codestream of a container.
+class entry:
+
+    ## Builds an entry.
+    # @param self Refers to object.
+    # @param picture Number of the picture (or field).
+    # @param component Name of the component.
+    # @param length Bytes of the codestream.
+    # @param header Bytes of the header of the codestream.
+    # @param layers End of each layer (relative to the codestream).
+    # @param layer_bytes Bytes without headers of each resolution level
+    # of each layer (a list per layer, see codestream.layer_bytes()).
+    # @param source File with the codestream (only to write a container).
+    # @param data The codestream, instead of a file (only to write a
+    # container).
+    def __init__(self, picture, component, length=0, header=0, layers=(), layer_bytes=(),
+                 source=None, data=None):
+        ## Number of the picture.
+        self.picture = picture
+        ## Name of the component.
+        self.component = component
+        ## Bytes of the codestream.
+        self.length = length
+        ## Bytes of the header.
+        self.header = header
+        ## End of each layer.
+        self.layers = list(layers)
+        ## Bytes of each resolution level of each layer.
+        self.layer_bytes = [list(l) for l in layer_bytes]
+        ## File with the codestream.
+        self.source = source
+        ## The codestream (if there is no file).
+        self.data = data
+        ## Position of the codestream in the container.
+        self.offset = 0
+
+    ## Number of resolution levels of the index.
+    # @param self Refers to object.
+    # @return The number of resolution levels (0 if there is no index).
+    def resolutions(self):
+        return len(self.layer_bytes[0]) if self.layer_bytes else 0
+
+    ## Bytes without headers (as the sizes of the codestreams, see
+    #  sizes()) of the codestream truncated to a number of quality
+    #  layers and resolution levels. A codestream without index is
+    #  counted complete.
+    # @param self Refers to object.
+    # @param layers Number of layers.
+    # @param reduces Number of resolution levels which are discarded.
+    # @return The bytes.
+    def truncated_bytes(self, layers, reduces=0):
+        if layers <= 0:
+            return 0
+        if not self.layer_bytes:
+            return self.length - self.header
+        resolutions = max(self.resolutions() - reduces, 0)
+        return sum(sum(l[:resolutions]) for l in self.layer_bytes[:layers])
+
+## The entry of a J2K codestream stored in a file, with the index of
+#  its layers and resolution levels.
+#  @param picture Number of the picture (or field).
+#  @param component Name of the component.
+#  @param file_name Name of the file.
+#  @return The entry.
+def codestream_entry(picture, component, file_name):
+    stream = codestream.read(file_name)
+    return entry(picture, component, header=codestream.header(file_name),
+                 layers=stream.layer_ends(), layer_bytes=stream.layer_bytes(),
+                 source=file_name)
+
+## Name of the container of a subband.
+#  @param prefix Name of the subband (for example, "high_1").
+#  @return The name of the container.
+def name(prefix):
+    return prefix + "." + EXTENSION
+
+## Writes a container.
+#  @param file_name Name of the container.
+#  @param pictures Number of pictures (some of them can have no
+#  codestreams).
+#  @param entries The codestreams. The length of an entry is the size
+#  of its source (or of its data).
+#  @param remove Remove the sources.
+def write(file_name, pictures, entries, remove=False):
+    for e in entries:
+        if e.data is None:
+            e.length = os.path.getsize(e.source)
+        else:
+            e.length = len(e.data)
+    offset = HEADER_BYTES + sum(ENTRY_BYTES + 4 * (len(e.layers) + sum(len(l) for l in e.layer_bytes))
+                                for e in entries)
+    with open(file_name, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, pictures, len(entries)))
+        for e in entries:
+            e.offset = offset
+            offset += e.length
+            f.write(struct.pack(ENTRY, e.picture, e.component, e.offset,
+                                e.length, e.header, len(e.layers), e.resolutions()))
+            f.write(struct.pack("<%dI" % len(e.layers), *e.layers))
+            for l in e.layer_bytes:
+                f.write(struct.pack("<%dI" % len(l), *l))
+        for e in entries:
+            if e.data is None:
+                with open(e.source, "rb") as s:
+                    shutil.copyfileobj(s, f)
+            else:
+                f.write(e.data)
+    if remove:
+        for e in entries:
+            if e.data is None:
+                os.remove(e.source)
+
+## The codestreams of a subband.
+class container:
+
+    ## Reads the index of a container.
+    # @param self Refers to object.
+    # @param file_name Name of the container.
+    def __init__(self, file_name):
+        ## Name of the container.
+        self.file_name = file_name
+        ## The entries, by (picture, component).
+        self.entries = {}
+        ## The container (it is opened only once).
+        self.file = open(file_name, "rb")
+        magic, pictures, n = struct.unpack(HEADER, self.file.read(HEADER_BYTES))
+        if magic != MAGIC:
+            raise ValueError("\"%s\" is not a container" % file_name)
+        ## Number of pictures.
+        self.pictures = pictures
+        for i in range(n):
+            picture, component, offset, length, header, layers, resolutions = \
+                struct.unpack(ENTRY, self.file.read(ENTRY_BYTES))
+            ends = struct.unpack("<%dI" % layers, self.file.read(4 * layers))
+            layer_bytes = [struct.unpack("<%dI" % resolutions, self.file.read(4 * resolutions))
+                           for l in range(layers if resolutions else 0)]
+            e = entry(picture, component.rstrip("\0"), length, header, ends, layer_bytes)
+            e.offset = offset
+            self.entries[(picture, e.component)] = e
+
+    ## Finds a codestream.
+    # @param self Refers to object.
+    # @param picture Number of the picture.
+    # @param component Name of the component.
+    # @return The entry (None if the codestream is not stored).
+    def find(self, picture, component):
+        return self.entries.get((picture, component))
+
+    ## Reads a codestream.
+    # @param self Refers to object.
+    # @param picture Number of the picture.
+    # @param component Name of the component.
+    # @return The codestream (None if it is not stored).
+    def read(self, picture, component):
+        e = self.find(picture, component)
+        if e is None:
+            return None
+        self.file.seek(e.offset)
+        return self.file.read(e.length)
+
+    ## Writes a codestream in a file.
+    # @param self Refers to object.
+    # @param picture Number of the picture.
+    # @param component Name of the component.
+    # @param file_name Name of the file.
+    # @return False if the codestream is not stored.
+    def extract(self, picture, component, file_name):
+        data = self.read(picture, component)
+        if data is None:
+            return False
+        with open(file_name, "wb") as f:
+            f.write(data)
+        return True
+
+    ## Bytes without headers of the codestreams of a range of pictures
+    #  (for example, a GOP) truncated to a number of quality layers and
+    #  resolution levels (see entry.truncated_bytes()). With the
+    #  complete codestreams, they are the bytes of sizes().
+    # @param self Refers to object.
+    # @param layers Number of layers.
+    # @param first The first picture.
+    # @param last The picture after the last one (None = the last
+    # picture of the container).
+    # @param reduces Number of resolution levels which are discarded.
+    # @return The bytes.
+    def truncated_bytes(self, layers, first=0, last=None, reduces=0):
+        if last is None:
+            last = self.pictures
+        return sum(e.truncated_bytes(layers, reduces) for e in self.entries.values()
+                   if first <= e.picture < last)
+
+    ## Accumulated size (without headers) of the codestreams of each
+    #  picture, as in the files of sizes written by the codecs.
+    # @param self Refers to object.
+    # @return The list of sizes.
+    def sizes(self):
+        pictures = {}
+        for e in self.entries.values():
+            pictures[e.picture] = pictures.get(e.picture, 0) + e.length - e.header
+        total = 0
+        sizes = []
+        for picture in range(self.pictures):
+            total += pictures.get(picture, 0)
+            sizes.append(total)
+        return sizes
+
+## Opens the container of a subband.
+#  @param prefix Name of the subband (for example, "high_1").
+#  @return The container (None if it does not exist).
+def open_subband(prefix):
+    if not os.path.exists(name(prefix)):
+        return None
+    return container(name(prefix))
@@ -16,6 +16,7 @@
 #include <stdarg.h>
 #include <string.h>
 #include "display.cpp"
+#include "profile.cpp"
 //#include "Haar.cpp"
 #include "5_3.cpp"
 //#include "13_7.cpp"
@@ -24,6 +25,8 @@
 #include "texture.cpp"
 #include "motion.cpp"
 #include "entropy.h"
+#include "threads.cpp"
+#include "lazy.cpp"
 
 
 /** \brief TC = Texture Component; IO = Input Output. */
@@ -44,8 +47,23 @@
 #define PIXELS_IN_Y 288
 /** \brief If defined, shows information about predictions. */
 #define GET_PREDICTION
-/* \brief If defined, shows information about the execution. */
-#define DEBUG
+
+/** \brief Time spent reading the pictures and the motion fields. */
+static int read_timer = profile_timer("read");
+/** \brief Time spent writing the pictures and the motion fields. */
+static int write_timer = profile_timer("write");
+/** \brief Time spent interpolating the references. */
+static int interpolation_timer = profile_timer("interpolation");
+/** \brief Time spent compensating the pictures. */
+static int compensation_timer = profile_timer("compensation");
+/** \brief Number of compensated pictures. */
+static int pictures_counter = profile_counter("pictures");
+/** \brief Number of compensated blocks. */
+static int blocks_counter = profile_counter("blocks_compensated");
+/** \brief Number of bytes read. */
+static int bytes_read_counter = profile_counter("bytes_read");
+/** \brief Number of bytes written. */
+static int bytes_written_counter = profile_counter("bytes_written");
 
 /** \brief When it is used to analyze, uses information about the movement to generate a prediction of the odd images (predicted frames) from the pairs (reference images).\n
  * Then the predictions are subtracted at odd images to generate high temporal frequency band (images of error).\n
@@ -189,6 +207,440 @@ void predict
 } /* predict() */
 
 
+/** \brief Interpolates the chroma of a reference picture, to have the
+ * same size as the luma. This is necessary because the fields of
+ * motion apply to chroma with the same precision as the luma. After
+ * that, the three components are interpolated to the sub-pixel
+ * accuracy and their borders are filled.
+ * \param pixels_in_y Dimension 'Y' of the luma.
+ * \param pixels_in_x Dimension 'X' of the luma.
+ * \param subpixel_accuracy Sub-pixel accuracy of the motion estimation.
+ * \param picture_border_size Border size of the reference picture.
+ * \param image_dwt A texture interpolation filter.
+ * \param image A texture object (used to fill the borders).
+ * \param reference_picture A reference picture (three components).
+ */
+void interpolate_reference
+(
+ int pixels_in_y,
+ int pixels_in_x,
+ int subpixel_accuracy,
+ int picture_border_size,
+ class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > *image_dwt,
+ texture < TC_IO_TYPE, TC_CPU_TYPE > *image,
+ TC_CPU_TYPE ***reference_picture
+) {
+
+  /* Chroma Cb. */
+
+  /*
+    +--------------+--------------+
+    |              |00000000000000|
+    |              |00000000000000|
+    |              |00000000000000|
+    |              |00000000000000|
+    |              |00000000000000|
+    |              |00000000000000|
+    +--------------+--------------+
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    +--------------+--------------+
+   */
+  for(int y=0; y<pixels_in_y/2; y++) {
+    memset(reference_picture[1][y]+pixels_in_x/2, 0,
+	   (pixels_in_x*sizeof(TC_CPU_TYPE))/2);
+  }
+
+  /*
+    +--------------+--------------+
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    |              |              |
+    +--------------+--------------+
+    |00000000000000|00000000000000|
+    |00000000000000|00000000000000|
+    |00000000000000|00000000000000|
+    |00000000000000|00000000000000|
+    |00000000000000|00000000000000|
+    |00000000000000|00000000000000|
+    +--------------+--------------+
+   */
+
+  for(int y=pixels_in_y/2; y<pixels_in_y; y++) {
+    memset(reference_picture[1][y], 0, pixels_in_x*sizeof(TC_CPU_TYPE));
+  }
+
+  /* Interpolation. */
+  image_dwt->synthesize(reference_picture[1], pixels_in_y, pixels_in_x, 1);
+
+  /* Chroma Cr. */
+  for(int y=0; y<pixels_in_y/2; y++) {
+    memset(reference_picture[2][y]+pixels_in_x/2, 0,
+	   (pixels_in_x*sizeof(TC_CPU_TYPE))/2);
+  }
+  for(int y=pixels_in_y/2; y<pixels_in_y; y++) {
+    memset(reference_picture[2][y], 0, pixels_in_x*sizeof(TC_CPU_TYPE));
+  }
+  image_dwt->synthesize(reference_picture[2], pixels_in_y, pixels_in_x, 1);
+
+  /** At this point, the reference has its three components with the
+      same size.  It's time to interpolate (interpolation leads to
+      errors).\n And fill edges, if you are using sub-pixel estimation
+      movement. */
+
+  /* Interpolate and fill edges. */
+  for(int c = 0; c < COMPONENTS; c++) {
+
+    for(int s = 1; s <= subpixel_accuracy; s++) {
+
+      /* Interpolate (the error is here!) */
+      for(int y = 0; y < ( pixels_in_y << s ) / 2; y++) {
+	memset ( reference_picture[c][y] + ( pixels_in_x << s ) / 2,
+		 0,
+		 ( ( ( pixels_in_x << s ) / 2 ) * sizeof(TC_CPU_TYPE) )
+		 );
+      }
+
+      for(int y = ( pixels_in_y << s) / 2; y < ( pixels_in_y << s); y++) {
+	memset(reference_picture[c][y],
+	       0,
+	       ( pixels_in_x << s ) *sizeof(TC_CPU_TYPE) );
+      }
+      image_dwt->synthesize(reference_picture[c],
+			    pixels_in_y << s,
+			    pixels_in_x << s,
+			    1);
+
+    }
+
+    /* Fill edges. */
+    image->fill_border(reference_picture[c],
+		       pixels_in_y << subpixel_accuracy,
+		       pixels_in_x << subpixel_accuracy,
+		       picture_border_size << subpixel_accuracy);
+
+  }
+
+} /* interpolate_reference() */
+
+
+/** \brief A window of pictures which are processed concurrently.\n
+ * The odd picture "j" of the window is predicted from the references
+ * "j" and "j+1" and the motion field "j", so the pictures of a window
+ * are independent. The buffers of a picture are indexed by its
+ * position in the window and the working buffers by the thread which
+ * uses them.
+ */
+struct window {
+  /** \brief Level of overlapping between blocks. */
+  int block_overlaping;
+  /** \brief Size block. */
+  int block_size;
+  /** \brief Dimension 'Y' of blocks in a picture. */
+  int blocks_in_y;
+  /** \brief Dimension 'X' of blocks in a picture. */
+  int blocks_in_x;
+  /** \brief Dimension 'Y' of the components. */
+  int *pixels_in_y;
+  /** \brief Dimension 'X' of the components. */
+  int *pixels_in_x;
+  /** \brief Sub-pixel accuracy of the motion estimation. */
+  int subpixel_accuracy;
+  /** \brief Border size of the reference pictures. */
+  int picture_border_size;
+  /** \brief Forces to use only B frames. */
+  int always_B;
+  /** \brief A texture object (used to fill the borders). */
+  texture < TC_IO_TYPE, TC_CPU_TYPE > *image;
+  /** \brief A texture interpolation filter per thread. */
+  class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > **image_dwt;
+  /** \brief A prediction block per thread. */
+  TC_CPU_TYPE ***prediction_block;
+  /** \brief The references of the window (one more than pictures). */
+  TC_CPU_TYPE ****reference;
+  /** \brief The odd (predicted) pictures. */
+  TC_CPU_TYPE ****predicted;
+  /** \brief The predictions. */
+  TC_CPU_TYPE ****prediction;
+  /** \brief The residue (high-subband) pictures. */
+  TC_CPU_TYPE ****residue;
+  /** \brief The motion fields. */
+  MVC_TYPE *****mv;
+  /** \brief The frame types ('I' or 'B'). */
+  char *frame_type;
+};
+
+/** \brief Interpolates the reference "task+1" of a window (the
+ * reference 0 comes from the previous window).
+ * \param task Index of the reference (minus one).
+ * \param thread Index of the thread.
+ * \param arg A window.
+ */
+void interpolate_task(int task, int thread, void *arg) {
+  struct window *w = (struct window *)arg;
+  interpolate_reference(w->pixels_in_y[0],
+			w->pixels_in_x[0],
+			w->subpixel_accuracy,
+			w->picture_border_size,
+			w->image_dwt[thread],
+			w->image,
+			w->reference[task+1]);
+}
+
+/** \brief Predicts the odd picture "task" of a window and, depending
+ * on ANALYZE, generates its residue (and its frame type) or
+ * reconstructs it from the residue.
+ * \param task Index of the picture.
+ * \param thread Index of the thread.
+ * \param arg A window.
+ */
+void compensate_task(int task, int thread, void *arg) {
+  struct window *w = (struct window *)arg;
+  int *pixels_in_y = w->pixels_in_y;
+  int *pixels_in_x = w->pixels_in_x;
+  int subpixel_accuracy = w->subpixel_accuracy;
+  int blocks_in_y = w->blocks_in_y;
+  int blocks_in_x = w->blocks_in_x;
+  class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > *image_dwt = w->image_dwt[thread];
+  TC_CPU_TYPE ***predicted = w->predicted[task];
+  TC_CPU_TYPE ***prediction = w->prediction[task];
+  TC_CPU_TYPE ***residue = w->residue[task];
+  MVC_TYPE ****mv = w->mv[task];
+
+  profile_count(pictures_counter, 1);
+  profile_count(blocks_counter, blocks_in_y*blocks_in_x);
+
+#if defined ANALYZE
+  float motion_entropy = 0.0; {
+    int count[256];
+
+    if(!w->always_B) {
+
+      for(int i=0; i<256; i++) {
+	count[i] = 0;
+      }
+
+      for(int y=0; y<blocks_in_y; y++) {
+	for(int x=0; x<blocks_in_x; x++) {
+	  count[ mv[PREV][Y_FIELD][y][x] + 128 ]++;
+	  count[ mv[PREV][X_FIELD][y][x] + 128 ]++;
+	  count[ mv[NEXT][Y_FIELD][y][x] + 128 ]++;
+	  count[ mv[NEXT][X_FIELD][y][x] + 128 ]++;
+	}
+      }
+
+      motion_entropy = entropy(count, 256);
+
+    }
+  }
+#endif /* ANALYZE */
+
+  predict(w->block_overlaping << subpixel_accuracy,
+	  w->block_size << subpixel_accuracy,
+	  blocks_in_y,
+	  blocks_in_x,
+	  COMPONENTS,
+	  pixels_in_y[0] << subpixel_accuracy,
+	  pixels_in_x[0] << subpixel_accuracy,
+	  mv,
+	  image_dwt,
+	  w->prediction_block[thread],
+	  prediction,
+	  w->reference + task);
+
+  for(int c=0; c<COMPONENTS; c++) {
+    for(int y=0; y<pixels_in_y[0] << subpixel_accuracy; y++) {
+      for(int x=0; x<pixels_in_x[0] << subpixel_accuracy; x++) {
+	if (prediction[c][y][x] < 0) prediction[c][y][x] = 0;
+	else if (prediction[c][y][x] > 255) prediction[c][y][x] = 255;
+      }
+    }
+  }
+
+  /** Sub-sampled the three components because the motion
+      compensation is made to the original video resolution. */
+  for(int c=0; c<COMPONENTS; c++) {
+    image_dwt->analyze(prediction[c],
+		       pixels_in_y[0] << subpixel_accuracy,
+		       pixels_in_x[0] << subpixel_accuracy,
+		       subpixel_accuracy);
+  }
+
+  /* The prediction is still on: YUV444; and we must pass it: YUV422. */
+  image_dwt->analyze(prediction[1], pixels_in_y[0], pixels_in_x[0], 1);
+  image_dwt->analyze(prediction[2], pixels_in_y[0], pixels_in_x[0], 1);
+
+#if defined ANALYZE
+
+  /*
+    A subtraction at high resolution and a reduction,
+    vs,
+    Two reductions and a subtraction at low resolution.
+
+    Without truncating:
+
+    1 2 3 4   1 1 2 2   0  1  1  2     0.5  1.5
+    5 6 7 8 - 5 5 6 6 = 0  1  1  2 -> -0.5 -1.5
+    8 7 6 5   8 8 7 7   0 -1 -1 -2
+    4 3 2 1   4 4 3 3   0 -1 -1 -2
+
+       |         |
+       v         v
+
+    3.5 5.5 - 3.0 4.0 =  0.5  1.5
+    5.5 3.5   6.0 5.0   -0.5 -1.5
+
+    Truncating:
+
+    1 2 3 4   1 1 2 2   0  1  1  2     0  1
+    5 6 7 8 - 5 5 6 6 = 0  1  1  2 -> -1 -2
+    8 7 6 5   8 8 7 7   0 -1 -1 -2
+    4 3 2 1   4 4 3 3   0 -1 -1 -2
+
+       |         |
+       v         v
+
+    3 5     -   3 4 =  0  1
+    5 3         6 5   -1 -2
+
+    That is, the motion compensation at high resolution is the
+    same as at low resolution (if the predictions are equal).
+  */
+
+  /* Compensation is applied (with clipping). The compensation is
+     done over-pixel resolution. */
+  for(int c=0; c<COMPONENTS; c++) {
+    for(int y=0; y<pixels_in_y[c]; y++) {
+      for(int x=0; x<pixels_in_x[c]; x++) {
+	int val = predicted[c][y][x] - prediction[c][y][x];
+	if(val < -128) val = -128;
+	else if(val > 127) val = 127;
+	residue[c][y][x] = val;
+      }
+    }
+  }
+
+  /* The entropy of the residual image and the predicted image is
+     calculated. We only use the luma. */
+
+  float residue_entropy = 0.0, predicted_entropy = 1.0; {
+    int predicted_count[256];
+    int residue_count[256];
+
+    if (!w->always_B) {
+
+      for(int i=0; i<256; i++) {
+	predicted_count[i] = 0;
+	residue_count[i] = 0;
+      }
+
+      for(int y=0; y<pixels_in_y[0]; y++) {
+	for(int x=0; x<pixels_in_x[0]; x++) {
+	  predicted_count[ predicted[0][y][x]       ]++;
+	  residue_count  [ residue  [0][y][x] + 128 ]++; // Usar puntero
+	}
+      }
+
+      predicted_entropy = entropy(predicted_count, 256);
+      residue_entropy = entropy(residue_count, 256);
+
+    }
+  }
+
+  /* If the entropy of the predicted image is less than or equal to
+     the entropy of the "wrong image" then the predicted image
+     replaces the "wrong image". */
+
+  int predicted_size
+    = (int)(predicted_entropy * (float)pixels_in_y[0] * (float)pixels_in_x[0]);
+  int residue_size
+    = (int)(residue_entropy * (float)pixels_in_y[0] * (float)pixels_in_x[0]);
+  int motion_size
+    = (int)(motion_entropy * (float)blocks_in_y * (float)blocks_in_x);
+
+  log_debug("predicted_entropy=%f residue_entropy=%f motion_entropy=%f\n",
+            predicted_entropy, residue_entropy, motion_entropy);
+  log_debug("predicted_size=%d residue_size=%d motion_size=%d\n",
+            predicted_size, residue_size, motion_size);
+
+  //if(predicted_entropy <= (residue_entropy + motion_entropy)) /* Image of type I. */ {
+  if(predicted_size <= (residue_size + motion_size)) {
+
+    /* Image of type I. */
+    w->frame_type[task] = 'I';
+
+    /* Copy predicted to residue. */
+    for(int c=0; c<COMPONENTS; c++) {
+      for(int y=0; y<pixels_in_y[c] /* c */; y++) {
+	for(int x=0; x<pixels_in_x[c] /* c */; x++) {
+	  residue[c][y][x] = predicted[c][y][x];
+	}
+      }
+    }
+
+  } else {
+
+    /* Image of type B. */
+    w->frame_type[task] = 'B';
+
+    /* We turn to the range [0,255] possibly with clipping. */
+    for(int c=0; c<COMPONENTS; c++) {
+      /* The following loop is only necessary if the dynamic range
+	 of the residue image must be stored in the range
+	 [0,255]. */
+      for(int y=0; y<pixels_in_y[c]; y++) {
+	for(int x=0; x<pixels_in_x[c]; x++) {
+	  int val = residue[c][y][x] + 128;
+	  if(val < 0) val = 0;
+	  else if(val > 255) val = 255;
+	  residue[c][y][x] = val;
+	}
+      }
+    }
+
+  }
+
+#else /* SYNTHESIZE */
+
+  /** Decompensation. */
+
+  if(w->frame_type[task] == 'I') {
+
+    /* If the picture is of type I, copy residue to predicted. */
+    for(int c=0; c<COMPONENTS; c++) {
+      for(int y=0; y<pixels_in_y[c]; y++) {
+	for(int x=0; x<pixels_in_x[c]; x++) {
+	  predicted[c][y][x] = residue[c][y][x] + 128;
+	  /*	    if (predicted[c][y][x] < 0 ) predicted[c][y][x] = 0;
+		    else if(predicted[c][y][x] > 255 ) predicted[c][y][x] = 255;*/
+	}
+      }
+    }
+  } else {
+    for(int c=0; c<COMPONENTS; c++) {
+      for(int y=0; y<pixels_in_y[c]; y++) {
+	for(int x=0; x<pixels_in_x[c]; x++) {
+	  int val = residue[c][y][x] + prediction[c][y][x];
+	  if(val<0) val=0;
+	  else if(val>255) val=255;
+	  predicted[c][y][x] = val;
+	}
+      }
+    }
+  }
+
+#endif /* SYNTHESIZE */
+
+} /* compensate_task() */
+
+
 #include <getopt.h>
 
 /** \brief Provides a main function which reads in parameters from the command line and a parameter file.
@@ -198,13 +650,8 @@ void predict
  */
 int main(int argc, char *argv[]) {
 
-#if defined DEBUG
-  info("%s ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
 
   int block_overlaping = 0;
   int block_size = 16;
@@ -223,6 +670,9 @@ int main(int argc, char *argv[]) {
   int search_range = 4;
   int subpixel_accuracy = 0;
   int always_B = 0; /* By default, not force to have only B frames */
+  int threads = 1;
+  int window_size = 0; /* By default, as many pictures as threads */
+  int interleaved = 0; /* By default, the even and odd pictures are in different files */
 
 
   int c;
@@ -246,6 +696,9 @@ int main(int argc, char *argv[]) {
       {"search_range", required_argument, 0, 's'},
       {"subpixel_accuracy", required_argument, 0, 'a'},
       {"always_B", required_argument, 0, 'B'},
+      {"threads", required_argument, 0, 'T'},
+      {"window_size", required_argument, 0, 'w'},
+      {"interleaved", required_argument, 0, 'I'},
       {"help", no_argument, 0, '?'},
       {0, 0, 0, 0}
     };
@@ -254,9 +707,9 @@ int main(int argc, char *argv[]) {
 
     c = getopt_long(argc, argv,
 #if defined ANALYZE
-		    "v:b:e:f:h:i:t:o:p:x:y:s:a:B:?",
+		    "v:b:e:f:h:i:t:o:p:x:y:s:a:B:T:w:I:?",
 #else
-		    "v:b:e:f:h:i:o:p:x:y:s:a:B:?",
+		    "v:b:e:f:h:i:o:p:x:y:s:a:B:T:w:I:?",
 #endif
 		    long_options, &option_index);
     
@@ -336,6 +789,18 @@ int main(int argc, char *argv[]) {
       always_B = atoi(optarg);
       break;
       
+    case 'T':
+      threads = atoi(optarg);
+      break;
+      
+    case 'w':
+      window_size = atoi(optarg);
+      break;
+
+    case 'I':
+      interleaved = atoi(optarg);
+      break;
+      
     case '?':
       //      print::info("[0;32m\n");
 #if defined ANALYZE
@@ -372,6 +837,9 @@ int main(int argc, char *argv[]) {
       printf("   -[-s]earch_range = size of the searching area of the motion estimation (%d)\n", search_range);
       printf("   -[-]subpixel_[a]ccuracy = sub-pixel accuracy of the motion estimation (%d)\n", subpixel_accuracy);
       printf("   -[-]always_[B] (%d)\n", always_B);
+      printf("   -[-T]hreads = number of pictures processed concurrently (%d)\n", threads);
+      printf("   -[-w]indow_size = number of pictures read ahead, 0 = as many as threads (%d)\n", window_size);
+      printf("   -[-I]nterleaved = 1 if the even and the odd pictures are interleaved in even_fn (= odd_fn) (%d)\n", interleaved);
       printf("\n");
       exit(1);
       break;
@@ -390,32 +858,14 @@ int main(int argc, char *argv[]) {
     }
   }
 
-  FILE *motion_in_fd;{
-    motion_in_fd = fopen(motion_in_fn, "r");
-    if(!motion_in_fd) {
-      error("%s: unable to read \"%s\" ... aborting!\n",
-	    argv[0], motion_in_fn);
-      abort();
-    }
-  }
-
-#if defined ANALYZE
-  FILE *motion_out_fd;{
-    motion_out_fd = fopen(motion_out_fn, "w");
-    if(!motion_out_fd) {
-      error("%s: unable to write \"%s\" ... aborting!\n",
-	    argv[0], motion_out_fn);
-      abort();
-    }
-  }
-#endif
-
   FILE *odd_fd; {
     odd_fd = fopen(odd_fn,
 #if defined ANALYZE
 		    "r"
 #else
-		    "w"
+		    /* The even pictures of an interleaved sequence have
+		       been written by un_update. */
+		    interleaved ? "r+" : "w"
 #endif
 		   );
     if(!odd_fd) {
@@ -464,10 +914,8 @@ int main(int argc, char *argv[]) {
 	    argv[0], prediction_fn);
       abort();
     }
-#if defined DEBUG
-    info("%s: writing predictions in \"%s\"\n",
-	 argv[0], prediction_fn);
-#endif
+    log_info("%s: writing predictions in \"%s\"\n",
+	     argv[0], prediction_fn);
   }
 #endif /* GET_PREDICTION */
 
@@ -491,33 +939,37 @@ int main(int argc, char *argv[]) {
     }
   }
 
-  class dwt2d <
-  TC_CPU_TYPE,
-    TEXTURE_INTERPOLATION_FILTER <
-  TC_CPU_TYPE
-    >
-    >
-  *image_dwt = new class dwt2d <
-    TC_CPU_TYPE,
-    TEXTURE_INTERPOLATION_FILTER <
-      TC_CPU_TYPE
-      >
-    >;
-  image_dwt->set_max_line_size(PIXELS_IN_X_MAX);
+  if(threads < 1) threads = 1;
+  if(threads > THREADS_MAX) threads = THREADS_MAX;
+  if(window_size < 1) window_size = threads;
 
   int blocks_in_y = pixels_in_y[0]/block_size;
   int blocks_in_x = pixels_in_x[0]/block_size;
-#if defined DEBUG
-  info("%s: blocks_in_y = %d\n", argv[0], blocks_in_y);
-  info("%s: blocks_in_x = %d\n", argv[0], blocks_in_x);
-#endif
+  log_debug("%s: blocks_in_y = %d\n", argv[0], blocks_in_y);
+  log_debug("%s: blocks_in_x = %d\n", argv[0], blocks_in_x);
+  log_debug("%s: threads = %d\n", argv[0], threads);
+  log_debug("%s: window_size = %d\n", argv[0], window_size);
 
   /** \tparam MVC_TYPE Motion vector component type. */
   motion < MVC_TYPE > motion;
   /** \tparam TC_IO_TYPE TC = Texture Component; IO = Input Output */
   texture < TC_IO_TYPE, TC_CPU_TYPE > image;
 
-  MVC_TYPE ****mv = motion.alloc(blocks_in_y, blocks_in_x);
+  motion_file motion_in;
+  if(!motion_in.open_read(motion_in_fn, blocks_in_y, blocks_in_x)) {
+    error("%s: unable to read \"%s\" ... aborting!\n",
+	  argv[0], motion_in_fn);
+    abort();
+  }
+
+#if defined ANALYZE
+  motion_file motion_out;
+  if(!motion_out.open_write(motion_out_fn, blocks_in_y, blocks_in_x, block_size)) {
+    error("%s: unable to write \"%s\" ... aborting!\n",
+	  argv[0], motion_out_fn);
+    abort();
+  }
+#endif
 
   MVC_TYPE ****zeroes = motion.alloc(blocks_in_y, blocks_in_x);
   for(int by=0; by<blocks_in_y; by++) {
@@ -529,550 +981,238 @@ int main(int argc, char *argv[]) {
     }
   }
 
-  TC_CPU_TYPE **prediction_block =
-    image.alloc((pixels_in_y[0]/blocks_in_y + block_overlaping*2)
-		<< subpixel_accuracy,
-		(pixels_in_x[0]/blocks_in_x + block_overlaping*2)
-		<< subpixel_accuracy,
-		0);
-
   int picture_border_size = 4*search_range + block_overlaping;
-#if defined DEBUG
-  info("%s: picture_border = %d\n", argv[0], picture_border_size);
-#endif
+  log_debug("%s: picture_border = %d\n", argv[0], picture_border_size);
+
+  struct window w;
+  w.block_overlaping = block_overlaping;
+  w.block_size = block_size;
+  w.blocks_in_y = blocks_in_y;
+  w.blocks_in_x = blocks_in_x;
+  w.pixels_in_y = pixels_in_y;
+  w.pixels_in_x = pixels_in_x;
+  w.subpixel_accuracy = subpixel_accuracy;
+  w.picture_border_size = picture_border_size;
+  w.always_B = always_B;
+  w.image = &image;
+
+  /* Working buffers of each thread. */
+  w.image_dwt = new class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > * [threads];
+  w.prediction_block = new TC_CPU_TYPE ** [threads];
+  for(int t=0; t<threads; t++) {
+    w.image_dwt[t] = new class dwt2d <
+      TC_CPU_TYPE,
+      TEXTURE_INTERPOLATION_FILTER <
+	TC_CPU_TYPE
+	>
+      >;
+    w.image_dwt[t]->set_max_line_size(PIXELS_IN_X_MAX);
+    w.prediction_block[t] =
+      image.alloc((pixels_in_y[0]/blocks_in_y + block_overlaping*2)
+		  << subpixel_accuracy,
+		  (pixels_in_x[0]/blocks_in_x + block_overlaping*2)
+		  << subpixel_accuracy,
+		  0);
+  }
 
-  TC_CPU_TYPE ***reference[2];
-  for(int i=0; i<2; i++) {
-    reference[i] = new TC_CPU_TYPE ** [COMPONENTS];
+  /* Buffers of each picture of the window. */
+  w.reference = new TC_CPU_TYPE *** [window_size + 1];
+  for(int i=0; i<=window_size; i++) {
+    w.reference[i] = new TC_CPU_TYPE ** [COMPONENTS];
     for(int c=0; c<COMPONENTS; c++) {
-      reference[i][c] =
+      w.reference[i][c] =
 	image.alloc(pixels_in_y[0] << subpixel_accuracy,
 		    pixels_in_x[0] << subpixel_accuracy,
 		    picture_border_size << subpixel_accuracy);
     }
   }
 
-  TC_CPU_TYPE ***predicted = new TC_CPU_TYPE ** [COMPONENTS];
-  for(int c=0; c<COMPONENTS; c++) {
-    predicted[c] = image.alloc(pixels_in_y[c], /* c */
-			       pixels_in_x[c], /* c */
-			       picture_border_size);
+  w.predicted = new TC_CPU_TYPE *** [window_size];
+  w.prediction = new TC_CPU_TYPE *** [window_size];
+  w.residue = new TC_CPU_TYPE *** [window_size];
+  w.mv = new MVC_TYPE **** [window_size];
+  w.frame_type = new char [window_size];
+  for(int i=0; i<window_size; i++) {
+    w.predicted[i] = new TC_CPU_TYPE ** [COMPONENTS];
+    w.prediction[i] = new TC_CPU_TYPE ** [COMPONENTS];
+    w.residue[i] = new TC_CPU_TYPE ** [COMPONENTS];
+    for(int c=0; c<COMPONENTS; c++) {
+      w.predicted[i][c] = image.alloc(pixels_in_y[c], /* c */
+				      pixels_in_x[c], /* c */
+				      picture_border_size);
+      w.prediction[i][c] = image.alloc(pixels_in_y[0] << subpixel_accuracy,
+				       pixels_in_x[0] << subpixel_accuracy,
+				       0);
+      w.residue[i][c] = image.alloc(pixels_in_y[c], /* c */
+				    pixels_in_x[c], /* c */
+				    0/*picture_border_size*/);
+    }
+    w.mv[i] = motion.alloc(blocks_in_y, blocks_in_x);
   }
 
-  TC_CPU_TYPE ***prediction = new TC_CPU_TYPE ** [COMPONENTS];
-  for(int c=0; c<COMPONENTS; c++) {
-    prediction[c] = image.alloc(pixels_in_y[0] << subpixel_accuracy,
-				pixels_in_x[0] << subpixel_accuracy,
-				0);
-  }
-  
-  TC_CPU_TYPE ***residue = new TC_CPU_TYPE ** [COMPONENTS];
-  for(int c=0; c<COMPONENTS; c++) {
-    residue[c] = image.alloc(pixels_in_y[c], /* c */
-			     pixels_in_x[c], /* c */
-			     0/*picture_border_size*/);
-  }
-  
-#if defined GET_PREDICTION
-  TC_CPU_TYPE *line = (TC_CPU_TYPE *)malloc(pixels_in_x[0]*sizeof(TC_CPU_TYPE));
-#endif
-  
   /** Begin decorrelation. */
 
-  /** The first image (reference [0]) is read. */
+  /** Bytes of a picture and of a motion field. */
+  int picture_bytes = 0;
   for(int c=0; c<COMPONENTS; c++) {
-    image.read(even_fd, reference[0][c], pixels_in_y[c], pixels_in_x[c]);
+    picture_bytes += pixels_in_y[c] * pixels_in_x[c] * sizeof(TC_IO_TYPE);
   }
+  int motion_bytes = 4 * blocks_in_y * blocks_in_x * sizeof(MVC_TYPE);
 
-  /** Interpolate the chroma of reference [0], to have the same size as the luma. 
-      This is necessary because the fields of motion apply to chroma with the same 
-      precision as the luma. */
-
-  /* Chroma Cb. */
+  /** Without split (merge), the even and the odd pictures are read
+      (written) in the same (interleaved) sequence. */
+  int stride = interleaved ? 2 : 1;
 
-  /*
-    +--------------+--------------+
-    |              |00000000000000|
-    |              |00000000000000|
-    |              |00000000000000|
-    |              |00000000000000|
-    |              |00000000000000|
-    |              |00000000000000|
-    +--------------+--------------+
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    +--------------+--------------+
-   */
-  for(int y=0; y<pixels_in_y[0]/2; y++) {
-    memset(reference[0][1][y]+pixels_in_x[0]/2, 0,
-	   (pixels_in_x[0]*sizeof(TC_CPU_TYPE))/2);
+  /** The first image (reference [0]) is read. */ {
+    profile_scope timer(read_timer);
+    seek_picture(even_fd, 0, stride, EVEN_OFFSET, picture_bytes);
+    for(int c=0; c<COMPONENTS; c++) {
+      image.read(even_fd, w.reference[0][c], pixels_in_y[c], pixels_in_x[c]);
+    }
+    profile_count(bytes_read_counter, picture_bytes);
   }
+  interpolate_reference(pixels_in_y[0],
+			pixels_in_x[0],
+			subpixel_accuracy,
+			picture_border_size,
+			w.image_dwt[0],
+			&image,
+			w.reference[0]);
 
-  /*
-    +--------------+--------------+
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    |              |              |
-    +--------------+--------------+
-    |00000000000000|00000000000000|
-    |00000000000000|00000000000000|
-    |00000000000000|00000000000000|
-    |00000000000000|00000000000000|
-    |00000000000000|00000000000000|
-    |00000000000000|00000000000000|
-    +--------------+--------------+
-   */
+  /** The other images are processed, "window_size" pictures at a
+      time. The pictures of a window are read, processed concurrently
+      and written in order. */
 
-  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-    memset(reference[0][1][y], 0, pixels_in_x[0]*sizeof(TC_CPU_TYPE));
-  }
+  for(int i=0; i<pictures/2; i+=window_size) {
 
-  /* Interpolation. */
-  image_dwt->synthesize(reference[0][1], pixels_in_y[0], pixels_in_x[0], 1);
+    int n = pictures/2 - i;
+    if(n > window_size) n = window_size;
 
-  /* Chroma Cr. */
-  for(int y=0; y<pixels_in_y[0]/2; y++) {
-    memset(reference[0][2][y]+pixels_in_x[0]/2, 0,
-	   (pixels_in_x[0]*sizeof(TC_CPU_TYPE))/2);
-  }
-  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-    memset(reference[0][2][y], 0, pixels_in_x[0]*sizeof(TC_CPU_TYPE));
-  }
-  image_dwt->synthesize(reference[0][2], pixels_in_y[0], pixels_in_x[0], 1); 
+    for(int j=0; j<n; j++) {
 
-  /** At this point, referece [0] has its three components with the
-      same size.  It's time to interpolate (interpolation leads to
-      errors).\n And fill edges, if you are using sub-pixel estimation
-      movement. */
+      profile_scope timer(read_timer);
 
-  /* Interpolate and fill edges. */
-  for(int c = 0; c < COMPONENTS; c++) {
-    
-    for(int s = 1; s <= subpixel_accuracy; s++) {
-      
-      /* Interpolate (the error is here!) */
-      for(int y = 0; y < ( pixels_in_y[0] << s ) / 2; y++) {
-	memset ( reference[0][c][y] + ( pixels_in_x[0] << s ) / 2,
-		 0,
-		 ( ( ( pixels_in_x[0] << s ) / 2 ) * sizeof(TC_CPU_TYPE) )
-		 );
-      }
-      
-      for(int y = ( pixels_in_y[0] << s) / 2; y < ( pixels_in_y[0] << s); y++) {
-	memset(reference[0][c][y],
-	       0,
-	       ( pixels_in_x[0] << s ) *sizeof(TC_CPU_TYPE) );
-      }
-      image_dwt->synthesize(reference[0][c],
-			    pixels_in_y[0] << s,
-			    pixels_in_x[0] << s,
-			    1);
-      
-    }
-    
-    /* Fill edges. */
-    image.fill_border(reference[0][c],
-		      pixels_in_y[0] << subpixel_accuracy,
-		      pixels_in_x[0] << subpixel_accuracy,
-		      picture_border_size << subpixel_accuracy);
-    
-  }
-  
-  /** The other images are processed. */
-  
-  for(int i=0; i<pictures/2; i++) {
-    
-#if defined ANALYZE /** DECORRELATION or SYNTHESIZE (Correlation). Depends if ANALYZE is defined. */     
+#if defined ANALYZE /** DECORRELATION or SYNTHESIZE (Correlation). Depends if ANALYZE is defined. */
 
-#if defined DEBUG
-    info("%s: reading picture %d of \"%s\".\n",
-	 argv[0], i, odd_fn);
-#endif
+      log_info("%s: reading picture %d of \"%s\".\n",
+	       argv[0], i+j, odd_fn);
 
-    /** The next image is read (which is what we will predicir). */
+      /** The next image is read (which is what we will predicir). */
 
-    for(int c=0; c<COMPONENTS; c++) {
-      image.read(odd_fd, predicted[c], pixels_in_y[c], pixels_in_x[c]);
-    }
+      seek_picture(odd_fd, i+j, stride, ODD_OFFSET, picture_bytes);
+      for(int c=0; c<COMPONENTS; c++) {
+	image.read(odd_fd, w.predicted[j][c], pixels_in_y[c], pixels_in_x[c]);
+      }
 
 #else /* SYNTHESIZE (Correlation). */
 
-#if defined DEBUG
-    info("%s: reding picture %d of \"%s\".\n",
-	 argv[0], i, high_fn);
-#endif
+      log_info("%s: reading picture %d of \"%s\".\n",
+	       argv[0], i+j, high_fn);
 
-    /** The residue image is read. */
+      /** The residue image is read. */
 
-    for(int c=0; c<COMPONENTS; c++) {
-      image.read(high_fd, residue[c], pixels_in_y[c], pixels_in_x[c]);
-      for(int y=0; y<pixels_in_y[c]; y++) {
-	for(int x=0; x<pixels_in_x[c]; x++) {
-	  residue[c][y][x] -= 128;
+      for(int c=0; c<COMPONENTS; c++) {
+	image.read(high_fd, w.residue[j][c], pixels_in_y[c], pixels_in_x[c]);
+	for(int y=0; y<pixels_in_y[c]; y++) {
+	  for(int x=0; x<pixels_in_x[c]; x++) {
+	    w.residue[j][c][y][x] -= 128;
+	  }
 	}
       }
-    }
 
-#endif /* SYNTHESIZE. */
+      w.frame_type[j] = fgetc(frame_types_fd);
 
-#if defined DEBUG
-    info("%s: reading picture %d of \"%s\".\n",
-	 argv[0], i, even_fn);
-#endif
-
-    /* It reads reference [1], interpolating the chroma. */
-
-    for(int c=0; c<COMPONENTS; c++) {
-      image.read(even_fd, reference[1][c], pixels_in_y[c], pixels_in_x[c]);
-    }
-
-    /* Croma Cb. */
-    for(int y=0; y<pixels_in_y[0]/2; y++) {
-      memset(reference[1][1][y]+pixels_in_x[0]/2, 0,
-	     (pixels_in_x[0]*sizeof(TC_CPU_TYPE))/2);
-    }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      memset(reference[1][1][y], 0, pixels_in_x[0]*sizeof(TC_CPU_TYPE));
-    }
-    image_dwt->synthesize(reference[1][1], pixels_in_y[0], pixels_in_x[0], 1);
-
-    /* Croma Cr. */
-    for(int y=0; y<pixels_in_y[0]/2; y++) {
-      memset(reference[1][2][y]+pixels_in_x[0]/2, 0,
-	     (pixels_in_x[0]*sizeof(TC_CPU_TYPE))/2);
-    }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      memset(reference[1][2][y], 0, pixels_in_x[0]*sizeof(TC_CPU_TYPE));
-    }
-    image_dwt->synthesize(reference[1][2], pixels_in_y[0], pixels_in_x[0], 1);
+#endif /* SYNTHESIZE. */
 
-    /* Interpolate and fill edges. */
+      log_info("%s: reading picture %d of \"%s\".\n",
+	       argv[0], i+j, even_fn);
 
-    for(int c = 0; c < COMPONENTS; c++) {
-      
-      for(int s = 1; s <= subpixel_accuracy; s++) {
-	
-	/* Interpolate. */
-	for(int y = 0; y < ( pixels_in_y[0] << s ) / 2; y++) {
-	  memset ( reference[1][c][y] + ( pixels_in_x[0] << s ) / 2,
-		   0,
-		   ( ( ( pixels_in_x[0] << s ) / 2 ) * sizeof(TC_CPU_TYPE) )
-		   );
-	}
-	
-	for(int y = ( pixels_in_y[0] << s) / 2; y < ( pixels_in_y[0] << s); y++) {
-	  memset(reference[1][c][y],
-		 0,
-		 ( pixels_in_x[0] << s ) *sizeof(TC_CPU_TYPE) );
-	}
-	image_dwt->synthesize(reference[1][c],
-			      pixels_in_y[0] << s,
-			      pixels_in_x[0] << s,
-			      1);
+      /* It reads the reference j+1 (its chroma is interpolated later). */
 
+      seek_picture(even_fd, i+j+1, stride, EVEN_OFFSET, picture_bytes);
+      for(int c=0; c<COMPONENTS; c++) {
+	image.read(even_fd, w.reference[j+1][c], pixels_in_y[c], pixels_in_x[c]);
       }
-      
-      /* Fill edges. */
-      image.fill_border(reference[1][c],
-			pixels_in_y[0] << subpixel_accuracy,
-			pixels_in_x[0] << subpixel_accuracy,
-			picture_border_size << subpixel_accuracy);
-
-    }
-
-    /* Motion fields are read. */
-#if defined DEBUG
-    info("%s: reading motion vector field %d in \"%s\".\n",
-	 argv[0], i, motion_in_fn);
-#endif
-    motion.read(motion_in_fd, mv, blocks_in_y, blocks_in_x);
 
-#if defined ANALYZE
-    float motion_entropy = 0.0; {
-      static int count[256];
-      
-      if(!always_B) {
-	
-	for(int i=0; i<256; i++) {
-	  count[i] = 0;
-	}
-	
-	for(int y=0; y<blocks_in_y; y++) {
-	  for(int x=0; x<blocks_in_x; x++) {
-	    count[ mv[PREV][Y_FIELD][y][x] + 128 ]++;
-	    count[ mv[PREV][X_FIELD][y][x] + 128 ]++;
-	    count[ mv[NEXT][Y_FIELD][y][x] + 128 ]++;
-	    count[ mv[NEXT][X_FIELD][y][x] + 128 ]++;
-	  }
-	}
-	
-	motion_entropy = entropy(count, 256);
+      /* Motion fields are read. */
+      log_info("%s: reading motion vector field %d in \"%s\".\n",
+	       argv[0], i+j, motion_in_fn);
+      motion_in.read(w.mv[j]);
 
-      }
+      profile_count(bytes_read_counter, 2*picture_bytes + motion_bytes);
     }
-#endif /* ANALYZE */
 
-    /** If the entropy of the predicted image is less than or equal to
-	the entropy of the "wrong image" then the predicted image
-	replaces the "wrong image". */
-
-    /* Write the residue image, the chroma subsampling. */
-
-    predict(block_overlaping << subpixel_accuracy,
-	    block_size << subpixel_accuracy,
-	    blocks_in_y,
-	    blocks_in_x,
-	    COMPONENTS,
-	    pixels_in_y[0] << subpixel_accuracy,
-	    pixels_in_x[0] << subpixel_accuracy,
-	    mv,
-	    image_dwt,
-	    prediction_block,
-	    prediction,
-	    reference);
-
-    for(int c=0; c<COMPONENTS; c++) {
-      for(int y=0; y<pixels_in_y[0] << subpixel_accuracy; y++) {
-	for(int x=0; x<pixels_in_x[0] << subpixel_accuracy; x++) {
-	  if (prediction[c][y][x] < 0) prediction[c][y][x] = 0;
-	  else if (prediction[c][y][x] > 255) prediction[c][y][x] = 255;
-	}
-      }
+    /* Interpolate the references and compensate the pictures. */ {
+      profile_scope timer(interpolation_timer);
+      run_tasks(n, threads, interpolate_task, &w);
+    } {
+      profile_scope timer(compensation_timer);
+      run_tasks(n, threads, compensate_task, &w);
     }
 
-    /** Sub-sampled the three components because the motion
-	compensation is made to the original video resolution. */
-    for(int c=0; c<COMPONENTS; c++) {
-      image_dwt->analyze(prediction[c],
-			 pixels_in_y[0] << subpixel_accuracy,
-			 pixels_in_x[0] << subpixel_accuracy,
-			 subpixel_accuracy);
-    }
+    for(int j=0; j<n; j++) {
 
-    /* The prediction is still on: YUV444; and we must pass it: YUV422. */
-    image_dwt->analyze(prediction[1], pixels_in_y[0], pixels_in_x[0], 1);
-    image_dwt->analyze(prediction[2], pixels_in_y[0], pixels_in_x[0], 1);
+      profile_scope timer(write_timer);
 
 #if defined GET_PREDICTION
-#if defined DEBUG
-    info("%s: writing picture %d of \"%s\".\n",
-	 argv[0], i, prediction_fn);
-#endif /* DEBUG */
-    for(int c=0; c<COMPONENTS; c++) {
-      image.write(prediction_fd, prediction[c], pixels_in_y[c], pixels_in_x[c]);
-    }
+      log_info("%s: writing picture %d of \"%s\".\n",
+	       argv[0], i+j, prediction_fn);
+      for(int c=0; c<COMPONENTS; c++) {
+	image.write(prediction_fd, w.prediction[j][c], pixels_in_y[c], pixels_in_x[c]);
+      }
+      profile_count(bytes_written_counter, picture_bytes);
 #endif /* GET_PREDICTION */
 
 #if defined ANALYZE
 
-    /** The residue image is generated. */
+      log_info("%s: writing picture %d of \"%s\".\n",
+	       argv[0], i+j, high_fn);
 
-#if defined DEBUG
-      info("%s: writing picture %d of \"%s\".\n",
-	   argv[0], i, high_fn);
-#endif
-
-      /*
-	A subtraction at high resolution and a reduction,
-	vs, 
-	Two reductions and a subtraction at low resolution.
-
-	Without truncating:
-
-	1 2 3 4   1 1 2 2   0  1  1  2     0.5  1.5
-	5 6 7 8 - 5 5 6 6 = 0  1  1  2 -> -0.5 -1.5
-	8 7 6 5   8 8 7 7   0 -1 -1 -2
-	4 3 2 1   4 4 3 3   0 -1 -1 -2
-
-           |         |
-           v         v
-
-	3.5 5.5 - 3.0 4.0 =  0.5  1.5
-        5.5 3.5   6.0 5.0   -0.5 -1.5
-
-	Truncating:
+      /* Indicated in the code-stream the type of the image. */
+      putc(w.frame_type[j], frame_types_fd);
 
-	1 2 3 4   1 1 2 2   0  1  1  2     0  1
-	5 6 7 8 - 5 5 6 6 = 0  1  1  2 -> -1 -2
-	8 7 6 5   8 8 7 7   0 -1 -1 -2
-	4 3 2 1   4 4 3 3   0 -1 -1 -2
-
-           |         |
-           v         v
-
-	3 5     -   3 4 =  0  1
-        5 3         6 5   -1 -2
-	
-	That is, the motion compensation at high resolution is the
-	same as at low resolution (if the predictions are equal).
-       */
-
-
-      /* Compensation is applied (with clipping). The compensation is
-	 done over-pixel resolution. */
-    for(int c=0; c<COMPONENTS; c++) {
-      for(int y=0; y<pixels_in_y[c]; y++) {
-	for(int x=0; x<pixels_in_x[c]; x++) {
-	  int val = predicted[c][y][x] - prediction[c][y][x];
-	  if(val < -128) val = -128;
-	  else if(val > 127) val = 127;
-	  residue[c][y][x] = val;
-	}
-      }
-    }
-
-    /* The entropy of the residual image and the predicted image is
-       calculated. We only use the luma. */
-
-    float residue_entropy = 0.0, predicted_entropy = 1.0; {
-      static int predicted_count[256];
-      static int residue_count[256];
-
-      if (!always_B) {
-	
-	for(int i=0; i<256; i++) {
-	  predicted_count[i] = 0;
-	  residue_count[i] = 0;
-	}
-	
-	for(int y=0; y<pixels_in_y[0]; y++) {
-	  for(int x=0; x<pixels_in_x[0]; x++) {
-	    predicted_count[ predicted[0][y][x]       ]++;
-	    residue_count  [ residue  [0][y][x] + 128 ]++; // Usar puntero
-	  }
-	}
-	
-	predicted_entropy = entropy(predicted_count, 256);
-	residue_entropy = entropy(residue_count, 256);
-	
-      }
-    }
-
-    /* If the entropy of the predicted image is less than or equal to
-       the entropy of the "wrong image" then the predicted image
-       replaces the "wrong image". */
-
-      /* Write the residue image, the chroma subsampling. */
-
-    int predicted_size
-      = (int)(predicted_entropy * (float)pixels_in_y[0] * (float)pixels_in_x[0]);
-    int residue_size
-      = (int)(residue_entropy * (float)pixels_in_y[0] * (float)pixels_in_x[0]);
-    int motion_size
-      = (int)(motion_entropy * (float)blocks_in_y * (float)blocks_in_x);
-
-#if defined DEBUG
-    info("predicted_entropy=%f residue_entropy=%f motion_entropy=%f\n",
-	 predicted_entropy, residue_entropy, motion_entropy);
-    info("predicted_size=%d residue_size=%d motion_size=%d\n",
-	 predicted_size, residue_size, motion_size);
-#endif
-
-    //if(predicted_entropy <= (residue_entropy + motion_entropy)) /* Image of type I. */ {
-    if(predicted_size <= (residue_size + motion_size)) {
-
-      /* Indicated in the code-stream which is an image I. */
-      putc('I', frame_types_fd);
-
-      /* Copy predicted to residue. */
-      
       for(int c=0; c<COMPONENTS; c++) {
-	for(int y=0; y<pixels_in_y[c] /* c */; y++) {
-	  for(int x=0; x<pixels_in_x[c] /* c */; x++) {
-	    residue[c][y][x] = predicted[c][y][x];
-	    //printf("%d ",residue[c][y][x]);
-	  }
-	}
-      }
-      
-      for(int c=0; c<COMPONENTS; c++) {
-	image.write(high_fd, residue[c], pixels_in_y[c], pixels_in_x[c]);
+	image.write(high_fd, w.residue[j][c], pixels_in_y[c], pixels_in_x[c]);
       }
 
-      /* No motion field (other than 0) associated with an image I. */
-      motion.write(motion_out_fd, zeroes, blocks_in_y, blocks_in_x);
-
-    } else {
-
-      /* Indicated in the code-stream which is an image B. */
-      putc('B', frame_types_fd);
-
-      /* We turn to the range [0,255] possibly with clipping and write to disk. */
-
-      for(int c=0; c<COMPONENTS; c++) {
-	/* The following loop is only necessary if the dynamic range
-	   of the residue image must be stored in the range
-	   [0,255]. */
-	for(int y=0; y<pixels_in_y[c]; y++) {
-	  for(int x=0; x<pixels_in_x[c]; x++) {
-	    int val = residue[c][y][x] + 128;
-	    if(val < 0) val = 0;
-	    else if(val > 255) val = 255;
-	    residue[c][y][x] = val;
-	  }
-	}
-	image.write(high_fd, residue[c], pixels_in_y[c], pixels_in_x[c]);
+      if(w.frame_type[j] == 'I') {
+	/* No motion field (other than 0) associated with an image I. */
+	motion_out.write(zeroes);
+      } else {
+	/* The images B have associated motion field. */
+	motion_out.write(w.mv[j]);
       }
-
-      /* The images I have associated motion field. */
-      motion.write(motion_out_fd, mv, blocks_in_y, blocks_in_x);
-
-    }
+      profile_count(bytes_written_counter, 1 + picture_bytes + motion_bytes);
 
 #else /* SYNTHESIZE */
 
-#if defined DEBUG
-    info("%s: writing picture %d of \"%s\".\n",
-	 argv[0], i, odd_fn);
-#endif
+      log_info("%s: writing picture %d of \"%s\".\n",
+	       argv[0], i+j, odd_fn);
 
-    /** Decompensation. */
-
-    if(fgetc(frame_types_fd) == 'I') {
-
-      /* If the picture is of type I, copy residue to predicted. */
+      /* We write the predicted image, the chroma subsampling. */
+      seek_picture(odd_fd, i+j, stride, ODD_OFFSET, picture_bytes);
       for(int c=0; c<COMPONENTS; c++) {
-	for(int y=0; y<pixels_in_y[c]; y++) {
-	  for(int x=0; x<pixels_in_x[c]; x++) {
-	    predicted[c][y][x] = residue[c][y][x] + 128;
-	    /*	    if (predicted[c][y][x] < 0 ) predicted[c][y][x] = 0;
-		    else if(predicted[c][y][x] > 255 ) predicted[c][y][x] = 255;*/
-	  }
-	}
+	image.write(odd_fd, w.predicted[j][c], pixels_in_y[c], pixels_in_x[c]);
       }
-    } else {
-      for(int c=0; c<COMPONENTS; c++) {
-	for(int y=0; y<pixels_in_y[c]; y++) {
-	  for(int x=0; x<pixels_in_x[c]; x++) {
-	    int val = residue[c][y][x] + prediction[c][y][x];
-	    if(val<0) val=0;
-	    else if(val>255) val=255;
-	    predicted[c][y][x] = val;
-	  }
-	}
-      }
-    }
+      profile_count(bytes_written_counter, picture_bytes);
+
+#endif /* SYNTHESIZE */
 
-    /* We write the predicted image, the chroma subsampling. */
-    for(int c=0; c<COMPONENTS; c++) {
-      image.write(odd_fd, predicted[c], pixels_in_y[c], pixels_in_x[c]);
     }
 
-#endif /* SYNTHESIZE */
-    
-    /* SWAP(&reference_picture[0], &reference_picture[1]). */ {
-      TC_CPU_TYPE ***tmp = reference[0];
-      reference[0] = reference[1];
-      reference[1] = tmp;
+    /* The last reference of the window is the first of the next one. */ {
+      TC_CPU_TYPE ***tmp = w.reference[0];
+      w.reference[0] = w.reference[n];
+      w.reference[n] = tmp;
     }
   }
 
-  delete image_dwt;
+  motion_in.close();
+#if defined ANALYZE
+  motion_out.close();
+#endif
+
+  for(int t=0; t<threads; t++) {
+    delete w.image_dwt[t];
+  }
 }
@@ -9,6 +9,11 @@
  * sobre Internet" (P10-TIC-6548).
  */
 
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdarg.h>
+#include <string.h>
+
 /**
  * \brief Shows information about variables.
  */
@@ -44,3 +49,65 @@ void info_flush() {
 void error_flush() {
   fflush(stderr);
 }
+
+/** \brief Only errors are shown. */
+#define LOG_QUIET 0
+/** \brief Shows the progress of the execution (one message per picture or field). */
+#define LOG_INFO 1
+/** \brief Shows detailed information about the execution. */
+#define LOG_DEBUG 2
+
+/** \brief Current log level (-1 = not read yet). */
+static int log_level_value = -1;
+
+/**
+ * \brief Reads the log level from the environment variable
+ * MCTF_LOG_LEVEL, which can be "quiet" (or 0, the default), "info"
+ * (or 1) or "debug" (or 2).
+ * \returns The log level.
+ */
+int read_log_level() {
+  const char *level = getenv("MCTF_LOG_LEVEL");
+  if(!level || !*level) log_level_value = LOG_QUIET;
+  else if(!strcmp(level, "quiet")) log_level_value = LOG_QUIET;
+  else if(!strcmp(level, "info")) log_level_value = LOG_INFO;
+  else if(!strcmp(level, "debug")) log_level_value = LOG_DEBUG;
+  else log_level_value = atoi(level);
+  if(log_level_value < LOG_QUIET) log_level_value = LOG_QUIET;
+  return log_level_value;
+}
+
+/** \brief Log level. The environment is only read the first time. */
+#define log_level() (log_level_value >= 0 ? log_level_value : read_log_level())
+
+/**
+ * \brief Shows a log message (through stderr, so the standard output
+ * is not disturbed).
+ */
+void log_message(const char *args, ...) {
+  va_list ap;
+  va_start(ap, args);
+  vfprintf(stderr, args, ap);
+  va_end(ap);
+  fflush(stderr);
+}
+
+/** \brief Shows progress information. The arguments are not
+    evaluated if the log level is lower than LOG_INFO. */
+#define log_info(...) do { if(log_level() >= LOG_INFO) log_message(__VA_ARGS__); } while(0)
+
+/** \brief Shows detailed information. The arguments are not
+    evaluated if the log level is lower than LOG_DEBUG. */
+#define log_debug(...) do { if(log_level() >= LOG_DEBUG) log_message(__VA_ARGS__); } while(0)
+
+/**
+ * \brief Shows the command line (at the LOG_INFO level).
+ */
+void log_command_line(int argc, char *argv[]) {
+  if(log_level() >= LOG_INFO) {
+    for(int i=0; i<argc; i++) {
+      log_message("%s ", argv[i]);
+    }
+    log_message("\n");
+  }
+}
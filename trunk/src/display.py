@@ -10,6 +10,30 @@
 #  Bridge of communication between the programming language and display system.
 
 import sys
+import os
+
+## Nothing but errors and warnings are displayed.
+LOG_QUIET = 0
+## Progress information is displayed.
+LOG_INFO = 1
+## Detailed information about the execution is displayed.
+LOG_DEBUG = 2
+
+## Reads the log level from the environment variable MCTF_LOG_LEVEL,
+#  which can be "quiet", "info", "debug" or a number (0, 1 or 2).
+#  @return The log level (LOG_QUIET by default).
+def read_log_level():
+    level = os.environ.get("MCTF_LOG_LEVEL", "")
+    levels = {"quiet": LOG_QUIET, "info": LOG_INFO, "debug": LOG_DEBUG}
+    if level in levels:
+        return levels[level]
+    try:
+        return int(level)
+    except ValueError:
+        return LOG_QUIET
+
+## Current log level.
+log_level = read_log_level()
 
 ## Makes a system call in order to display information about the execution.
 #  @param string Information about the execution.
@@ -17,7 +41,23 @@ def info(string):
     sys.stderr.write(string)
     sys.stderr.flush()
 
-## Makes a system call in order to display error information about the execution.
+## Displays progress information, only if the log level is at least
+#  LOG_INFO.
+#  @param string Information about the execution.
+def log_info(string):
+    if log_level >= LOG_INFO:
+        info(string)
+
+## Displays detailed information, only if the log level is at least
+#  LOG_DEBUG.
+#  @param string Information about the execution.
+def log_debug(string):
+    if log_level >= LOG_DEBUG:
+        info(string)
+
+## Makes a system call in order to display error information about
+#  the execution, and exits with a non-zero status (so that check_call()
+#  fails in the caller).
 #  @param string Error information about the execution.
 def error(string):
     sys.stderr.write("[0;31m")
@@ -26,7 +66,7 @@ def error(string):
     sys.stderr.write("Aborting!")
     sys.stderr.write("[1;0m")
     sys.stderr.flush()
-    sys.exit()
+    sys.exit(-1)
 
 ## Makes a system call in order to display warning information on implementation.
 #  @param string Warning information on implementation.
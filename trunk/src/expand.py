@@ -36,6 +36,7 @@ from GOP import GOP
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
+from MCTF_profile import MCTF_profile
 
 ## Refers to Full-HD resolution. Is used as a boundary between the use
 ## of a block size of 16 or 32 by default.
@@ -70,6 +71,12 @@ border_size       = 0
 block_overlaping  = 0
 ## Weight of the update step.
 update_factor     = 1.0/4
+## Number of pictures processed concurrently in the motion
+## compensation and update steps.
+threads           = 1
+
+## Profile of the run (only if MCTF_PROFILE is defined).
+profile = MCTF_profile("expand")
 
 ## The parser module provides an interface to Python's internal parser
 ## and byte-code compiler.
@@ -87,6 +94,7 @@ parser.search_range(search_range)
 parser.border_size(border_size)
 parser.block_overlaping(block_overlaping)
 parser.update_factor(update_factor)
+parser.threads(threads)
 
 ## A script may only parse a few of the command-line arguments,
 ## passing the remaining arguments on to another script or program.
@@ -126,6 +134,8 @@ if args.block_overlaping:
     block_overlaping = int(args.block_overlaping)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
 
 
 
@@ -251,6 +261,11 @@ if TRLs > 1 :
                    + " --search_range="      + str(search_range)
                    + " --block_overlaping="  + str(block_overlaping)
                    + " --update_factor="     + str(update_factor)
+                   + " --threads="           + str(threads)
                    , shell=True)
     except CalledProcessError:
         sys.exit(-1)
+
+# Adds up the profiles of the kernels.
+#-------------------------------------
+profile.merge()
@@ -25,8 +25,7 @@ import sys
 import getopt
 import display
 import math
-import subprocess as     sub
-from   subprocess import check_call
+import rate_accounting
 from   GOP        import GOP
 
 ## class info
@@ -38,6 +37,8 @@ class info(GOP):
     TRLs = 4
     ##  Frames per Second.
     FPS  = 30
+    ## Codec of the codestreams (see rate_accounting.py).
+    codec = "j2k"
 
 
     ## Contructor. Displays information about the sequence in terms of rate.
@@ -59,8 +60,6 @@ class info(GOP):
         GOP_size            = GOP.get_size(self, self.TRLs) # number_of_GOPs = int(math.ceil((self.pictures * 1.0)/ GOP_size))
         ## Total number of images in the sequence.
         pictures            = GOP_size * self.GOPs + 1
-        ## Weighting value, to be applied between the GOP0, and the rest.
-        average_ponderation = (pictures - 1.0) / pictures
         ## The duration of GOP0.
         GOP0_time           = 1.0              / self.FPS
         ## The duration of a GOP.
@@ -118,83 +117,29 @@ class info(GOP):
 
 
 
-        # VARIABLES.
-        #-----------
+        # RATES. Read from the codestreams (see rate_accounting.py).
+        #-----------------------------------------------------------
 
-        # Displays the bit-rate of each subband of each
-        # GOP. Therefore, an array of integers, to store for each
-        # subband, the bit-rate required of the previous GOP. The
-        # bit-rate of the current GOP for each subband, is calculated
-        # by subtracting the value for the previous GOP, less the
-        # present value. Recall that the files with the code-streams,
-        # are traversed sequentially, and there is a file for each
-        # subband).
-        M_prev_GOP      = [0] * self.TRLs
-        H_prev_GOP      = [0] * self.TRLs
-        M_prev_image    = [0] * self.TRLs
-        H_prev_image    = [0] * self.TRLs
-
-        # Means for each subband.
-        #--------------------------
+        ## Rates of the sequence.
+        self.accounting = rate_accounting.accounting(self.GOPs, self.TRLs, self.FPS, self.codec)
+        T_kbps, M_kbps = self.accounting.gop_kbps()
+        ## Kbps of textures and motion of each GOP.
+        total_kbps = T_kbps.sum(axis=1) + M_kbps.sum(axis=1)
+        self.kbps_M, self.kbps_H, self.kbps_HM_total = self.accounting.kbps()
 
         ## List type frame.
-        self.types_frame     = [None] + [[] for x in xrange (self.TRLs-1)]   # [None, F, F, ..., F]
-
+        self.types_frame     = [None] + [list(t) for t in self.accounting.types[1:]]    # [None, F, F, ..., F]
 
         # Calculation of bytes (textures and motion) per frame.
         #------------------------------------------------------
-        self.bytes_frames_M  = [None] + [[] for x in xrange (self.TRLs-1)]   # [None, M, M, ..., M]
-        self.bytes_frames_T  = [[] for x in xrange (self.TRLs)]              # [L,    H, H, ..., H]
-        self.bytes_frames_TM = [[] for x in xrange (self.TRLs)]              # [L,    H, H, ..., H]
-
-
-        # Calculation of bit-rates.
-        #--------------------------
-
-        ## List kbps of high frequency subbands.
-        self.kbps_H          = [[] for x in xrange (self.GOPs+1)]
-        ## List kbps of motion vectors.
-        self.kbps_M          = [[] for x in xrange (self.GOPs)]
-        ## List kbps of high frequency subbands and motion vectors.
-        self.kbps_HM_total   = []
-        #self.info_RMSE      = []
-
-
-        # Means for each subband.
-        #--------------------------
-
-        ## Average kbps of motion.
-        self.average_M     = [0] * (self.TRLs + 1)
-        ## Average kbps of high frecuency subbands.
-        self.average_H     = [0] * (self.TRLs + 1)
-        ## Average kbps of low frecuency subbands.
-        self.average_L     = 0
-        ## Average kbps of codestream.
-        self.average_total = 0
-
-
-        # FILES. Open files with temporal subbands and motion fields.
-        #------------------------------------------------------------
-        L_file  = self.open_codestream("low_" + str(self.TRLs - 1) + ".j2c") # L
-        H_file  = [None]                                                     # H
-        M_file  = [None]                                                     # M
-        F_file  = [None]                                                     # Frame types
-
-        for subband in range(1, self.TRLs) :
-            H_file.append(self.open_codestream("high_"           + str(subband) + ".j2c"))
-            M_file.append(self.open_codestream("motion_residue_" + str(subband) + ".mjc"))
-            F_file.append(self.open_codestream("frame_types_"    + str(subband)         ))
+        self.bytes_frames_M  = [None] + [m.tolist() for m in self.accounting.motion[1:]] # [None, M, M, ..., M]
+        self.bytes_frames_T  = [t.tolist() for t in self.accounting.texture]             # [L,    H, H, ..., H]
+        self.bytes_frames_TM = [self.bytes_frames_T[0][:]] + [(t + m).tolist() for t, m in zip(self.accounting.texture[1:], self.accounting.motion[1:])]
 
 
         # GOP 0. The GOP0 is formed by the first image in low_<TRLs-1>.
         #--------------------------------------------------------------
-        L_prev_GOP = self.find_next_EOC_texture(L_file)
-        self.bytes_frames_T[0].append(L_prev_GOP) # Bytes per frame
-
-        L_kbps_GOP0 = float(L_prev_GOP) * 8.0 / GOP0_time / 1000.0
-        self.kbps_H    [0].append(L_kbps_GOP0)
-        self.kbps_HM_total.append(L_kbps_GOP0)
-
+        L_kbps_GOP0 = T_kbps[0, 0]
         sys.stdout.write("0000 %8d " % L_kbps_GOP0)
 
         for subband in range(self.TRLs-1, 0, -1):
@@ -209,161 +154,37 @@ class info(GOP):
         # GOP n. GOPs are formed by a number of subbands.
         #------------------------------------------------
         for GOP_number in range(1, self.GOPs+1) :
-            total = 0 # Total Kbps
             sys.stdout.write("%3s " % '%04d' % GOP_number)
+            sys.stdout.write("%8d " % int(T_kbps[GOP_number, 0]))
 
-
-            # SUBBANDA L. Each new image represents a new GOP.
-            #-------------------------------------------------
-            L_next_GOP = self.find_next_EOC_texture(L_file)
-            L_bytes    = L_next_GOP - L_prev_GOP
-            self.bytes_frames_T[0].append(L_bytes) # Bytes per frame
-
-            L_prev_GOP                   = L_next_GOP
-            L_kbps                       = float(L_bytes) * 8.0 / GOP_time / 1000.0
-            self.kbps_H[GOP_number].append(L_kbps)
-            self.average_L              += L_kbps
-            total                       += L_kbps
-
-            sys.stdout.write("%8d " % int(L_kbps))
-
-
-            # SUBBANDAS H. Depending on the level of temporal resolution, each GOP generates a number of different images.
-            #-------------------------------------------------------------------------------------------------------------
             pics_in_GOP = 1
             for subband in range(self.TRLs-1, 0, -1) :
-
-                # Frame_types.
-                #-------------
-                for i in range(0, pics_in_GOP) :
-                    frame_type = F_file[subband].read(1)
-                    self.types_frame[self.TRLs - subband].append(frame_type)
-                    sys.stdout.write("%s" % frame_type)
-
-
-                # Motion.
-                #--------
-                for i in range(0, pics_in_GOP) :
-                    next_image = self.find_next_EOC_motion(M_file[subband])
-                    self.bytes_frames_M[self.TRLs - subband].append(next_image - M_prev_image[subband]) # Bytes per frame
-                    M_prev_image[subband] = next_image
-
-                M_kbps = float(next_image - M_prev_GOP[subband]) * 8.0 / GOP_time / 1000.0
-
-                self.kbps_M[GOP_number-1].append(M_kbps)
-                self.average_M[subband]       += M_kbps
-                total                         += M_kbps
-                sys.stdout.write("%7d " %    int(M_kbps))
-
-		M_prev_image[subband] = M_prev_GOP[subband] = next_image
-
-                # High frecuency.
-                #----------------
-                for i in range(0, pics_in_GOP) :
-                    next_image = self.find_next_EOC_texture(H_file[subband])
-                    self.bytes_frames_T[self.TRLs - subband].append(next_image - H_prev_image[subband]) # Bytes per frame
-                    H_prev_image[subband] = next_image
-
-                H_kbps = float(next_image - H_prev_GOP[subband]) * 8.0 / GOP_time / 1000.0
-
-                self.kbps_H[GOP_number].append(H_kbps)
-                self.average_H[subband]     += H_kbps
-                total                       += H_kbps
-                sys.stdout.write("%6d " %  int(H_kbps))
-
-                H_prev_image[subband] = H_prev_GOP[subband] = next_image
-
+                k = self.TRLs - subband
+                first = (GOP_number - 1) * pics_in_GOP
+                sys.stdout.write("".join(self.types_frame[k][first:first + pics_in_GOP]))
+                sys.stdout.write("%7d " % int(M_kbps[GOP_number, k]))
+                sys.stdout.write("%6d " % int(T_kbps[GOP_number, k]))
                 pics_in_GOP *= 2
 
-
-            sys.stdout.write("%8d\n" % total)
-            self.average_total      += total
-            self.kbps_HM_total.append (total) # < Jse
-
-
-
-        # Bytes per frame TM = M + T
-        #---------------------------
-        self.bytes_frames_TM[0] = self.bytes_frames_T[0][:]
-        for sub in range(1, self.TRLs) :
-            for pic in range(0, len(self.bytes_frames_M[sub])) :
-                self.bytes_frames_TM[sub].append(self.bytes_frames_M[sub][pic] + self.bytes_frames_T[sub][pic])
+            sys.stdout.write("%8d\n" % total_kbps[GOP_number])
 
 
         # bytes_frames_MCTF. (Frame per frame)
         #---------------------------------------
+        bytes_frames_MCTF, identifiers = self.accounting.frame_bytes()
+        bytes_frames_MCTF_average      = self.accounting.frame_bytes_average(bytes_frames_MCTF)
 
-        # Add bytes of subband L to all frames.
-        bytes_frames_MCTF = []
-        for pic in range(0, pictures) :
-
-            if pic % GOP_size == 0 : # Is a L image. Then add image 0, from L, from GOPx
-                bytes_frames_MCTF.append( self.bytes_frames_TM[0][pic/GOP_size] )
-
-            else : # Is not a L image. Then add image 0 & 1, from L, from GOPx
-
-                ## pic is the image number 'image_number' from subband 'sub'.
-                image_number = pic / 2.0
-                sub          = 1
-                check_call("echo \"pic " + str(pic) + "\timage_number " + str(image_number) + "\tsub " + str(sub) + "\" >> " + "info_picIdentifier", shell=True)
-                while (image_number - int(image_number)) == 0.0 :
-                    image_number /= 2.0
-                    sub          += 1
-                    check_call("echo \"pic " + str(pic) + "\timage_number " + str(image_number) + "\tsub " + str(sub) + "\" >> " + "info_picIdentifier", shell=True)
-                check_call("echo \"sub --> " + str(sub) + "\" >> " + "info_picIdentifier", shell=True)
-
-                # Frame type = 'I'
-                if self.types_frame[self.TRLs-sub][int(image_number)] == 'I' :
-                    bytes_frames_MCTF.append( 0 )
-                # Frame type = 'B'
-                else :
-                    bytes_frames_MCTF.append( self.bytes_frames_TM[0][pic/GOP_size] + self.bytes_frames_TM[0][(pic/GOP_size)+1] )
-
-
-        # Add bytes Hs & Ms as MCTF, to each frame of Hs.
-        for Vpic in range(0, pictures) :
-            pic = Vpic
-            for sub in range(1, self.TRLs) :
-                pic /= 2.0
-                if pic - int(pic) > 0.0 :
-                    if self.types_frame[self.TRLs-sub][int(pic)] == 'I' :
-                        bytes_frames_MCTF[Vpic] += self.bytes_frames_T [self.TRLs-sub][int(pic)]
-                        break
-                    else :
-                        bytes_frames_MCTF[Vpic] += self.bytes_frames_TM[self.TRLs-sub][int(pic)]
-
-
-
-
-        # bytes_frames_MCTF_Average (Frame per frame)
-        #----------------------------------------------
-        bytes_frames_MCTF_average = [0] * (GOP_size + 1)
-
-        # Ls
-        for gop in range(0, GOPs+1) :
-            bytes_frames_MCTF_average[0] += bytes_frames_MCTF[gop*GOP_size]
-        bytes_frames_MCTF_average[0] /= (GOPs + 1.0)
-
-        # Hs
-        for Vpic in range(1, GOP_size+1) :
-            for gop in range(0, GOPs) :
-                bytes_frames_MCTF_average[Vpic] += bytes_frames_MCTF[Vpic + (gop*GOP_size)]
-
-        for Vpic in range(1, GOP_size+1) :
-            bytes_frames_MCTF_average[Vpic] /= GOPs * 1.0
-
-
-        # PRINT: Formatted for gnuplot.
-        for pic in range (0, len(bytes_frames_MCTF)) :
-            check_call("echo \"" + str(pic) + "\t " + str(bytes_frames_MCTF[pic])         + "\" >> " + "info_bytesFrames_MCTF",             shell=True)
-        for pic in range (0, len(bytes_frames_MCTF_average)) :
-            check_call("echo \"" + str(pic) + "\t " + str(bytes_frames_MCTF_average[pic]) + "\" >> " + "info_bytesFrames_MCTF_averageGOPs", shell=True)
-
-
-
-        
-
+        # PRINT: Formatted for gnuplot (one write per file).
+        with open("info_picIdentifier", "a") as f:
+            f.write("".join(line + "\n" for line in identifiers))
+        with open("info_bytesFrames_MCTF", "a") as f:
+            f.write("".join(str(pic) + "\t " + str(b) + "\n" for pic, b in enumerate(bytes_frames_MCTF.tolist())))
+        with open("info_bytesFrames_MCTF_averageGOPs", "a") as f:
+            f.write("".join(str(pic) + "\t " + str(b) + "\n" for pic, b in enumerate(bytes_frames_MCTF_average.tolist())))
 
+        # The rates, in JSON and CSV.
+        self.accounting.write_json("info.json")
+        self.accounting.write_csv("info.csv")
 
 
         # PRINT averages.
@@ -377,10 +198,14 @@ class info(GOP):
         sys.stdout.write("--------\n")
         sys.stdout.write("Average")
 
+        ## Average kbps of motion [M_{TRLs-1}, ..., M_1], textures [L,
+        #  H_{TRLs-1}, ..., H_1] and both together.
+        self.average_M, self.average_H, self.average_total = self.accounting.kbps_average()
+        ## Average kbps of low frecuency subbands.
+        self.average_L = self.average_H[0]
 
         # Average L.
         #-----------
-        self.average_L = (L_kbps_GOP0 * (1 - average_ponderation)) + ((self.average_L / GOPs) * average_ponderation) # MEDIA SEMI PONDERADA
         sys.stdout.write("%6d " % int(self.average_L))
 
         for subband in range(self.TRLs-1, 0, -1) :
@@ -389,36 +214,15 @@ class info(GOP):
 
             # Average Motion and High frecuency.
             #-----------------------------------
-            self.average_M[subband] = self.average_M[subband] / self.GOPs
-            self.average_H[subband] = self.average_H[subband] / self.GOPs
-            sys.stdout.write("%7d " % int(self.average_M[subband]))
-            sys.stdout.write("%6d " % int(self.average_H[subband]))
-
-
+            sys.stdout.write("%7d " % int(self.average_M[self.TRLs-1-subband]))
+            sys.stdout.write("%6d " % int(self.average_H[self.TRLs-subband]))
 
         # Total average.
         #---------------
-        self.average_total /= self.GOPs
-        self.average_total = (L_kbps_GOP0 * (1 - average_ponderation)) + (self.average_total * average_ponderation) # MEDIA SEMI PONDERADA
         sys.stdout.write("%8d\n" % int(self.average_total))
 
-
-
-
-        self.average_M.reverse()                      # < Jse
-        self.average_H.reverse()                      # < Jse
-        self.average_M = self.average_M[1:-1]         # < Jse
-        self.average_H = self.average_H[1:-1]         # < Jse
-        self.average_H.insert(0, self.average_L)      # < Jse
-
         # < Jse   SAMPLE DATA PERFORMANCE
 
-        print (" ")
-        print ("M_prev_GOP\t"    + str(M_prev_GOP))
-        print ("H_prev_GOP\t"    + str(H_prev_GOP))
-        print ("M_prev_image\t"  + str(M_prev_image))
-        print ("H_prev_image\t"  + str(H_prev_image))
-
         print (" ")
         print ("Frame_Types\t"           + str(self.types_frame))
         print (" ")
@@ -428,9 +232,9 @@ class info(GOP):
         print (" ")
         print ("B_frames_TM\t"           + str(self.bytes_frames_TM))
         print (" ")
-        print ("B_frames_MCTF\t"         + str(bytes_frames_MCTF))
+        print ("B_frames_MCTF\t"         + str(bytes_frames_MCTF.tolist()))
         print (" ")
-        print ("B_frames_MCTF_average\t" + str(bytes_frames_MCTF_average))
+        print ("B_frames_MCTF_average\t" + str(bytes_frames_MCTF_average.tolist()))
         print (" ")
         print ("kbps_M\t\t"              + str(self.kbps_M))
         print (" ")
@@ -446,9 +250,6 @@ class info(GOP):
         print (" ")
         # > Jse
 
-
-
-
     ## Returns values of the instance.
     #  @param self Refers to object.
     #  @returns Kbps of:
@@ -21,37 +21,9 @@ from MCTF_parser import MCTF_parser
 class info_j2k(info):
 
 
-    ## Find the length of JPEG 2000 image.
-    #  @param self Refers to object.
-    #  @param file JPEG 2000 image.
-    #  @return Length of JPEG 2000 image
-    def find_next_EOC_texture(self, file):
-        if file == None:
-            return 0
-        else:
-            return int(file.readline())
-
-
-    ## Find the length of motion.
-    #  @param self Refers to object.
-    #  @param file Motion file.
-    #  @return Length of motion.
-    def find_next_EOC_motion(self, file):
-        if file == None:
-            return 0
-        else:
-            return int(file.readline())
-
-
-    ## Open a sizes files.
-    #  @param self Refers to object.
-    #  @param codestream_filename Codestream filename.
-    #  @return Size file.
-    def open_codestream(self, codestream_filename):
-        try:
-            return open(codestream_filename, 'rb')
-        except IOError:
-            return None
+    ## The sizes are read from the files of sizes or the index of the
+    #  containers (see rate_accounting.py).
+    codec = "j2k"
 
 
     ## Bytes per frame in MCTF context.
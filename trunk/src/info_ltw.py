@@ -18,44 +18,10 @@ from info import info
 ## Class info for LTW codec.
 class info_ltw(info):
 
-
-    ## Current image number.
-    image_number = 0
-
-
-    ## Find the length of a color LTW image. Find next EOC texture.
-    #  @param self Refers to object.
-    #  @param file Color LTW image.
-    #  @return Length of a color LTW image.
-    def find_next_EOC_texture(self, file):
-        return int(file.readline())
-
-
-    ## Find the next End Of fame's Code-stream (FFD9) in a Motion JPEG 2000 code-stream.
-    #  @param self Refers to object.
-    #  @param file Motion file.
-    #  @return Position of next End Of fame's Code-stream.
-    def find_next_EOC_motion(self, file):
-        byte = file.read(1)
-        #print "Buscando ..."
-        #print byte
-        while byte != '':
-            #sys.stdout.write(byte)
-            if byte == '\xff':
-                #print "\xff"
-                byte = file.read(1)
-                if byte == '\xd9':
-                    return file.tell()
-            byte = file.read(1)
-        return file.tell()
-
-
-    ## Open a LTW code-stream.
-    #  @param self Refers to object.
-    #  @param codestream_filename Codestream filename.
-    #  @return File descriptor.
-    def open_codestream(self, codestream_filename):
-        return open(codestream_filename + ".ltw", 'rb')
+    ## The sizes of the textures are read from the files of sizes and
+    #  the fields of motion are found with their markers (see
+    #  rate_accounting.py).
+    codec = "ltw"
 
 
 ## Instance of the class: info_ltw.
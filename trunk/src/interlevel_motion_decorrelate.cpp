@@ -77,13 +77,7 @@ void decorrelate_field
  */
 int main(int argc, char *argv[]) {
 
-#if defined DEBUG
-  info("%s: ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
 
   int blocks_in_x = 11;
   int blocks_in_y = 9;
@@ -130,44 +124,32 @@ int main(int argc, char *argv[]) {
       
     case 'x':
       blocks_in_x = atoi(optarg);
-#if defined DEBUG
-      info("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
-#endif
+      log_debug("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
       break;
       
     case 'y':
       blocks_in_y = atoi(optarg);
-#if defined DEBUG
-      info("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
-#endif
+      log_debug("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
       break;
 
     case 'f':
       fields_in_predicted = atoi(optarg);
-#if defined DEBUG
-      info("%s: fields_in_predicted=%d\n", argv[0], fields_in_predicted);
-#endif
+      log_debug("%s: fields_in_predicted=%d\n", argv[0], fields_in_predicted);
       break;
 
     case 'p':
       predicted_fn = optarg;
-#if defined DEBUG
-      info("%s: predicted_fn = \"%s\"\n", argv[0], predicted_fn);
-#endif
+      log_debug("%s: predicted_fn = \"%s\"\n", argv[0], predicted_fn);
       break;
 
     case 'r':
       reference_fn = optarg;
-#if defined DEBUG
-      info("%s: reference_fn = \"%s\"\n", argv[0], reference_fn);
-#endif
+      log_debug("%s: reference_fn = \"%s\"\n", argv[0], reference_fn);
       break;
 
     case 'e':
       residue_fn = optarg;
-#if defined DEBUG
-      info("%s: residue_fn = \"%s\"\n", argv[0], residue_fn);
-#endif
+      log_debug("%s: residue_fn = \"%s\"\n", argv[0], residue_fn);
       break;
       
     case '?':
@@ -205,50 +187,38 @@ int main(int argc, char *argv[]) {
     }
   }
   
-  FILE *predicted_fd = fopen(predicted_fn,
-#if defined ANALYZE
-			     "r"
-#else
-			     "w"
-#endif
-			     );
-  if(!predicted_fd) {
-#if defined ANALYZE
-    error("%s: unable to read \"%s\" ... aborting!\n", argv[0], predicted_fn);
-#else
-    error("%s: unable to write \"%s\" ... aborting!\n", argv[0], predicted_fn);    
-#endif
-    abort();
-  }
-  
-  FILE *reference_fd = fopen(reference_fn, "r");
-  if(reference_fd) {
-#if defined DEBUG
-    info("%s: reference file name = \"%s\"\n",argv[0], reference_fn);
-#endif
+  motion_file reference_fields;
+  if(reference_fields.open_read(reference_fn, blocks_in_y, blocks_in_x)) {
+    log_debug("%s: reference file name = \"%s\"\n",argv[0], reference_fn);
   } else {
-    reference_fd = fopen("/dev/zero", "r");
- #if defined DEBUG
-   info("%s: \"%s\" does not exist: reference file name=\"%s\"\n",argv[0],
-		 reference_fn, "/dev/zero");
-#endif
+    reference_fields.open_zero(blocks_in_y, blocks_in_x);
+    log_debug("%s: \"%s\" does not exist: reference file name=\"%s\"\n",argv[0],
+	      reference_fn, "/dev/zero");
   }
 
-  FILE *residue_fd = fopen(residue_fn,
-#if defined ANALYZE
-			   "w"
-#else
-			   "r"
-#endif
-			   );
-  if(!residue_fd) {
 #if defined ANALYZE
+  motion_file predicted_fields;
+  if(!predicted_fields.open_read(predicted_fn, blocks_in_y, blocks_in_x)) {
+    error("%s: unable to read \"%s\" ... aborting!\n", argv[0], predicted_fn);
+    abort();
+  }
+  motion_file residue_fields;
+  if(!residue_fields.open_write(residue_fn, blocks_in_y, blocks_in_x, predicted_fields.block_size)) {
     error("%s: unable to write \"%s\" ... aborting!\n", argv[0], residue_fn);
+    abort();
+  }
 #else
-    error("%s: unable to read \"%s\" ... aborting!\n", argv[0], residue_fn);    
-#endif
+  motion_file residue_fields;
+  if(!residue_fields.open_read(residue_fn, blocks_in_y, blocks_in_x)) {
+    error("%s: unable to read \"%s\" ... aborting!\n", argv[0], residue_fn);
     abort();
   }
+  motion_file predicted_fields;
+  if(!predicted_fields.open_write(predicted_fn, blocks_in_y, blocks_in_x, residue_fields.block_size)) {
+    error("%s: unable to write \"%s\" ... aborting!\n", argv[0], predicted_fn);
+    abort();
+  }
+#endif
 
   motion < MVC_TYPE > motion;
   MVC_TYPE ****predicted = motion.alloc(blocks_in_y, blocks_in_x);
@@ -257,25 +227,21 @@ int main(int argc, char *argv[]) {
   
   for(int i=0; i<fields_in_predicted; i++) {
     
-#if defined DEBUG
-    info("%s: %d\n",argv[0], i);
-#endif
+    log_info("%s: %d\n",argv[0], i);
     
     /** Read the motion field that serves as reference (the range of
 	motion of the superior temporal iteration). */
-    motion.read(reference_fd, reference, blocks_in_y, blocks_in_x);
+    reference_fields.read(reference);
     
     /** Des/correlate two consecutive motion fields using the same
 	reference. */
     for(int p=0; p<2; p++) {
 #if defined ANALYZE
       /** Read the motion field to be predicted, if ANALYZE is defined.\n Read the residue motion field, if ANALYZE is not defined.*/
-      motion.read(predicted_fd, predicted, blocks_in_y, blocks_in_x);
-      if(feof(predicted_fd)) break;
+      if(!predicted_fields.read(predicted)) break;
 #else
       /** Read the residue motion field, if ANALYZE is not defined. */
-      motion.read(residue_fd, residue, blocks_in_y, blocks_in_x);
-      if(feof(residue_fd)) break;
+      if(!residue_fields.read(residue)) break;
 #endif
       
       decorrelate_field
@@ -287,11 +253,14 @@ int main(int argc, char *argv[]) {
       
 #if defined ANALYZE
       /** Write residue, if ANALYZE is defined.\n Write the reconstruction, if ANALYZE is not defined. */
-      motion.write(residue_fd, residue, blocks_in_y, blocks_in_x);
+      residue_fields.write(residue);
 #else
       /** Write the reconstruction, if ANALYZE is not defined. */
-      motion.write(predicted_fd, predicted, blocks_in_y, blocks_in_x);
+      predicted_fields.write(predicted);
 #endif
     }
   }
+  reference_fields.close();
+  predicted_fields.close();
+  residue_fields.close();
 }
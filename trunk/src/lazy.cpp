@@ -0,0 +1,42 @@
+/**
+ * \file lazy.cpp
+ * \author Vicente Gonzalez-Ruiz.
+ * \date Last modification: 2015, January 7.
+ * \brief Lazy wavelet transform (split/merge) as a view over a sequence.
+ *
+ * Instead of copying the even and the odd pictures of "low_{k-1}" to
+ * "even_k" and "odd_k" (split) and back (merge), the kernels can
+ * read (and write) the pictures directly in "low_{k-1}": the picture
+ * "i" of the even (odd) sequence is the picture "2*i" ("2*i+1") of
+ * the file.
+ *
+ * The MCTF project has been supported by the Junta de Andalucía through
+ * the Proyecto Motriz "Codificación de Vídeo Escalable y su Streaming
+ * sobre Internet" (P10-TIC-6548).
+ */
+
+/** \brief Offset of the even pictures in an interleaved sequence. */
+#define EVEN_OFFSET 0
+/** \brief Offset of the odd pictures in an interleaved sequence. */
+#define ODD_OFFSET 1
+
+/**
+ * \brief Places a file at the beginning of a picture of a sequence of
+ * pictures stored in it with a stride. With a stride of 1 (the
+ * sequence is the file, which is read or written sequentially)
+ * nothing is done.
+ * \param fd File.
+ * \param picture Index of the picture in the sequence.
+ * \param stride Distance (in pictures of the file) between two
+ * consecutive pictures of the sequence.
+ * \param offset Index (in the file) of the first picture of the sequence.
+ * \param picture_bytes Size of a picture in the file.
+ */
+void seek_picture(FILE *fd, int picture, int stride, int offset, long picture_bytes) {
+  if(stride > 1) {
+    if(fseek(fd, (long)(offset + stride*picture) * picture_bytes, SEEK_SET)) {
+      error("seek_picture: unable to seek picture %d ... aborting!\n", offset + stride*picture);
+      abort();
+    }
+  }
+}
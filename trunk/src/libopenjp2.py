@@ -0,0 +1,257 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file libopenjp2.py
+#  Compresses and decompresses planes in memory with the OpenJPEG
+#  library (libopenjp2, version 2), through ctypes.
+#
+#  Only the beginning of the parameters of the encoder and the decoder
+#  (opj_cparameters_t and opj_dparameters_t) is declared. The library
+#  initializes the rest of them. The library is searched in the
+#  environment variable MCTF_OPENJPEG_LIBRARY and in the system paths.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package libopenjp2
+#  Compresses and decompresses planes in memory with libopenjp2.
+
+import os
+import ctypes
+import ctypes.util
+import threading
+
+try:
+    import numpy
+except ImportError:
+    ## NumPy is not available.
+    numpy = None
+
+## J2K codestreams (without the JP2 file format).
+OPJ_CODEC_J2K = 0
+## Grayscale images.
+OPJ_CLRSPC_GRAY = 2
+## Coding style with SOP markers.
+CSTY_SOP = 0x02
+## Bytes reserved for the parameters of the encoder and the decoder
+#  (more than sizeof(opj_cparameters_t) and sizeof(opj_dparameters_t)).
+PARAMETERS_BYTES = 1 << 16
+
+## Parameters of a component (opj_image_cmptparm_t).
+class image_cmptparm(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_uint32), ("dy", ctypes.c_uint32),
+                ("w", ctypes.c_uint32), ("h", ctypes.c_uint32),
+                ("x0", ctypes.c_uint32), ("y0", ctypes.c_uint32),
+                ("prec", ctypes.c_uint32), ("bpp", ctypes.c_uint32),
+                ("sgnd", ctypes.c_uint32)]
+
+## A component of an image (opj_image_comp_t).
+class image_comp(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_uint32), ("dy", ctypes.c_uint32),
+                ("w", ctypes.c_uint32), ("h", ctypes.c_uint32),
+                ("x0", ctypes.c_uint32), ("y0", ctypes.c_uint32),
+                ("prec", ctypes.c_uint32), ("bpp", ctypes.c_uint32),
+                ("sgnd", ctypes.c_uint32), ("resno_decoded", ctypes.c_uint32),
+                ("factor", ctypes.c_uint32), ("data", ctypes.POINTER(ctypes.c_int32)),
+                ("alpha", ctypes.c_uint16)]
+
+## An image (opj_image_t).
+class image(ctypes.Structure):
+    _fields_ = [("x0", ctypes.c_uint32), ("y0", ctypes.c_uint32),
+                ("x1", ctypes.c_uint32), ("y1", ctypes.c_uint32),
+                ("numcomps", ctypes.c_uint32), ("color_space", ctypes.c_int),
+                ("comps", ctypes.POINTER(image_comp)),
+                ("icc_profile_buf", ctypes.c_void_p),
+                ("icc_profile_len", ctypes.c_uint32)]
+
+## The beginning of the parameters of the encoder (opj_cparameters_t).
+class cparameters(ctypes.Structure):
+    _fields_ = [("tile_size_on", ctypes.c_int), ("cp_tx0", ctypes.c_int),
+                ("cp_ty0", ctypes.c_int), ("cp_tdx", ctypes.c_int),
+                ("cp_tdy", ctypes.c_int), ("cp_disto_alloc", ctypes.c_int),
+                ("cp_fixed_alloc", ctypes.c_int), ("cp_fixed_quality", ctypes.c_int),
+                ("cp_matrice", ctypes.c_void_p), ("cp_comment", ctypes.c_char_p),
+                ("csty", ctypes.c_int), ("prog_order", ctypes.c_int),
+                # 32 opj_poc_t (37 integers each).
+                ("POC", ctypes.c_uint32 * (37 * 32)),
+                ("numpocs", ctypes.c_uint32), ("tcp_numlayers", ctypes.c_int),
+                ("tcp_rates", ctypes.c_float * 100),
+                ("tcp_distoratio", ctypes.c_float * 100),
+                ("numresolution", ctypes.c_int), ("cblockw_init", ctypes.c_int),
+                ("cblockh_init", ctypes.c_int), ("mode", ctypes.c_int),
+                ("irreversible", ctypes.c_int)]
+
+## The beginning of the parameters of the decoder (opj_dparameters_t).
+class dparameters(ctypes.Structure):
+    _fields_ = [("cp_reduce", ctypes.c_uint32), ("cp_layer", ctypes.c_uint32)]
+
+## Reads the data of a stream.
+READ = ctypes.CFUNCTYPE(ctypes.c_size_t, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+## Writes the data of a stream.
+WRITE = ctypes.CFUNCTYPE(ctypes.c_size_t, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+## Skips bytes of a stream.
+SKIP = ctypes.CFUNCTYPE(ctypes.c_int64, ctypes.c_int64, ctypes.c_void_p)
+## Places a stream.
+SEEK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_int64, ctypes.c_void_p)
+
+## The library (None if it has not been loaded).
+_library = None
+## Serializes the loading of the library.
+_lock = threading.Lock()
+
+## Loads the library.
+#  @return The library (None if it is not available).
+def library():
+    global _library
+    with _lock:
+        if _library is None:
+            name = os.environ.get("MCTF_OPENJPEG_LIBRARY") or ctypes.util.find_library("openjp2")
+            if not name or numpy is None:
+                return None
+            try:
+                lib = ctypes.CDLL(name)
+            except OSError:
+                return None
+            lib.opj_image_create.restype = ctypes.POINTER(image)
+            lib.opj_image_create.argtypes = [ctypes.c_uint32, ctypes.POINTER(image_cmptparm), ctypes.c_int]
+            lib.opj_image_destroy.argtypes = [ctypes.POINTER(image)]
+            lib.opj_create_compress.restype = ctypes.c_void_p
+            lib.opj_create_decompress.restype = ctypes.c_void_p
+            lib.opj_destroy_codec.argtypes = [ctypes.c_void_p]
+            lib.opj_set_default_encoder_parameters.argtypes = [ctypes.c_void_p]
+            lib.opj_set_default_decoder_parameters.argtypes = [ctypes.c_void_p]
+            lib.opj_setup_encoder.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(image)]
+            lib.opj_setup_decoder.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+            lib.opj_stream_create.restype = ctypes.c_void_p
+            lib.opj_stream_create.argtypes = [ctypes.c_size_t, ctypes.c_int]
+            lib.opj_stream_destroy.argtypes = [ctypes.c_void_p]
+            lib.opj_stream_set_read_function.argtypes = [ctypes.c_void_p, READ]
+            lib.opj_stream_set_write_function.argtypes = [ctypes.c_void_p, WRITE]
+            lib.opj_stream_set_skip_function.argtypes = [ctypes.c_void_p, SKIP]
+            lib.opj_stream_set_seek_function.argtypes = [ctypes.c_void_p, SEEK]
+            lib.opj_stream_set_user_data_length.argtypes = [ctypes.c_void_p, ctypes.c_uint64]
+            lib.opj_start_compress.argtypes = [ctypes.c_void_p, ctypes.POINTER(image), ctypes.c_void_p]
+            lib.opj_encode.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+            lib.opj_end_compress.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+            lib.opj_read_header.argtypes = [ctypes.c_void_p, ctypes.c_void_p,
+                                            ctypes.POINTER(ctypes.POINTER(image))]
+            lib.opj_decode.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(image)]
+            lib.opj_end_decompress.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+            _library = lib
+        return _library
+
+## A stream in memory.
+class memory_stream:
+
+    ## Creates a stream.
+    # @param self Refers to object.
+    # @param lib The library.
+    # @param data The data to read (None to write).
+    def __init__(self, lib, data=None):
+        ## The data.
+        self.data = bytearray(data or b"")
+        ## Current position.
+        self.position = 0
+        # The callbacks must live as long as the stream.
+        self.callbacks = [READ(self.read), WRITE(self.write), SKIP(self.skip), SEEK(self.seek)]
+        ## The stream of the library.
+        self.stream = lib.opj_stream_create(1 << 16, int(data is not None))
+        if data is not None:
+            lib.opj_stream_set_read_function(self.stream, self.callbacks[0])
+            lib.opj_stream_set_user_data_length(self.stream, len(self.data))
+        else:
+            lib.opj_stream_set_write_function(self.stream, self.callbacks[1])
+        lib.opj_stream_set_skip_function(self.stream, self.callbacks[2])
+        lib.opj_stream_set_seek_function(self.stream, self.callbacks[3])
+
+    def read(self, buffer, n, user):
+        n = min(n, len(self.data) - self.position)
+        if n <= 0:
+            return ctypes.c_size_t(-1).value
+        ctypes.memmove(buffer, bytes(self.data[self.position:self.position + n]), n)
+        self.position += n
+        return n
+
+    def write(self, buffer, n, user):
+        end = self.position + n
+        if end > len(self.data):
+            self.data.extend(b"\0" * (end - len(self.data)))
+        self.data[self.position:end] = ctypes.string_at(buffer, n)
+        self.position = end
+        return n
+
+    def skip(self, n, user):
+        self.position += n
+        return n
+
+    def seek(self, position, user):
+        self.position = position
+        return 1
+
+## Compresses a plane.
+#  @param plane The plane (a NumPy array of bytes).
+#  @param psnrs The PSNR of each quality layer (increasing).
+#  @param resolutions Number of resolution levels (DWT levels + 1).
+#  @return The codestream (a string).
+def encode(plane, psnrs, resolutions):
+    lib = library()
+    rows, columns = plane.shape
+    parameters = ctypes.create_string_buffer(PARAMETERS_BYTES)
+    lib.opj_set_default_encoder_parameters(parameters)
+    p = ctypes.cast(parameters, ctypes.POINTER(cparameters)).contents
+    p.tcp_numlayers = len(psnrs)
+    for i, psnr in enumerate(psnrs):
+        p.tcp_distoratio[i] = psnr
+    p.cp_fixed_quality = 1
+    p.numresolution = resolutions
+    p.irreversible = 1
+    p.csty |= CSTY_SOP
+    component = image_cmptparm(1, 1, columns, rows, 0, 0, 8, 8, 0)
+    img = lib.opj_image_create(1, ctypes.byref(component), OPJ_CLRSPC_GRAY)
+    codec = lib.opj_create_compress(OPJ_CODEC_J2K)
+    stream = memory_stream(lib)
+    try:
+        img.contents.x1, img.contents.y1 = columns, rows
+        samples = numpy.ascontiguousarray(plane, dtype=numpy.int32)
+        ctypes.memmove(img.contents.comps[0].data, samples.ctypes.data, samples.nbytes)
+        if not (lib.opj_setup_encoder(codec, parameters, img)
+                and lib.opj_start_compress(codec, img, stream.stream)
+                and lib.opj_encode(codec, stream.stream)
+                and lib.opj_end_compress(codec, stream.stream)):
+            raise RuntimeError("libopenjp2: unable to compress")
+    finally:
+        lib.opj_stream_destroy(stream.stream)
+        lib.opj_destroy_codec(codec)
+        lib.opj_image_destroy(img)
+    return bytes(stream.data)
+
+## Decompresses a codestream.
+#  @param data The codestream.
+#  @param layers Number of quality layers to decode (None = all).
+#  @return The plane.
+def decode(data, layers=None):
+    lib = library()
+    parameters = ctypes.create_string_buffer(PARAMETERS_BYTES)
+    lib.opj_set_default_decoder_parameters(parameters)
+    if layers is not None:
+        ctypes.cast(parameters, ctypes.POINTER(dparameters)).contents.cp_layer = layers
+    codec = lib.opj_create_decompress(OPJ_CODEC_J2K)
+    stream = memory_stream(lib, data)
+    img = ctypes.POINTER(image)()
+    try:
+        if not (lib.opj_setup_decoder(codec, parameters)
+                and lib.opj_read_header(stream.stream, codec, ctypes.byref(img))
+                and lib.opj_decode(codec, stream.stream, img)
+                and lib.opj_end_decompress(codec, stream.stream)):
+            raise RuntimeError("libopenjp2: unable to decompress")
+        component = img.contents.comps[0]
+        samples = numpy.ctypeslib.as_array(component.data, shape=(component.h, component.w))
+        return numpy.clip(samples, 0, 255).astype(numpy.uint8)
+    finally:
+        lib.opj_stream_destroy(stream.stream)
+        lib.opj_destroy_codec(codec)
+        if img:
+            lib.opj_image_destroy(img)
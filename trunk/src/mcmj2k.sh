@@ -11,8 +11,9 @@
 ## \brief MCTF texture codec.
 export MCTF_TEXTURE_CODEC="mj2k"
 
-## \brief MCTF motion codec.
-export MCTF_MOTION_CODEC="j2k"
+## \brief MCTF motion codec (export MCTF_MOTION_CODEC="mvc" before
+#  running it to use the native lossless codec).
+export MCTF_MOTION_CODEC="${MCTF_MOTION_CODEC:-j2k}"
 
 ## \brief Slopes sample.
 export SLOPES="44500,44250,44000,43700,43400"
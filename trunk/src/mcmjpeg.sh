@@ -10,8 +10,9 @@
 ## \brief MCTF texture codec.
 export MCTF_TEXTURE_CODEC="mjpeg"
 
-## \brief MCTF motion codec.
-export MCTF_MOTION_CODEC="j2k"
+## \brief MCTF motion codec (export MCTF_MOTION_CODEC="mvc" before
+#  running it to use the native lossless codec).
+export MCTF_MOTION_CODEC="${MCTF_MOTION_CODEC:-j2k}"
 
 ## \brief Slopes sample.
 export SLOPES="30"
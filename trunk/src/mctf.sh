@@ -33,7 +33,11 @@ if [ -z "$*" ]; then
 fi
 
 echo "$MCTF/bin/$@" >> trace
-set -x
+# The executed commands are only shown when MCTF_LOG_LEVEL is "info"
+# or "debug" (or a number greater than 0).
+case "$MCTF_LOG_LEVEL" in
+    info|debug|[1-9]*) set -x ;;
+esac
 "$MCTF/bin/$@"
 #set +x
 exit $?
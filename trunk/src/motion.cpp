@@ -5,6 +5,9 @@
  * \date Last modification: 2015, January 7.
  */
 
+#include <stdio.h>
+#include <string.h>
+
 /** \brief Reference to previous picture. */
 #define PREV     0
 /** \brief Reference to next picture. */
@@ -74,11 +77,6 @@ public:
       for(int f=0; f<2; f++) {
 	for(int y=0; y<y_dim; y++) {
 	  int read = fread(data[i][f][y], x_dim, sizeof(TYPE), fd);
-#if defined DEBUG /** Sign and magnitude */
-	  for(int x=0; x<x_dim; x++) {
-	    info("%d ", data[i][f][y][x]);
-	  }
-#endif
 	}
       }
     }
@@ -101,3 +99,268 @@ public:
   }
 
 };
+
+/** \brief Identifier of the motion files. */
+#define MOTION_MAGIC "MCTM"
+/** \brief Bytes of the header of a motion file. */
+#define MOTION_HEADER_BYTES 28
+/** \brief Byte which precedes the components that do not fit in a
+    signed byte. */
+#define MOTION_ESCAPE 0x80
+
+/**
+ * \brief A file of motion fields.\n
+ * The file starts with a header:\n
+ * - "MCTM".
+ * - Blocks in Y, blocks in X and block size (0 if unknown).
+ * - Number of fields.
+ * - Position of the offset table (64 bits).
+ *
+ * followed by the fields and the offset table (the position of
+ * each field, 64 bits). The integers are little endian. The
+ * components of a field are stored in the order of motion::write()
+ * as signed bytes. A component which does not fit in a signed byte
+ * is stored as MOTION_ESCAPE followed by the 16 bits value.\n
+ * The offset table (and the number of fields) is written by close().
+ */
+class motion_file {
+
+  /** \brief The file. */
+  FILE *fd;
+  /** \brief Name of the file. */
+  const char *fn;
+  /** \brief 1 if the file is written. */
+  int writing;
+  /** \brief Position of each field. */
+  long long *offsets;
+  /** \brief Allocated size of "offsets". */
+  int capacity;
+  /** \brief Coded field. */
+  unsigned char *buffer;
+
+  /** \brief Writes an integer of "bytes" bytes (little endian). */
+  void put(unsigned long long value, int bytes) {
+    for(int i=0; i<bytes; i++) fputc((value >> (8*i)) & 0xFF, fd);
+  }
+
+  /** \brief Reads an integer of "bytes" bytes (little endian). */
+  unsigned long long get(int bytes) {
+    unsigned long long value = 0;
+    for(int i=0; i<bytes; i++) {
+      int b = fgetc(fd);
+      if(b == EOF) {
+	error("motion_file: \"%s\" is truncated ... aborting!\n", fn);
+	abort();
+      }
+      value |= (unsigned long long)b << (8*i);
+    }
+    return value;
+  }
+
+  /** \brief Checks (or sets) the dimensions of the fields. */
+  void check_dimensions(int y_dim, int x_dim, int file_y_dim, int file_x_dim) {
+    if((y_dim > 0 && y_dim != file_y_dim) || (x_dim > 0 && x_dim != file_x_dim)) {
+      error("motion_file: \"%s\" has %dx%d blocks (%dx%d expected) ... aborting!\n",
+	    fn, file_y_dim, file_x_dim, y_dim, x_dim);
+      abort();
+    }
+    blocks_in_y = file_y_dim;
+    blocks_in_x = file_x_dim;
+  }
+
+public:
+
+  /** \brief Dimension 'Y' of blocks of a field. */
+  int blocks_in_y;
+  /** \brief Dimension 'X' of blocks of a field. */
+  int blocks_in_x;
+  /** \brief Size of the blocks (0 if unknown). */
+  int block_size;
+  /** \brief Number of fields. */
+  int fields;
+  /** \brief Index of the next field. */
+  int field;
+
+  motion_file() {
+    fd = NULL;
+    fn = "";
+    writing = 0;
+    offsets = NULL;
+    capacity = 0;
+    buffer = NULL;
+    blocks_in_y = blocks_in_x = block_size = 0;
+    fields = field = 0;
+  }
+
+  /** \brief Opens a motion file for reading.
+   * \param fn Name of the file.
+   * \param y_dim Dimension 'Y' of blocks (0 = the one of the file).
+   * \param x_dim Dimension 'X' of blocks (0 = the one of the file).
+   * \returns 0 if the file can not be opened.
+   */
+  int open_read(const char *fn, int y_dim, int x_dim) {
+    this->fn = fn;
+    writing = 0;
+    fd = fopen(fn, "r");
+    if(!fd) return 0;
+    char magic[4];
+    if(fread(magic, 1, 4, fd) != 4 || memcmp(magic, MOTION_MAGIC, 4)) {
+      error("motion_file: \"%s\" is not a motion file ... aborting!\n", fn);
+      abort();
+    }
+    int file_y_dim = get(4);
+    int file_x_dim = get(4);
+    check_dimensions(y_dim, x_dim, file_y_dim, file_x_dim);
+    block_size = get(4);
+    fields = get(4);
+    long long table = get(8);
+    offsets = new long long [fields + 1];
+    capacity = fields + 1;
+    fseek(fd, table, SEEK_SET);
+    for(int i=0; i<fields; i++) offsets[i] = get(8);
+    offsets[fields] = table;
+    buffer = new unsigned char [4*blocks_in_y*blocks_in_x*3];
+    field = 0;
+    fseek(fd, MOTION_HEADER_BYTES, SEEK_SET);
+    return 1;
+  }
+
+  /** \brief Opens an empty sequence of fields. The fields read are
+   * zero (linear motion).
+   * \param y_dim Dimension 'Y' of blocks.
+   * \param x_dim Dimension 'X' of blocks.
+   */
+  void open_zero(int y_dim, int x_dim) {
+    fn = "/dev/zero";
+    fd = NULL;
+    writing = 0;
+    blocks_in_y = y_dim;
+    blocks_in_x = x_dim;
+    fields = field = 0;
+  }
+
+  /** \brief Creates a motion file.
+   * \param fn Name of the file.
+   * \param y_dim Dimension 'Y' of blocks.
+   * \param x_dim Dimension 'X' of blocks.
+   * \param block_size Size of the blocks (0 if unknown).
+   * \returns 0 if the file can not be created.
+   */
+  int open_write(const char *fn, int y_dim, int x_dim, int block_size) {
+    this->fn = fn;
+    writing = 1;
+    fd = fopen(fn, "w");
+    if(!fd) return 0;
+    blocks_in_y = y_dim;
+    blocks_in_x = x_dim;
+    this->block_size = block_size;
+    fields = field = 0;
+    capacity = 64;
+    offsets = new long long [capacity];
+    buffer = new unsigned char [4*blocks_in_y*blocks_in_x*3];
+    fwrite(MOTION_MAGIC, 1, 4, fd);
+    put(blocks_in_y, 4);
+    put(blocks_in_x, 4);
+    put(block_size, 4);
+    put(0, 4);
+    put(0, 8);
+    return 1;
+  }
+
+  /** \brief Places the file at the beginning of a field.
+   * \param i Index of the field.
+   */
+  void seek(int i) {
+    field = i;
+    if(fd && i < fields) fseek(fd, offsets[i], SEEK_SET);
+  }
+
+  /** \brief Reads the next field. If there are no more fields, the
+   * field is zero.
+   * \param data Two motion vectors.
+   * \returns 0 if there are no more fields.
+   */
+  int read(MVC_TYPE ****data) {
+    if(field >= fields) {
+      for(int i=0; i<2; i++) {
+	for(int f=0; f<2; f++) {
+	  for(int y=0; y<blocks_in_y; y++) {
+	    memset(data[i][f][y], 0, blocks_in_x*sizeof(MVC_TYPE));
+	  }
+	}
+      }
+      return 0;
+    }
+    long bytes = offsets[field+1] - offsets[field];
+    if(fread(buffer, 1, bytes, fd) != (size_t)bytes) {
+      error("motion_file: \"%s\" is truncated ... aborting!\n", fn);
+      abort();
+    }
+    unsigned char *p = buffer;
+    for(int i=0; i<2; i++) {
+      for(int f=0; f<2; f++) {
+	for(int y=0; y<blocks_in_y; y++) {
+	  for(int x=0; x<blocks_in_x; x++) {
+	    if(*p == MOTION_ESCAPE) {
+	      data[i][f][y][x] = (MVC_TYPE)(p[1] | (p[2] << 8));
+	      p += 3;
+	    } else {
+	      data[i][f][y][x] = (signed char)*p++;
+	    }
+	  }
+	}
+      }
+    }
+    field++;
+    return 1;
+  }
+
+  /** \brief Writes a field at the end of the file.
+   * \param data Two motion vectors.
+   */
+  void write(MVC_TYPE ****data) {
+    if(fields >= capacity) {
+      long long *tmp = new long long [2*capacity];
+      memcpy(tmp, offsets, capacity*sizeof(long long));
+      delete [] offsets;
+      offsets = tmp;
+      capacity *= 2;
+    }
+    offsets[fields++] = ftell(fd);
+    unsigned char *p = buffer;
+    for(int i=0; i<2; i++) {
+      for(int f=0; f<2; f++) {
+	for(int y=0; y<blocks_in_y; y++) {
+	  for(int x=0; x<blocks_in_x; x++) {
+	    int v = data[i][f][y][x];
+	    if(v > -128 && v < 128) {
+	      *p++ = (unsigned char)v;
+	    } else {
+	      *p++ = MOTION_ESCAPE;
+	      *p++ = v & 0xFF;
+	      *p++ = (v >> 8) & 0xFF;
+	    }
+	  }
+	}
+      }
+    }
+    fwrite(buffer, 1, p - buffer, fd);
+    field = fields;
+  }
+
+  /** \brief Closes the file. If it has been written, the offset
+   * table and the number of fields are written. */
+  void close() {
+    if(!fd) return;
+    if(writing) {
+      long long table = ftell(fd);
+      for(int i=0; i<fields; i++) put(offsets[i], 8);
+      fseek(fd, 16, SEEK_SET);
+      put(fields, 4);
+      put(table, 8);
+    }
+    fclose(fd);
+    fd = NULL;
+  }
+
+};
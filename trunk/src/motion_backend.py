@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file motion_backend.py
+#  General-purpose lossless compressors (zlib, bz2 and lzma) for the
+#  motion fields, run in the same process.
+#
+#  The motion fields of a temporal subband are compressed GOP by GOP
+#  (so that each GOP can be extracted and decompressed alone) and
+#  stored in a file with an index:\n
+#  - The name of the backend (4 bytes) and its level (1 byte).
+#  - The number of GOPs (4 bytes).
+#  - The size in bytes of each GOP (4 bytes per GOP).
+#  - The compressed GOPs.
+#
+#  All the integers are little endian.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package motion_backend
+#  General-purpose lossless compressors (zlib, bz2 and lzma) for the
+#  motion fields, run in the same process.
+
+import os
+import abc
+import bz2
+import zlib
+import struct
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        ## The lzma module is not available (Python 2 needs the
+        #  backports.lzma package).
+        lzma = None
+
+## Backend used if MCTF_MOTION_BACKEND is not defined.
+DEFAULT_BACKEND = "zlib:9"
+## Extension of the compressed files.
+EXTENSION = "mgp"
+
+## A general-purpose compressor. compress() and decompress() are
+#  abstract.
+class backend:
+    __metaclass__ = abc.ABCMeta
+
+    ## Name of the backend (at most 4 characters).
+    name = ""
+    ## Valid levels.
+    levels = []
+
+    ## Selects the level of compression.
+    # @param self Refers to object.
+    # @param level Level of compression (None = the highest).
+    def __init__(self, level=None):
+        if level is None:
+            level = self.levels[-1]
+        if level not in self.levels:
+            raise ValueError("%s: invalid level %d" % (self.name, level))
+        ## Level of compression.
+        self.level = level
+
+    ## Compresses a string of bytes.
+    # @param self Refers to object.
+    # @param data The string.
+    # @return The compressed string.
+    @abc.abstractmethod
+    def compress(self, data):
+        pass
+
+    ## Decompresses a string of bytes.
+    # @param self Refers to object.
+    # @param data The compressed string.
+    # @return The string.
+    @abc.abstractmethod
+    def decompress(self, data):
+        pass
+
+## Deflate (zlib).
+class zlib_backend(backend):
+    name = "zlib"
+    levels = range(1, 10)
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+## Burrows-Wheeler (bz2).
+class bz2_backend(backend):
+    name = "bz2"
+    levels = range(1, 10)
+
+    def compress(self, data):
+        return bz2.compress(data, self.level)
+
+    def decompress(self, data):
+        return bz2.decompress(data)
+
+## LZMA (xz without container, see lzma.FORMAT_ALONE).
+class lzma_backend(backend):
+    name = "lzma"
+    levels = range(0, 10)
+
+    def __init__(self, level=None):
+        if lzma is None:
+            raise ImportError("lzma: install the backports.lzma package")
+        backend.__init__(self, level)
+
+    def compress(self, data):
+        return lzma.compress(data, format=lzma.FORMAT_ALONE, preset=self.level)
+
+    def decompress(self, data):
+        return lzma.decompress(data, format=lzma.FORMAT_ALONE)
+
+## The backends, by name.
+backends = dict((b.name, b) for b in (zlib_backend, bz2_backend, lzma_backend))
+
+## Creates a backend.
+#  @param name Name of the backend, optionally followed by ":" and the
+#  level (for example, "bz2:9").
+#  @return The backend.
+def create(name):
+    name, _, level = name.partition(":")
+    if name not in backends:
+        raise ValueError("unknown motion backend \"%s\" (%s)" % (name, ", ".join(sorted(backends))))
+    return backends[name](int(level) if level else None)
+
+## The backend selected with the environment variable
+#  MCTF_MOTION_BACKEND.
+#  @return The backend.
+def selected():
+    return create(os.environ.get("MCTF_MOTION_BACKEND") or DEFAULT_BACKEND)
+
+## Compresses the GOPs of a subband and writes them with an index.
+#  @param file_name Name of the compressed file.
+#  @param codec The backend.
+#  @param GOPs A list of strings (the motion fields of each GOP).
+#  @return The sizes of the compressed GOPs.
+def write(file_name, codec, GOPs):
+    compressed = [codec.compress(g) for g in GOPs]
+    with open(file_name, "wb") as f:
+        f.write(struct.pack("<4sBI", codec.name, codec.level, len(compressed)))
+        f.write(struct.pack("<%dI" % len(compressed), *[len(c) for c in compressed]))
+        for c in compressed:
+            f.write(c)
+    return [len(c) for c in compressed]
+
+## Reads the index of a compressed subband.
+#  @param f File (positioned at the beginning).
+#  @return The backend and the sizes of the compressed GOPs.
+def read_index(f):
+    name, level, GOPs = struct.unpack("<4sBI", f.read(9))
+    sizes = struct.unpack("<%dI" % GOPs, f.read(4 * GOPs))
+    return backends[name.rstrip("\0")](level), sizes
+
+## Reads and decompresses the GOPs of a subband.
+#  @param file_name Name of the compressed file.
+#  @return A list of strings (the motion fields of each GOP).
+def read(file_name):
+    with open(file_name, "rb") as f:
+        codec, sizes = read_index(f)
+        return [codec.decompress(f.read(s)) for s in sizes]
+
+## Writes the accumulated sizes of the fields (one line per field), as
+#  the J2K codec. The size of a GOP is shared among its fields.
+#  @param file_name Name of the file of sizes (".mjc").
+#  @param sizes The sizes of the compressed GOPs.
+#  @param fields_per_GOP Number of fields of a GOP.
+def write_sizes(file_name, sizes, fields_per_GOP):
+    total = 0
+    with open(file_name, "w") as f:
+        for size in sizes:
+            for field in range(1, fields_per_GOP + 1):
+                f.write(str(total + size * field / fields_per_GOP) + "\n")
+            total += size
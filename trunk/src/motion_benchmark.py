@@ -0,0 +1,95 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file motion_benchmark.py
+#  Compares the general-purpose motion backends (see
+#  motion_backend.py): compression ratio versus encoding and decoding
+#  throughput, for the motion fields of a compressed sequence.
+#
+#  Usage example (in the directory of a compressed sequence):
+#
+#  mctf motion_benchmark --GOPs=16 --TRLs=5
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package motion_benchmark
+#  Compares the general-purpose motion backends (see
+#  motion_backend.py).
+
+import sys
+import time
+import motion_backend
+import motion_format
+from MCTF_parser import MCTF_parser
+
+## Number of Group Of Pictures.
+GOPs     = 1
+## Number of Temporal Resolution Levels.
+TRLs     = 4
+## Backends (and levels) to compare.
+backends = "zlib:1,zlib:6,zlib:9,bz2:1,bz2:9,lzma:0,lzma:6,lzma:9"
+## Number of times each measure is repeated (the best time is used).
+repeat   = 3
+
+## The parser module provides an interface to Python's internal parser
+#  and byte-code compiler.
+parser = MCTF_parser(description="Compares the motion backends.")
+parser.GOPs(GOPs)
+parser.TRLs(TRLs)
+parser.add_argument("--backends", help="backends to compare. (Default = {})".format(backends))
+parser.add_argument("--repeat",   help="repetitions of each measure. (Default = {})".format(repeat))
+
+## A script may only parse a few of the command-line arguments,
+#  passing the remaining arguments on to another script or program.
+args = parser.parse_known_args()[0]
+if args.GOPs:
+    GOPs = int(args.GOPs)
+if args.TRLs:
+    TRLs = int(args.TRLs)
+if args.backends:
+    backends = args.backends
+if args.repeat:
+    repeat = int(args.repeat)
+
+## Measures the best time of a function.
+#  @param function The function.
+#  @return The time in seconds.
+def best_time(function):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return max(best, 1e-9)
+
+# The motion fields of each temporal subband, split in GOPs.
+#-----------------------------------------------------------
+## The GOPs of all the subbands.
+data = []
+for subband in range(1, TRLs):
+    subband_data = motion_format.read("motion_residue_" + str(subband))[1].tostring()
+    GOP_bytes = len(subband_data) / GOPs
+    data += [subband_data[i * GOP_bytes:(i + 1) * GOP_bytes] for i in range(GOPs)]
+
+## Bytes of motion (uncompressed).
+raw_bytes = sum(len(g) for g in data)
+
+sys.stdout.write("%-8s %10s %8s %12s %12s\n" % ("backend", "bytes", "ratio", "enc (MB/s)", "dec (MB/s)"))
+for name in backends.split(","):
+    try:
+        codec = motion_backend.create(name)
+    except (ValueError, ImportError), e:
+        sys.stdout.write("%-8s %s\n" % (name, e))
+        continue
+    compressed = [codec.compress(g) for g in data]
+    for g, c in zip(data, compressed):
+        assert codec.decompress(c) == g
+    compressed_bytes = sum(len(c) for c in compressed)
+    encode = best_time(lambda: [codec.compress(g) for g in data])
+    decode = best_time(lambda: [codec.decompress(c) for c in compressed])
+    sys.stdout.write("%-8s %10d %8.2f %12.2f %12.2f\n" % (name, compressed_bytes,
+                                                        float(raw_bytes) / max(compressed_bytes, 1),
+                                                        raw_bytes / encode / 1e6,
+                                                        raw_bytes / decode / 1e6))
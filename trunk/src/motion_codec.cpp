@@ -0,0 +1,713 @@
+/**
+ * \file motion_codec.cpp
+ * \author Vicente Gonzalez-Ruiz.
+ * \date Last modification: 2015, January 7.
+ * \brief Lossless compression of the motion fields of a temporal
+ * subband.
+ *
+ * The fields of a file "motion_residue_<i>" are compressed in one
+ * pass (there is no demultiplexing of the components in separate
+ * files). The four components of a field (PREV/NEXT, X/Y) are stored
+ * one after the other (see motion.cpp) and each one is predicted
+ * with one of these predictors, the one that minimizes the absolute
+ * value of the prediction errors:\n
+ * - 0: no prediction.
+ * - 1: spatial (median of the left, upper and upper-left vectors).
+ * - 2: temporal (the NEXT vector is predicted as the PREV vector
+ *   changed sign).
+ * - 3: temporal and spatial (the spatial prediction of the
+ *   temporal prediction errors).
+ *
+ * The prediction errors are coded with an adaptive binary
+ * arithmetic (range) coder. Each field is coded independently (the
+ * probabilities are reset), so the fields of a GOP can be extracted
+ * without decoding the rest.
+ *
+ * The output file "<file>.mvc" is an index (the number of fields and
+ * the size in bytes of each field, 32 bit integers) followed by the
+ * fields. As the J2K codec, the sizes of the fields (without the
+ * index) are also written, accumulated, in "<file>.mjc".
+ *
+ * The MCTF project has been supported by the Junta de Andalucía through
+ * the Proyecto Motriz "Codificación de Vídeo Escalable y su Streaming
+ * sobre Internet" (P10-TIC-6548).
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "display.cpp"
+#include "motion.cpp"
+#include "profile.cpp"
+
+/** \brief Number of components of a field. */
+#define COMPONENTS 4
+/** \brief Number of predictors. */
+#define PREDICTORS 4
+/** \brief Bits of the probabilities of the coder. */
+#define PROB_BITS 11
+/** \brief Initial probability (0.5). */
+#define PROB_INIT (1 << (PROB_BITS - 1))
+/** \brief Speed of adaptation of the probabilities. */
+#define PROB_SHIFT 5
+/** \brief Minimum range before a renormalization. */
+#define RANGE_TOP (1U << 24)
+/** \brief Contexts (depending on the neighbour errors). */
+#define CONTEXTS 3
+/** \brief Maximum length of the prefix of the Exp-Golomb codes (the
+    prediction errors are smaller than 2^18). */
+#define PREFIX_MAX 18
+
+static int code_timer = profile_timer("code");
+static int io_timer = profile_timer("io");
+static int fields_counter = profile_counter("fields");
+static int bytes_counter = profile_counter("bytes");
+
+/** \brief Adaptive probabilities of a field. */
+struct models {
+  /** \brief Probability of a zero prediction error. */
+  unsigned short zero[CONTEXTS];
+  /** \brief Probability of a positive prediction error. */
+  unsigned short sign[CONTEXTS];
+  /** \brief Probabilities of the bits of the prefixes. */
+  unsigned short prefix[CONTEXTS][PREFIX_MAX];
+};
+
+/** \brief Initializes the probabilities.
+ * \param m The probabilities.
+ */
+void reset_models(struct models *m) {
+  for(int c=0; c<CONTEXTS; c++) {
+    m->zero[c] = PROB_INIT;
+    m->sign[c] = PROB_INIT;
+    for(int i=0; i<PREFIX_MAX; i++) {
+      m->prefix[c][i] = PROB_INIT;
+    }
+  }
+}
+
+/** \brief Context of a prediction error.
+ * \param left Error of the left vector.
+ * \param up Error of the upper vector.
+ * \returns The context.
+ */
+int context(int left, int up) {
+  int a = abs(left) + abs(up);
+  if(a == 0) return 0;
+  if(a < 3) return 1;
+  return 2;
+}
+
+/** \brief Spatial prediction of a vector.
+ * \param v A component.
+ * \param y Row.
+ * \param x Column.
+ * \returns The prediction.
+ */
+int spatial_prediction(int **v, int y, int x) {
+  if(y == 0) return x ? v[y][x-1] : 0;
+  if(x == 0) return v[y-1][x];
+  int a = v[y][x-1], b = v[y-1][x], c = v[y-1][x-1];
+  int mx = a > b ? a : b, mn = a > b ? b : a;
+  if(c >= mx) return mn;
+  if(c <= mn) return mx;
+  return a + b - c;
+}
+
+/**
+ * \brief Computes the prediction errors of a component.
+ * \param predictor Predictor.
+ * \param v Component.
+ * \param reference Component used by the temporal predictors.
+ * \param t Temporary component.
+ * \param e Prediction errors.
+ * \param blocks_in_y Dimension 'Y' of blocks in a picture.
+ * \param blocks_in_x Dimension 'X' of blocks in a picture.
+ */
+void predict(int predictor, int **v, int **reference, int **t, int **e,
+	     int blocks_in_y, int blocks_in_x) {
+  for(int y=0; y<blocks_in_y; y++) {
+    for(int x=0; x<blocks_in_x; x++) {
+      switch(predictor) {
+      case 0: e[y][x] = v[y][x]; break;
+      case 1: e[y][x] = v[y][x] - spatial_prediction(v, y, x); break;
+      case 2: e[y][x] = v[y][x] + reference[y][x]; break;
+      case 3:
+	t[y][x] = v[y][x] + reference[y][x];
+	e[y][x] = t[y][x] - spatial_prediction(t, y, x);
+	break;
+      }
+    }
+  }
+}
+
+/**
+ * \brief Rebuilds a component from its prediction errors (in place).
+ * \param predictor Predictor.
+ * \param v Prediction errors (input) and component (output).
+ * \param reference Component used by the temporal predictors.
+ * \param blocks_in_y Dimension 'Y' of blocks in a picture.
+ * \param blocks_in_x Dimension 'X' of blocks in a picture.
+ */
+void unpredict(int predictor, int **v, int **reference,
+	       int blocks_in_y, int blocks_in_x) {
+  for(int y=0; y<blocks_in_y; y++) {
+    for(int x=0; x<blocks_in_x; x++) {
+      if(predictor & 1) v[y][x] += spatial_prediction(v, y, x);
+    }
+  }
+  if(predictor & 2) {
+    for(int y=0; y<blocks_in_y; y++) {
+      for(int x=0; x<blocks_in_x; x++) {
+	v[y][x] -= reference[y][x];
+      }
+    }
+  }
+}
+
+#if defined ANALYZE
+
+/** \brief Range encoder (LZMA-like). */
+struct encoder {
+  /** \brief Lower limit of the interval. */
+  unsigned long long low;
+  /** \brief Size of the interval. */
+  unsigned int range;
+  /** \brief Last byte not yet output (pending carry). */
+  unsigned char cache;
+  /** \brief Number of pending bytes. */
+  long long cache_size;
+  /** \brief Output buffer. */
+  unsigned char *out;
+  /** \brief Number of output bytes. */
+  long size;
+};
+
+/** \brief Starts the encoding.
+ * \param c Encoder.
+ * \param out Output buffer.
+ */
+void start_encoder(struct encoder *c, unsigned char *out) {
+  c->low = 0;
+  c->range = 0xFFFFFFFFU;
+  c->cache = 0;
+  c->cache_size = 1;
+  c->out = out;
+  c->size = 0;
+}
+
+/** \brief Outputs the top byte of "low", propagating the carry. */
+void shift_low(struct encoder *c) {
+  if((unsigned int)c->low < 0xFF000000U || (c->low >> 32) != 0) {
+    unsigned char carry = (unsigned char)(c->low >> 32);
+    unsigned char b = c->cache;
+    do {
+      c->out[c->size++] = b + carry;
+      b = 0xFF;
+    } while(--c->cache_size != 0);
+    c->cache = (unsigned char)(c->low >> 24);
+  }
+  c->cache_size++;
+  c->low = (c->low & 0x00FFFFFFULL) << 8;
+}
+
+/** \brief Encodes a bit with an adaptive probability. */
+void encode_bit(struct encoder *c, unsigned short *p, int bit) {
+  unsigned int bound = (c->range >> PROB_BITS) * *p;
+  if(bit) {
+    c->low += bound;
+    c->range -= bound;
+    *p -= *p >> PROB_SHIFT;
+  } else {
+    c->range = bound;
+    *p += ((1 << PROB_BITS) - *p) >> PROB_SHIFT;
+  }
+  while(c->range < RANGE_TOP) {
+    c->range <<= 8;
+    shift_low(c);
+  }
+}
+
+/** \brief Encodes "n" bits with probability 0.5. */
+void encode_direct(struct encoder *c, int value, int n) {
+  for(int i=n-1; i>=0; i--) {
+    c->range >>= 1;
+    if((value >> i) & 1) c->low += c->range;
+    while(c->range < RANGE_TOP) {
+      c->range <<= 8;
+      shift_low(c);
+    }
+  }
+}
+
+/** \brief Finishes the encoding. \returns The number of output bytes. */
+long stop_encoder(struct encoder *c) {
+  for(int i=0; i<5; i++) shift_low(c);
+  return c->size;
+}
+
+/** \brief Encodes a prediction error (zero flag, sign and an
+ * Exp-Golomb code of the magnitude with an adaptive prefix). */
+void encode_error(struct encoder *c, struct models *m, int ctx, int e) {
+  encode_bit(c, &m->zero[ctx], e != 0);
+  if(e == 0) return;
+  encode_bit(c, &m->sign[ctx], e < 0);
+  unsigned int a = abs(e);
+  int k = 0;
+  while((a >> (k+1)) != 0) k++;
+  for(int i=0; i<k; i++) encode_bit(c, &m->prefix[ctx][i], 1);
+  encode_bit(c, &m->prefix[ctx][k], 0);
+  encode_direct(c, a & ((1 << k) - 1), k);
+}
+
+#else /* ANALYZE */
+
+/** \brief Range decoder. */
+struct decoder {
+  /** \brief Size of the interval. */
+  unsigned int range;
+  /** \brief Code value. */
+  unsigned int code;
+  /** \brief Input buffer. */
+  const unsigned char *in;
+  /** \brief Size of the input buffer. */
+  long size;
+  /** \brief Number of input bytes. */
+  long pos;
+};
+
+/** \brief Next input byte (zero past the end of the buffer). */
+unsigned int next_byte(struct decoder *d) {
+  return d->pos < d->size ? d->in[d->pos++] : 0;
+}
+
+/** \brief Starts the decoding. */
+void start_decoder(struct decoder *d, const unsigned char *in, long size) {
+  d->range = 0xFFFFFFFFU;
+  d->code = 0;
+  d->in = in;
+  d->size = size;
+  d->pos = 0;
+  for(int i=0; i<5; i++) d->code = (d->code << 8) | next_byte(d);
+}
+
+/** \brief Decodes a bit with an adaptive probability. */
+int decode_bit(struct decoder *d, unsigned short *p) {
+  unsigned int bound = (d->range >> PROB_BITS) * *p;
+  int bit;
+  if(d->code < bound) {
+    d->range = bound;
+    *p += ((1 << PROB_BITS) - *p) >> PROB_SHIFT;
+    bit = 0;
+  } else {
+    d->code -= bound;
+    d->range -= bound;
+    *p -= *p >> PROB_SHIFT;
+    bit = 1;
+  }
+  while(d->range < RANGE_TOP) {
+    d->range <<= 8;
+    d->code = (d->code << 8) | next_byte(d);
+  }
+  return bit;
+}
+
+/** \brief Decodes "n" bits with probability 0.5. */
+int decode_direct(struct decoder *d, int n) {
+  int value = 0;
+  for(int i=0; i<n; i++) {
+    d->range >>= 1;
+    int bit = d->code >= d->range;
+    if(bit) d->code -= d->range;
+    value = (value << 1) | bit;
+    while(d->range < RANGE_TOP) {
+      d->range <<= 8;
+      d->code = (d->code << 8) | next_byte(d);
+    }
+  }
+  return value;
+}
+
+/** \brief Decodes a prediction error. */
+int decode_error(struct decoder *d, struct models *m, int ctx) {
+  if(!decode_bit(d, &m->zero[ctx])) return 0;
+  int negative = decode_bit(d, &m->sign[ctx]);
+  int k = 0;
+  while(k < PREFIX_MAX-1 && decode_bit(d, &m->prefix[ctx][k])) k++;
+  int a = (1 << k) | decode_direct(d, k);
+  return negative ? -a : a;
+}
+
+#endif /* ANALYZE */
+
+/** \brief Component (in the order of the file) used by the temporal
+    predictors of a component (-1 if they can not be used). */
+int temporal_reference(int component) {
+  return component >= 2 ? component - 2 : -1;
+}
+
+/** \brief Allocates a component. */
+int **alloc_component(int blocks_in_y, int blocks_in_x) {
+  int **v = new int * [blocks_in_y];
+  for(int y=0; y<blocks_in_y; y++) {
+    v[y] = new int [blocks_in_x];
+  }
+  return v;
+}
+
+/** \brief Writes a 32 bit integer (little endian). */
+void write_int(FILE *fd, unsigned int value) {
+  for(int i=0; i<4; i++) fputc((value >> (8*i)) & 0xFF, fd);
+}
+
+/** \brief Reads a 32 bit integer (little endian). */
+unsigned int read_int(FILE *fd) {
+  unsigned int value = 0;
+  for(int i=0; i<4; i++) {
+    int b = fgetc(fd);
+    if(b == EOF) {
+      error("read_int: unexpected end of file ... aborting!\n");
+      abort();
+    }
+    value |= (unsigned int)b << (8*i);
+  }
+  return value;
+}
+
+#include <getopt.h>
+
+/** \brief Provides a main function which reads in parameters from the command line.
+ * \param argc The number of command line arguments of the program.
+ * \param argv The contents of the command line arguments of the program.
+ * \returns Notifies proper execution.
+ */
+int main(int argc, char *argv[]) {
+
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
+
+  int blocks_in_x = 11;                   /* Dimension 'X' of blocks in a picture. */
+  int blocks_in_y = 9;                    /* Dimension 'Y' of blocks in a picture. */
+  int block_size = 0;                     /* Size of the blocks (0 if unknown). */
+  int fields = 1;                         /* Number of fields. */
+  char *file = (char *)"motion_residue_1"; /* Name of the file with the fields. */
+
+  int c;
+  while(1) {
+
+    /* http://www.gnu.org/software/libc/manual/html_node/Getopt-Long-Option-Example.html */
+    static struct option long_options[] = {
+      {"blocks_in_x", required_argument, 0, 'x'},
+      {"blocks_in_y", required_argument, 0, 'y'},
+      {"block_size", required_argument, 0, 'b'},
+      {"fields", required_argument, 0, 'f'},
+      {"file", required_argument, 0, 'i'},
+      /* Used by other motion codecs. */
+      {"iteration", required_argument, 0, 'n'},
+      {"quantization", required_argument, 0, 'q'},
+      {"clayers", required_argument, 0, 'c'},
+      {"pictures", required_argument, 0, 'p'},
+      {"GOPs", required_argument, 0, 'g'},
+      {"help", no_argument, 0, '?'},
+      {0, 0, 0, 0}
+    };
+
+    int option_index = 0;
+
+    c = getopt_long(argc, argv, "x:y:b:f:i:n:q:c:p:g:?", long_options, &option_index);
+
+    if(c==-1) {
+      /* There are no more options. */
+      break;
+    }
+
+    switch (c) {
+    case 0:
+      /* If this option set a flag, do nothing else now. */
+      if (long_options[option_index].flag != 0)
+	break;
+      info("option %s", long_options[option_index].name);
+      if (optarg)
+	info(" with arg %s", optarg);
+      info("\n");
+      break;
+
+    case 'x':
+      blocks_in_x = atoi(optarg);
+      log_debug("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
+      break;
+
+    case 'y':
+      blocks_in_y = atoi(optarg);
+      log_debug("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
+      break;
+
+    case 'b':
+      block_size = atoi(optarg);
+      log_debug("%s: block_size=%d\n", argv[0], block_size);
+      break;
+
+    case 'f':
+      fields = atoi(optarg);
+      log_debug("%s: fields=%d\n", argv[0], fields);
+      break;
+
+    case 'i':
+      file = optarg;
+      log_debug("%s: file=\"%s\"\n", argv[0], file);
+      break;
+
+    case 'n':
+    case 'q':
+    case 'c':
+    case 'p':
+    case 'g':
+      log_debug("%s: ignoring %s=%s\n", argv[0], long_options[option_index].name, optarg);
+      break;
+
+    case '?':
+#if defined ANALYZE
+      printf("+--------------------------+\n");
+      printf("| MCTF motion_compress_mvc |\n");
+      printf("+--------------------------+\n");
+#else
+      printf("+------------------------+\n");
+      printf("| MCTF motion_expand_mvc |\n");
+      printf("+------------------------+\n");
+#endif
+      printf("\n");
+#if defined ANALYZE
+      printf("  Lossless compression of the motion fields of a temporal subband.\n");
+#else
+      printf("  Lossless decompression of the motion fields of a temporal subband.\n");
+#endif
+      printf("\n");
+      printf("  Parameters:\n");
+      printf("\n");
+      printf("   -[-]blocks_in_[x]=number of blocks in the X direction (%d)\n", blocks_in_x);
+      printf("   -[-]blocks_in_[y]=number of blocks in the Y direction (%d)\n", blocks_in_y);
+      printf("   -[-]block_size=size of the blocks, 0 if it is unknown (%d)\n", block_size);
+      printf("   -[-f]ields=number of fields (%d)\n", fields);
+      printf("   -[-]f[i]le=name of the file with the motion fields (\"%s\")\n", file);
+      printf("\n");
+      exit(1);
+      break;
+
+    default:
+      error("%s: Unrecognized argument. Aborting ...\n", argv[0]);
+      abort();
+    }
+  }
+
+  /* RUN. */
+
+  char *codestream_fn = new char [strlen(file) + 5];
+  sprintf(codestream_fn, "%s.mvc", file);
+
+  /** \tparam MVC_TYPE Motion vector component type. */
+  motion < MVC_TYPE > motion;
+  MVC_TYPE ****field = motion.alloc(blocks_in_y, blocks_in_x);
+
+  int **component[COMPONENTS];
+  for(int i=0; i<COMPONENTS; i++) {
+    component[i] = alloc_component(blocks_in_y, blocks_in_x);
+  }
+
+  struct models m;
+  long vectors = (long)blocks_in_y * blocks_in_x;
+
+#if defined ANALYZE
+
+  motion_file input;
+  if(!input.open_read(file, blocks_in_y, blocks_in_x)) {
+    error("%s: unable to read \"%s\" ... aborting!\n", argv[0], file);
+    abort();
+  }
+  FILE *output_fd = fopen(codestream_fn, "w");
+  if(!output_fd) {
+    error("%s: unable to write \"%s\" ... aborting!\n", argv[0], codestream_fn);
+    abort();
+  }
+  char *sizes_fn = new char [strlen(file) + 5];
+  sprintf(sizes_fn, "%s.mjc", file);
+  FILE *sizes_fd = fopen(sizes_fn, "w");
+  if(!sizes_fd) {
+    error("%s: unable to write \"%s\" ... aborting!\n", argv[0], sizes_fn);
+    abort();
+  }
+
+  int **errors = alloc_component(blocks_in_y, blocks_in_x);
+  int **best = alloc_component(blocks_in_y, blocks_in_x);
+  int **tmp = alloc_component(blocks_in_y, blocks_in_x);
+
+  /* An adaptive bit costs, at most, PROB_BITS bits and a prediction
+     error needs, at most, 2*PREFIX_MAX adaptive bits. */
+  long max_field_bytes = COMPONENTS * vectors * 2*PREFIX_MAX * PROB_BITS / 8 + 16;
+  unsigned char *codestream = new unsigned char [max_field_bytes];
+  long *sizes = new long [fields];
+
+  /* The index is written when the sizes of the fields are known. */
+  write_int(output_fd, fields);
+  for(int i=0; i<fields; i++) {
+    write_int(output_fd, 0);
+  }
+
+  long total = 0;
+  for(int i=0; i<fields; i++) {
+
+    {
+      profile_scope timer(io_timer);
+      input.read(field);
+    }
+
+    profile_scope timer(code_timer);
+    for(int k=0; k<COMPONENTS; k++) {
+      for(int y=0; y<blocks_in_y; y++) {
+	for(int x=0; x<blocks_in_x; x++) {
+	  component[k][y][x] = field[k/2][k%2][y][x];
+	}
+      }
+    }
+
+    struct encoder e;
+    start_encoder(&e, codestream);
+    reset_models(&m);
+
+    for(int k=0; k<COMPONENTS; k++) {
+
+      /* Selection of the predictor. */
+      int r = temporal_reference(k);
+      int **reference = r >= 0 ? component[r] : NULL;
+      int predictor = 0;
+      long best_cost = -1;
+      for(int p=0; p<PREDICTORS; p++) {
+	if((p & 2) && !reference) continue;
+	predict(p, component[k], reference, tmp, errors, blocks_in_y, blocks_in_x);
+	long cost = 0;
+	for(int y=0; y<blocks_in_y; y++) {
+	  for(int x=0; x<blocks_in_x; x++) {
+	    cost += abs(errors[y][x]);
+	  }
+	}
+	if(best_cost < 0 || cost < best_cost) {
+	  best_cost = cost;
+	  predictor = p;
+	  int **t = best; best = errors; errors = t;
+	}
+      }
+
+      encode_direct(&e, predictor, 2);
+      for(int y=0; y<blocks_in_y; y++) {
+	for(int x=0; x<blocks_in_x; x++) {
+	  int ctx = context(x ? best[y][x-1] : 0, y ? best[y-1][x] : 0);
+	  encode_error(&e, &m, ctx, best[y][x]);
+	}
+      }
+    }
+
+    sizes[i] = stop_encoder(&e);
+    fwrite(codestream, 1, sizes[i], output_fd);
+    total += sizes[i];
+    fprintf(sizes_fd, "%ld\n", total);
+    profile_count(fields_counter, 1);
+    profile_count(bytes_counter, sizes[i]);
+    log_info("%s: field %d: %ld bytes\n", argv[0], i, sizes[i]);
+  }
+
+  fseek(output_fd, 4, SEEK_SET);
+  for(int i=0; i<fields; i++) {
+    write_int(output_fd, sizes[i]);
+  }
+
+  fclose(sizes_fd);
+  fclose(output_fd);
+  input.close();
+
+#else /* ANALYZE */
+
+  motion_file output;
+  if(!output.open_write(file, blocks_in_y, blocks_in_x, block_size)) {
+    error("%s: unable to write \"%s\" ... aborting!\n", argv[0], file);
+    abort();
+  }
+
+  FILE *input_fd = fopen(codestream_fn, "r");
+  if(!input_fd) {
+    /* If there is no codestream (the motion has been discarded),
+       the fields are zero (linear motion). */
+    log_info("%s: \"%s\" not found, writing zero fields\n", argv[0], codestream_fn);
+    for(int k=0; k<COMPONENTS; k++) {
+      for(int y=0; y<blocks_in_y; y++) {
+	memset(field[k/2][k%2][y], 0, blocks_in_x*sizeof(MVC_TYPE));
+      }
+    }
+    for(int i=0; i<fields; i++) {
+      output.write(field);
+    }
+    output.close();
+    return 0;
+  }
+
+  int stored_fields = read_int(input_fd);
+  if(stored_fields < fields) {
+    error("%s: \"%s\" has %d fields (%d expected) ... aborting!\n",
+	  argv[0], codestream_fn, stored_fields, fields);
+    abort();
+  }
+  long *sizes = new long [stored_fields];
+  long max_size = 0;
+  for(int i=0; i<stored_fields; i++) {
+    sizes[i] = read_int(input_fd);
+    if(sizes[i] > max_size) max_size = sizes[i];
+  }
+  unsigned char *codestream = new unsigned char [max_size + 1];
+
+  for(int i=0; i<fields; i++) {
+
+    {
+      profile_scope timer(io_timer);
+      if(fread(codestream, 1, sizes[i], input_fd) != (size_t)sizes[i]) {
+	error("%s: \"%s\" is truncated ... aborting!\n", argv[0], codestream_fn);
+	abort();
+      }
+    }
+
+    {
+      profile_scope timer(code_timer);
+      struct decoder d;
+      start_decoder(&d, codestream, sizes[i]);
+      reset_models(&m);
+
+      for(int k=0; k<COMPONENTS; k++) {
+	int predictor = decode_direct(&d, 2);
+	int **v = component[k];
+	for(int y=0; y<blocks_in_y; y++) {
+	  for(int x=0; x<blocks_in_x; x++) {
+	    int ctx = context(x ? v[y][x-1] : 0, y ? v[y-1][x] : 0);
+	    v[y][x] = decode_error(&d, &m, ctx);
+	  }
+	}
+	int r = temporal_reference(k);
+	unpredict(predictor, v, r >= 0 ? component[r] : NULL, blocks_in_y, blocks_in_x);
+	for(int y=0; y<blocks_in_y; y++) {
+	  for(int x=0; x<blocks_in_x; x++) {
+	    field[k/2][k%2][y][x] = v[y][x];
+	  }
+	}
+      }
+    }
+
+    profile_count(fields_counter, 1);
+    profile_count(bytes_counter, sizes[i]);
+
+    profile_scope timer(io_timer);
+    output.write(field);
+  }
+
+  fclose(input_fd);
+  output.close();
+
+#endif /* ANALYZE */
+
+  return 0;
+}
@@ -138,45 +138,39 @@ blocks_in_x = pixels_in_x / block_size
 
 
 
-while iteration < iterations:
+## Number of blocks in the X direction of each level.
+_blocks_in_x = []
+## Number of blocks in the Y direction of each level.
+_blocks_in_y = []
 
-    # Unmapped fields of movement between levels of resolution.
-    #----------------------------------------------------------
-    try:
-        check_call("mctf interlevel_motion_decorrelate"
-                   + " --blocks_in_x="         + str(blocks_in_x)
-                   + " --blocks_in_y="         + str(blocks_in_y)
-                   + " --fields_in_predicted=" + str(fields)
-                   + " --predicted="           + "motion_filtered_" + str(iteration)
-                   + " --reference="           + "motion_filtered_" + str(iteration + 1)
-                   + " --residue="             + "motion_residue_"  + str(iteration)
-                   , shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
-    # Calculate the block size used in this temporal iteration.
-    #----------------------------------------------------------
+# Calculate the block size used in each temporal iteration.
+#----------------------------------------------------------
+while iteration <= iterations:
+    _blocks_in_x.append(pixels_in_x / block_size)
+    _blocks_in_y.append(pixels_in_y / block_size)
     block_size = block_size / 2
     if (block_size < block_size_min):
         block_size = block_size_min
+    iteration += 1
 
-        fields /= 2
-        iteration += 1
-        blocks_in_y = pixels_in_y / block_size
-        blocks_in_x = pixels_in_x / block_size
+# The last number of blocks in X and Y is used by the codec.
+if iterations > 0:
+    blocks_in_x = _blocks_in_x[-1]
+    blocks_in_y = _blocks_in_y[-1]
 
 
-# Bidirectionally unmapped level lower temporal resolution. The last
-# number of blocks in X and Y calculated in the previous loop is
-# used. The same applies to the variable "iteration".
-#-------------------------------------------------------------------
+# Unmapped fields of movement between levels of resolution and
+# bidirectionally unmapped level lower temporal resolution. All the
+# levels of a GOP are decorrelated in one pass.
+#-----------------------------------------------------------------
 try:
-    check_call("mctf bidirectional_motion_decorrelate"
-               + " --blocks_in_x=" + str(blocks_in_x)
-               + " --blocks_in_y=" + str(blocks_in_y)
-               + " --fields="      + str(fields)
-               + " --input="       + "motion_filtered_" + str(iteration)
-               + " --output="      + "motion_residue_"  + str(iteration)
+    check_call("mctf motion_decorrelate"
+               + " --blocks_in_x=" + ','.join(map(str, _blocks_in_x))
+               + " --blocks_in_y=" + ','.join(map(str, _blocks_in_y))
+               + " --GOPs="        + str(GOPs)
+               + " --levels="      + str(iterations)
+               + " --input="       + "motion_filtered_"
+               + " --output="      + "motion_residue_"
                , shell=True)
 except CalledProcessError:
     sys.exit(-1)
@@ -198,6 +192,7 @@ while iteration <= iterations:
                    + " --blocks_in_y="     + str(blocks_in_y)
                    + " --iteration="       + str(iteration)
                    + " --fields="          + str(fields)
+                   + " --GOPs="            + str(GOPs)
                    + " --quantization=\""  + str(quantization) + "\""
                    + " --clayers=\""       + str(clayers)      + "\""
                    + " --file="            + "motion_residue_" + str(iteration)
@@ -67,9 +67,7 @@ def usage():
     sys.stderr.write("   -[-p]ictures=number of images to process (%d)\n" % pictures)
     sys.stderr.write("   -[-t]emporal_levels=number of temporal levels (%d)\n" % temporal_levels)
 
-ifdef({{DEBUG}},
-display.info(str(sys.argv[0:]) + '\n')
-)
+display.log_debug(str(sys.argv[0:]) + '\n')
 
 ## Define the variable for options.
 opts = ""
@@ -92,34 +90,22 @@ except getopt.GetoptError, exc:
 for o, a in opts:
     if o in ("-x", "--blocks_in_x"):
         blocks_in_x = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": blocks_in_x=" + str(blocks_in_x) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": blocks_in_x=" + str(blocks_in_x) + '\n')
     if o in ("-y", "--blocks_in_y"):
         blocks_in_y = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": blocks_in_y=" + str(blocks_in_y) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": blocks_in_y=" + str(blocks_in_y) + '\n')
     if o in ("-i", "--iteration"):
         iteration = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": iteration=" + str(iteration) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": iteration=" + str(iteration) + '\n')
     if o in ("-f", "--file"):
         file = a
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": file=" + file + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": file=" + file + '\n')
     if o in ("-p", "--pictures"):
         pictures = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
     if o in ("-t", "--temporal_levels"):
         temporal_levels = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
     if o in ("-h", "--help"):
         usage()
         sys.exit()
@@ -138,30 +124,22 @@ gop = GOP();
 
 ## Extract the value of the size of a GOP, that is, the number of images.
 GOP_size = gop.get_size(temporal_levels)
-ifdef({{DEBUG}},
-sys.stdout.write(sys.argv[0] + ": GOP_size=" + str(GOP_size) + '\n')
-)
+display.log_debug(sys.argv[0] + ": GOP_size=" + str(GOP_size) + '\n')
 
 ## Number of GOPs.
 number_of_GOPs = pictures / GOP_size
-ifdef({{DEBUG}},
-sys.stdout.write(sys.argv[0] + ": number_of_GOPs=" + str(number_of_GOPs) + '\n')
-)
+display.log_debug(sys.argv[0] + ": number_of_GOPs=" + str(number_of_GOPs) + '\n')
 
 ## Number of fields per GOP.
 fields_per_GOP = GOP_size / (2 ** iteration)
-ifdef({{DEBUG}},
-sys.stdout.write(sys.argv[0] + ": fields_per_GOP=" + str(fields_per_GOP) + '\n')
-)
+display.log_debug(sys.argv[0] + ": fields_per_GOP=" + str(fields_per_GOP) + '\n')
 
 print field_size_in_bytes * fields_per_GOP
 
 ## Instruction compression by gzip.
 command = "gzip -9nf " + file # Try flag -n
 
-ifdef({{DEBUG}},
-sys.stdout.write(sys.argv[0] + ": " + command + "\n")
-)
+display.log_debug(sys.argv[0] + ": " + command + "\n")
 
 os.system(command)
 
@@ -28,6 +28,9 @@
 
 import os
 import sys
+import array
+import container
+import motion_format
 import subprocess  as     sub
 from   subprocess  import check_call
 from   subprocess  import CalledProcessError
@@ -90,23 +93,21 @@ if args.file:
 
 ## Number of levels of the DWT to be applied in compression.
 dwt_levels = 0 # 1 # SRLs - 1
-## Number of bytes required by the movement information (uncompressed)
-#  for each image.
-bytes_compF = blocks_in_x * blocks_in_y * BYTES_PER_COMPONENT
+## Number of vectors (of each component) of a field.
+vectors_per_field = blocks_in_x * blocks_in_y
 
 
+## Motion fields of the subband (the components of the vectors are
+#  interleaved).
+vectors = motion_format.read(file, fields)[1]
+
 for comp_number in range (0, COMPONENTS) :
 
     # DEMUX components.
     #------------------
-    try :
-        check_call("trace demux " + str(COMPONENTS * BYTES_PER_COMPONENT) + " " + str(comp_number * BYTES_PER_COMPONENT) + " " + str(BYTES_PER_COMPONENT)
-                   + " < " + file
-                   + " | /usr/bin/split --numeric-suffixes --suffix-length=4 "
-                   + "--bytes=" + str(bytes_compF) + " - " + file + "_comp" + str(comp_number) + "_" # .rawl aqu!
-                   , shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
+    ## The component of all the fields (an extended slice is
+    #  copied in one operation).
+    component = vectors[comp_number::COMPONENTS]
 
 
     # ENCODE components.
@@ -119,11 +120,9 @@ for comp_number in range (0, COMPONENTS) :
         #  component of a desired image and a specific subband.
         campoMov_name = file + "_comp" + str(comp_number) + "_" + str('%04d' % campoMov_number)
 
-        try:
-            check_call("mv " + campoMov_name + " " + campoMov_name + ".rawl"
-                       , shell=True)
-        except CalledProcessError:
-            sys.exit(-1)
+        with open(campoMov_name + ".rawl", "wb") as f:
+            component[campoMov_number * vectors_per_field :
+                      (campoMov_number + 1) * vectors_per_field].tofile(f)
 
         try:
             # Compress.
@@ -153,19 +152,11 @@ for comp_number in range (0, COMPONENTS) :
 
 
 
-## Determines the size of the header of a codestream.
-#  @param file_name Name of the file with the motion fields.
-#  @return Bytes of the header of a codestream.
-def header (file_name) :
-    p = sub.Popen("header_size " + str(file_name) + " 2> /dev/null | grep OUT", shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
-    out, err = p.communicate()
-    return long(out[4:])
-
-
-
 ## Records motion size information in a file that can be consulted
 #  later.
 file_sizes = open (file + ".mjc", 'w') # Compute file sizes
+## Codestreams of the subband, stored in one container.
+entries = []
 ## Determines the size in bytes of motion fields belonging to each 
 #  component, each image and each temporal subband.
 total = 0
@@ -174,5 +165,10 @@ for campoMov_number in range (0, fields) :
         ## Name of the file containing the data of movement of a
         #  component of a desired image and a specific subband.
         name  = file + "_comp" + str(comp_number) + "_" + str('%04d' % campoMov_number)
-        total = total + os.path.getsize(name + ".j2c") - header(name + ".j2c")
+        ## A component (with the size of its header).
+        e     = container.codestream_entry(campoMov_number, "comp" + str(comp_number), name + ".j2c")
+        entries.append(e)
+        total = total + os.path.getsize(name + ".j2c") - e.header
     file_sizes.write(str(total) + "\n")
+file_sizes.close()
+container.write(container.name(file), fields, entries, remove=True)
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file motion_compress_stdlib.py
+#  Compresses the motion vectors with a general-purpose compressor
+#  (zlib, bz2 or lzma, see motion_backend.py) in the same process.
+#
+#  The backend and its level are selected with the environment
+#  variable MCTF_MOTION_BACKEND (for example, "bz2:9"). Each GOP is
+#  compressed separately. The accumulated sizes of the fields are
+#  written in "<file>.mjc".
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package motion_compress_stdlib
+#  Compresses the motion vectors with a general-purpose compressor
+#  (zlib, bz2 or lzma, see motion_backend.py) in the same process.
+
+import sys
+import display
+import motion_backend
+import motion_format
+from MCTF_parser import MCTF_parser
+
+## Number of components of a motion field.
+COMPONENTS          = 4
+## Number of bytes for each component.
+BYTES_PER_COMPONENT = 2
+## Name of the file with the motion fields.
+file         = ""
+## Number of blocks in the X direction.
+blocks_in_x  = 0
+## Number of blocks in the Y direction.
+blocks_in_y  = 0
+## Number of fields in to compress.
+fields       = 0
+## Number of GOPs.
+GOPs         = 1
+
+## The parser module provides an interface to Python's internal parser
+#  and byte-code compiler.
+parser = MCTF_parser(description="Compress the motion data with zlib, bz2 or lzma.")
+parser.add_argument("--blocks_in_x", help="number of blocks in the X direction. (Default = {})".format(blocks_in_x))
+parser.add_argument("--blocks_in_y", help="number of blocks in the Y direction. (Default = {})".format(blocks_in_y))
+parser.add_argument("--fields",      help="number of fields in to compress. (Default = {})".format(fields))
+parser.add_argument("--file",        help="name of the file with the motion fields. (Default = {})".format(file))
+parser.GOPs(GOPs)
+
+## A script may only parse a few of the command-line arguments,
+#  passing the remaining arguments on to another script or program.
+args = parser.parse_known_args()[0]
+if args.blocks_in_x:
+    blocks_in_x = int(args.blocks_in_x)
+if args.blocks_in_y:
+    blocks_in_y = int(args.blocks_in_y)
+if args.fields:
+    fields = int(args.fields)
+if args.file:
+    file = args.file
+if args.GOPs:
+    GOPs = int(args.GOPs)
+
+## Number of fields of a GOP.
+fields_per_GOP = max(fields / GOPs, 1)
+## Number of bytes of a GOP.
+GOP_bytes = fields_per_GOP * blocks_in_x * blocks_in_y * COMPONENTS * BYTES_PER_COMPONENT
+
+try:
+    ## The backend.
+    codec = motion_backend.selected()
+except (ValueError, ImportError), e:
+    display.info(sys.argv[0] + ": " + str(e) + "\n")
+    sys.exit(-1)
+
+## The motion fields of the subband (the shorts of the fields, as
+#  in the uncompressed files of previous versions).
+data = motion_format.read(file, fields)[1].tostring()
+
+## The sizes of the compressed GOPs.
+sizes = motion_backend.write(file + "." + motion_backend.EXTENSION, codec,
+                             [data[i:i + GOP_bytes] for i in xrange(0, len(data), GOP_bytes)])
+motion_backend.write_sizes(file + ".mjc", sizes, fields_per_GOP)
+display.log_debug(sys.argv[0] + ": " + codec.name + ":" + str(codec.level) + " " + str(sizes) + "\n")
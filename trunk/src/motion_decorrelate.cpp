@@ -0,0 +1,337 @@
+/**
+ * \file motion_decorrelate.cpp
+ * \author Vicente Gonzalez-Ruiz.
+ * \date Last modification: 2015, January 7.
+ * \brief Interlevel and bidirectional motion decorrelation (or
+ * correlation) of all the temporal levels in one pass.
+ *
+ * The motion fields of a GOP (of all the temporal levels) are read
+ * once and:\n
+ * - The fields of the level "i" are predicted from the fields of
+ *   the level "i+1" (see interlevel_motion_decorrelate.cpp): if a
+ *   component of a vector is "x" at the level "i+1", the
+ *   corresponding component at the level "i" should be "x/2".
+ * - The NEXT vectors of the last level are predicted from the PREV
+ *   ones (see bidirectional_motion_decorrelate.cpp).
+ *
+ * The residues of all the levels are written at the end of each GOP.
+ *
+ * The MCTF project has been supported by the Junta de Andalucía through
+ * the Proyecto Motriz "Codificación de Vídeo Escalable y su Streaming
+ * sobre Internet" (P10-TIC-6548).
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include "display.cpp"
+#include "motion.cpp"
+#include "profile.cpp"
+
+/** \brief Maximum number of temporal levels. */
+#define LEVELS_MAX 16
+
+static int read_timer = profile_timer("read");
+static int write_timer = profile_timer("write");
+static int decorrelation_timer = profile_timer("decorrelation");
+static int fields_counter = profile_counter("fields");
+static int bytes_counter = profile_counter("bytes");
+
+/** \brief Interlevel (de)correlation of a field. The reference is
+ * the co-located field of the next temporal level.
+ * \param blocks_in_y Dimension 'Y' of blocks of the field.
+ * \param blocks_in_x Dimension 'X' of blocks of the field.
+ * \param field A field (predicted or residue).
+ * \param reference_blocks_in_y Dimension 'Y' of blocks of the reference.
+ * \param reference_blocks_in_x Dimension 'X' of blocks of the reference.
+ * \param reference The reference field.
+ */
+void interlevel_field
+(
+ int blocks_in_y,
+ int blocks_in_x,
+ MVC_TYPE ****field,
+ int reference_blocks_in_y,
+ int reference_blocks_in_x,
+ MVC_TYPE ****reference
+ ) {
+  for(int y=0; y<blocks_in_y; y++) {
+    int ry = y * reference_blocks_in_y / blocks_in_y;
+    for(int x=0; x<blocks_in_x; x++) {
+      int rx = x * reference_blocks_in_x / blocks_in_x;
+      for(int i=0; i<2; i++) {
+	for(int f=0; f<2; f++) {
+#if defined ANALYZE
+	  field[i][f][y][x] = field[i][f][y][x] - reference[i][f][ry][rx]/2;
+#else
+	  field[i][f][y][x] = field[i][f][y][x] + reference[i][f][ry][rx]/2;
+#endif
+	}
+      }
+    }
+  }
+}
+
+/** \brief Bidirectional (de)correlation of a field.
+ * \param blocks_in_y Dimension 'Y' of blocks of the field.
+ * \param blocks_in_x Dimension 'X' of blocks of the field.
+ * \param field A field.
+ */
+void bidirectional_field
+(
+ int blocks_in_y,
+ int blocks_in_x,
+ MVC_TYPE ****field
+ ) {
+  for(int y=0; y<blocks_in_y; y++) {
+    for(int x=0; x<blocks_in_x; x++) {
+#if defined ANALYZE
+      field[NEXT][X_FIELD][y][x] -= field[PREV][X_FIELD][y][x];
+      field[NEXT][Y_FIELD][y][x] -= field[PREV][Y_FIELD][y][x];
+#else
+      field[NEXT][X_FIELD][y][x] += field[PREV][X_FIELD][y][x];
+      field[NEXT][Y_FIELD][y][x] += field[PREV][Y_FIELD][y][x];
+#endif
+    }
+  }
+}
+
+/** \brief Parses a list of integers separated by commas. The last
+ * value is repeated if the list is shorter than "n".
+ * \param list The list.
+ * \param values The parsed values.
+ * \param n Number of values.
+ */
+void parse_list(const char *list, int *values, int n) {
+  int i = 0;
+  const char *p = list;
+  while(i < n && *p) {
+    values[i++] = atoi(p);
+    p = strchr(p, ',');
+    if(!p) break;
+    p++;
+  }
+  for(; i<n; i++) {
+    values[i] = i ? values[i-1] : 0;
+  }
+}
+
+#include <getopt.h>
+
+/** \brief Provides a main function which reads in parameters from the command line.
+ * \param argc The number of command line arguments of the program.
+ * \param argv The contents of the command line arguments of the program.
+ * \returns Notifies proper execution.
+ */
+int main(int argc, char *argv[]) {
+
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
+
+  char *blocks_in_x_list = (char *)"11"; /* Dimension 'X' of blocks (of each level). */
+  char *blocks_in_y_list = (char *)"9";  /* Dimension 'Y' of blocks (of each level). */
+  int GOPs = 1;                          /* Number of GOPs. */
+  int levels = 1;                        /* Number of levels of motion (TRLs - 1). */
+#if defined ANALYZE
+  char *input = (char *)"motion_filtered_";
+  char *output = (char *)"motion_residue_";
+#else
+  char *input = (char *)"motion_residue_";
+  char *output = (char *)"motion_";
+#endif
+
+  int c;
+  while(1) {
+
+    /* http://www.gnu.org/software/libc/manual/html_node/Getopt-Long-Option-Example.html */
+    static struct option long_options[] = {
+      {"blocks_in_x", required_argument, 0, 'x'},
+      {"blocks_in_y", required_argument, 0, 'y'},
+      {"GOPs", required_argument, 0, 'g'},
+      {"levels", required_argument, 0, 'l'},
+      {"input", required_argument, 0, 'i'},
+      {"output", required_argument, 0, 'o'},
+      {"help", no_argument, 0, '?'},
+      {0, 0, 0, 0}
+    };
+
+    int option_index = 0;
+
+    c = getopt_long(argc, argv, "x:y:g:l:i:o:?", long_options, &option_index);
+
+    if(c==-1) {
+      /* There are no more options. */
+      break;
+    }
+
+    switch (c) {
+    case 0:
+      /* If this option set a flag, do nothing else now. */
+      if (long_options[option_index].flag != 0)
+	break;
+      info("option %s", long_options[option_index].name);
+      if (optarg)
+	info(" with arg %s", optarg);
+      info("\n");
+      break;
+
+    case 'x':
+      blocks_in_x_list = optarg;
+      log_debug("%s: blocks_in_x=%s\n", argv[0], blocks_in_x_list);
+      break;
+
+    case 'y':
+      blocks_in_y_list = optarg;
+      log_debug("%s: blocks_in_y=%s\n", argv[0], blocks_in_y_list);
+      break;
+
+    case 'g':
+      GOPs = atoi(optarg);
+      log_debug("%s: GOPs=%d\n", argv[0], GOPs);
+      break;
+
+    case 'l':
+      levels = atoi(optarg);
+      log_debug("%s: levels=%d\n", argv[0], levels);
+      break;
+
+    case 'i':
+      input = optarg;
+      log_debug("%s: input=\"%s\"\n", argv[0], input);
+      break;
+
+    case 'o':
+      output = optarg;
+      log_debug("%s: output=\"%s\"\n", argv[0], output);
+      break;
+
+    case '?':
+#if defined ANALYZE
+      printf("+-------------------------+\n");
+      printf("| MCTF motion_decorrelate |\n");
+      printf("+-------------------------+\n");
+#else
+      printf("+-----------------------+\n");
+      printf("| MCTF motion_correlate |\n");
+      printf("+-----------------------+\n");
+#endif
+      printf("\n");
+#if defined ANALYZE
+      printf("  Interlevel and bidirectional decorrelation of the motion information.\n");
+#else
+      printf("  Interlevel and bidirectional correlation of the motion information.\n");
+#endif
+      printf("\n");
+      printf("  Parameters:\n");
+      printf("\n");
+      printf("   -[-]blocks_in_[x]=number of blocks in the X direction, for each level (\"%s\")\n", blocks_in_x_list);
+      printf("   -[-]blocks_in_[y]=number of blocks in the Y direction, for each level (\"%s\")\n", blocks_in_y_list);
+      printf("   -[-g]OPs=number of GOPs (%d)\n", GOPs);
+      printf("   -[-l]evels=number of levels of motion fields (%d)\n", levels);
+      printf("   -[-i]nput=prefix of the input files, followed by the level (\"%s\")\n", input);
+      printf("   -[-o]utput=prefix of the output files, followed by the level (\"%s\")\n", output);
+      printf("\n");
+      exit(1);
+      break;
+
+    default:
+      error("%s: Unrecognized argument. Aborting ...\n", argv[0]);
+      abort();
+    }
+  }
+
+  if(levels < 1) return 0;
+  if(levels > LEVELS_MAX) {
+    error("%s: too many levels (%d) ... aborting!\n", argv[0], levels);
+    abort();
+  }
+
+  /* Levels are numbered from 1 (the highest temporal resolution). */
+  int blocks_in_x[LEVELS_MAX + 1], blocks_in_y[LEVELS_MAX + 1];
+  parse_list(blocks_in_x_list, blocks_in_x + 1, levels);
+  parse_list(blocks_in_y_list, blocks_in_y + 1, levels);
+
+  motion_file input_fields[LEVELS_MAX + 1], output_fields[LEVELS_MAX + 1];
+  char input_fn[LEVELS_MAX + 1][1024], output_fn[LEVELS_MAX + 1][1024];
+  for(int l=1; l<=levels; l++) {
+    snprintf(input_fn[l], sizeof(input_fn[l]), "%s%d", input, l);
+    if(!input_fields[l].open_read(input_fn[l], blocks_in_y[l], blocks_in_x[l])) {
+      error("%s: unable to read \"%s\" ... aborting!\n", argv[0], input_fn[l]);
+      abort();
+    }
+    snprintf(output_fn[l], sizeof(output_fn[l]), "%s%d", output, l);
+    if(!output_fields[l].open_write(output_fn[l], blocks_in_y[l], blocks_in_x[l],
+				    input_fields[l].block_size)) {
+      error("%s: unable to write \"%s\" ... aborting!\n", argv[0], output_fn[l]);
+      abort();
+    }
+  }
+
+  /* The fields of a GOP: 2^(levels-l) at the level "l". */
+  motion < MVC_TYPE > motion;
+  MVC_TYPE *****fields[LEVELS_MAX + 1];
+  for(int l=1; l<=levels; l++) {
+    int n = 1 << (levels - l);
+    fields[l] = new MVC_TYPE **** [n];
+    for(int j=0; j<n; j++) {
+      fields[l][j] = motion.alloc(blocks_in_y[l], blocks_in_x[l]);
+    }
+  }
+
+  for(int g=0; g<GOPs; g++) {
+
+    log_info("%s: GOP %d\n", argv[0], g);
+
+    {
+      profile_scope timer(read_timer);
+      for(int l=1; l<=levels; l++) {
+	for(int j=0; j<(1 << (levels - l)); j++) {
+	  input_fields[l].read(fields[l][j]);
+	  profile_count(fields_counter, 1);
+	  profile_count(bytes_counter, 4*blocks_in_y[l]*blocks_in_x[l]*sizeof(MVC_TYPE));
+	}
+      }
+    }
+
+    {
+      profile_scope timer(decorrelation_timer);
+#if defined ANALYZE
+      /* Each level is predicted from the next one, which has not
+	 been decorrelated yet. */
+      for(int l=1; l<levels; l++) {
+	for(int j=0; j<(1 << (levels - l)); j++) {
+	  interlevel_field(blocks_in_y[l], blocks_in_x[l], fields[l][j],
+			   blocks_in_y[l+1], blocks_in_x[l+1], fields[l+1][j/2]);
+	}
+      }
+      bidirectional_field(blocks_in_y[levels], blocks_in_x[levels], fields[levels][0]);
+#else
+      /* Each level is predicted from the next one, which has
+	 already been reconstructed. */
+      bidirectional_field(blocks_in_y[levels], blocks_in_x[levels], fields[levels][0]);
+      for(int l=levels-1; l>=1; l--) {
+	for(int j=0; j<(1 << (levels - l)); j++) {
+	  interlevel_field(blocks_in_y[l], blocks_in_x[l], fields[l][j],
+			   blocks_in_y[l+1], blocks_in_x[l+1], fields[l+1][j/2]);
+	}
+      }
+#endif
+    }
+
+    {
+      profile_scope timer(write_timer);
+      for(int l=1; l<=levels; l++) {
+	for(int j=0; j<(1 << (levels - l)); j++) {
+	  output_fields[l].write(fields[l][j]);
+	}
+      }
+    }
+  }
+
+  for(int l=1; l<=levels; l++) {
+    input_fields[l].close();
+    output_fields[l].close();
+  }
+
+  return 0;
+}
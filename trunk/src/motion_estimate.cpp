@@ -11,6 +11,7 @@
 #include <stdarg.h>
 #include <string.h>
 #include "display.cpp"
+#include "profile.cpp"
 #include "Haar.cpp"
 #include "5_3.cpp"
 //#include "13_7.cpp"
@@ -18,6 +19,7 @@
 #include "dwt2d.cpp"
 #include "texture.cpp"
 #include "motion.cpp"
+#include "lazy.cpp"
 
 /** \brief Trigger for if_defined.\n
  * Greatly accelerates the process of motion estimation, although the search is sub-optimal.\n
@@ -42,9 +44,6 @@
 #define MVC_IO_TYPE short
 /** \brief MVC = Motion Vectors Components; CPU = Central Processing Unit. */
 #define MVC_CPU_TYPE short
-/* \brief Trigger for if_defined.\n
- * Displays real time information about running. */
-//#define DEBUG
 /* \brief Trigger for if_defined.\n
  * Outputs the motion vectors to the stdout. */
 //#define GNUPLOT
@@ -52,6 +51,28 @@
  * Set to zero the motion vectors. */
 //#define CLEAR_MVS
 
+/** \brief Time spent reading the pictures. */
+static int read_timer = profile_timer("read");
+/** \brief Time spent writing the motion fields. */
+static int write_timer = profile_timer("write");
+/** \brief Time spent building the pyramids (DWT) of the pictures and
+    the motion fields. */
+static int pyramid_timer = profile_timer("pyramid");
+/** \brief Time spent interpolating the pictures (sub-pixel accuracy). */
+static int interpolation_timer = profile_timer("interpolation");
+/** \brief Time spent searching the motion vectors. */
+static int search_timer = profile_timer("search");
+/** \brief Number of searched blocks. */
+static int blocks_counter = profile_counter("blocks_searched");
+/** \brief Number of SAD (Sum of Absolute Differences) evaluations. */
+static int sad_counter = profile_counter("sad_evaluations");
+/** \brief Number of absolute differences. */
+static int pixels_counter = profile_counter("sad_pixels");
+/** \brief Number of bytes read. */
+static int bytes_read_counter = profile_counter("bytes_read");
+/** \brief Number of bytes written. */
+static int bytes_written_counter = profile_counter("bytes_written");
+
 #if defined FAST_SEARCH
 
 /** \brief Motion estimation for blocks of variable size using only luminance.\n
@@ -203,6 +224,12 @@ void local_me_for_image
  int blocks_in_y,
  int blocks_in_x
 ) {
+
+  profile_scope timer(search_timer);
+  /* Each block is compared in 9 positions with both references. */
+  profile_count(blocks_counter, blocks_in_y*blocks_in_x);
+  profile_count(sad_counter, 2*9*blocks_in_y*blocks_in_x);
+  profile_count(pixels_counter, 2*9*blocks_in_y*blocks_in_x*(block_size+2*border_size)*(block_size+2*border_size));
   
   for(int by=0; by<blocks_in_y; by++) {
 #if defined DEBUG_
@@ -219,9 +246,7 @@ void local_me_for_image
       local_me_for_block(mv, ref, pred, luby, lubx, rbby, rbbx, by, bx);
     }
   }
-#if defined DEBUG
-  info("\n");
-#endif
+  log_debug("\n");
 }
 
 /** \brief Recalculates the number of blocks in each level DWT (Discrete Wavelet Transform).
@@ -275,19 +300,17 @@ void me_for_image
 #if defined FAST_SEARCH
   
   int dwt_levels = (int)rint(log((double)search_range)/log(2.0)) - 1;
-#if defined DEBUG
-  info("motion_estimate: dwt_levels = %d\n", dwt_levels);
-#endif
+  log_debug("motion_estimate: dwt_levels = %d\n", dwt_levels);
 
-  /* DWT applied to images. */
-  pic_dwt->analyze(ref[PREV], pixels_in_y, pixels_in_x, dwt_levels);
-  pic_dwt->analyze(ref[NEXT], pixels_in_y, pixels_in_x, dwt_levels);
-  pic_dwt->analyze(pred, pixels_in_y, pixels_in_x, dwt_levels);
+  /* DWT applied to images. */ {
+    profile_scope timer(pyramid_timer);
+    pic_dwt->analyze(ref[PREV], pixels_in_y, pixels_in_x, dwt_levels);
+    pic_dwt->analyze(ref[NEXT], pixels_in_y, pixels_in_x, dwt_levels);
+    pic_dwt->analyze(pred, pixels_in_y, pixels_in_x, dwt_levels);
+  }
 
   /** \brief Over-pixel estimation. */
-#if defined DEBUG
-  info("motion_estimate: over-pixel motion estimation level=%d\n", dwt_levels);
-#endif
+  log_debug("motion_estimate: over-pixel motion estimation level=%d\n", dwt_levels);
 
   local_me_for_image(mv,
 		     ref,
@@ -303,18 +326,22 @@ void me_for_image
     int blocks_in_y_l = desp(blocks_in_y, l);
     int blocks_in_x_l = desp(blocks_in_x, l);
 
-    /** - Wide images on a factor of 2. */
-    pic_dwt->synthesize(ref[PREV], Y_l, X_l, 1);
-    pic_dwt->synthesize(ref[NEXT], Y_l, X_l, 1);
-    pic_dwt->synthesize(pred, Y_l, X_l, 1);
-
-    /** - Motion fields expanded by a factor of 2. This is necessary
-	because in the next iteration the reference and predicted
-	images are twice as large. */
-    mv_dwt->synthesize(mv[PREV][Y_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
-    mv_dwt->synthesize(mv[NEXT][Y_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
-    mv_dwt->synthesize(mv[PREV][X_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
-    mv_dwt->synthesize(mv[NEXT][X_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
+    /* Pyramid. */ {
+      profile_scope timer(pyramid_timer);
+
+      /** - Wide images on a factor of 2. */
+      pic_dwt->synthesize(ref[PREV], Y_l, X_l, 1);
+      pic_dwt->synthesize(ref[NEXT], Y_l, X_l, 1);
+      pic_dwt->synthesize(pred, Y_l, X_l, 1);
+
+      /** - Motion fields expanded by a factor of 2. This is necessary
+	  because in the next iteration the reference and predicted
+	  images are twice as large. */
+      mv_dwt->synthesize(mv[PREV][Y_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
+      mv_dwt->synthesize(mv[NEXT][Y_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
+      mv_dwt->synthesize(mv[PREV][X_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
+      mv_dwt->synthesize(mv[NEXT][X_FIELD], blocks_in_y_l, blocks_in_x_l, 1);
+    }
     
     /** - Doubles the motion vectors, because the calculated values now
 	referenced to an image twice as large in each dimension. */
@@ -346,9 +373,7 @@ void me_for_image
 	  mv[NEXT][X_FIELD][by][bx] = -search_range;
       }
     }
-#if defined DEBUG
-    info("motion_estimate: over-pixel motion estimation level=%d\n",l);
-#endif
+    log_debug("motion_estimate: over-pixel motion estimation level=%d\n",l);
     local_me_for_image(mv,
 		       ref,
 		       pred,
@@ -359,14 +384,14 @@ void me_for_image
   
   /** Sub-pixel estimation. */
   for(int l=1; l<=subpixel_accuracy; l++) {
-#if defined DEBUG
-    info("motion_estimate: sub-pixel motion estimation level=%d\n",l);
-#endif
+    log_debug("motion_estimate: sub-pixel motion estimation level=%d\n",l);
     
-    /** - Wide images on a factor of 2. */
-    pic_dwt->synthesize(ref[PREV], pixels_in_y<<l, pixels_in_x<<l, 1);
-    pic_dwt->synthesize(ref[NEXT], pixels_in_y<<l, pixels_in_x<<l, 1);
-    pic_dwt->synthesize(pred, pixels_in_y<<l, pixels_in_x<<l, 1);
+    /** - Wide images on a factor of 2. */ {
+      profile_scope timer(interpolation_timer);
+      pic_dwt->synthesize(ref[PREV], pixels_in_y<<l, pixels_in_x<<l, 1);
+      pic_dwt->synthesize(ref[NEXT], pixels_in_y<<l, pixels_in_x<<l, 1);
+      pic_dwt->synthesize(pred, pixels_in_y<<l, pixels_in_x<<l, 1);
+    }
     
     /** - Motion fields expanded by a factor of 2. */
     for(int by=0; by<blocks_in_y; by++) {
@@ -406,10 +431,12 @@ void me_for_image
 		       blocks_in_y, blocks_in_x);
   }
 
-  /* - The images as they were left to the next search. */
-  pic_dwt->analyze(ref[PREV], pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
-  pic_dwt->analyze(ref[NEXT], pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
-  pic_dwt->analyze(pred, pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
+  /* - The images as they were left to the next search. */ {
+    profile_scope timer(interpolation_timer);
+    pic_dwt->analyze(ref[PREV], pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
+    pic_dwt->analyze(ref[NEXT], pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
+    pic_dwt->analyze(pred, pixels_in_y << subpixel_accuracy, pixels_in_x << subpixel_accuracy, subpixel_accuracy);
+  }
 
   //pic_dwt->analyze(reference_pic, Y<<subpixel_accuracy, X<<subpixel_accuracy, subpixel_accuracy);
   //pic_dwt->analyze(predicted_pic, Y<<subpixel_accuracy, X<<subpixel_accuracy, subpixel_accuracy);
@@ -489,13 +516,8 @@ void me_for_image
  */
 int main(int argc, char *argv[]) {
 
-#if defined DEBUG
-  info("%s ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
 
   int block_size = 32;
   int border_size = 0;
@@ -508,6 +530,7 @@ int main(int argc, char *argv[]) {
   int pixels_in_y = 288;
   int search_range = 4;
   int subpixel_accuracy = 0;
+  int interleaved = 0;
   
   int c;
   while(1) {
@@ -525,13 +548,14 @@ int main(int argc, char *argv[]) {
       {"pixels_in_y", required_argument, 0, 'y'},
       {"search_range", required_argument, 0, 's'},
       {"subpixel_accuracy", required_argument, 0, 'a'},
+      {"interleaved", required_argument, 0, 'I'},
       {"help", no_argument, 0, '?'},
       {0, 0, 0, 0}
     };
 
     int option_index = 0;
     
-    c = getopt_long(argc, argv, "b:d:e:i:m:o:p:x:y:s:a:?", long_options, &option_index);
+    c = getopt_long(argc, argv, "b:d:e:i:m:o:p:x:y:s:a:I:?", long_options, &option_index);
 
     if(c==-1) {
       /* There are no more options. */
@@ -551,79 +575,62 @@ int main(int argc, char *argv[]) {
       
     case 'b':
       block_size = atoi(optarg);
-#if defined DEBUG
-      info("%s: block_size=%d\n", argv[0], block_size);
-#endif
+      log_debug("%s: block_size=%d\n", argv[0], block_size);
       break;
       
     case 'e':
       even_fn = optarg;
-#if defined DEBUG
-      info("%s: even_fn=\"%s\"\n", argv[0], even_fn);
-#endif
+      log_debug("%s: even_fn=\"%s\"\n", argv[0], even_fn);
       break;
 
     case 'i':
       imotion_fn = optarg;
-#if defined DEBUG
-      info("%s: imotion_fn=\"%s\"\n", argv[0], imotion_fn);
-#endif
+      log_debug("%s: imotion_fn=\"%s\"\n", argv[0], imotion_fn);
       break;
 
     case 'm':
       motion_fn = optarg;
-#if defined DEBUG
-      info("%s: motion_fn=\"%s\"\n", argv[0], motion_fn);
-#endif
+      log_debug("%s: motion_fn=\"%s\"\n", argv[0], motion_fn);
       break;
 
     case 'o':
       odd_fn = optarg;
-#if defined DEBUG
-      info("%s: odd_fn=\"%s\"\n", argv[0], odd_fn);
-#endif
+      log_debug("%s: odd_fn=\"%s\"\n", argv[0], odd_fn);
       break;
 
     case 'd':
       border_size = atoi(optarg);
-#if defined DEBUG
-      info("%s: border_size=%d\n", argv[0], border_size);
-#endif
+      log_debug("%s: border_size=%d\n", argv[0], border_size);
       break;
 
     case 'p':
       pictures = atoi(optarg);
-#if defined DEBUG
-      info("%s: pictures=%d\n", argv[0], pictures);
-#endif
+      log_debug("%s: pictures=%d\n", argv[0], pictures);
       break;
       
     case 'x':
       pixels_in_x = atoi(optarg);
- #if defined DEBUG
-     info("%s: pixels_in_x=%d\n", argv[0], pixels_in_x);
-#endif
+     log_debug("%s: pixels_in_x=%d\n", argv[0], pixels_in_x);
       break;
       
     case 'y':
       pixels_in_y = atoi(optarg);
-#if defined DEBUG
-      info("%s: pixels_in_y=%d\n", argv[0], pixels_in_y);
-#endif
+      log_debug("%s: pixels_in_y=%d\n", argv[0], pixels_in_y);
       break;
       
     case 's':
       search_range = atoi(optarg);
-#if defined DEBUG
-      info("%s: search_range=%d\n", argv[0], search_range);
-#endif
+      log_debug("%s: search_range=%d\n", argv[0], search_range);
       break;
       
     case 'a':
       subpixel_accuracy = atoi(optarg);
-#if defined DEBUG
-      info("%s: subpixel_accuracy=%d\n", argv[0], subpixel_accuracy);
-#endif
+      log_debug("%s: subpixel_accuracy=%d\n", argv[0], subpixel_accuracy);
+      break;
+
+    case 'I':
+      interleaved = atoi(optarg);
+      log_debug("%s: interleaved=%d\n", argv[0], interleaved);
       break;
       
     case '?':
@@ -646,6 +653,7 @@ int main(int argc, char *argv[]) {
       printf("   -[-]pixels_in_[y] = size of the Y dimension of the pictures (%d)\n", pixels_in_y);
       printf("   -[-s]earch_range = size of the searching area of the motion estimation (%d)\n", search_range);
       printf("   -[-]subpixel_[a]ccuracy = sub-pixel accuracy of the motion estimation (%d)\n", subpixel_accuracy);
+      printf("   -[-I]nterleaved = 1 if the even and the odd pictures are interleaved in even_fn (= odd_fn) (%d)\n", interleaved);
       printf("\n");
       exit(1);
       break;
@@ -662,20 +670,10 @@ int main(int argc, char *argv[]) {
     motion_fd = fopen(motion_fn, "r");
     if(!motion_fd) {
       reuse_motion = 0;
-#if defined DEBUG
-      info("%s: computing motion information\n", argv[0]);
-#endif
-      motion_fd = fopen(motion_fn, "w");
-      if(!motion_fd) {
-	error("%s: unable to create the file \"%s\" ... aborting!\n",
-	      argv[0], motion_fn);
-	abort();
-      }
+      log_debug("%s: computing motion information\n", argv[0]);
     } else {
-#if defined DEBUG
-      info("%s: reusing motion information \"%s\"\n",
-	   argv[0], motion_fn);
-#endif
+      log_debug("%s: reusing motion information \"%s\"\n",
+	        argv[0], motion_fn);
     }
   }
 
@@ -684,10 +682,8 @@ int main(int argc, char *argv[]) {
   FILE *imotion_fd; {
     imotion_fd = fopen(imotion_fn, "r");
     if(!imotion_fd) {
-#if defined DEBUG
-      info("%s: \"%s\" does not exist: initial_motion_fn = \"%s\"\n",
-	   argv[0], imotion_fn, "/dev/zero");
-#endif
+      log_debug("%s: \"%s\" does not exist: initial_motion_fn = \"%s\"\n",
+	        argv[0], imotion_fn, "/dev/zero");
       imotion_fd = fopen("/dev/zero", "r");
       /* /dev/zero should always be. */
     }
@@ -744,14 +740,19 @@ int main(int argc, char *argv[]) {
 
   int blocks_in_y = pixels_in_y/block_size;
   int blocks_in_x = pixels_in_x/block_size;
-#if defined DEBUG
-  info("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
-  info("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
-#endif
+  log_debug("%s: blocks_in_y=%d\n", argv[0], blocks_in_y);
+  log_debug("%s: blocks_in_x=%d\n", argv[0], blocks_in_x);
 
   motion < MVC_TYPE > motion;
   MVC_CPU_TYPE ****mv = motion.alloc(blocks_in_y, blocks_in_x);
 
+  motion_file motion_fields;
+  if(!motion_fields.open_write(motion_fn, blocks_in_y, blocks_in_x, block_size)) {
+    error("%s: unable to create the file \"%s\" ... aborting!\n",
+	  argv[0], motion_fn);
+    abort();
+  }
+
   class dwt2d <
   TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER <
   TC_CPU_TYPE > > *texture_dwt
@@ -768,12 +769,21 @@ int main(int argc, char *argv[]) {
   MVC_CPU_TYPE > >;
   motion_dwt->set_max_line_size(PIXELS_IN_X_MAX);
 
-  /* Read the luma of reference[0]. */
-  texture.read(even_fd, reference[0], pixels_in_y, pixels_in_x);
+  /* Without split, the even and the odd pictures are read from the
+     same (interleaved) sequence. */
+  int stride = interleaved ? 2 : 1;
+  long picture_bytes = (pixels_in_y * pixels_in_x + 2 * (pixels_in_y/2) * (pixels_in_x/2)) * sizeof(TC_IO_TYPE);
+
+  /* Read the luma of reference[0]. */ {
+    profile_scope timer(read_timer);
+    seek_picture(even_fd, 0, stride, EVEN_OFFSET, picture_bytes);
+    texture.read(even_fd, reference[0], pixels_in_y, pixels_in_x);
+    profile_count(bytes_read_counter, pixels_in_y * pixels_in_x * sizeof(TC_IO_TYPE));
 
-  /* Skip to the chroma. */
-  fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
-  fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+    /* Skip to the chroma. */
+    fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+    fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+  }
 
   /* Fill the edge of the read image. */
   texture.fill_border(reference[0],
@@ -783,22 +793,22 @@ int main(int argc, char *argv[]) {
 
   for(int i=0; i<pictures/2; i++) {
 
-#if defined DEBUG
-    info("%s: reading picture %d of \"%s\".\n",
-	 argv[0], i, odd_fn);
-#endif
+    log_info("%s: reading picture %d of \"%s\".\n",
+	     argv[0], i, odd_fn);
 
-    /* Luma. */
-    texture.read(odd_fd, predicted, pixels_in_y, pixels_in_x);
+    /* Luma. */ {
+      profile_scope timer(read_timer);
+      seek_picture(odd_fd, i, stride, ODD_OFFSET, picture_bytes);
+      texture.read(odd_fd, predicted, pixels_in_y, pixels_in_x);
+      profile_count(bytes_read_counter, pixels_in_y * pixels_in_x * sizeof(TC_IO_TYPE));
 
-    /* Chroma. */
-    fseek(odd_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
-    fseek(odd_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+      /* Chroma. */
+      fseek(odd_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+      fseek(odd_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+    }
 
-#if defined DEBUG
-    info("%s: reading picture %d of \"%s\".\n",
-	 argv[0], i, even_fn);
-#endif
+    log_info("%s: reading picture %d of \"%s\".\n",
+	     argv[0], i, even_fn);
     /* This initialization seems to do nothing. */
     for(int y=0; y<pixels_in_y << subpixel_accuracy; y++) {
       for(int x=0; x<pixels_in_x <<subpixel_accuracy; x++) {
@@ -806,12 +816,16 @@ int main(int argc, char *argv[]) {
       }
     }
 
-    /* Luma. */
-    texture.read(even_fd, reference[1], pixels_in_y, pixels_in_x);
+    /* Luma. */ {
+      profile_scope timer(read_timer);
+      seek_picture(even_fd, i+1, stride, EVEN_OFFSET, picture_bytes);
+      texture.read(even_fd, reference[1], pixels_in_y, pixels_in_x);
+      profile_count(bytes_read_counter, pixels_in_y * pixels_in_x * sizeof(TC_IO_TYPE));
 
-    /* Cromas. */
-    fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
-    fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+      /* Cromas. */
+      fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+      fseek(even_fd, (pixels_in_y/2) * (pixels_in_x/2) * sizeof(unsigned char), SEEK_CUR);
+    }
 
     /* Fill the edge of the read image. */
     texture.fill_border(reference[1],
@@ -819,9 +833,7 @@ int main(int argc, char *argv[]) {
 			pixels_in_x,
 			picture_border_size);
 
-#if defined DEBUG
-    info("%s: reading initial motion vectors.\n", argv[0]);
-#endif
+    log_debug("%s: reading initial motion vectors.\n", argv[0]);
     //motion.read(imotion_fd, mv, blocks_in_y, blocks_in_x);
     //This does nothing (leave the above).
     for(int by=0; by<blocks_in_y; by++) {
@@ -854,33 +866,33 @@ int main(int argc, char *argv[]) {
     }
 #endif
 
-#if defined DEBUG
-    info("Backward motion vector field:");
-    for(int y=0; y<blocks_in_y; y++) {
-      info("\n");
-      for(int x=0; x<blocks_in_x; x++) {
-	static char aux[80];
-	sprintf(aux,"%3d,%3d",
-	     mv[PREV][Y_FIELD][y][x],
-	     mv[PREV][X_FIELD][y][x]);
-	info("%8s",aux);
+    if(log_level() >= LOG_DEBUG) {
+      log_message("Backward motion vector field:");
+      for(int y=0; y<blocks_in_y; y++) {
+        log_message("\n");
+        for(int x=0; x<blocks_in_x; x++) {
+	  static char aux[80];
+	  sprintf(aux,"%3d,%3d",
+	       mv[PREV][Y_FIELD][y][x],
+	       mv[PREV][X_FIELD][y][x]);
+	  log_message("%8s",aux);
+        }
       }
-    }
-    info("\n");
-
-    info("Forward motion vector field:");
-    for(int y=0; y<blocks_in_y; y++) {
-      info("\n");
-      for(int x=0; x<blocks_in_x; x++) {
-	static char aux[80];
-	sprintf(aux,"%3d,%3d",
-	     mv[NEXT][Y_FIELD][y][x],
-	     mv[NEXT][X_FIELD][y][x]);
-	info("%8s",aux);
+      log_message("\n");
+
+      log_message("Forward motion vector field:");
+      for(int y=0; y<blocks_in_y; y++) {
+        log_message("\n");
+        for(int x=0; x<blocks_in_x; x++) {
+	  static char aux[80];
+	  sprintf(aux,"%3d,%3d",
+	       mv[NEXT][Y_FIELD][y][x],
+	       mv[NEXT][X_FIELD][y][x]);
+	  log_message("%8s",aux);
+        }
       }
+      log_message("\n");
     }
-    info("\n");
-#endif
 
 #if defined GNUPLOT
     for(int y=0; y<blocks_in_y; y++) {
@@ -893,11 +905,13 @@ int main(int argc, char *argv[]) {
     }
 #endif
 
-#if defined DEBUG
-    info("%s: writing motion vector field %d in \"%s\".\n",
-	 argv[0], i, motion_fn);
-#endif
-    motion.write(motion_fd, mv, blocks_in_y, blocks_in_x);
+    log_info("%s: writing motion vector field %d in \"%s\".\n",
+	     argv[0], i, motion_fn);
+    /* Motion field. */ {
+      profile_scope timer(write_timer);
+      motion_fields.write(mv);
+      profile_count(bytes_written_counter, 4 * blocks_in_y * blocks_in_x * sizeof(MVC_TYPE));
+    }
 
     /* SWAP(&reference_pic[0], &reference_pic[1]). */ {
       TC_CPU_TYPE **tmp = reference[0];
@@ -906,6 +920,8 @@ int main(int argc, char *argv[]) {
     }
   }
 
+  motion_fields.close();
+
   delete motion_dwt;
   delete texture_dwt;
 
@@ -132,7 +132,9 @@ while iteration <= (TRLs - 1) :
                    + " --file=" + "\""   + "motion_residue_" + str(iteration) + "\""
                    + " --blocks_in_y="   + str(_blocks_in_y[(TRLs-1)-iteration])
                    + " --blocks_in_x="   + str(_blocks_in_x[(TRLs-1)-iteration])
+                   + " --block_size="    + str(_block_size[(TRLs-1)-iteration])
                    + " --fields="        + str(fields)
+                   + " --GOPs="          + str(GOPs)
                    + " --pictures="      + str(pictures)
                    ,shell=True)
     except CalledProcessError :
@@ -144,36 +146,18 @@ while iteration <= (TRLs - 1) :
 
 
     
-# Decorrelation bidirectional level lower temporal resolution.
-#-------------------------------------------------------------
+# Bidirectional correlation of the lower temporal resolution level
+# and correlation between levels of resolution. All the levels of a
+# GOP are correlated in one pass.
+#-----------------------------------------------------------------
 try:
-    check_call("mctf bidirectional_motion_correlate"
-               + " --blocks_in_y=" + str(_blocks_in_y[len(_blocks_in_y)-1])
-               + " --blocks_in_x=" + str(_blocks_in_x[len(_blocks_in_x)-1])
-               + " --fields="      + str(GOPs)
-               + " --input="       + "\"" + "motion_residue_" + str(TRLs - 1) + "\""
-               + " --output="      + "\"" + "motion_"         + str(TRLs - 1) + "\""
+    check_call("mctf motion_correlate"
+               + " --blocks_in_x=" + ','.join(map(str, _blocks_in_x))
+               + " --blocks_in_y=" + ','.join(map(str, _blocks_in_y))
+               + " --GOPs="        + str(GOPs)
+               + " --levels="      + str(TRLs - 1)
+               + " --input="       + "\"" + "motion_residue_" + "\""
+               + " --output="      + "\"" + "motion_"         + "\""
                , shell=True)
 except CalledProcessError :
     sys.exit(-1)
-
-
-# Decorrelation between levels of resolution.
-#--------------------------------------------
-iteration = TRLs - 1 # total iterations
-while iteration > 1 :
-    
-    iteration -= 1
-    fields = pictures / (2**iteration)
-
-    try:
-        check_call("mctf interlevel_motion_correlate"
-                   + " --blocks_in_y="         + str(_blocks_in_y[iteration-1])
-                   + " --blocks_in_x="         + str(_blocks_in_x[iteration-1])
-                   + " --fields_in_predicted=" + str(fields)
-                   + " --reference="           + "\"" + "motion_"         + str(iteration + 1) + "\""
-                   + " --predicted="           + "\"" + "motion_"         + str(iteration)     + "\""
-                   + " --residue="             + "\"" + "motion_residue_" + str(iteration)     + "\""
-                   , shell=True)
-    except CalledProcessError :
-        sys.exit(-1)
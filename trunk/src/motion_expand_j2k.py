@@ -25,6 +25,9 @@
 
 import os
 import sys
+import array
+import container
+import motion_format
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
@@ -40,6 +43,8 @@ BITS_COMPONENT  = BYTES_COMPONENT * 8
 blocks_in_x = 0
 ## Number of blocks in the Y direction.
 blocks_in_y = 0
+## Size of the blocks (0 if it is unknown).
+block_size  = 0
 ## Number of pictures of a temporal resolution.
 fields      = 0
 ## Name of the file with the motion fields.
@@ -53,6 +58,7 @@ parser = MCTF_parser(description="Expands the motion data using JPEG 2000.")
 #parser.add_argument("--discard_levels", help="number of discard level. (Default = {})".format(discard_levels))
 parser.add_argument("--blocks_in_x",     help="number of blocks in the X direction. (Default = {})".format(blocks_in_x))
 parser.add_argument("--blocks_in_y",     help="number of blocks in the Y direction. (Default = {})".format(blocks_in_y))
+parser.block_size(block_size)
 parser.add_argument("--fields",          help="number of fields in to compress. (Default = {})".format(fields))
 parser.add_argument("--file",            help="name of the file with the motion fields. (Default = {})".format(file))
 
@@ -65,6 +71,8 @@ if args.blocks_in_x:
     blocks_in_x = int(args.blocks_in_x)
 if args.blocks_in_y:
     blocks_in_y = int(args.blocks_in_y)
+if args.block_size:
+    block_size = int(args.block_size)
 if args.fields:
     fields = int(args.fields)
 if args.file:
@@ -74,10 +82,24 @@ if args.file:
 
 
 
+## Number of vectors (of each component) of a field.
+vectors_per_field = blocks_in_x * blocks_in_y
+
+## Motion fields of the subband (the components of the vectors are
+#  interleaved). If there is no vector file, the field is zero
+#  (linear movement).
+vectors = array.array('h', [0]) * (fields * COMPONENTS * vectors_per_field)
+
+## Codestreams of the subband (None if there is no container).
+codestreams = container.open_subband(file)
+
 # Expand each field.
 #-------------------
 for comp_number in range (0, COMPONENTS) :
 
+    ## The component of all the fields.
+    component = array.array('h', [0]) * (fields * vectors_per_field)
+
     # Decode components.
     #-------------------
     for campoMov_number in range (0, fields) :
@@ -85,65 +107,34 @@ for comp_number in range (0, COMPONENTS) :
         ## Refers to a particular component from a field of movement.
         campoMov_name = file + "_comp" + str(comp_number) + "_" + str('%04d' % campoMov_number)
 
-        try:
-            ## File compressed motion vectors. If there is no vector
-            #  file, a file is created with linear movement. That is,
-            #  a file of zeros.
-            f = open(campoMov_name + ".j2c", "rb")
-            f.close()
-
-            try:
-                check_call("trace kdu_expand"
-                           + " -i " + str(campoMov_name) + ".j2c"
-                           + " -o " + str(campoMov_name) + ".rawl"
-                           , shell=True)
-            except CalledProcessError:
-                sys.exit(-1)
-
-        except: 
-            # If there is no vector file, a file is created with
-            # linear movement. That is, a file of zeros.
-            # check_call("echo Motion interpolation..", shell=True)
-            # raw_input("")
-            
-            f = open(campoMov_name + ".rawl", "wb")
-            for a in xrange(BYTES_COMPONENT * blocks_in_y * blocks_in_x) :
-                f.write('%c' % 0)
-            f.close()
-
-# Multiplexing.
-#--------------
-for campoMov_number in range (0, fields) :
-
-    try:
-        ## Component 1.
-        f0 = open(file + "_comp0_" + str('%04d' % campoMov_number) + ".rawl", "rb")
-        ## Component 2.
-        f1 = open(file + "_comp1_" + str('%04d' % campoMov_number) + ".rawl", "rb")
-        ## Component 3.
-        f2 = open(file + "_comp2_" + str('%04d' % campoMov_number) + ".rawl", "rb")
-        ## Component 4.
-        f3 = open(file + "_comp3_" + str('%04d' % campoMov_number) + ".rawl", "rb")
-        # Component 1, Component 2, Component 3 y Component 4.
-        f  = open(file + "_"       + str('%04d' % campoMov_number) + ".join", "wb")
-
-        while 1 : # 792 -> 198 -> 49.5
-            ## Multiplexing all components.
-            comps = f0.read(BYTES_COMPONENT) + f1.read(BYTES_COMPONENT) + f2.read(BYTES_COMPONENT) + f3.read(BYTES_COMPONENT)
-            if len(comps) == (BYTES_COMPONENT * COMPONENTS) :
-                f.write(comps)
-            else :
-                break
-
-        f0.close()
-        f1.close()
-        f2.close()
-        f3.close()
-        f.close()
-
-    except CalledProcessError :
-        sys.exit(-1)
-
-# cat file_????.join > file
-check_call("trace cat " + file + "_????.join > " + file, shell=True)
+        if codestreams != None :
+            if not codestreams.extract(campoMov_number, "comp" + str(comp_number), campoMov_name + ".j2c") :
+                # If there is no codestream, the field is zero.
+                continue
+        elif not os.path.exists(campoMov_name + ".j2c") :
+            # If there is no vector file, the field is zero.
+            continue
 
+        try:
+            check_call("trace kdu_expand"
+                       + " -i " + str(campoMov_name) + ".j2c"
+                       + " -o " + str(campoMov_name) + ".rawl"
+                       , shell=True)
+        except CalledProcessError:
+            sys.exit(-1)
+
+        if codestreams != None :
+            os.remove(campoMov_name + ".j2c")
+
+        ## The component of the field.
+        field = array.array('h')
+        with open(campoMov_name + ".rawl", "rb") as f:
+            field.fromfile(f, vectors_per_field)
+        component[campoMov_number * vectors_per_field :
+                  (campoMov_number + 1) * vectors_per_field] = field
+
+    # Multiplexing (an extended slice is assigned in one operation).
+    #---------------------------------------------------------------
+    vectors[comp_number::COMPONENTS] = component
+
+motion_format.write(file, motion_format.header(blocks_in_y, blocks_in_x, block_size), vectors)
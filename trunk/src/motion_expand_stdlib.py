@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file motion_expand_stdlib.py
+#  Expands the motion vectors compressed by motion_compress_stdlib.
+#
+#  The backend is read from the compressed file. If there is no
+#  compressed file, the fields are zero (linear movement).
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package motion_expand_stdlib
+#  Expands the motion vectors compressed by motion_compress_stdlib.
+
+import os
+import array
+import motion_backend
+import motion_format
+from MCTF_parser import MCTF_parser
+
+## Number of components of a motion field.
+COMPONENTS          = 4
+## Number of bytes for each component.
+BYTES_PER_COMPONENT = 2
+## Number of blocks in the X direction.
+blocks_in_x = 0
+## Number of blocks in the Y direction.
+blocks_in_y = 0
+## Size of the blocks (0 if it is unknown).
+block_size  = 0
+## Number of fields of the subband.
+fields      = 0
+## Name of the file with the motion fields.
+file        = ""
+
+## The parser module provides an interface to Python's internal parser
+#  and byte-code compiler.
+parser = MCTF_parser(description="Expands the motion data compressed with zlib, bz2 or lzma.")
+parser.add_argument("--blocks_in_x", help="number of blocks in the X direction. (Default = {})".format(blocks_in_x))
+parser.add_argument("--blocks_in_y", help="number of blocks in the Y direction. (Default = {})".format(blocks_in_y))
+parser.block_size(block_size)
+parser.add_argument("--fields",      help="number of fields to decompress. (Default = {})".format(fields))
+parser.add_argument("--file",        help="name of the file with the motion fields. (Default = {})".format(file))
+
+## A script may only parse a few of the command-line arguments,
+#  passing the remaining arguments on to another script or program.
+args = parser.parse_known_args()[0]
+if args.blocks_in_x:
+    blocks_in_x = int(args.blocks_in_x)
+if args.blocks_in_y:
+    blocks_in_y = int(args.blocks_in_y)
+if args.block_size:
+    block_size = int(args.block_size)
+if args.fields:
+    fields = int(args.fields)
+if args.file:
+    file = args.file
+
+## Number of bytes of the subband.
+subband_bytes = fields * blocks_in_x * blocks_in_y * COMPONENTS * BYTES_PER_COMPONENT
+
+## Name of the compressed file.
+codestream = file + "." + motion_backend.EXTENSION
+if os.path.exists(codestream):
+    data = "".join(motion_backend.read(codestream))
+else:
+    # If there is no compressed file, the fields are zero.
+    data = ""
+
+## The motion fields of the subband.
+vectors = array.array('h')
+vectors.fromstring(data[:subband_bytes] + "\0" * (subband_bytes - len(data)))
+motion_format.write(file, motion_format.header(blocks_in_y, blocks_in_x, block_size), vectors)
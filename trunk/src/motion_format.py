@@ -0,0 +1,164 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file motion_format.py
+#  Reads and writes the files of motion fields (see motion_file in
+#  motion.cpp).
+#
+#  The file starts with a header:\n
+#  - "MCTM".
+#  - Blocks in Y, blocks in X and block size (4 bytes each).
+#  - Number of fields (4 bytes).
+#  - Position of the offset table (8 bytes).
+#
+#  followed by the fields and the offset table (the position of each
+#  field, 8 bytes). A component is stored as a signed byte or, if it
+#  does not fit, as the byte 0x80 followed by the 16 bits value. All
+#  the integers are little endian.
+#
+#  In memory, the fields are an array of shorts with the components
+#  in the order of motion::write() (the order of the files used by
+#  the codecs).
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package motion_format
+#  Reads and writes the files of motion fields.
+
+import re
+import sys
+import array
+import struct
+
+## Identifier of the motion files.
+MAGIC = "MCTM"
+## Format of the header.
+HEADER = "<4sIIIIQ"
+## Bytes of the header.
+HEADER_BYTES = struct.calcsize(HEADER)
+## Byte which precedes the components that do not fit in a signed byte.
+ESCAPE = 0x80
+## Number of components of a field.
+COMPONENTS = 4
+## A run of components which fit in a signed byte (as little endian
+#  shorts) followed, optionally, by a component which does not fit.
+RUN = re.compile(r"((?:[\x00-\x7f]\x00|[\x81-\xff]\xff)*)(..)?", re.S)
+
+## Header of a file of motion fields.
+class header:
+
+    ## Builds a header.
+    # @param self Refers to object.
+    # @param blocks_in_y Dimension 'Y' of blocks of a field.
+    # @param blocks_in_x Dimension 'X' of blocks of a field.
+    # @param block_size Size of the blocks (0 if unknown).
+    # @param fields Number of fields.
+    def __init__(self, blocks_in_y, blocks_in_x, block_size=0, fields=0):
+        ## Dimension 'Y' of blocks of a field.
+        self.blocks_in_y = blocks_in_y
+        ## Dimension 'X' of blocks of a field.
+        self.blocks_in_x = blocks_in_x
+        ## Size of the blocks.
+        self.block_size = block_size
+        ## Number of fields.
+        self.fields = fields
+
+    ## Number of components (shorts) of a field.
+    # @param self Refers to object.
+    # @return The number of components.
+    def field_components(self):
+        return COMPONENTS * self.blocks_in_y * self.blocks_in_x
+
+## Decodes a field.
+#  @param data The coded field (a string).
+#  @param n Number of components of the field.
+#  @return The field (an array of shorts).
+def decode_field(data, n):
+    if len(data) == n:
+        # No escaped components.
+        return array.array('h', array.array('b', data))
+    field = array.array('h')
+    i = 0
+    while i < len(data):
+        j = data.find(chr(ESCAPE), i)
+        if j < 0:
+            j = len(data)
+        field += array.array('h', array.array('b', data[i:j]))
+        if j < len(data):
+            field.append(struct.unpack("<h", data[j + 1:j + 3])[0])
+        i = j + 3
+    if len(field) != n:
+        raise ValueError("corrupted motion field")
+    return field
+
+## Codes a field.
+#  @param field The field (an array of shorts).
+#  @return The coded field (a string).
+def encode_field(field):
+    if not len(field):
+        return ""
+    if min(field) > -128 and max(field) < 128:
+        return array.array('b', field).tostring()
+    shorts = array.array('h', field)
+    if sys.byteorder == "big":
+        shorts.byteswap()
+    data = shorts.tostring()
+    chunks = []
+    i = 0
+    while i < len(data):
+        run = RUN.match(data, i)
+        # The low byte of a short which fits is its signed byte.
+        chunks.append(run.group(1)[0::2])
+        if run.group(2):
+            chunks.append(chr(ESCAPE) + run.group(2))
+        i = run.end()
+    return "".join(chunks)
+
+## Reads a file of motion fields.
+#  @param file_name Name of the file.
+#  @param fields Number of fields to read (None = all). If the file
+#  has less fields, the rest of fields are zero.
+#  @return The header and the fields (an array of shorts).
+def read(file_name, fields=None):
+    with open(file_name, "rb") as f:
+        magic, blocks_in_y, blocks_in_x, block_size, stored_fields, table = \
+            struct.unpack(HEADER, f.read(HEADER_BYTES))
+        if magic != MAGIC:
+            raise ValueError("\"%s\" is not a motion file" % file_name)
+        h = header(blocks_in_y, blocks_in_x, block_size, stored_fields)
+        f.seek(table)
+        offsets = list(struct.unpack("<%dQ" % stored_fields, f.read(8 * stored_fields))) + [table]
+        if fields is None:
+            fields = stored_fields
+        n = h.field_components()
+        vectors = array.array('h')
+        f.seek(HEADER_BYTES)
+        for i in range(min(fields, stored_fields)):
+            vectors.extend(decode_field(f.read(offsets[i + 1] - offsets[i]), n))
+    if fields > stored_fields:
+        vectors.extend(array.array('h', [0]) * ((fields - stored_fields) * n))
+    h.fields = fields
+    return h, vectors
+
+## Writes a file of motion fields.
+#  @param file_name Name of the file.
+#  @param h The header (the number of fields is computed).
+#  @param vectors The fields (a sequence of shorts).
+def write(file_name, h, vectors):
+    n = h.field_components()
+    fields = len(vectors) / n
+    with open(file_name, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, 0, 0, 0, 0, 0))
+        offsets = []
+        for i in range(fields):
+            offsets.append(f.tell())
+            f.write(encode_field(vectors[i * n:(i + 1) * n]))
+        table = f.tell()
+        f.write(struct.pack("<%dQ" % fields, *offsets))
+        f.seek(0)
+        f.write(struct.pack(HEADER, MAGIC, h.blocks_in_y, h.blocks_in_x,
+                            h.block_size, fields, table))
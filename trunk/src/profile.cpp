@@ -0,0 +1,172 @@
+/**
+ * \file profile.cpp
+ * \author Vicente Gonzalez-Ruiz.
+ * \date Last modification: 2015, January 7.
+ * \brief Timers and counters which measure where the time of a
+ * kernel goes.
+ *
+ * Profiling is enabled by the environment variable MCTF_PROFILE,
+ * which is the directory where each execution writes a JSON file
+ * called "<program>.<pid>.json". When MCTF_PROFILE is not defined the
+ * timers and counters only test a cached integer.
+ *
+ * The MCTF project has been supported by the Junta de Andalucía through
+ * the Proyecto Motriz "Codificación de Vídeo Escalable y su Streaming
+ * sobre Internet" (P10-TIC-6548).
+ */
+
+#include <time.h>
+#include <unistd.h>
+
+/** \brief Maximum number of timers and counters. */
+#define PROFILE_MAX 32
+
+/** \brief A timer or a counter. */
+struct profile_slot {
+  /** \brief Name (a C identifier). */
+  const char *name;
+  /** \brief 1 for timers, 0 for counters. */
+  int timer;
+  /** \brief Nanoseconds (timers) or events (counters). */
+  long long value;
+  /** \brief Number of measured intervals (timers). */
+  long long calls;
+};
+
+/** \brief The timers and counters of the program. */
+static struct profile_slot profile_slots[PROFILE_MAX];
+/** \brief Number of used slots. */
+static int profile_slots_used = 0;
+/** \brief 1 if profiling is enabled (-1 = not read yet). */
+static int profile_enabled = -1;
+/** \brief Name of the program (without the path). */
+static const char *profile_program = "unknown";
+
+/**
+ * \brief Reads the environment variable MCTF_PROFILE.
+ * \returns 1 if profiling is enabled, 0 otherwise.
+ */
+int read_profile() {
+  const char *dir = getenv("MCTF_PROFILE");
+  profile_enabled = (dir && *dir) ? 1 : 0;
+  return profile_enabled;
+}
+
+/** \brief Profiling state. The environment is only read the first time. */
+#define profiling() (profile_enabled >= 0 ? profile_enabled : read_profile())
+
+/**
+ * \brief Creates a slot.
+ * \param name Name of the timer or counter.
+ * \param timer 1 for a timer, 0 for a counter.
+ * \returns The index of the slot.
+ */
+int profile_slot(const char *name, int timer) {
+  if(profile_slots_used >= PROFILE_MAX) {
+    error("profile_slot: too many timers and counters ... aborting!\n");
+    abort();
+  }
+  profile_slots[profile_slots_used].name = name;
+  profile_slots[profile_slots_used].timer = timer;
+  profile_slots[profile_slots_used].value = 0;
+  profile_slots[profile_slots_used].calls = 0;
+  return profile_slots_used++;
+}
+
+/** \brief Creates a timer. \returns The index of the timer. */
+int profile_timer(const char *name) {
+  return profile_slot(name, 1);
+}
+
+/** \brief Creates a counter. \returns The index of the counter. */
+int profile_counter(const char *name) {
+  return profile_slot(name, 0);
+}
+
+/** \brief Monotonic clock. \returns The time in nanoseconds. */
+long long profile_clock() {
+  struct timespec t;
+  clock_gettime(CLOCK_MONOTONIC, &t);
+  return (long long)t.tv_sec * 1000000000LL + t.tv_nsec;
+}
+
+/** \brief Adds "n" events to a counter. The arguments are not
+    evaluated if profiling is disabled. It can be used by concurrent
+    threads. */
+#define profile_count(slot, n) do { if(profiling()) __sync_fetch_and_add(&profile_slots[slot].value, (long long)(n)); } while(0)
+
+/**
+ * \brief Measures the time spent in a scope (from its construction
+ * until its destruction) and adds it to a timer. It can be used by
+ * concurrent threads.
+ */
+class profile_scope {
+  /** \brief Index of the timer. */
+  int slot;
+  /** \brief Time of the construction. */
+  long long start;
+public:
+  /** \brief Starts the measurement. \param slot Index of the timer. */
+  profile_scope(int slot) {
+    this->slot = slot;
+    if(profiling()) start = profile_clock();
+  }
+  /** \brief Finishes the measurement. */
+  ~profile_scope() {
+    if(profiling()) {
+      __sync_fetch_and_add(&profile_slots[slot].value, profile_clock() - start);
+      __sync_fetch_and_add(&profile_slots[slot].calls, 1LL);
+    }
+  }
+};
+
+/**
+ * \brief Writes the timers and counters in the file
+ * "$MCTF_PROFILE/<program>.<pid>.json".
+ */
+void profile_write() {
+  char fn[1024];
+  snprintf(fn, sizeof(fn), "%s/%s.%d.json",
+	   getenv("MCTF_PROFILE"), profile_program, (int)getpid());
+  FILE *fd = fopen(fn, "w");
+  if(!fd) {
+    error("%s: unable to create the file \"%s\" ... aborting!\n",
+	  profile_program, fn);
+    return;
+  }
+  fprintf(fd, "{\"program\": \"%s\", \"pid\": %d,\n", profile_program, (int)getpid());
+  fprintf(fd, " \"timers\": {");
+  const char *sep = "";
+  for(int i=0; i<profile_slots_used; i++) {
+    if(profile_slots[i].timer) {
+      fprintf(fd, "%s\n  \"%s\": {\"seconds\": %.9f, \"calls\": %lld}",
+	      sep, profile_slots[i].name,
+	      profile_slots[i].value / 1e9, profile_slots[i].calls);
+      sep = ",";
+    }
+  }
+  fprintf(fd, "},\n \"counters\": {");
+  sep = "";
+  for(int i=0; i<profile_slots_used; i++) {
+    if(!profile_slots[i].timer) {
+      fprintf(fd, "%s\n  \"%s\": %lld", sep, profile_slots[i].name, profile_slots[i].value);
+      sep = ",";
+    }
+  }
+  fprintf(fd, "}}\n");
+  fclose(fd);
+}
+
+/**
+ * \brief Initializes the profiling of a program. If profiling is
+ * enabled, the timers and counters are written at the end of the
+ * execution.
+ * \param program Name of the program (argv[0]).
+ */
+void profile_init(const char *program) {
+  const char *slash = strrchr(program, '/');
+  profile_program = slash ? slash + 1 : program;
+  if(profiling()) {
+    atexit(profile_write);
+  }
+}
@@ -34,9 +34,7 @@ def usage():
     sys.stderr.write("   -[-]pixels_in_[y]=size of the Y dimension of the pictures (%d)\n" %  pixels_in_x)
     sys.stderr.write("\n")
 
-ifdef({{DEBUG}},
-display.info(str(sys.argv[0:]) + '\n')
-)
+display.log_debug(str(sys.argv[0:]) + '\n')
 
 try:
     opts, extraparams = getopt.getopt(sys.argv[1:],"o:x:y::h",
@@ -53,19 +51,13 @@ for o, a in opts:
     if o in ("-o", "--original"):
         ## Original signal.
         original = a
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": original=" + original + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": original=" + original + '\n')
     if o in ("-x", "--pixels_in_x"):
         pixels_in_x = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
     if o in ("-y", "--pixels_in_y"):
         pixels_in_y = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
 
     if o in ("-h", "--help"):
 	usage()
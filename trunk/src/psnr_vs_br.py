@@ -82,9 +82,7 @@ def usage():
 ## Define the variable for options.
 opts = ""
 
-ifdef({{DEBUG}},
-display.info(str(sys.argv[0:]) + '\n')
-)
+display.log_debug(str(sys.argv[0:]) + '\n')
 
 try:
     opts, extraparams = getopt.getopt(sys.argv[1:],"v:b:z:d:p:x:y:l:p:a:t:h",
@@ -109,65 +107,41 @@ except getopt.GetoptError, exc:
 for o, a in opts:
     if o in ("-v", "--block_overlaping"):
         block_overlaping = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": block_overlaping=" + str(block_overlaping) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": block_overlaping=" + str(block_overlaping) + '\n')
     if o in ("-b", "--block_size"):
         block_size = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": block_size=" + str(block_size) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": block_size=" + str(block_size) + '\n')
     if o in ("-z", "--block_size_min"):
         block_size_min = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": block_size_min=" + str(block_size_min) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": block_size_min=" + str(block_size_min) + '\n')
     if o in ("-d", "--border_size"):
         border_size = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": border_size=" + str(border_size) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": border_size=" + str(border_size) + '\n')
     if o in ("-o", "--original"):
         original = a
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": original=" + original + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": original=" + original + '\n')
     if o in ("-p", "--pictures"):
         pictures = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
     if o in ("-x", "--pixels_in_x"):
         pixels_in_x = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
     if o in ("-y", "--pixels_in_y"):
         pixels_in_y = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
     if o in ("-s", "--search_range"):
         search_range = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": search_range=" + str(search_range) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": search_range=" + str(search_range) + '\n')
     if o in ("-l", "--slopes"):
         slopes = a
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": slopes=" + slopes + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": slopes=" + slopes + '\n')
 #        slopes += ",65535"
     if o in ("-a", "--subpixel_accuracy"):
         subpixel_accuracy = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": subpixel_accuracy=" + str(subpixel_accuracy) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": subpixel_accuracy=" + str(subpixel_accuracy) + '\n')
     if o in ("-t", "--temporal_levels"):
         temporal_levels = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
     if o in ("-h", "--help"):
 	usage()
 	sys.exit()
@@ -0,0 +1,385 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file rate_accounting.py
+#  Bytes and Kbps of a compressed sequence, per picture, subband,
+#  component and GOP, neglecting headers (see info.py).
+#
+#  The sizes of the codestreams are read with a reader of the codec
+#  (see READERS) and stored in NumPy arrays. The subbands are in the
+#  order [L_{TRLs-1}, H_{TRLs-1}, ..., H_1] (the fields of motion of
+#  each subband H are in the same position). The reports are written
+#  in JSON or CSV.
+#  @authors Jose Carmelo Maturana-Espinosa\n Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package rate_accounting
+#  Bytes and Kbps of a compressed sequence.
+
+import json
+import container
+import codestream
+
+try:
+    import numpy
+except ImportError:
+    ## NumPy is not available.
+    numpy = None
+
+## Refers to high frequency subbands.
+HIGH   = "high_"
+## Refers to low frequency subbands.
+LOW    = "low_"
+## Refers to the fields of motion.
+MOTION = "motion_residue_"
+## Refers to the types of the frames.
+TYPES  = "frame_types_"
+## Component of the pictures coded in one codestream with the three
+#  components (see texture_compress_fb_j2k.py).
+MULTICOMPONENT = "YUV"
+
+## Ends of the codestreams listed in a file of sizes (one cumulative
+#  size per line, see texture_compress_fb_j2k.py) or in the index of
+#  the container of the subband.
+class sizes:
+
+    ## @param self Refers to object.
+    # @param extension Extension of the file of sizes.
+    def __init__(self, extension):
+        ## Extension of the file of sizes.
+        self.extension = extension
+
+    ## Ends of the codestreams of a subband.
+    # @param self Refers to object.
+    # @param prefix Name of the subband (for example, "high_1").
+    # @return The cumulative sizes (a list).
+    def ends(self, prefix):
+        codestreams = container.open_subband(prefix)
+        if codestreams != None:
+            return codestreams.sizes()
+        try:
+            with open(prefix + "." + self.extension) as f:
+                return [int(size) for size in f.read().split()]
+        except IOError:
+            return []
+
+## Ends of the codestreams of a file with the codestreams one after
+#  the other, found with a marker (by default, EOC).
+class markers:
+
+    ## @param self Refers to object.
+    # @param extension Extension of the file.
+    # @param marker Second byte of the marker (after 0xFF).
+    def __init__(self, extension, marker=0xD9):
+        ## Extension of the file.
+        self.extension = extension
+        ## Second byte of the marker.
+        self.marker = marker
+
+    ## Ends of the codestreams of a subband (the position after each
+    #  marker).
+    # @param self Refers to object.
+    # @param prefix Name of the subband (for example, "high_1").
+    # @return The positions (a list).
+    def ends(self, prefix):
+        try:
+            data = numpy.fromfile(prefix + "." + self.extension, dtype=numpy.uint8)
+        except IOError:
+            return []
+        found = (data[:-1] == 0xFF) & (data[1:] == self.marker)
+        return (numpy.flatnonzero(found) + 2).tolist() + [data.size]
+
+## A codec without codestreams (all the sizes are 0).
+class nothing:
+
+    ## @param self Refers to object.
+    # @param prefix Name of the subband.
+    # @return An empty list.
+    def ends(self, prefix):
+        return []
+
+## Reader of the sizes of the textures and the motion of a codec.
+class reader:
+
+    ## @param self Refers to object.
+    # @param texture Source of the sizes of the textures.
+    # @param motion Source of the sizes of the fields of motion.
+    def __init__(self, texture, motion):
+        ## Source of the sizes of the textures.
+        self.texture = texture
+        ## Source of the sizes of the fields of motion.
+        self.motion = motion
+
+    ## Bytes of each component of each picture of a subband, if the
+    #  codestreams are stored in a container. The codestreams of
+    #  MULTICOMPONENT are split in Y, U and V with the sizes of their
+    #  packets.
+    # @param self Refers to object.
+    # @param prefix Name of the subband.
+    # @param count Number of pictures.
+    # @return A dictionary component -> bytes of each picture (None if
+    #  there is no container).
+    def components(self, prefix, count):
+        codestreams = container.open_subband(prefix)
+        if codestreams == None:
+            return None
+        components = {}
+        for e in codestreams.entries.values():
+            if e.picture < count:
+                if e.component == MULTICOMPONENT:
+                    names = list(MULTICOMPONENT)
+                    if e.length > e.header:
+                        data = codestreams.read(e.picture, e.component)
+                        sizes = codestream.codestream(data).component_sizes(headers=False)
+                    else:
+                        # A skipped picture.
+                        sizes = [0] * len(names)
+                else:
+                    names = [e.component]
+                    sizes = [e.length - e.header]
+                for name, size in zip(names, sizes):
+                    if name not in components:
+                        components[name] = numpy.zeros(count, dtype=numpy.int64)
+                    components[name][e.picture] += size
+        return components
+
+## Readers of the codecs.
+READERS = {"j2k":   reader(sizes("j2c"), sizes("mjc")),
+           "mj2k":  reader(markers("mjc"), markers("mjc")),
+           "mjpeg": reader(markers("mjpeg", 0xD8), markers("mjpeg")),
+           "ltw":   reader(sizes("ltw"), markers("ltw")),
+           "cp":    reader(nothing(), nothing())}
+
+## Bytes of each picture from the ends of the codestreams. If there
+#  are less ends than pictures, the last pictures have 0 bytes.
+#  @param ends The ends of the codestreams.
+#  @param count Number of pictures.
+#  @return The bytes of each picture (a NumPy array).
+def picture_bytes(ends, count):
+    ends = numpy.array(list(ends[:count]), dtype=numpy.int64)
+    last = ends[-1] if ends.size else 0
+    ends = numpy.concatenate((ends, numpy.full(count - ends.size, last, dtype=numpy.int64)))
+    return numpy.diff(numpy.concatenate(([0], ends)))
+
+## Types of the frames of a subband ("I" or "B").
+#  @param prefix Name of the file.
+#  @param count Number of frames.
+#  @return The types (a NumPy array of characters).
+def frame_types(prefix, count):
+    try:
+        with open(prefix) as f:
+            types = f.read(count)
+    except IOError:
+        types = ""
+    return numpy.array(list(types.ljust(count, "B")))
+
+## Rates of a compressed sequence.
+class accounting:
+
+    ## Reads the sizes of the codestreams.
+    # @param self Refers to object.
+    # @param GOPs Total number of GOPs (Group of Pictures) in the sequence.
+    # @param TRLs Total number of Temporal Resolution Levels.
+    # @param FPS Frames per Second.
+    # @param codec Name of the codec (see READERS) or a reader.
+    def __init__(self, GOPs, TRLs, FPS, codec="j2k"):
+        if numpy is None:
+            raise ImportError("rate_accounting: install the numpy package")
+        source = READERS[codec] if codec in READERS else codec
+        ## Total number of GOPs.
+        self.GOPs = GOPs
+        ## Total number of Temporal Resolution Levels.
+        self.TRLs = TRLs
+        ## Frames per Second.
+        self.FPS = float(FPS)
+        ## Number of pictures of a GOP.
+        self.GOP_size = 1 << (TRLs - 1)
+        ## Total number of pictures.
+        self.pictures = self.GOP_size * GOPs + 1
+
+        prefix = LOW + str(TRLs - 1)
+        ## Bytes of each picture of each subband.
+        self.texture = [picture_bytes(source.texture.ends(prefix), GOPs + 1)]
+        ## Bytes of each field of motion of each subband (None for L).
+        self.motion = [None]
+        ## Types of the frames of each subband (None for L).
+        self.types = [None]
+        ## Bytes of each component of each picture of each subband
+        #  (None if the codestreams are not stored in containers).
+        self.components = [source.components(prefix, GOPs + 1)]
+        for k in range(1, TRLs):
+            subband = str(TRLs - k)
+            count = GOPs << (k - 1)
+            self.texture.append(picture_bytes(source.texture.ends(HIGH + subband), count))
+            self.motion.append(picture_bytes(source.motion.ends(MOTION + subband), count))
+            self.types.append(frame_types(TYPES + subband, count))
+            self.components.append(source.components(HIGH + subband, count))
+
+    ## Bytes of the textures and the motion of each GOP. The GOP 0 is
+    #  the first picture of the subband L.
+    # @param self Refers to object.
+    # @return Two arrays (textures and motion) of GOPs+1 rows and one
+    #  column per subband.
+    def gop_bytes(self):
+        texture = numpy.zeros((self.GOPs + 1, self.TRLs))
+        motion = numpy.zeros((self.GOPs + 1, self.TRLs))
+        texture[:, 0] = self.texture[0]
+        for k in range(1, self.TRLs):
+            texture[1:, k] = self.texture[k].reshape(self.GOPs, -1).sum(axis=1)
+            motion[1:, k] = self.motion[k].reshape(self.GOPs, -1).sum(axis=1)
+        return texture, motion
+
+    ## Duration of each GOP (in seconds).
+    # @param self Refers to object.
+    # @return An array of GOPs+1 durations.
+    def gop_time(self):
+        time = numpy.full(self.GOPs + 1, self.GOP_size / self.FPS)
+        time[0] = 1.0 / self.FPS
+        return time
+
+    ## Kbps of the textures and the motion of each GOP.
+    # @param self Refers to object.
+    # @return Two arrays as gop_bytes().
+    def gop_kbps(self):
+        texture, motion = self.gop_bytes()
+        time = self.gop_time()[:, numpy.newaxis]
+        return texture * 8.0 / time / 1000.0, motion * 8.0 / time / 1000.0
+
+    ## Kbps, as info.kbps().
+    # @param self Refers to object.
+    # @returns Kbps of:
+    #  - Motion ([M_{TRLs-1}, ..., M_1] of each GOP but the GOP 0),
+    #  - Textures ([L] of the GOP 0 and [L, H_{TRLs-1}, ..., H_1] of each GOP) and
+    #  - Both together (of each GOP).
+    def kbps(self):
+        texture, motion = self.gop_kbps()
+        total = texture.sum(axis=1) + motion.sum(axis=1)
+        return (motion[1:, 1:].tolist(),
+                [[float(texture[0, 0])]] + texture[1:].tolist(),
+                total.tolist())
+
+    ## Average Kbps, as info.kbps_average(). The GOP 0 is weighted
+    #  with its number of pictures.
+    # @param self Refers to object.
+    # @returns Average kbps of:
+    #  - Motion ([M_{TRLs-1}, ..., M_1]),
+    #  - Textures ([L, H_{TRLs-1}, ..., H_1]) and
+    #  - Both together.
+    def kbps_average(self):
+        texture, motion = self.gop_kbps()
+        weight = (self.pictures - 1.0) / self.pictures
+        average_L = texture[0, 0] * (1 - weight) + texture[1:, 0].mean() * weight
+        total = texture[1:].sum(axis=1) + motion[1:].sum(axis=1)
+        average_total = texture[0, 0] * (1 - weight) + total.mean() * weight
+        return (motion[1:, 1:].mean(axis=0).tolist(),
+                [float(average_L)] + texture[1:, 1:].mean(axis=0).tolist(),
+                float(average_total))
+
+    ## Bytes of each frame, in the order of the sequence: the bytes of
+    #  the pictures (and the fields of motion) of each subband which
+    #  are needed to reconstruct the frame.
+    # @param self Refers to object.
+    # @return The bytes of each frame and the subband of each frame
+    #  (the lines of the file "info_picIdentifier").
+    def frame_bytes(self):
+        TRLs = self.TRLs
+        both = [self.texture[0]] + [self.texture[k] + self.motion[k] for k in range(1, TRLs)]
+        frames = numpy.zeros(self.pictures, dtype=numpy.int64)
+        identifiers = []
+
+        # Bytes of the subband L.
+        for pic in range(0, self.pictures):
+            gop = pic // self.GOP_size
+            if pic % self.GOP_size == 0:
+                frames[pic] = both[0][gop]
+            else:
+                image_number = pic / 2.0
+                sub = 1
+                identifiers.append("pic " + str(pic) + "\timage_number " + str(image_number) + "\tsub " + str(sub))
+                while (image_number - int(image_number)) == 0.0:
+                    image_number /= 2.0
+                    sub += 1
+                    identifiers.append("pic " + str(pic) + "\timage_number " + str(image_number) + "\tsub " + str(sub))
+                identifiers.append("sub --> " + str(sub))
+                if self.types[TRLs - sub][int(image_number)] != 'I':
+                    frames[pic] = both[0][gop] + both[0][gop + 1]
+
+        # Bytes of the subbands H (and the motion).
+        for frame in range(0, self.pictures):
+            pic = float(frame)
+            for sub in range(1, TRLs):
+                pic /= 2.0
+                if pic - int(pic) > 0.0:
+                    if self.types[TRLs - sub][int(pic)] == 'I':
+                        frames[frame] += self.texture[TRLs - sub][int(pic)]
+                        break
+                    else:
+                        frames[frame] += both[TRLs - sub][int(pic)]
+
+        return frames, identifiers
+
+    ## Average bytes of each frame of a GOP (the frame 0 is the first
+    #  one of the subband L).
+    # @param self Refers to object.
+    # @param frames The bytes of each frame (see frame_bytes()).
+    # @return GOP_size+1 averages.
+    def frame_bytes_average(self, frames):
+        averages = [frames[0::self.GOP_size].mean()]
+        for pic in range(1, self.GOP_size + 1):
+            averages.append(frames[pic:pic + self.GOPs * self.GOP_size:self.GOP_size].mean())
+        return numpy.array(averages)
+
+    ## The rates as a dictionary (of lists).
+    # @param self Refers to object.
+    # @return The report.
+    def report(self):
+        texture, motion = self.gop_bytes()
+        texture_kbps, motion_kbps = self.gop_kbps()
+        frames, identifiers = self.frame_bytes()
+        M_average, T_average, total_average = self.kbps_average()
+        components = []
+        for c in self.components:
+            components.append(None if c is None else dict((k, v.tolist()) for k, v in c.items()))
+        return {"GOPs": self.GOPs,
+                "TRLs": self.TRLs,
+                "FPS": self.FPS,
+                "subbands": ["L" + str(self.TRLs - 1)] + ["H" + str(self.TRLs - k) for k in range(1, self.TRLs)],
+                "picture_bytes": {"texture": [t.tolist() for t in self.texture],
+                                  "motion": [None] + [m.tolist() for m in self.motion[1:]],
+                                  "components": components},
+                "frame_types": [None] + ["".join(t) for t in self.types[1:]],
+                "gop_bytes": {"texture": texture.tolist(), "motion": motion.tolist()},
+                "gop_kbps": {"texture": texture_kbps.tolist(), "motion": motion_kbps.tolist()},
+                "frame_bytes": frames.tolist(),
+                "frame_bytes_average": self.frame_bytes_average(frames).tolist(),
+                "average_kbps": {"motion": M_average, "texture": T_average, "total": total_average}}
+
+    ## Writes the report in JSON.
+    # @param self Refers to object.
+    # @param file_name Name of the file.
+    def write_json(self, file_name):
+        with open(file_name, "w") as f:
+            f.write(json.dumps(self.report(), indent=1, sort_keys=True) + "\n")
+
+    ## Writes the Kbps of each GOP in CSV (a column per subband:
+    #  L, motion and texture of each subband H, and the total).
+    # @param self Refers to object.
+    # @param file_name Name of the file.
+    def write_csv(self, file_name):
+        texture, motion = self.gop_kbps()
+        head = ["GOP", "L" + str(self.TRLs - 1)]
+        columns = [texture[:, 0]]
+        for k in range(1, self.TRLs):
+            head += ["M" + str(self.TRLs - k), "H" + str(self.TRLs - k)]
+            columns += [motion[:, k], texture[:, k]]
+        columns.append(texture.sum(axis=1) + motion.sum(axis=1))
+        head.append("Total")
+        lines = [",".join(head)]
+        for gop in range(self.GOPs + 1):
+            lines.append(",".join([str(gop)] + ["%.3f" % c[gop] for c in columns]))
+        with open(file_name, "w") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file rate_control.py
+#  Bit-rate control of the compression of the textures (see
+#  compress.py, --target_kbps).
+#
+#  In a first pass, a sample of the pictures of each temporal subband
+#  is compressed (in the same process, see texture_codec.py) with two
+#  slopes, and the size of the subband is modelled as
+#  log(bytes) = a + b*slope. With this model, the slope of the subband
+#  L is searched (keeping the distance between subbands given by the
+#  gains, see temporal_gains.py) so that the size of all the subbands
+#  meets the target. After compressing, the model can be corrected
+#  once with the real size of the subbands.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package rate_control
+#  Bit-rate control of the compression of the textures.
+
+import math
+import container
+import texture_codec
+import temporal_gains
+
+## Refers to high frequency subbands.
+HIGH           = "high"
+## Refers to low frequency subbands.
+LOW            = "low"
+## Smallest slope.
+MIN_SLOPE      = 0
+## Largest slope.
+MAX_SLOPE      = 65535
+## Distance between the two slopes of the first pass.
+PROBE_DISTANCE = 2048
+## Rate model used when the probes do not give a slope (the size is
+#  halved each 256 of slope).
+DEFAULT_B      = -math.log(2) / 256
+
+## Model of the size of a subband.
+class model:
+
+    ## Builds the model of a subband from two probes.
+    # @param self Refers to object.
+    # @param name Name of the subband (for example, "high_1").
+    # @param pictures Number of pictures of the subband.
+    # @param probes Slopes and bytes per picture of the probes.
+    def __init__(self, name, pictures, probes):
+        ## Name of the subband.
+        self.name = name
+        ## Number of pictures of the subband.
+        self.pictures = pictures
+        (s1, b1), (s2, b2) = probes
+        b1 = max(b1, 1.0)
+        b2 = max(b2, 1.0)
+        ## Slope of the line log(bytes) vs slope.
+        self.b = (math.log(b2) - math.log(b1)) / (s2 - s1)
+        if self.b >= 0:
+            self.b = DEFAULT_B
+        ## Intercept of the line (per picture).
+        self.a = math.log(b1) - self.b * s1
+
+    ## Predicted size of the subband.
+    # @param self Refers to object.
+    # @param slope Slope of the first quality layer.
+    # @return The bytes of the subband.
+    def bytes(self, slope):
+        return self.pictures * math.exp(self.a + self.b * slope)
+
+## Shapes of the components of a picture.
+#  @param pixels_in_x Width of the pictures.
+#  @param pixels_in_y Height of the pictures.
+#  @return The name and the shape of each component.
+def shapes(pixels_in_x, pixels_in_y):
+    return [("Y", (pixels_in_y, pixels_in_x)),
+            ("U", (pixels_in_y // 2, pixels_in_x // 2)),
+            ("V", (pixels_in_y // 2, pixels_in_x // 2))]
+
+## Subbands of the textures, in the order of texture_compress.py.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param GOPs Number of Group Of Pictures.
+#  @return The name and the number of pictures of [L_{TRLs-1},
+#  H_{TRLs-1}, ..., H_1].
+def subbands(TRLs, GOPs):
+    pictures = GOPs * (1 << (TRLs - 1)) + 1
+    high = []
+    for subband in range(1, TRLs):
+        pictures = (pictures + 1) // 2
+        high.insert(0, (HIGH + "_" + str(subband), pictures - 1))
+    return [(LOW + "_" + str(TRLs - 1), pictures)] + high
+
+## Bytes (without headers) of each picture of a sample, compressed with
+#  a slope.
+#  @param coder The codec.
+#  @param planes The components of the pictures of the sample.
+#  @param slope The slope.
+#  @param pictures Number of pictures of the sample.
+#  @return The average bytes per picture.
+def probe(coder, planes, slope, pictures):
+    total = 0
+    for plane in planes:
+        data = coder.encode(plane, [slope])
+        header, layers = coder.sizes(data)
+        total += len(data) - header
+    return float(total) / pictures
+
+## First pass: builds the model of each subband.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param GOPs Number of Group Of Pictures.
+#  @param pixels_in_x Width of the pictures.
+#  @param pixels_in_y Height of the pictures.
+#  @param SRLs Number of Spatial Resolution Levels.
+#  @param slope Slope around which the probes are made.
+#  @param samples Number of pictures of each subband which are compressed.
+#  @return The models of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def first_pass(TRLs, GOPs, pixels_in_x, pixels_in_y, SRLs, slope, samples=2):
+    coder = texture_codec.selected(max(SRLs - 1, 0))
+    components = shapes(pixels_in_x, pixels_in_y)
+    YUV_size = sum(rows * columns for component, (rows, columns) in components)
+    probes = (slope - PROBE_DISTANCE // 2, slope + PROBE_DISTANCE // 2)
+    models = []
+    for name, pictures in subbands(TRLs, GOPs):
+        # Pictures of the sample, evenly spaced.
+        count = max(min(samples, pictures), 1)
+        numbers = sorted(set((2 * i + 1) * pictures // (2 * count) for i in range(count)))
+        planes = []
+        with open(name, "rb") as f:
+            for number in numbers:
+                f.seek(number * YUV_size)
+                picture = texture_codec.numpy.frombuffer(f.read(YUV_size), dtype=texture_codec.numpy.uint8)
+                offset = 0
+                for component, (rows, columns) in components:
+                    planes.append(picture[offset:offset + rows * columns].reshape(rows, columns))
+                    offset += rows * columns
+        models.append(model(name, pictures,
+                            [(s, probe(coder, planes, s, len(numbers))) for s in probes]))
+    return models
+
+## Distance between the slope of the subband L and the slope of each
+#  subband.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @return The distances of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def offsets(TRLs, update_factor=1.0/4):
+    return [0.0] + temporal_gains.offsets(TRLs, update_factor)
+
+## Slopes of the subbands (clipped to the range of the slopes).
+#  @param base The slope of the subband L.
+#  @param distances The distances between slopes (see offsets()).
+#  @return The slope of each subband.
+def _slopes(base, distances):
+    return [int(round(min(max(base + d, MIN_SLOPE), MAX_SLOPE))) for d in distances]
+
+## Predicted size of the textures.
+#  @param models The models of the subbands.
+#  @param slopes The slope of each subband.
+#  @return The bytes.
+def predict(models, slopes):
+    return sum(m.bytes(s) for m, s in zip(models, slopes))
+
+## Searches the slopes of the subbands which meet a target size (by
+#  bisection of the slope of the subband L).
+#  @param models The models of the subbands.
+#  @param distances The distances between slopes (see offsets()).
+#  @param target The bytes of the textures.
+#  @return The slope of each subband.
+def solve(models, distances, target):
+    low = MIN_SLOPE - max(distances)
+    high = MAX_SLOPE - min(distances)
+    while high - low > 1:
+        middle = (low + high) / 2.0
+        if predict(models, _slopes(middle, distances)) > target:
+            low = middle
+        else:
+            high = middle
+    return _slopes(high, distances)
+
+## Corrects the models with the real size of the textures.
+#  @param models The models of the subbands.
+#  @param slopes The slopes used.
+#  @param measured The bytes of the textures.
+def correct(models, slopes, measured):
+    shift = math.log(max(measured, 1.0) / predict(models, slopes))
+    for m in models:
+        m.a += shift
+
+## Bytes (without headers) of a subband already compressed.
+#  @param prefix Name of the subband (for example, "high_1").
+#  @param extension Extension of the file of sizes.
+#  @return The bytes.
+def subband_bytes(prefix, extension):
+    codestreams = container.open_subband(prefix)
+    if codestreams != None:
+        sizes = codestreams.sizes()
+        return sizes[-1] if sizes else 0
+    try:
+        with open(prefix + "." + extension) as f:
+            sizes = f.read().split()
+        return int(sizes[-1]) if sizes else 0
+    except IOError:
+        return 0
+
+## Bytes of the compressed textures.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param GOPs Number of Group Of Pictures.
+#  @return The bytes.
+def texture_bytes(TRLs, GOPs):
+    extension = texture_codec.selected().extension
+    return sum(subband_bytes(name, extension) for name, pictures in subbands(TRLs, GOPs))
+
+## Bytes of the compressed fields of motion.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @return The bytes.
+def motion_bytes(TRLs):
+    return sum(subband_bytes("motion_residue_" + str(subband), "mjc") for subband in range(1, TRLs))
@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file rd_cache.py
+#  Cache of the rate-distortion evaluations of the sorting algorithms
+#  of transcode.py.
+#
+#  An evaluation (the Kbps and the RMSE of a truncated codestream) is
+#  identified by the digest of the codestream and by the GOP, the
+#  number of layers and the reductions of each subband. The
+#  evaluations are appended to a file, one JSON object per line, as
+#  soon as they are known, so an interrupted optimization can be
+#  resumed without repeating them. The evaluations of other
+#  codestreams in the same file are ignored.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package rd_cache
+#  Cache of the rate-distortion evaluations of transcode.py.
+
+import os
+import json
+import hashlib
+
+## Bytes read at once to compute a digest.
+BLOCK = 1 << 20
+
+## Digest of a set of files (their names and their contents).
+#  @param file_names The names of the files.
+#  @return The digest (hexadecimal).
+def digest(file_names):
+    h = hashlib.sha1()
+    for file_name in sorted(file_names):
+        h.update(os.path.basename(file_name) + "\0")
+        with open(file_name, "rb") as f:
+            block = f.read(BLOCK)
+            while block:
+                h.update(block)
+                block = f.read(BLOCK)
+    return h.hexdigest()
+
+## The evaluations of a codestream.
+class cache:
+
+    ## Reads the evaluations already stored.
+    # @param self Refers to object.
+    # @param file_name Name of the file of the cache.
+    # @param codestream Digest of the codestream (see digest()).
+    def __init__(self, file_name, codestream):
+        ## Name of the file of the cache.
+        self.file_name = file_name
+        ## Digest of the codestream.
+        self.codestream = codestream
+        ## The evaluations, by key.
+        self.evaluations = {}
+        ## Written before the next evaluation (a new line if the last
+        #  line of the file is not complete).
+        self.separator = ""
+        try:
+            with open(file_name) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        self.separator = "\n"
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # The last line of an interrupted run.
+                        continue
+                    if record.get("codestream") == codestream:
+                        self.evaluations[record["key"]] = record["value"]
+        except IOError:
+            pass
+
+    ## Key of an evaluation.
+    # @param self Refers to object.
+    # @param fields The parameters of the evaluation (GOP, layers,
+    # reductions, ...).
+    # @return The key.
+    def key(self, *fields):
+        return json.dumps(fields)
+
+    ## Finds an evaluation.
+    # @param self Refers to object.
+    # @param key The key (see key()).
+    # @return The evaluation (None if it is not stored).
+    def get(self, key):
+        return self.evaluations.get(key)
+
+    ## Stores an evaluation (also in the file).
+    # @param self Refers to object.
+    # @param key The key (see key()).
+    # @param value The evaluation (a JSON serializable object).
+    def put(self, key, value):
+        self.evaluations[key] = value
+        with open(self.file_name, "a") as f:
+            f.write(self.separator + json.dumps({"codestream": self.codestream,
+                                                 "key": key, "value": value}) + "\n")
+        self.separator = ""
@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file rd_estimate.py
+#  Estimation of the rate and the distortion of a truncated codestream
+#  in the domain of the subbands (see transcode.py, --estimate).
+#
+#  The codestreams of each texture subband of a GOP are decoded with a
+#  number of quality layers in the same process (see texture_codec.py)
+#  and compared with the original subband (the files "low_<TRLs-1>"
+#  and "high_<k>"). The bytes of the layers are read from the index of
+#  the container (see container.py); the codestreams without index are
+#  truncated (see codestream.py). The distortion
+#  of the reconstructed GOP is modelled as the sum of the squared
+#  errors of the subbands weighted by their synthesis gains (see
+#  temporal_gains.py), so the distortion of any combination of layers
+#  is computed from a table with an entry per subband and number of
+#  layers. The fields of motion are not modelled.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package rd_estimate
+#  Estimation of the rate and the distortion of a truncated codestream.
+
+import os
+import math
+import container
+import codestream
+import texture_codec
+import temporal_gains
+import rate_control
+
+## Refers to high frequency subbands.
+HIGH = "high_"
+## Refers to low frequency subbands.
+LOW  = "low_"
+
+## Pictures of each texture subband of a GOP, as transcode.py extracts
+#  them.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param first Number of the first picture of the GOP.
+#  @param pictures Number of the picture after the last one of the GOP.
+#  @return The name, the first picture and the picture after the last
+#  one of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def subbands(TRLs, first, pictures):
+    high = []
+    for subband in range(1, TRLs):
+        pictures = (pictures + 1) // 2
+        first = first // 2
+        high.insert(0, (HIGH + str(subband), first, pictures - 1))
+    return [(LOW + str(TRLs - 1), first, pictures)] + high
+
+## Bytes (without headers) of a codestream truncated to a number of
+#  layers (as transcode_codestream() in transcode.py), for the
+#  codestreams without index (see container.entry.truncated_bytes()).
+#  @param data The codestream.
+#  @param layers Number of quality layers.
+#  @return The truncated codestream and its bytes.
+def truncated_bytes(data, layers):
+    try:
+        data = codestream.truncate(data, layers)
+    except ValueError:
+        # Decoded with all the layers, but counted as truncated.
+        return data, sum(codestream.codestream(data).layer_sizes()[:layers])
+    return data, len(data) - codestream.header_size(data)
+
+## Estimations of the textures of a codestream.
+class estimator:
+
+    ## Prepares the estimations.
+    # @param self Refers to object.
+    # @param TRLs Number of Temporal Resolution Levels.
+    # @param pixels_in_x Width of the pictures.
+    # @param pixels_in_y Height of the pictures.
+    # @param update_factor Weight of the update step.
+    # @param codec Name of the codec which decodes the codestreams (see
+    # texture_codec.py).
+    # @param path Directory of the subbands.
+    def __init__(self, TRLs, pixels_in_x, pixels_in_y, update_factor, codec, path="."):
+        if texture_codec.numpy is None:
+            raise ImportError("rd_estimate requires NumPy")
+        ## Number of Temporal Resolution Levels.
+        self.TRLs = TRLs
+        ## Directory of the subbands.
+        self.path = path
+        ## The codec.
+        self.coder = texture_codec.create(codec)
+        ## Name and shape of each component.
+        self.components = rate_control.shapes(pixels_in_x, pixels_in_y)
+        ## Samples of a picture.
+        self.picture_size = sum(rows * columns for component, (rows, columns) in self.components)
+        ## Synthesis gains of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+        self.gains = temporal_gains.gains(TRLs, update_factor)
+        ## Squared error and bytes, by (subband, first, last, layers).
+        self.table = {}
+
+    ## Squared error and bytes of a range of pictures of a subband
+    #  truncated to a number of layers.
+    # @param self Refers to object.
+    # @param name Name of the subband (for example, "high_1").
+    # @param first The first picture.
+    # @param last The picture after the last one.
+    # @param layers Number of quality layers.
+    # @return The squared error and the bytes.
+    # @exception ValueError The subband is stored with one codestream
+    # for the three components.
+    def subband(self, name, first, last, layers):
+        key = (name, first, last, layers)
+        if key not in self.table:
+            numpy = texture_codec.numpy
+            prefix = os.path.join(self.path, name)
+            codestreams = container.open_subband(prefix)
+            error = 0.0
+            total = 0
+            with open(prefix, "rb") as f:
+                for picture in range(first, last):
+                    f.seek(picture * self.picture_size)
+                    original = numpy.frombuffer(f.read(self.picture_size), dtype=numpy.uint8)
+                    offset = 0
+                    for component, shape in self.components:
+                        plane = original[offset:offset + shape[0] * shape[1]].reshape(shape)
+                        offset += shape[0] * shape[1]
+                        data = self.read(codestreams, prefix, picture, component)
+                        if data is None:
+                            raise ValueError("\"%s\" has no codestream for the component %s" % (name, component))
+                        e = codestreams.find(picture, component) if codestreams != None else None
+                        if data and layers > 0 and e != None and e.layer_bytes:
+                            # The bytes are read from the index of the
+                            # container and the layers are decoded
+                            # without truncating the codestream.
+                            decoded = self.coder.decode(data, shape, layers)
+                            total += e.truncated_bytes(layers)
+                        elif data and layers > 0:
+                            data, size = truncated_bytes(data, layers)
+                            decoded = self.coder.decode(data, shape)
+                            total += size
+                        else:
+                            # A skipped picture or no layers.
+                            decoded = texture_codec.neutral(shape)
+                        difference = plane.astype(numpy.float64) - decoded
+                        error += float(numpy.sum(difference * difference))
+            self.table[key] = (error, total)
+        return self.table[key]
+
+    ## Reads a codestream of a subband (from its container or from its
+    #  file).
+    # @param self Refers to object.
+    # @param codestreams The container of the subband (None if there
+    # is no container).
+    # @param prefix Name of the subband.
+    # @param picture Number of the picture.
+    # @param component Name of the component.
+    # @return The codestream (None if it does not exist).
+    def read(self, codestreams, prefix, picture, component):
+        if codestreams != None:
+            return codestreams.read(picture, component)
+        file_name = prefix + "_" + component + "_" + str('%04d' % picture) + ".j2c"
+        if not os.path.exists(file_name):
+            return None
+        with open(file_name, "rb") as f:
+            return f.read()
+
+    ## Estimation of the textures of a GOP truncated to a combination
+    #  of layers.
+    # @param self Refers to object.
+    # @param first Number of the first picture of the GOP.
+    # @param pictures Number of the picture after the last one of the GOP.
+    # @param combination Number of layers of each subband ([L_{TRLs-1},
+    # H_{TRLs-1}, ..., H_1, ...], the fields of motion are ignored).
+    # @return The bytes of the textures and the RMSE of the GOP.
+    def estimate(self, first, pictures, combination):
+        error = 0.0
+        total = 0
+        for (name, begin, end), layers, gain in zip(subbands(self.TRLs, first, pictures),
+                                                    combination, self.gains):
+            e, b = self.subband(name, begin, end, layers)
+            error += gain * e
+            total += b
+        samples = max(pictures - first, 1) * self.picture_size
+        return total, math.sqrt(error / samples)
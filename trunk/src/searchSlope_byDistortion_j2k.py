@@ -18,6 +18,7 @@
 import os
 import sys
 import display
+import codestream
 import math
 import subprocess  as sub
 from   GOP         import GOP
@@ -159,27 +160,17 @@ def decode (image_filename) :
         sys.exit(-1)
 
 
-#------------------------------------------------
-## Determines the size of the header of a codestream.
-#  @param file_name Name of the textures file.
-#  @return Header size (bytes).
-def header (file_name) :
-    p = sub.Popen("header_size " + str(file_name) + " 2> /dev/null | grep OUT", shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
-    out, err = p.communicate()
-    return long(out[4:])
-
-
 #------------------------------------------------
 ## Determines the codestream size.
 #  @param file_name Name of the textures file.
 #  @return Codestream size (bytes).
 def size (file_name) :
     ## Size of the component 'Y' (measured in bytes, without headers).
-    Ysize  = os.path.getsize(file_name + "_Y_" + '%04d' % image_number + ".j2c") - header(file_name + "_Y_" + '%04d' % image_number + ".j2c")
+    Ysize  = os.path.getsize(file_name + "_Y_" + '%04d' % image_number + ".j2c") - codestream.header(file_name + "_Y_" + '%04d' % image_number + ".j2c")
     ## Size of the component 'U' (measured in bytes, without headers).
-    Usize  = os.path.getsize(file_name + "_U_" + '%04d' % image_number + ".j2c") - header(file_name + "_U_" + '%04d' % image_number + ".j2c")
+    Usize  = os.path.getsize(file_name + "_U_" + '%04d' % image_number + ".j2c") - codestream.header(file_name + "_U_" + '%04d' % image_number + ".j2c")
     ## Size of the component 'V' (measured in bytes, without headers).
-    Vsize  = os.path.getsize(file_name + "_V_" + '%04d' % image_number + ".j2c") - header(file_name + "_V_" + '%04d' % image_number + ".j2c")
+    Vsize  = os.path.getsize(file_name + "_V_" + '%04d' % image_number + ".j2c") - codestream.header(file_name + "_V_" + '%04d' % image_number + ".j2c")
 
     return Ysize, Usize, Vsize
 
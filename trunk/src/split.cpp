@@ -16,8 +16,9 @@
 //#include "SP.cpp"
 #include "dwt2d.cpp"
 #include "texture.cpp"
-#include "motion.cpp"
 #include "display.cpp"
+#include "motion.cpp"
+#include "profile.cpp"
 
 /** \brief Texture component type. */
 #define TC_TYPE unsigned char
@@ -30,6 +31,13 @@
 /** \brief Dimension 'Y' of a picture. */
 #define PIXELS_IN_Y 288
 
+/** \brief Time spent copying the pictures. */
+static int copy_timer = profile_timer("copy");
+/** \brief Number of copied pictures. */
+static int pictures_counter = profile_counter("pictures");
+/** \brief Number of bytes read (the same number is written). */
+static int bytes_counter = profile_counter("bytes_read");
+
 #include <getopt.h>
 
 /** \brief Provides a main function which reads in parameters from the command line and a parameter file.
@@ -39,13 +47,8 @@
  */
 int main(int argc, char *argv[]) {
 
-#if defined DEBUG
-  info("%s: ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
 
   char *even_fn=(char *)"even";
   char *low_fn=(char *)"low";
@@ -224,81 +227,82 @@ int main(int argc, char *argv[]) {
   }
   
   TC_TYPE *line = (TC_TYPE *)malloc(pixels_in_x[0]*sizeof(TC_TYPE));
-  
-  /* First image (even index). */
+
+  int picture_bytes = 0;
   for(int c=0; c<COMPONENTS; c++) {
-    for(int y=0; y<pixels_in_y[c]; y++) {
+    picture_bytes += pixels_in_y[c] * pixels_in_x[c] * sizeof(TC_TYPE);
+  }
+  
+  /* First image (even index). */ {
+    profile_scope timer(copy_timer);
+    for(int c=0; c<COMPONENTS; c++) {
+      for(int y=0; y<pixels_in_y[c]; y++) {
 #if defined ANALYZE
-      int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
-#if defined DEBUG
-      if(r<pixels_in_x[c]) {
-	error("%s: input error (read=%d, expected=%d) in picture 0 of \"%s\". Aborting!\n",
-	      argv[0], r, pixels_in_x[c], low_fn);
-	abort();
-      }
-#endif
-      fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
+	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
+	if(r<pixels_in_x[c]) {
+	  error("%s: input error (read=%d, expected=%d) in picture 0 of \"%s\". Aborting!\n",
+		argv[0], r, pixels_in_x[c], low_fn);
+	  abort();
+	}
+	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
 #else
-      int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
-#if defined DEBUG
-      if(r<pixels_in_x[c]) {
-	error("%s: input error (read=%d, expected=%d) in picture 0 of \"%s\". Aborting!\n",
-	      argv[0], r, pixels_in_x[c], even_fn);
-	abort();
-      }
-#endif
-      fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
+	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
+	if(r<pixels_in_x[c]) {
+	  error("%s: input error (read=%d, expected=%d) in picture 0 of \"%s\". Aborting!\n",
+		argv[0], r, pixels_in_x[c], even_fn);
+	  abort();
+	}
+	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
 #endif
+      }
     }
+    profile_count(pictures_counter, 1);
+    profile_count(bytes_counter, picture_bytes);
   }
   
-#if defined DEBUG
 #ifdef ANALYZE
-  info("%s: writing picture 0 from \"%s\" to \"%s\".\n",
-       argv[0], low_fn,  even_fn);
+  log_info("%s: writing picture 0 from \"%s\" to \"%s\".\n",
+           argv[0], low_fn,  even_fn);
 #else
-  info("%s: reading picture 0 from \"%s\" to \"%s\".\n",
-       argv[0], even_fn, low_fn);
-#endif
+  log_info("%s: reading picture 0 from \"%s\" to \"%s\".\n",
+           argv[0], even_fn, low_fn);
 #endif
 
   for(int i=0; i<pictures/2; i++) {
+
+    profile_scope timer(copy_timer);
+    profile_count(pictures_counter, 2);
+    profile_count(bytes_counter, 2*picture_bytes);
     
     /* Images odd index. */
     for(int c=0; c<COMPONENTS; c++) {
       for(int y=0; y<pixels_in_y[c]; y++) {
 #if defined ANALYZE
 	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
-#if defined DEBUG
 	if(r<pixels_in_x[c]) {
 	  error("%s: input error (read=%d, expected=%d) in picture %d of \"%s\". Aborting!\n",
 		argv[0], r, pixels_in_x[c], i, low_fn);
 	  abort();
 	}
-#endif
 	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], odd_fd);
 #else
 	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], odd_fd);
-#if defined DEBUG
 	if(r<pixels_in_x[c]) {
 	  error("%s: input error (read=%d, expected=%d) in picture %d of \"%s\". Aborting!\n",
 		argv[0], r, pixels_in_x[c], i, odd_fn);
 	  abort();
 	}
-#endif
 	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
 #endif
       }
     }
 
-#if defined DEBUG
 #if defined ANALYZE
-    info("%s: writing picture %d from \"%s\" to \"%s\".\n",
-	 argv[0], i*2+1, low_fn, odd_fn);
+    log_info("%s: writing picture %d from \"%s\" to \"%s\".\n",
+	     argv[0], i*2+1, low_fn, odd_fn);
 #else
-    info("%s: reading picture %d from \"%s\" to \"%s\".\n",
-	 argv[0], i*2+1, odd_fn, low_fn);
-#endif
+    log_info("%s: reading picture %d from \"%s\" to \"%s\".\n",
+	     argv[0], i*2+1, odd_fn, low_fn);
 #endif
     
     /* Pictures of even index. */
@@ -306,36 +310,30 @@ int main(int argc, char *argv[]) {
       for(int y=0; y<pixels_in_y[c]; y++) {
 #if defined ANALYZE
 	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
-#if defined DEBUG
-	if(r< pixels_in_x[c]) {
+	if(r<pixels_in_x[c]) {
 	  error("%s: input error (read=%d, expected=%d) in picture %d of \"%s\". Aborting!\n",
 		argv[0], r, pixels_in_x[c], i, low_fn);
 	  abort();
 	}
-#endif
 	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
 #else
 	int r = fread(line, sizeof(TC_TYPE), pixels_in_x[c], even_fd);
-#if defined DEBUG
 	if(r<pixels_in_x[c]) {
 	  error("%s: input error (read=%d, expected=%d) in picture %d of \"%s\". Aborting!\n",
 		argv[0], r, pixels_in_x[c], i, even_fn);
 	  abort();
 	}
-#endif
 	fwrite(line, sizeof(TC_TYPE), pixels_in_x[c], low_fd);
 #endif
       }
     }
 
-#if defined DEBUG
 #ifdef ANALYZE
-    info("%s: writing picture %d from \"%s\" to \"%s\".\n",
-	 argv[0], i*2+2, low_fn, even_fn);
+    log_info("%s: writing picture %d from \"%s\" to \"%s\".\n",
+	     argv[0], i*2+2, low_fn, even_fn);
 #else
-    info("%s: reading picture %d from \"%s\" to \"%s\".\n",
-	 argv[0], i*2+2, even_fn, low_fn);
-#endif
+    log_info("%s: reading picture %d from \"%s\" to \"%s\".\n",
+	     argv[0], i*2+2, even_fn, low_fn);
 #endif
     
   }
@@ -41,6 +41,9 @@ block_overlaping  = 0
 search_range      = 4
 ## Weight of the update step.
 update_factor     = 1.0/4
+## Number of pictures processed concurrently in the motion
+## compensation and update steps.
+threads           = 1
 ## Size of the search areas in the motion estimation process.
 search_factor     = 2
 
@@ -58,6 +61,7 @@ parser.border_size(border_size)
 parser.block_overlaping(block_overlaping)
 parser.search_range(search_range)
 parser.update_factor(update_factor)
+parser.threads(threads)
 
 ## A script may only parse a few of the command-line arguments,
 ## passing the remaining arguments on to another script or program.
@@ -82,6 +86,8 @@ if args.search_range:
     search_range = int(args.search_range)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
 
 
 #block_overlaping >>= int(number_of_discarded_spatial_levels)
@@ -133,6 +139,7 @@ if TRLs > 1 :
                        + " --subpixel_accuracy=" + str(subpixel_accuracy.split(',')[TRLs-temporal_subband])
                        + " --temporal_subband="  + str(temporal_subband)
                        + " --update_factor="     + str(update_factor)
+                       + " --threads="           + str(threads)
                        , shell=True)
         except CalledProcessError :
             sys.exit(-1)
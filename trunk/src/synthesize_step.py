@@ -38,6 +38,9 @@ subpixel_accuracy = 0
 temporal_subband  = 0
 ## Weight of the update step.
 update_factor     = 1.0/4
+## Number of pictures processed concurrently in the motion
+## compensation and update steps.
+threads           = 1
 
 ## The parser module provides an interface to Python's internal parser
 ## and byte-code compiler.
@@ -51,6 +54,7 @@ parser.search_range(search_range)
 parser.subpixel_accuracy(subpixel_accuracy)
 parser.add_argument("--temporal_subband", help="iteration of the temporal transform. Default = {}".format(temporal_subband))
 parser.update_factor(update_factor)
+parser.threads(threads)
 
 ## A script may only parse a few of the command-line arguments,
 ## passing the remaining arguments on to another script or program.
@@ -73,8 +77,15 @@ if args.temporal_subband:
     temporal_subband = int(args.temporal_subband)
 if args.update_factor:
     update_factor = float(args.update_factor)
+if args.threads:
+    threads = int(args.threads)
 
 
+# Inverse lazzy transform. The even and the odd pictures are written
+# directly in the (interleaved) low-subband of the previous temporal
+# level, which does not need to be merged.
+even_fn = "low_" + str(temporal_subband-1)
+odd_fn  = "low_" + str(temporal_subband-1)
 
 # To monitor the execution:
 # check_call("echo SYNTHETIZE_STEP:: Subband: " + str(temporal_subband), shell=True)
@@ -84,7 +95,8 @@ if args.update_factor:
 try:
     check_call("mctf un_update"
                + " --block_size="        + str(block_size)
-               + " --even_fn="           + "even_"        + str(temporal_subband)
+               + " --even_fn="           + even_fn
+               + " --interleaved=1"
                + " --frame_types_fn="    + "frame_types_" + str(temporal_subband)
                + " --high_fn="           + "high_"        + str(temporal_subband)
                + " --low_fn="            + "low_"         + str(temporal_subband)
@@ -94,6 +106,7 @@ try:
                + " --pixels_in_y="       + str(pixels_in_y)
                + " --subpixel_accuracy=" + str(subpixel_accuracy)
                + " --update_factor="     + str(update_factor)
+               + " --threads="           + str(threads)
                , shell=True)
 except CalledProcessError:
             sys.exit(-1)
@@ -109,35 +122,19 @@ try:
     check_call("mctf correlate"
                + " --block_overlaping="  + str(block_overlaping)
                + " --block_size="        + str(block_size)
-               + " --even_fn="           + "even_"        + str(temporal_subband)
+               + " --even_fn="           + even_fn
                + " --frame_types_fn="    + "frame_types_" + str(temporal_subband)
                + " --high_fn="           + "high_"        + str(temporal_subband)
                + " --motion_in_fn="      + "motion_"      + str(temporal_subband)
-               + " --odd_fn="            + "odd_"         + str(temporal_subband)
+               + " --odd_fn="            + odd_fn
+               + " --interleaved=1"
                + " --pictures="          + str(pictures)
                + " --pixels_in_x="       + str(pixels_in_x)
                + " --pixels_in_y="       + str(pixels_in_y)
                + " --search_range="      + str(search_range)
                + " --subpixel_accuracy=" + str(subpixel_accuracy)
+               + " --threads="           + str(threads)
                , shell=True)
 except CalledProcessError:
             sys.exit(-1)
 
-
-
-# To monitor the execution:
-# check_call("echo end CORRELATE:: Subband: " + str(temporal_subband), shell=True)
-# check_call("echo MERGE:: Subband: "         + str(temporal_subband), shell=True)
-# raw_input("")
-
-try:
-    check_call("mctf merge"
-               + " --even="        + "even_" + str(temporal_subband)
-               + " --low="         + "low_"  + str(temporal_subband-1)
-               + " --odd="         + "odd_"  + str(temporal_subband)
-               + " --pictures="    + str(pictures)
-               + " --pixels_in_x=" + str(pixels_in_x)
-               + " --pixels_in_y=" + str(pixels_in_y)
-               , shell=True)
-except CalledProcessError:
-            sys.exit(-1)
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file temporal_gains.py
+#  Gains of the temporal subbands (see texture_compress.py).
+#
+#  The gain of a subband is the energy of the sequence of pictures
+#  which is synthesized from an impulse (a coefficient equal to 1) in
+#  this subband. The impulse is pushed through the temporal synthesis
+#  (see synthesize.py), without motion (the vectors are zero), for a
+#  number of TRLs, an update_factor and a filter. An interior picture
+#  of the subband is used, so the borders of the sequence are not
+#  taken into account.
+#
+#  The slopes of the subbands are computed by default with the gains
+#  measured for 2 to 8 TRLs (see MEASURED), and with the synthesis
+#  gains for other numbers of TRLs or when they are selected (see
+#  offsets()). The synthesis gains can be cached per configuration in
+#  the file given by MCTF_GAINS_CACHE.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package temporal_gains
+#  Gains of the temporal subbands.
+
+import os
+import math
+
+## Weights of the previous and the next picture in the prediction
+#  step and weights (multiplied by the update_factor) of the previous
+#  and the next residue in the update step, per filter. "5/3" is the
+#  bidirectional filter of decorrelate.py and update.py. "Haar" only
+#  uses the previous picture (with update_factor = 1/4, L = (A+B)/2).
+FILTERS = {"5/3": ((0.5, 0.5), (1.0, 1.0)),
+           "Haar": ((1.0, 0.0), (0.0, 2.0))}
+
+## GOPs of the synthesized sequence. Enough to reach the borders only
+#  with negligible energy.
+GOPs = 16
+
+## File of the cache (None = the gains are not stored).
+CACHE = os.environ.get("MCTF_GAINS_CACHE")
+
+## Gains measured for each number of TRLs, [L/H_{TRLs-1}, ..., L/H_1]
+#  (for example, [L2/H2, L2/H1] for 3 TRLs). The distance between the
+#  slope of the subband L and the slope of a subband H is proportional
+#  to its gain (see measured_offsets()).
+MEASURED = {
+    2 : [1.2460784922], # [L1/H1]
+    3 : [1.8652117304, 1.2500103877], # [L2/H2, L2/H1]
+    4 : [1.1598810146, 2.1224082769, 3.1669663339],
+    5 : [1.0877939347, 2.1250255455, 3.8884779989, 5.8022196044],
+    6 : [1.0456562538, 2.0788785438, 4.0611276369, 7.4312544148, 11.0885981772],
+    7 : [1.0232370223, 2.0434169985, 4.0625355976, 7.9362383342, 14.5221257323, 21.6692913386],
+    8 : [1.0117165706, 2.0226778348, 4.0393126714, 8.0305936232, 15.6879129862, 28.7065276104, 42.8346456693]
+}
+
+## Distance in the slopes between subbands per unit of measured gain.
+MEASURED_STEP = 256 / math.sqrt(2)
+
+## Gains already computed (or read from the cache).
+_cache = None
+
+## One level of the temporal synthesis (the inverse of the update and
+#  the prediction steps). The pictures are constant, so each one is a
+#  number.
+#  @param low The low-frequency pictures (n+1 pictures).
+#  @param high The high-frequency pictures (n pictures).
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @return The 2n+1 pictures.
+def synthesize(low, high, update_factor, filter="5/3"):
+    (p_prev, p_next), (u_prev, u_next) = FILTERS[filter]
+    even = [float(l) for l in low]
+    # Un-update: the residue at the right (next) and at the left
+    # (prev) of each even picture.
+    for i, h in enumerate(high):
+        even[i] -= update_factor * u_next * h
+        even[i + 1] -= update_factor * u_prev * h
+    # Un-predict.
+    odd = [h + p_prev * even[i] + p_next * even[i + 1] for i, h in enumerate(high)]
+    pictures = [even[0]]
+    for o, e in zip(odd, even[1:]):
+        pictures += [o, e]
+    return pictures
+
+## Number of pictures of each subband of a sequence.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param pictures Number of pictures of the sequence (odd).
+#  @return The pictures of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def lengths(TRLs, pictures):
+    high = []
+    for subband in range(1, TRLs):
+        high.insert(0, pictures // 2)
+        pictures = pictures - pictures // 2
+    return [pictures] + high
+
+## Synthesis gains of the temporal subbands.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @return The gains of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def synthesis_gains(TRLs, update_factor=1.0/4, filter="5/3"):
+    sizes = lengths(TRLs, GOPs * (1 << (TRLs - 1)) + 1)
+    gains = []
+    for impulse in range(len(sizes)):
+        subbands = [[0.0] * size for size in sizes]
+        subbands[impulse][sizes[impulse] // 2] = 1.0
+        pictures = subbands[0]
+        for high in subbands[1:]:
+            pictures = synthesize(pictures, high, update_factor, filter)
+        gains.append(sum(p * p for p in pictures))
+    return gains
+
+## Key of a configuration in the cache.
+def _key(TRLs, update_factor, filter):
+    return "{} {!r} {}".format(TRLs, float(update_factor), filter)
+
+## Reads the cache (once).
+def _read_cache():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if CACHE is None:
+            return _cache
+        try:
+            with open(CACHE) as f:
+                for line in f:
+                    key, gains = line.rsplit(":", 1)
+                    _cache[key] = [float(g) for g in gains.split()]
+        except (IOError, OSError, ValueError):
+            pass
+    return _cache
+
+## Synthesis gains of the temporal subbands, computed only once per
+#  configuration.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @return The gains of [L_{TRLs-1}, H_{TRLs-1}, ..., H_1].
+def gains(TRLs, update_factor=1.0/4, filter="5/3"):
+    cache = _read_cache()
+    key = _key(TRLs, update_factor, filter)
+    if key not in cache:
+        cache[key] = synthesis_gains(TRLs, update_factor, filter)
+        if CACHE is not None:
+            try:
+                with open(CACHE, "a") as f:
+                    f.write(key + ":" + " ".join(repr(g) for g in cache[key]) + "\n")
+            except (IOError, OSError):
+                pass
+    return cache[key]
+
+## Gains of the high-frequency subbands relative to the low-frequency
+#  subband, as used by texture_compress.py to compute the slopes.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @return The ratios [L/H_{TRLs-1}, ..., L/H_1].
+def ratios(TRLs, update_factor=1.0/4, filter="5/3"):
+    g = gains(TRLs, update_factor, filter)
+    return [g[0] / h for h in g[1:]]
+
+## Distances between the slope of the subband L and the slopes of the
+#  high-frequency subbands. The gains are energies, so the distance is
+#  256 per octave of the ratio (as the slopes of the codecs).
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @return The distances [H_{TRLs-1}, ..., H_1].
+def slope_offsets(TRLs, update_factor=1.0/4, filter="5/3"):
+    return [256 * math.log(r, 2) for r in ratios(TRLs, update_factor, filter)]
+
+## Distances between the slope of the subband L and the slopes of the
+#  high-frequency subbands, with the measured gains (see MEASURED).
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @return The distances [H_{TRLs-1}, ..., H_1] (None if the gains
+#  have not been measured for the TRLs).
+def measured_offsets(TRLs):
+    if TRLs not in MEASURED:
+        return None
+    return [MEASURED_STEP * g for g in MEASURED[TRLs]]
+
+## Distances between the slope of the subband L and the slopes of the
+#  high-frequency subbands, as used by texture_compress.py.
+#  @param TRLs Number of Temporal Resolution Levels.
+#  @param update_factor Weight of the update step.
+#  @param filter Name of the filter (see FILTERS).
+#  @param gains "measured" (the synthesis gains are used if they have
+#  not been measured for the TRLs) or "synthesis".
+#  @return The distances [H_{TRLs-1}, ..., H_1].
+def offsets(TRLs, update_factor=1.0/4, filter="5/3", gains="measured"):
+    if TRLs < 2:
+        return []
+    if gains == "measured" and TRLs in MEASURED:
+        return measured_offsets(TRLs)
+    return slope_offsets(TRLs, update_factor, filter)
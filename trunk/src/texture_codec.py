@@ -0,0 +1,489 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file texture_codec.py
+#  Texture codecs: compress a plane (a component of a picture) into a
+#  codestream with quality layers, and decompress (the first layers
+#  of) a codestream into a plane.
+#
+#  The planes are NumPy arrays of 8-bit samples (rows x columns). The
+#  codecs are:\n
+#  - "j2k": Kakadu (kdu_compress and kdu_expand).
+#  - "openjpeg": OpenJPEG (libopenjp2, or image_to_j2k and
+#    j2k_to_image).
+#  - "numpy": a reference codec, written with NumPy, which needs no
+#    external programs (see reference_codec). Its codestreams are not
+#    J2K, so it is not installed as a codec of mctf (there is no
+#    texture_*_fb_numpy); it is used in process.
+#
+#  The drivers texture_compress_fb.py and texture_expand_fb.py use a
+#  codec (MCTF_TEXTURE_CODEC) to compress and expand the subbands.
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package texture_codec
+#  Texture codecs: compress a plane into a codestream with quality
+#  layers, and decompress (the first layers of) a codestream.
+
+import os
+import abc
+import math
+import zlib
+import struct
+import shutil
+import tempfile
+import codestream
+import libopenjp2
+from subprocess import check_call
+
+try:
+    import numpy
+except ImportError:
+    ## NumPy is not available.
+    numpy = None
+
+## Slope of the first quality layer which is coded without loss with
+#  the reference codec.
+SLOPE_LOSSLESS = 43000
+## Increment of the slope which removes a bit-plane (the distortion
+#  is multiplied by 4 and the slopes are 256*log2 of the ratio
+#  distortion/length).
+SLOPE_PER_PLANE = 512
+
+## A texture codec. encode(), decode() and sizes() are abstract.
+class TextureCodec:
+    __metaclass__ = abc.ABCMeta
+
+    ## Name of the codec.
+    name = ""
+    ## Extension of the codestreams.
+    extension = ""
+
+    ## Configures the codec.
+    # @param self Refers to object.
+    # @param Clevels Number of levels of the spatial DWT.
+    def __init__(self, Clevels=4):
+        if numpy is None:
+            raise ImportError("%s: install the numpy package" % self.name)
+        ## Number of levels of the spatial DWT.
+        self.Clevels = Clevels
+
+    ## Compresses a plane.
+    # @param self Refers to object.
+    # @param plane The plane (a NumPy array of bytes).
+    # @param slopes The slope of each quality layer (a list).
+    # @return The codestream (a string).
+    @abc.abstractmethod
+    def encode(self, plane, slopes):
+        pass
+
+    ## Decompresses a codestream.
+    # @param self Refers to object.
+    # @param data The codestream.
+    # @param shape Rows and columns of the plane.
+    # @param layers Number of quality layers to decode (None = all).
+    # @return The plane.
+    @abc.abstractmethod
+    def decode(self, data, shape, layers=None):
+        pass
+
+    ## Sizes of a codestream.
+    # @param self Refers to object.
+    # @param data The codestream.
+    # @return The bytes of the header and the end of each quality
+    #  layer (relative to the beginning of the codestream).
+    @abc.abstractmethod
+    def sizes(self, data):
+        pass
+
+    ## Bytes without headers of each quality layer and resolution
+    #  level of a codestream (see container.entry). By default, each
+    #  layer has one resolution level with the bytes between its end
+    #  and the end of the previous layer.
+    # @param self Refers to object.
+    # @param data The codestream.
+    # @return A list per layer with the bytes of each resolution level.
+    def layer_bytes(self, data):
+        header, ends = self.sizes(data)
+        return [[end - start] for start, end in zip([header] + ends[:-1], ends)]
+
+## Runs a codec which works with files in a temporal directory.
+class external_codec(TextureCodec):
+
+    ## Creates a temporal directory in the working directory.
+    # @param self Refers to object.
+    # @return The name of the directory.
+    def workspace(self):
+        return tempfile.mkdtemp(prefix=self.name + "_", dir=".")
+
+## Kakadu (an adapter of kdu_compress and kdu_expand).
+class kakadu_codec(external_codec):
+    name = "j2k"
+    extension = "j2c"
+
+    def encode(self, plane, slopes):
+        path = self.workspace()
+        try:
+            raw = os.path.join(path, "plane.rawl")
+            j2c = os.path.join(path, "plane.j2c")
+            plane.astype(numpy.uint8).tofile(raw)
+            check_call("trace kdu_compress"
+                       + " -i "          + raw
+                       + " -o "          + j2c
+                       + " Creversible=" + "no"
+                       + " -slope "      + ",".join(map(str, slopes))
+                       + " -no_weights"
+                       + " Sprecision="  + "8"
+                       + " Ssigned="     + "no"
+                       + " Sdims='{'"    + str(plane.shape[0]) + "," + str(plane.shape[1]) + "'}'"
+                       + " Clevels="     + str(self.Clevels)
+                       + " Clayers="     + str(len(slopes))
+                       + " Cuse_sop="    + "yes"
+                       , shell=True)
+            with open(j2c, "rb") as f:
+                return f.read()
+        finally:
+            shutil.rmtree(path)
+
+    def decode(self, data, shape, layers=None):
+        if layers == 0:
+            return neutral(shape)
+        path = self.workspace()
+        try:
+            raw = os.path.join(path, "plane.rawl")
+            j2c = os.path.join(path, "plane.j2c")
+            with open(j2c, "wb") as f:
+                f.write(data)
+            check_call("trace kdu_expand"
+                       + " -i " + j2c
+                       + " -o " + raw
+                       + ("" if layers is None else " -layers " + str(layers))
+                       , shell=True)
+            return numpy.fromfile(raw, dtype=numpy.uint8).reshape(shape)
+        finally:
+            shutil.rmtree(path)
+
+    def sizes(self, data):
+        return codestream.header_size(data), codestream.codestream(data).layer_ends()
+
+    def layer_bytes(self, data):
+        return codestream.codestream(data).layer_bytes()
+
+## OpenJPEG. The planes are compressed in memory with libopenjp2 (see
+#  libopenjp2.py) or, if the library is not available, with
+#  image_to_j2k and j2k_to_image. OpenJPEG has no slopes: each slope
+#  is converted into the PSNR of its layer (see slope_to_psnr).
+class openjpeg_codec(kakadu_codec):
+    name = "openjpeg"
+    extension = "j2c"
+
+    ## The PSNR of the layers.
+    # @param self Refers to object.
+    # @param slopes The slope of each quality layer.
+    # @return The PSNR of each layer (increasing).
+    def psnrs(self, slopes):
+        psnrs = []
+        for slope in sorted(slopes, reverse=True):
+            psnr = slope_to_psnr(slope)
+            if psnrs and psnr <= psnrs[-1]:
+                psnr = psnrs[-1] + 0.01
+            psnrs.append(psnr)
+        return psnrs
+
+    def encode(self, plane, slopes):
+        if libopenjp2.library() is not None:
+            return libopenjp2.encode(plane, self.psnrs(slopes), self.Clevels + 1)
+        path = self.workspace()
+        try:
+            pgm = os.path.join(path, "plane.pgm")
+            j2c = os.path.join(path, "plane.j2c")
+            write_pgm(pgm, plane)
+            check_call("trace image_to_j2k"
+                       + " -i " + pgm
+                       + " -o " + j2c
+                       + " -q " + ",".join("%.2f" % psnr for psnr in self.psnrs(slopes))
+                       + " -n " + str(self.Clevels + 1)
+                       + " -I"
+                       + " -SOP"
+                       , shell=True)
+            with open(j2c, "rb") as f:
+                return f.read()
+        finally:
+            shutil.rmtree(path)
+
+    def decode(self, data, shape, layers=None):
+        if layers == 0:
+            return neutral(shape)
+        if libopenjp2.library() is not None:
+            return libopenjp2.decode(data, layers).reshape(shape)
+        path = self.workspace()
+        try:
+            pgm = os.path.join(path, "plane.pgm")
+            j2c = os.path.join(path, "plane.j2c")
+            with open(j2c, "wb") as f:
+                f.write(data)
+            check_call("trace j2k_to_image"
+                       + " -i " + j2c
+                       + " -o " + pgm
+                       + ("" if layers is None else " -l " + str(layers))
+                       , shell=True)
+            return read_pgm(pgm).reshape(shape)
+        finally:
+            shutil.rmtree(path)
+
+## PSNR of a slope: the quantization of the slope (see SLOPE_LOSSLESS
+#  and SLOPE_PER_PLANE) removes bit-planes, with a step "2^planes" and
+#  an error of "step^2/12".
+#  @param slope The slope.
+#  @return The PSNR (dB).
+def slope_to_psnr(slope):
+    planes = max(float(slope - SLOPE_LOSSLESS) / SLOPE_PER_PLANE, 0.0)
+    return 10.0 * math.log10(255.0 ** 2 * 12.0) - 20.0 * math.log10(2.0) * planes
+
+## A neutral plane (all the samples are 128).
+#  @param shape Rows and columns of the plane.
+#  @return The plane.
+def neutral(shape):
+    plane = numpy.empty(shape, dtype=numpy.uint8)
+    plane.fill(128)
+    return plane
+
+## Writes a plane in a (binary) PGM file.
+#  @param file_name Name of the file.
+#  @param plane The plane.
+def write_pgm(file_name, plane):
+    with open(file_name, "wb") as f:
+        f.write(b"P5\n%d %d\n255\n" % (plane.shape[1], plane.shape[0]))
+        f.write(plane.astype(numpy.uint8).tobytes())
+
+## Reads a (binary) PGM file.
+#  @param file_name Name of the file.
+#  @return The plane.
+def read_pgm(file_name):
+    with open(file_name, "rb") as f:
+        data = f.read()
+    fields = []
+    i = 0
+    while len(fields) < 4:
+        while data[i:i + 1].isspace():
+            i += 1
+        if data[i:i + 1] == b"#":
+            i = data.index(b"\n", i)
+            continue
+        j = i
+        while not data[j:j + 1].isspace():
+            j += 1
+        fields.append(data[i:j])
+        i = j
+    columns, rows = int(fields[1]), int(fields[2])
+    return numpy.frombuffer(data, dtype=numpy.uint8, count=rows * columns,
+                            offset=i + 1).reshape(rows, columns)
+
+## Forward 5/3 (integer) lifting of the last axis of an array.
+#  @param x The array (of integers).
+#  @return The low-pass and the high-pass coefficients.
+def analyze_53(x):
+    s = x[..., 0::2].copy()
+    d = x[..., 1::2].copy()
+    n = d.shape[-1]
+    if n == 0:
+        return s, d
+    # Symmetric extension at both ends.
+    right = numpy.concatenate((s[..., 1:], s[..., -1:]), axis=-1)[..., :n]
+    d -= (s[..., :n] + right) >> 1
+    left = numpy.concatenate((d[..., :1], d), axis=-1)[..., :s.shape[-1]]
+    right = numpy.concatenate((d, d[..., -1:]), axis=-1)[..., :s.shape[-1]]
+    s += (left + right + 2) >> 2
+    return s, d
+
+## Inverse 5/3 (integer) lifting of the last axis of an array.
+#  @param s The low-pass coefficients.
+#  @param d The high-pass coefficients.
+#  @return The array.
+def synthesize_53(s, d):
+    n = d.shape[-1]
+    x = numpy.empty(s.shape[:-1] + (s.shape[-1] + n,), dtype=s.dtype)
+    if n == 0:
+        x[...] = s
+        return x
+    left = numpy.concatenate((d[..., :1], d), axis=-1)[..., :s.shape[-1]]
+    right = numpy.concatenate((d, d[..., -1:]), axis=-1)[..., :s.shape[-1]]
+    s = s - ((left + right + 2) >> 2)
+    right = numpy.concatenate((s[..., 1:], s[..., -1:]), axis=-1)[..., :n]
+    x[..., 0::2] = s
+    x[..., 1::2] = d + ((s[..., :n] + right) >> 1)
+    return x
+
+## 2D DWT (Mallat decomposition) of a plane.
+#  @param plane The plane (integers).
+#  @param levels Number of levels.
+#  @return The coefficients (an array with the shape of the plane).
+def forward_dwt(plane, levels):
+    c = plane.astype(numpy.int32)
+    rows, columns = c.shape
+    for level in range(levels):
+        if rows < 2 or columns < 2:
+            break
+        s, d = analyze_53(c[:rows, :columns])
+        c[:rows, :columns] = numpy.concatenate((s, d), axis=1)
+        s, d = analyze_53(c[:rows, :columns].T)
+        c[:rows, :columns] = numpy.concatenate((s, d), axis=1).T
+        rows, columns = (rows + 1) // 2, (columns + 1) // 2
+    return c
+
+## Inverse 2D DWT.
+#  @param c The coefficients.
+#  @param levels Number of levels.
+#  @return The plane (integers).
+def inverse_dwt(c, levels):
+    c = c.copy()
+    shapes = []
+    rows, columns = c.shape
+    for level in range(levels):
+        if rows < 2 or columns < 2:
+            break
+        shapes.append((rows, columns))
+        rows, columns = (rows + 1) // 2, (columns + 1) // 2
+    for rows, columns in reversed(shapes):
+        half = (rows + 1) // 2
+        t = c[:rows, :columns].T
+        c[:rows, :columns] = synthesize_53(t[:, :half], t[:, half:]).T
+        half = (columns + 1) // 2
+        t = c[:rows, :columns]
+        c[:rows, :columns] = synthesize_53(t[:, :half], t[:, half:])
+    return c
+
+## A reference codec (a 5/3 DWT and a bit-plane coder), written with
+#  NumPy.
+#
+#  The coefficients of the DWT are coded by bit-planes, from the most
+#  significant one. A bit-plane is the bit of the magnitude of each
+#  coefficient, followed by the sign of the coefficients which become
+#  significant, compressed with zlib. Each quality layer adds the
+#  bit-planes down to the one selected by its slope (see
+#  SLOPE_LOSSLESS and SLOPE_PER_PLANE). The codestream is:\n
+#  - "MCTN" (4 bytes).
+#  - Rows and columns (2 bytes each), DWT levels, bit-planes and
+#    layers (1 byte each).
+#  - For each layer: its last bit-plane (1 byte) and its end (4 bytes).
+#  - For each bit-plane: its length (4 bytes) and its data.
+#
+#  All the integers are little endian. It is not compatible with J2K.
+class reference_codec(TextureCodec):
+    name = "numpy"
+    extension = "mtn"
+
+    ## Identifier of the codestreams.
+    MAGIC = b"MCTN"
+    ## Format of the beginning of the header.
+    HEADER = "<4sHHBBB"
+    ## Format of a layer in the header.
+    LAYER = "<BI"
+
+    ## Last bit-plane of a layer.
+    # @param self Refers to object.
+    # @param slope The slope of the layer.
+    # @param planes Number of bit-planes.
+    # @return The bit-plane.
+    def last_plane(self, slope, planes):
+        plane = int(round(float(slope - SLOPE_LOSSLESS) / SLOPE_PER_PLANE))
+        return min(max(plane, 0), planes)
+
+    def encode(self, plane, slopes):
+        c = forward_dwt(plane.astype(numpy.int32) - 128, self.Clevels).ravel()
+        magnitudes = numpy.abs(c)
+        signs = c < 0
+        planes = int(magnitudes.max()).bit_length()
+        # The layers, from the lowest quality (the highest slope).
+        lasts = [self.last_plane(s, planes) for s in sorted(slopes, reverse=True)]
+        lasts = [min(lasts[:i + 1]) for i in range(len(lasts))]
+        chunks = []
+        for bit in range(planes - 1, min(lasts + [planes]) - 1, -1):
+            bits = (magnitudes >> bit) & 1
+            new = (magnitudes >> bit) == 1
+            data = zlib.compress(numpy.packbits(bits).tobytes()
+                                 + numpy.packbits(signs[new]).tobytes(), 9)
+            chunks.append(struct.pack("<I", len(data)) + data)
+        header = struct.calcsize(self.HEADER) + struct.calcsize(self.LAYER) * len(lasts)
+        # The chunks are sorted by bit-plane, from the most significant.
+        layers = [(last, header + sum(len(c) for c in chunks[:planes - last])) for last in lasts]
+        return struct.pack(self.HEADER, self.MAGIC, plane.shape[0], plane.shape[1],
+                           self.Clevels, planes, len(layers)) \
+            + b"".join(struct.pack(self.LAYER, last, end) for last, end in layers) \
+            + b"".join(chunks)
+
+    ## Parses the header of a codestream.
+    # @param self Refers to object.
+    # @param data The codestream.
+    # @return The rows, the columns, the DWT levels, the bit-planes and
+    #  the layers (last bit-plane, end).
+    def parse(self, data):
+        size = struct.calcsize(self.HEADER)
+        magic, rows, columns, levels, planes, n = struct.unpack(self.HEADER, data[:size])
+        if magic != self.MAGIC:
+            raise ValueError("not a %s codestream" % self.name)
+        step = struct.calcsize(self.LAYER)
+        layers = [struct.unpack(self.LAYER, data[size + i * step:size + (i + 1) * step])
+                  for i in range(n)]
+        return rows, columns, levels, planes, layers
+
+    def decode(self, data, shape, layers=None):
+        rows, columns, levels, planes, header_layers = self.parse(data)
+        if (rows, columns) != tuple(shape):
+            raise ValueError("%s: the plane is %dx%d" % (self.name, rows, columns))
+        if layers is None:
+            layers = len(header_layers)
+        # The bit-planes of the first layers (which are in the data).
+        last = header_layers[layers - 1][0] if layers > 0 else planes
+        n = rows * columns
+        magnitudes = numpy.zeros(n, dtype=numpy.int32)
+        signs = numpy.zeros(n, dtype=bool)
+        i = struct.calcsize(self.HEADER) + struct.calcsize(self.LAYER) * len(header_layers)
+        bit = planes
+        while bit > last and i + 4 <= len(data):
+            length, = struct.unpack("<I", data[i:i + 4])
+            if i + 4 + length > len(data):
+                break
+            chunk = zlib.decompress(data[i + 4:i + 4 + length])
+            i += 4 + length
+            bit -= 1
+            bits = numpy.unpackbits(numpy.frombuffer(chunk, dtype=numpy.uint8, count=(n + 7) // 8))[:n]
+            new = (magnitudes == 0) & (bits == 1)
+            count = int(new.sum())
+            signs[new] = numpy.unpackbits(numpy.frombuffer(chunk, dtype=numpy.uint8,
+                                                           offset=(n + 7) // 8))[:count] == 1
+            magnitudes = (magnitudes << 1) | bits
+        # Reconstruction at the middle of the interval of uncertainty.
+        magnitudes <<= bit
+        if bit > 0:
+            magnitudes[magnitudes > 0] += 1 << (bit - 1)
+        c = numpy.where(signs, -magnitudes, magnitudes).reshape(rows, columns)
+        return numpy.clip(inverse_dwt(c, levels) + 128, 0, 255).astype(numpy.uint8)
+
+    def sizes(self, data):
+        layers = self.parse(data)[4]
+        return struct.calcsize(self.HEADER) + struct.calcsize(self.LAYER) * len(layers), \
+            [end for last, end in layers]
+
+## The codecs, by name.
+codecs = dict((c.name, c) for c in (kakadu_codec, openjpeg_codec, reference_codec))
+
+## Creates a codec.
+#  @param name Name of the codec.
+#  @param Clevels Number of levels of the spatial DWT.
+#  @return The codec.
+def create(name, Clevels=4):
+    if name not in codecs:
+        raise ValueError("unknown texture codec \"%s\" (%s)" % (name, ", ".join(sorted(codecs))))
+    return codecs[name](Clevels)
+
+## The codec selected with the environment variable
+#  MCTF_TEXTURE_CODEC.
+#  @param Clevels Number of levels of the spatial DWT.
+#  @return The codec.
+def selected(Clevels=4):
+    return create(os.environ["MCTF_TEXTURE_CODEC"], Clevels)
@@ -29,6 +29,7 @@ import os
 import sys
 import display
 import math
+import temporal_gains
 from GOP import GOP
 from subprocess import check_call
 from subprocess import CalledProcessError
@@ -61,6 +62,19 @@ quantization         = "45000"
 TRLs                 = 4
 ## Number of Spatia Resolution Levels.
 SRLs                 = 5
+## Weight of the update step.
+update_factor        = 1.0/4
+## Filter of the temporal transform (see temporal_gains.py).
+temporal_filter      = "5/3"
+## Gains of the subbands: "measured" (for 2 to 8 TRLs, see
+#  temporal_gains.MEASURED, and the synthesis gains for other TRLs) or
+#  "synthesis" (computed for the TRLs, the update_factor and the
+#  filter, see temporal_gains.py).
+gains                = "measured"
+## Slope of the first quality layer of each subband ([L4, H4, H3, H2,
+#  H1]). If it is not given, the slopes are computed from the
+#  quantization and the gains.
+slopes               = ""
 
 ## The parser module provides an interface to Python's internal parser
 ## and byte-code compiler.
@@ -73,6 +87,10 @@ parser.quantization(quantization)
 parser.quantization_step(quantization_step)
 parser.TRLs(TRLs)
 parser.SRLs(SRLs)
+parser.update_factor(update_factor)
+parser.add_argument("--temporal_filter", help="filter of the temporal transform ({}). (Default = {})".format(", ".join(sorted(temporal_gains.FILTERS)), temporal_filter))
+parser.add_argument("--gains", help="gains of the subbands (synthesis or measured). (Default = {})".format(gains))
+parser.add_argument("--slopes", help="slope of the first quality layer of each subband, from L to H1 (see rate_control.py). (Default = {})".format(slopes))
 
 ## A script may only parse a few of the command-line arguments,
 ## passing the remaining arguments on to another script or program.
@@ -93,6 +111,14 @@ if args.TRLs:
     TRLs = int(args.TRLs)
 if args.SRLs:
     SRLs = int(args.SRLs)
+if args.update_factor:
+    update_factor = float(args.update_factor)
+if args.temporal_filter:
+    temporal_filter = args.temporal_filter
+if args.gains:
+    gains = args.gains
+if args.slopes:
+    slopes = args.slopes
 
 
 # print "texture_compress.py ; Q= " + str(quantization)
@@ -109,29 +135,8 @@ pictures = GOPs * GOP_size + 1
 # QUALITY SCALABILITY by GAINS.
 #------------------------------
 
-# GAINS per subband. Example: [L4, H4, H3, H2, H1] as energy.
-#------------------------------------------------------------
-if   TRLs == 1 :
-    pass
-elif TRLs == 2 :
-    ## Gains per subband.
-    GAINS = [1.2460784922] # [L1/H1]
-elif TRLs == 3 :
-    GAINS = [1.8652117304, 1.2500103877] # [L2/H2, L2/H1]
-elif TRLs == 4 :
-    GAINS = [1.1598810146, 2.1224082769, 3.1669663339]
-elif TRLs == 5 :
-    GAINS = [1.0877939347, 2.1250255455, 3.8884779989, 5.8022196044]
-elif TRLs == 6 :
-    GAINS = [1.0456562538, 2.0788785438, 4.0611276369, 7.4312544148, 11.0885981772]
-elif TRLs == 7 :
-    GAINS = [1.0232370223, 2.0434169985, 4.0625355976, 7.9362383342, 14.5221257323, 21.6692913386]
-elif TRLs == 8 :
-    GAINS = [1.0117165706, 2.0226778348, 4.0393126714, 8.0305936232, 15.6879129862, 28.7065276104, 42.8346456693]
-else :
-    check_call("Gains are not available for " + str(TRLs) + " TRLs. Enter them in texture_compress.py")
-    exit (0)
-
+if gains == "measured" and TRLs > 1 and TRLs not in temporal_gains.MEASURED:
+    display.log_info("texture_compress: gains have not been measured for " + str(TRLs) + " TRLs, using the synthesis gains\n")
 
 ## Slope distance for each quality layer in the same subband. If a
 ## quantization_step is specified by parameter, one proportional to
@@ -144,8 +149,11 @@ if quantization_step == 0 and nLayers > 1 :
 #size_proportion = ( quantization_step * math.sqrt(2) ) / 256
 #quantization_step_subband = quantization_step / size_proportion
 
-## Distance in the quantization step, between different subbands.
-quantization_step_subband = 256 / math.sqrt(2)
+## Slope distance between the subband L and each subband H, in the
+#  order [H4, H3, H2, H1]. For the measured gains, the distance is
+#  proportional to the gain (256/sqrt(2) per unit). For the synthesis
+#  gains, see temporal_gains.slope_offsets().
+OFFSETS = temporal_gains.offsets(TRLs, update_factor, temporal_filter, gains)
 
 ## Determines a slope for each subband, according to the gains of the
 #  number of TLRs the codestream. The order of subbands in the list is
@@ -155,7 +163,14 @@ quantization_step_subband = 256 / math.sqrt(2)
 #---------------------------------------------------------------------
 SLOPES = [[int(quantization)]]   # Subband L
 for sub in range (0, TRLs-1) :   # Subbands Hs with GAINS
-    SLOPES.append( [ int(round( SLOPES[0][0] + (quantization_step_subband * GAINS[sub]) )) ] )
+    SLOPES.append( [ int(round( SLOPES[0][0] + OFFSETS[sub] )) ] )
+
+# Slopes given by parameter (for example, by the bit-rate control).
+#------------------------------------------------------------------
+if slopes :
+    SLOPES = [[int(s)] for s in slopes.split(',')]
+    if len(SLOPES) != TRLs :
+        display.error("texture_compress: " + str(TRLs) + " slopes are required (one per subband)\n")
 
 
 # Determines a slope for each quality layer in the same subband.
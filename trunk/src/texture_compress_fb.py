@@ -0,0 +1,146 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file texture_compress_fb.py
+#  Compress textures, using a texture codec (see texture_codec.py) in
+#  the same process. The three components (Y, U and V) of each picture
+#  are compressed and stored in the container of the subband (see
+#  container.py).
+#
+#  It is installed as texture_compress_fb_<codec> for the codecs
+#  which have no specific script (for example, "openjpeg").
+#
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package texture_compress_fb
+#  Compress textures, using a texture codec in the same process.
+
+import os
+import display
+import container
+import texture_codec
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from MCTF_parser import MCTF_parser
+
+## Name of the codec.
+codec         = os.environ.get("MCTF_TEXTURE_CODEC", "openjpeg")
+## File that contains the textures.
+file          = ""
+## Number of images to process.
+pictures      = 33
+## Width of the pictures.
+pixels_in_x   = 352
+## Height of the pictures.
+pixels_in_y   = 288
+## Controls the quality level and the bit-rate of the code-stream.
+quantization  = 45000
+## Current temporal iteration.
+subband       = 0
+## Number of Spatial Resolution Levels.
+SRLs          = 5
+## Number of layers.
+nLayers       = 5
+## Number of components compressed concurrently.
+threads       = cpu_count()
+
+## The parser module provides an interface to Python's internal parser
+## and byte-code compiler.
+parser = MCTF_parser(description="Compress the texture data using a texture codec.")
+parser.add_argument("--codec",   help="texture codec ({}). Default = {})".format(", ".join(sorted(texture_codec.codecs)), codec))
+parser.add_argument("--file",    help="file that contains the textures data. Default = {})".format(file))
+parser.add_argument("--nLayers", help="Number of layers. (Default = {})".format(nLayers))
+parser.add_argument("--threads", help="number of components compressed concurrently. (Default = {})".format(threads))
+parser.pictures(pictures)
+parser.pixels_in_x(pixels_in_x)
+parser.pixels_in_y(pixels_in_y)
+parser.quantization(quantization)
+parser.subband(subband)
+parser.SRLs(SRLs)
+
+## A script may only parse a few of the command-line arguments,
+## passing the remaining arguments on to another script or program.
+args = parser.parse_known_args()[0]
+if args.codec:
+    codec = args.codec
+if args.file:
+    file = args.file
+if args.nLayers:
+    nLayers = int(args.nLayers)
+if args.threads:
+    threads = int(args.threads)
+if args.pictures:
+    pictures = int(args.pictures)
+if args.pixels_in_x:
+    pixels_in_x = int(args.pixels_in_x)
+if args.pixels_in_y:
+    pixels_in_y = int(args.pixels_in_y)
+if args.quantization:
+    quantization = str(args.quantization)
+if args.subband:
+    subband = int(args.subband)
+if args.SRLs:
+    SRLs = int(args.SRLs)
+
+display.log_info("texture_compress_fb: file: " + str(file) + " subband: " + str(subband) + " codec: " + codec + "\n")
+
+## Slope of each quality layer (the last one is repeated up to
+## nLayers).
+slopes = [int(s) for s in str(quantization).split(',')]
+slopes = (slopes + slopes[-1:] * nLayers)[:max(nLayers, 1)]
+
+## The codec.
+coder = texture_codec.create(codec, max(SRLs - 1, 0))
+
+## Shape of each component of a picture.
+shapes = [("Y", (pixels_in_y, pixels_in_x)),
+          ("U", (pixels_in_y / 2, pixels_in_x / 2)),
+          ("V", (pixels_in_y / 2, pixels_in_x / 2))]
+## Size of the components 'YUV' (measured in pixels).
+YUV_size = sum(rows * columns for component, (rows, columns) in shapes)
+
+## Compresses a component of a picture.
+#  @param task The number of the picture, the name of the component
+#  and the component.
+#  @return The entry of the codestream.
+def encode(task):
+    image_number, component, plane = task
+    data = coder.encode(plane, slopes)
+    header, layers = coder.sizes(data)
+    return container.entry(image_number, component, header=header, layers=layers,
+                           layer_bytes=coder.layer_bytes(data), data=data)
+
+## The components of the pictures.
+tasks = []
+with open(file, "rb") as f:
+    image_number = 0
+    while image_number < pictures:
+        picture = texture_codec.numpy.frombuffer(f.read(YUV_size), dtype=texture_codec.numpy.uint8)
+        if picture.size < YUV_size:
+            # Exits with a non-zero status, before any output is written.
+            display.error("texture_compress_fb: \"" + file + "\" has only " + str(image_number) + " pictures.\n")
+        offset = 0
+        for component, (rows, columns) in shapes:
+            tasks.append((image_number, component,
+                          picture[offset:offset + rows * columns].reshape(rows, columns)))
+            offset += rows * columns
+        image_number += 1
+
+# The components are compressed concurrently (the codecs release the
+# GIL while they run).
+pool = ThreadPool(max(threads, 1))
+entries = pool.map(encode, tasks)
+pool.close()
+
+## File that lists the sizes of the compressed pictures (see info.py).
+file_sizes = open(file + "." + coder.extension, 'w')
+## Total size of the codestreams (without headers).
+total = 0
+for e in entries:
+    total += len(e.data) - e.header
+    if e.component == shapes[-1][0]:
+        file_sizes.write(str(total) + "\n")
+
+file_sizes.close()
+container.write(container.name(file), pictures, entries)
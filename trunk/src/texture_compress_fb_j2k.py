@@ -7,6 +7,10 @@
 #  - Demultiplexing components (Y, U y V) and 
 #  - Encode components.
 #
+#  With --multicomponent (or MCTF_J2K_MULTICOMPONENT=1), each picture
+#  is encoded as one codestream with three components (the chroma
+#  components are subsampled by 2).
+#
 #  @authors Jose Carmelo Maturana-Espinosa\n Vicente Gonzalez-Ruiz.
 #  @date Last modification: 2015, January 7.
 
@@ -15,18 +19,31 @@
 #  The two main steps performed are:
 #  - Demultiplexing components (Y, U y V) and 
 #  - Encode components.
+#
+#  With --multicomponent (or MCTF_J2K_MULTICOMPONENT=1), each picture
+#  is encoded as one codestream with three components.
 
 import shutil
 import os
 import sys
 import display
+import container
+import codestream
+import weighting
 import math
 import struct
+import array
 import subprocess  as     sub
 from   subprocess  import check_call
 from   subprocess  import CalledProcessError
 from   MCTF_parser import MCTF_parser
 
+try:
+    import numpy
+except ImportError:
+    ## NumPy is not available (the energies are computed with array).
+    numpy = None
+
 
 ## Refers to low frequency subbands.
 LOW  = "low"
@@ -55,6 +72,12 @@ SRLs          = 5
 ## Number of layers. Logarithm controls the quality level and the
 #  bit-rate of the code-stream.
 nLayers       = 5
+## Encode the three components of a picture in one codestream.
+multicomponent = os.environ.get("MCTF_J2K_MULTICOMPONENT", "0") == "1"
+## The pictures of the high frequency subbands whose energy (the mean
+#  of the squared difference between the samples and 128) is below
+#  this value are not encoded (0 = encode all the pictures).
+skip_energy   = float(os.environ.get("MCTF_SKIP_ENERGY", "0.0"))
 
 
 ## The parser module provides an interface to Python's internal parser
@@ -62,6 +85,8 @@ nLayers       = 5
 parser = MCTF_parser(description="Compress the LFB texture data using JPEG 2000.")
 parser.add_argument("--file",    help="file that contains the textures data. Default = {})".format(file))
 parser.add_argument("--nLayers", help="Number of layers. Logarithm controls the quality level and the bit-rate of the code-stream. (Default = {})".format(nLayers))
+parser.add_argument("--multicomponent", help="encode the three components of a picture in one codestream (1) or in three codestreams (0). (Default = {})".format(int(multicomponent)))
+parser.add_argument("--skip_energy", help="pictures of the high frequency subbands with a lower energy are not encoded (0 = encode all). (Default = {})".format(skip_energy))
 parser.pictures(pictures)
 parser.pixels_in_x(pixels_in_x)
 parser.pixels_in_y(pixels_in_y)
@@ -76,6 +101,10 @@ if args.file:
     file = args.file
 if args.nLayers:
     nLayers = args.nLayers
+if args.multicomponent:
+    multicomponent = int(args.multicomponent) == 1
+if args.skip_energy:
+    skip_energy = float(args.skip_energy)
 if args.pictures:
     pictures = int(args.pictures)
 if args.pixels_in_x:
@@ -107,38 +136,90 @@ if args.SRLs:
 def pondComp (image_filename) :
 
     ## Weighting coefficients for subband. For an example of 5TRLs ([H1, H2, H3, H4, L4]).
-    coef = [1, 1.4921569843, 2.7304234608, 5.3339326679, 5.8022196044]
-    ## File containing the textures before weighting coefficients.
-    f_in = open (image_filename, 'rb')
-    ## File containing the textures after weighting coefficients.
-    f_out = open (image_filename + "_multCOM", 'wb')
+    coef = weighting.COEFFICIENTS
+
+    # Some examples of weighting coefficients:
+    #-----------------------------------------
+    ## Gain of the samples.
+    gain = 1                                   # =
+    #gain = pow(2, subband-1)                  # *2^subband
+    #gain = pow(5, subband-1)                  # *5^subband
+    #gain = pow(math.sqrt(2), subband-1)       # *sqrt(2)^subband
+    #gain = coef[subband-1]                    # coef
+    #gain = pow(coef[subband-1], subband-1)    # coef^subband
+
+    # A whole plane is weighted at once. The weighted samples are
+    # written with 2 bytes (little endian), as texture_expand_fb_j2k.py
+    # reads them.
+    weighting.weight_file(image_filename, gain, 2)
+
+
+
+
+## Demultiplexing a component. The component of each picture is
+## written in a file.
+## @param component Component type. It can be: Y, U or V.
+## @param jump_demux Number of bytes of distance between the same component within the codestream.\n It is useful to locate all occurrences of a particular component and can demux components.
+## @param size_component Number of bytes of a given component. It is useful for demultiplexing.
+
+#---------------------------------------------------------------------
+def demux (component, jump_demux, size_component) :
 
     try :
-        ## An unweighted coefficient.
-        byte = f_in.read(1)
-        while byte != "" :
+        check_call("trace demux " + str(YUV_size) + jump_demux
+                   + " < " + file + ".tmp | /usr/bin/split --numeric-suffixes --suffix-length=4 --bytes="
+                   + str(size_component) + " - " + file + "_" + str(component) + "_"
+                   , shell=True)
+    except CalledProcessError :
+        sys.exit(-1)
 
-            # Some examples of weighting coefficients:
-            #-----------------------------------------
-            #data = ord(byte)                                   # =
-            #data = ord(byte) * pow(2, subband-1)               # *2^subband
-            #data = ord(byte) * pow(5, subband-1)               # *5^subband
-            #data = ord(byte) * pow(math.sqrt(2), subband-1)    # *sqrt(2)^subband
-            #data = ord(byte) * coef[subband-1]                 # coef
-            #data = ord(byte) * pow(coef[subband-1], subband-1) # coef^subband
 
-            ## A weighted coefficient.
-            bin_data = struct.pack('H', int(round(data)))
-            f_out.write(bin_data[0]) #0
-            f_out.write(bin_data[1]) #1 # Ej: 3 = bin_data[1] bin_data[0] = 00000000 00000011
 
-            byte = f_in.read(1)
 
-    finally :
-        f_in.close()
-        f_out.close()
+## Encode the three components of each picture in one codestream. The
+## chroma components are subsampled by 2 in both directions. Using
+## Kakadu software.
+## @param bits_per_component Number of bits per component. It is a constant for the entire duration.
 
-    os.rename(image_filename + "_multCOM", image_filename)
+#---------------------------------------------------------------------
+def encode_YUV (bits_per_component) :
+
+    image_number = 0
+    while image_number < pictures :
+
+        ## Names of the components of the picture.
+        names = [file + "_" + component + "_" + '%04d' % image_number for component in ('Y', 'U', 'V')]
+
+        if skipped[image_number] :
+            for name in names :
+                os.remove(name)
+            image_number += 1
+            continue
+        for name in names :
+            os.rename(name, name + ".rawl")
+
+        try :
+            check_call("trace kdu_compress"
+                       + " -i "          + ",".join([name + ".rawl" for name in names])
+                       + " -o "          + file + "_YUV_" + '%04d' % image_number + ".j2c"
+                       + " Creversible=" + "no"
+                       + " -slope "      + str(quantization)
+                       + " -no_weights"
+                       + " Sprecision="  + str(bits_per_component)
+                       + " Ssigned="     + "no"
+                       + " Sdims='{'"    + str(pixels_in_y) + "," + str(pixels_in_x) + "'}','{'"
+                                         + str(pixels_in_y/2) + "," + str(pixels_in_x/2) + "'}','{'"
+                                         + str(pixels_in_y/2) + "," + str(pixels_in_x/2) + "'}'"
+                       + " Ssampling='{'1,1'}','{'2,2'}','{'2,2'}'"
+                       + " Cycc="        + "no"
+                       + " Clevels="     + str(Clevels)
+                       + " Clayers="     + str(nLayers)
+                       + " Cuse_sop="    + "yes"
+                       , shell=True)
+        except CalledProcessError :
+            sys.exit(-1)
+
+        image_number += 1
 
 
 
@@ -154,14 +235,7 @@ def pondComp (image_filename) :
 #---------------------------------------------------------------------
 def encode (component, jump_demux, size_component, bits_per_component, sDimX, sDimY) :
 
-    # Demux.
-    try :
-        check_call("trace demux " + str(YUV_size) + jump_demux
-                   + " < " + file + ".tmp | /usr/bin/split --numeric-suffixes --suffix-length=4 --bytes="
-                   + str(size_component) + " - " + file + "_" + str(component) + "_"
-                   , shell=True)
-    except CalledProcessError :
-        sys.exit(-1)
+    demux (component, jump_demux, size_component)
 
     # Encode.
     image_number = 0
@@ -169,6 +243,11 @@ def encode (component, jump_demux, size_component, bits_per_component, sDimX, sD
 
         image_filename = file + "_" + str(component) + "_" + '%04d' % image_number
 
+        if skipped[image_number] :
+            os.remove(image_filename)
+            image_number += 1
+            continue
+
         #shutil.copy (image_filename, image_filename + '.SINmult')
         #pondComp (image_filename)
 
@@ -250,34 +329,57 @@ except CalledProcessError :
     sys.exit(-1)
 
 
+# Pictures which are not encoded.
+#--------------------------------
+
+## Pictures whose energy is below skip_energy (only in the high
+## frequency subbands, the low frequency ones are never skipped). They
+## are stored as empty codestreams, which are decoded as neutral
+## textures (see texture_expand_fb_j2k.py).
+skipped = [False] * pictures
+if skip_energy > 0.0 and os.path.basename(file).startswith(HIGH) :
+    if numpy != None :
+        ## The residues of the pictures (around 128).
+        residues = numpy.fromfile(file + ".tmp", dtype=numpy.uint8)[:pictures * YUV_size].astype(numpy.float64) - 128
+        energies = (residues.reshape(-1, YUV_size) ** 2).mean(axis=1)
+    else :
+        ## Squared residue of each value of a sample.
+        squares = [(sample - 128) ** 2 for sample in range(256)]
+        energies = []
+        with open(file + ".tmp", "rb") as f :
+            for image_number in range(pictures) :
+                samples = array.array('B', f.read(YUV_size))
+                energies.append(float(sum(map(squares.__getitem__, samples))) / max(len(samples), 1))
+    for image_number, energy in enumerate(energies) :
+        skipped[image_number] = energy < skip_energy
+    display.log_info(file + ": " + str(sum(skipped)) + " of " + str(pictures) + " pictures skipped\n")
+
+
 # Encoding each component accordingly.
 #-------------------------------------
-encode ('Y', " " + "0"                + " " + str(Y_size), Y_size, bits_per_component, pixels_in_x,   pixels_in_y)
-encode ('U', " " + str(Y_size)        + " " + str(U_size), U_size, bits_per_component, pixels_in_x/2, pixels_in_y/2)
-encode ('V', " " + str(Y_size+U_size) + " " + str(V_size), V_size, bits_per_component, pixels_in_x/2, pixels_in_y/2)
+if multicomponent :
+    demux ('Y', " " + "0"                + " " + str(Y_size), Y_size)
+    demux ('U', " " + str(Y_size)        + " " + str(U_size), U_size)
+    demux ('V', " " + str(Y_size+U_size) + " " + str(V_size), V_size)
+    encode_YUV (bits_per_component)
+else :
+    encode ('Y', " " + "0"                + " " + str(Y_size), Y_size, bits_per_component, pixels_in_x,   pixels_in_y)
+    encode ('U', " " + str(Y_size)        + " " + str(U_size), U_size, bits_per_component, pixels_in_x/2, pixels_in_y/2)
+    encode ('V', " " + str(Y_size+U_size) + " " + str(V_size), V_size, bits_per_component, pixels_in_x/2, pixels_in_y/2)
 
 
 
 
 ## Number of bytes used for the header of a file.
 
-#------------------------------------------------
-## Determines the size of the header of a codestream.
-#  @param file_name Name of the file with the motion fields.
-#  @return Bytes of the header of a codestream.
-def header (file_name) :
-    p = sub.Popen("header_size " + str(file_name) + " 2> /dev/null | grep OUT", shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
-    out, err = p.communicate()
-    return long(out[4:])
-
-
-
-# Compute file sizes.
-#--------------------
+# Compute file sizes and pack the codestreams.
+#---------------------------------------------
 
 ## File that lists the sizes of the compressed files. It is useful for
 ## calculating Kbps (see info.py).
 file_sizes   = open (file + ".j2c", 'w')
+## Codestreams of the subband, stored in one container.
+entries      = []
 ## Number of image of the current iteration.
 image_number = 0
 ## Total size of compressed files.
@@ -288,14 +390,32 @@ while image_number < pictures:
     ## Name of image of the current iteration.
     str_image_number = '%04d' % image_number
 
-    ## Size of the component 'Y' (measured in bytes, without headers).
-    Ysize  = os.path.getsize(file + "_Y_" + str_image_number + ".j2c") - header(file + "_Y_" + str_image_number + ".j2c")
-    ## Size of the component 'U' (measured in bytes, without headers).
-    Usize  = os.path.getsize(file + "_U_" + str_image_number + ".j2c") - header(file + "_U_" + str_image_number + ".j2c")
-    ## Size of the component 'V' (measured in bytes, without headers).
-    Vsize  = os.path.getsize(file + "_V_" + str_image_number + ".j2c") - header(file + "_V_" + str_image_number + ".j2c")
+    if skipped[image_number] :
+        # Empty codestreams (without header).
+        for component in (("YUV",) if multicomponent else ('Y', 'U', 'V')) :
+            entries.append(container.entry(image_number, component, data=""))
+    elif multicomponent :
+        ## Name of the codestream of the picture.
+        name  = file + "_YUV_" + str_image_number + ".j2c"
+        ## The picture (with the size of its header).
+        e     = container.codestream_entry(image_number, "YUV", name)
+        entries.append(e)
+        total = total + os.path.getsize(name) - e.header
+        # Bytes of each component (from its packets).
+        if display.log_level >= display.LOG_DEBUG :
+            display.log_debug(name + ": Y,U,V bytes = " + str(codestream.read(name).component_sizes()) + "\n")
+    else :
+        for component in ('Y', 'U', 'V') :
+            ## Name of the codestream of a component.
+            name  = file + "_" + component + "_" + str_image_number + ".j2c"
+            ## A component (with the size of its header).
+            e     = container.codestream_entry(image_number, component, name)
+            entries.append(e)
+            total = total + os.path.getsize(name) - e.header
 
-    total  = total + Ysize + Usize + Vsize
     file_sizes.write(str(total) + "\n")
 
     image_number += 1
+
+file_sizes.close()
+container.write(container.name(file), pictures, entries, remove=True)
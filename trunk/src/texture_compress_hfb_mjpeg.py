@@ -141,12 +141,11 @@ command = "(ffmpeg"\
     + " " + file + ".mjpeg >&2) 2> /dev/null"
 
 trace.write(sys.argv[0] + ": " + command + "\n")
-ifdef({{DEBUG}},
-os.system(command)
-,
-trace.write(sys.argv[0] + ": " + command + " > /dev/null\n")
-os.system(command + " > /dev/null")
-)
+if display.log_level >= display.LOG_DEBUG:
+    os.system(command)
+else:
+    trace.write(sys.argv[0] + ": " + command + " > /dev/null\n")
+    os.system(command + " > /dev/null")
 
 # YUV file to Raw file.
 command = "mv " + file + ".yuv " + file
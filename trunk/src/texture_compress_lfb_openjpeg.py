@@ -3,7 +3,7 @@
 
 import os
 import sys
-import display
+import libopenjp2
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
@@ -24,7 +24,7 @@ parser.add_argument("--file", help="file that contains the LFB data. Default = {
 parser.pictures(pictures)
 parser.pixels_in_x(pixels_in_x)
 parser.pixels_in_y(pixels_in_y)
-parser.quantizations(quantizations)
+parser.add_argument("--quantizations", help="PSNR of each quality layer, as the -q of image_to_j2k. (Default = {})".format(quantizations))
 parser.SRLs(SRLs)
 
 args = parser.parse_known_args()[0]
@@ -45,127 +45,52 @@ Y_size = pixels_in_y * pixels_in_x
 U_size = V_size = Y_size / 4
 YUV_size = Y_size + U_size + V_size
 
-# Copy only the required images
-try:
-    check_call("trace dd" +
-               " if=" + file + 
-               " of=" + file + ".tmp"
-               " bs=" + str(YUV_size) +
-               " count=" + str(pictures),
-               shell=True)
-except CalledProcessError:
-    sys.exit(-1)
-
-# Encode Y
-try:
-    check_call("trace demux " + str(YUV_size) + " 0 " + str(Y_size)
-               + " < " + file
-               + ".tmp | /usr/bin/split --numeric-suffixes --suffix-length=4 --bytes="
-               + str(Y_size) + " - " + file + "_Y_",
-               shell=True)
-except CalledProcessError:
-    sys.exit(-1)
-
-image_number = 0
-while image_number < pictures:
-
-    str_image_number = '%04d' % image_number
-    image_filename = file + "_Y_" + str_image_number
-
-    try:
-        check_call("trace rawtopgm " + str(pixels_in_x) + " " + str(pixels_in_y)
-                   + " < " + image_filename + " > "
-                   + image_filename + ".pgm",
-                   shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
+# Name, width, height and offset (in a picture) of each component.
+components = [("Y", pixels_in_x,     pixels_in_y,     0),
+              ("U", pixels_in_x / 2, pixels_in_y / 2, Y_size),
+              ("V", pixels_in_x / 2, pixels_in_y / 2, Y_size + U_size)]
+
+# The quantizations are the PSNR of the quality layers (as the "-q" of
+# image_to_j2k).
+psnrs = [float(q) for q in quantizations.split(',')]
+
+# Encode a component of a picture. The planes are compressed in memory
+# with libopenjp2 or, if the library is not available, with
+# image_to_j2k (with the same parameters: SRLs resolution levels, the
+# irreversible DWT and SOP markers).
+def encode(samples, columns, rows, image_filename):
+    if libopenjp2.library() is not None:
+        plane = libopenjp2.numpy.frombuffer(samples, dtype=libopenjp2.numpy.uint8).reshape(rows, columns)
+        with open(image_filename + ".j2c", "wb") as f:
+            f.write(libopenjp2.encode(plane, psnrs, SRLs))
+        return
+    with open(image_filename + ".pgm", "wb") as f:
+        f.write("P5\n%d %d\n255\n" % (columns, rows))
+        f.write(samples)
     try:
         check_call("trace image_to_j2k"
                    + " -i " + image_filename + ".pgm"
                    + " -o " + image_filename + ".j2c"
-                   + " -q " + quantizations
-                   + " -r " + str(SRLs),
+                   + " -q " + ",".join("%.2f" % psnr for psnr in psnrs)
+                   + " -n " + str(SRLs)
+                   + " -I"
+                   + " -SOP",
                    shell=True)
     except CalledProcessError:
         sys.exit(-1)
 
-    image_number += 1
-
-# Encode U
-try:
-    check_call("trace demux "
-               + str(YUV_size) + " " + str(Y_size) + " " + str(U_size)
-               + " < " + file
-               + ".tmp | /usr/bin/split --numeric-suffixes --suffix-length=4 --bytes="
-               + str(U_size) + " - " + file + "_U_",
-               shell=True)
-except CalledProcessError:
-    sys.exit(-1)
+# Encode Y, U and V
+with open(file, "rb") as f:
+    image_number = 0
+    while image_number < pictures:
 
-image_number = 0
-while image_number < pictures:
-
-    str_image_number = '%04d' % image_number
-    image_filename = file + "_U_" + str_image_number
+        picture = f.read(YUV_size)
+        str_image_number = '%04d' % image_number
+        for component, columns, rows, offset in components:
+            encode(picture[offset:offset + columns * rows], columns, rows,
+                   file + "_" + component + "_" + str_image_number)
 
-    try:
-        check_call("trace rawtopgm "
-                   + str(pixels_in_x/2) + " " + str(pixels_in_y/2)
-                   + " < " + image_filename
-                   + " > " + image_filename + ".pgm",shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
-    try:
-        check_call("trace image_to_j2k"
-                   + " -i " + image_filename + ".pgm"
-                   + " -o " + image_filename + ".j2c"
-                   + " -q " + quantizations
-                   + " -r " + str(SRLs),
-                   shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
-    image_number += 1
-
-# Encode V
-try:
-    check_call("trace demux " + str(YUV_size) + " " + str(U_size+Y_size)
-               + " " + str(V_size)
-               + " < " + file
-               + ".tmp | /usr/bin/split --numeric-suffixes --suffix-length=4 --bytes="
-               + str(V_size) + " - " + file + "_V_",
-               shell=True)
-except CalledProcessError:
-    sys.exit(-1)
-
-image_number = 0
-while image_number < pictures:
-
-    str_image_number = '%04d' % image_number
-    image_filename = file + "_V_" + str_image_number
-
-    try:
-        check_call("trace rawtopgm "
-                   + str(pixels_in_x/2) + " " + str(pixels_in_y/2)
-                   + " < " + image_filename
-                   + " > " + image_filename + ".pgm",
-                   shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
-    try:
-        check_call("trace image_to_j2k"
-                   + " -i " + image_filename + ".pgm"
-                   + " -o " + image_filename + ".j2c"
-                   + " -q " + quantizations
-                   + " -r " + str(SRLs),
-                   shell=True)
-    except CalledProcessError:
-        sys.exit(-1)
-
-    image_number += 1
+        image_number += 1
 
 # Compute file sizes
 file_sizes = open (file + ".j2c", 'w')
@@ -182,3 +107,4 @@ while image_number < pictures:
     file_sizes.write(str(total) + "\n")
 
     image_number += 1
+file_sizes.close()
@@ -0,0 +1,120 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+## @file texture_expand_fb.py
+#  Decompress textures, using a texture codec (see texture_codec.py)
+#  in the same process. The codestreams are read from the container of
+#  the subband (see texture_compress_fb.py).
+#
+#  If a component of a picture has no codestream, it is created with a
+#  neutral texture.
+#
+#  @authors Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package texture_expand_fb
+#  Decompress textures, using a texture codec in the same process.
+
+import os
+import display
+import container
+import texture_codec
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from MCTF_parser import MCTF_parser
+
+## Name of the codec.
+codec       = os.environ.get("MCTF_TEXTURE_CODEC", "openjpeg")
+## File that contains the textures.
+file        = ""
+## Read only the quality layers of each codestream which fit in
+#  "rate" bits/sample (0 = all the layers).
+rate        = 0.0
+## Number of images to process.
+pictures    = 33
+## Width of the pictures.
+pixels_in_x = 352
+## Height of the pictures.
+pixels_in_y = 288
+## Current temporal iteration.
+subband     = 0
+## Number of components decompressed concurrently.
+threads     = cpu_count()
+
+## The parser module provides an interface to Python's internal parser
+## and byte-code compiler.
+parser = MCTF_parser(description="Expands the texture data using a texture codec.")
+parser.add_argument("--codec", help="texture codec ({}). Default = {})".format(", ".join(sorted(texture_codec.codecs)), codec))
+parser.add_argument("--file", help="file that contains the LFB or HFB data. Default = {})".format(file))
+parser.add_argument("--threads", help="number of components decompressed concurrently. (Default = {})".format(threads))
+parser.add_argument("--rate", help="read only the layers of each code-stream which fit in \"rate\" bits/sample. Default = {})".format(rate))
+parser.pictures(pictures)
+parser.pixels_in_x(pixels_in_x)
+parser.pixels_in_y(pixels_in_y)
+parser.subband(subband)
+
+## A script may only parse a few of the command-line arguments,
+## passing the remaining arguments on to another script or program.
+args = parser.parse_known_args()[0]
+if args.codec:
+    codec = args.codec
+if args.file:
+    file = args.file
+if args.threads:
+    threads = int(args.threads)
+if args.rate:
+    rate = float(args.rate)
+if args.pictures:
+    pictures = int(args.pictures)
+if args.pixels_in_x:
+    pixels_in_x = int(args.pixels_in_x)
+if args.pixels_in_y:
+    pixels_in_y = int(args.pixels_in_y)
+if args.subband:
+    subband = int(args.subband)
+
+## The codec (the levels of the DWT are read from the codestreams).
+coder = texture_codec.create(codec)
+
+## Shape of each component of a picture.
+shapes = [("Y", (pixels_in_y, pixels_in_x)),
+          ("U", (pixels_in_y / 2, pixels_in_x / 2)),
+          ("V", (pixels_in_y / 2, pixels_in_x / 2))]
+
+## Number of quality layers of a codestream which fit in the rate.
+#  @param data The codestream.
+#  @param samples Number of samples of the plane.
+#  @return The number of layers (None = all).
+def layers(data, samples):
+    if rate <= 0.0:
+        return None
+    header, ends = coder.sizes(data)
+    return len([end for end in ends if end <= rate * samples / 8])
+
+## Codestreams of the subband (None if there is no container).
+codestreams = container.open_subband(file)
+
+## Decompresses a component of a picture.
+#  @param task The shape of the component and its codestream (None if
+#  it is not stored).
+#  @return The component.
+def decode(task):
+    shape, data = task
+    if not data:
+        # A neutral texture (also for the empty codestreams).
+        return texture_codec.neutral(shape)
+    return coder.decode(data, shape, layers(data, shape[0] * shape[1]))
+
+## The components of the pictures (the container is read by one thread).
+tasks = []
+for image_number in range(pictures):
+    for component, shape in shapes:
+        tasks.append((shape, codestreams.read(image_number, component) if codestreams != None else None))
+
+# The components are decompressed concurrently (the codecs release the
+# GIL while they run) and written in order.
+pool = ThreadPool(max(threads, 1))
+with open(file, "ab") as f:
+    for plane in pool.imap(decode, tasks):
+        f.write(plane.tobytes())
+pool.close()
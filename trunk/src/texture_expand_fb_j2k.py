@@ -21,6 +21,11 @@
 #
 #  If there is no file textures of the current iteration, is created
 #  with a neutral texture.
+#
+#  The codestreams are read from the container of the subband (see
+#  container.py). A picture can be stored in one codestream with the
+#  three components (see texture_compress_fb_j2k.py). An empty
+#  codestream (a skipped picture) is decoded as a neutral texture.
 
 
 import shutil
@@ -29,6 +34,8 @@ import sys
 import math
 import struct
 import os
+import container
+import weighting
 from subprocess import check_call
 from subprocess import CalledProcessError
 from MCTF_parser import MCTF_parser
@@ -95,94 +102,125 @@ if args.subband:
 def pondComp (image_filename) :
 
     ## Weighting coefficients for subband. For an example of 5TRLs ([H1, H2, H3, H4, L4]).
-    coef = [1, 1.4921569843, 2.7304234608, 5.3339326679, 5.8022196044]
-    ## File containing the textures before investing weighting coefficients.
-    f_in  = open (image_filename + ".rawl", 'rb')
-    ## File containing the textures after investing weighting coefficients.
-    f_out = open (image_filename + ".rawl_desmultCOM", 'wb')
+    coef = weighting.COEFFICIENTS
+
+    # Some examples of weighting coefficients:
+    #-----------------------------------------
+    ## Gain of the samples.
+    gain = 1                                   # =
+    #gain = pow(2, subband-1)                  # *2^subband
+    #gain = pow(5, subband-1)                  # *4^subband
+    #gain = pow(math.sqrt(2), subband-1)       # *sqrt(2)^subband
+    #gain = coef[subband-1]                    # coef
+    #gain = pow(coef[subband-1], subband-1)    # coef^subband
 
-    try :
-        ## A weighted coefficient. (Big endian)
-        data = f_in.read(2)
-        while data != "" :
-            ## A weighted coefficient. (Little endian)
-            data_comp = ord(data[1])*256 + ord(data[0]) # [1] + [0]
+    # A whole plane (of weighted samples of 2 bytes, little endian) is
+    # processed at once.
+    weighting.unweight_file(image_filename + ".rawl", gain, 2)
 
-            # Some examples of weighting coefficients:
-            #-----------------------------------------
-            
-            ## A unweighted coefficient.
-            desmult_comp = data_comp                                    # =
-            #desmult_comp = data_comp / pow(2, subband-1)               # *2^subband
-            #desmult_comp = data_comp / pow(5, subband-1)               # *4^subband
-            #desmult_comp = data_comp / pow(math.sqrt(2), subband-1)    # *sqrt(2)^subband
-            #desmult_comp = data_comp / coef[subband-1]                 # coef
-            #desmult_comp = data_comp / pow(coef[subband-1], subband-1) # coef^subband
 
-            if desmult_comp > 255 :
-                desmult_comp = 255
 
-            f_out.write(chr(int(round(desmult_comp))))
+## Reads a decoded component, which is removed.
+## @param file_name Name of the decoded component.
+## @return The samples of the component (a string).
 
-            data = f_in.read(2)
+#---------------------------------------------------------------------
+def read_component (file_name) :
 
-    finally:
-        f_in.close()
-        f_out.close()
+    with open(file_name, "rb") as f :
+        samples = f.read()
+    os.remove(file_name)
+    return samples
 
-    os.rename(image_filename + ".rawl_desmultCOM", image_filename + ".rawl")
 
 
 
-## Decode and multiplexing components. Using Kakadu software.
+## Decode a component. Using Kakadu software.
 ## @param component Component type, encoded in the current iteration. It can be: Y, U or V.
 ## @param image_number Filenumber textures of the current iteration.
+## @return The samples of the component (a string).
 
 #---------------------------------------------------------------------
 def decode (component, image_number) :
 
+    image_filename = file + "_" + str(component) + "_" + str('%04d' % image_number)
+
+    # The codestream is taken from the container of the subband.
+    if codestreams != None :
+        codestreams.extract(image_number, component, image_filename + ".j2c")
+
+    if not os.path.exists(image_filename + ".j2c") :
+        # If there is no file textures of the current iteration, a
+        # neutral texture is used.
+        return neutral[component]
+
+    if os.path.getsize(image_filename + ".j2c") == 0 :
+        # The picture was skipped (see texture_compress_fb_j2k.py).
+        os.remove(image_filename + ".j2c")
+        return neutral[component]
+
+    # Decode.
     try:
-        image_filename = file + "_" + str(component) + "_" + str('%04d' % image_number)
-
-        f = open(image_filename + ".j2c", "rb")
-        f.close()
-
-        # Decode.
-        try:
-            if rate <= 0.0 :
-                check_call("trace kdu_expand"
-                           + " -i " + image_filename + ".j2c"
-                           + " -o " + image_filename + ".rawl"
-                           , shell=True)
-            else :
-                check_call("trace kdu_expand"
-                           + " -i " + image_filename + ".j2c"
-                           + " -o " + image_filename + ".rawl"
-                           + " -rate " + rate
-                           , shell=True)
-
-            #shutil.copy (image_filename + '.rawl', image_filename + '.SINdiv')    # Backs weighted components.
-            #pondComp (image_filename)
-
-        except CalledProcessError :
-            sys.exit(-1)
-
-    except:
-        # If there is no file textures of the current iteration, is
-        # created with a neutral texture.
-
-        f = open(image_filename + ".rawl", "wb")
-        for a in xrange(pixels_in_x * pixels_in_y) :
-            f.write('%c' % 128)  # BYTES_PER_COMPONENT = 1   # 1 byte for components used unweighted.
-            #f.write('%c' % 128) # BYTES_PER_COMPONENT = 2   # 2 bytes for weighted or components that are used weighted.
-        f.close()
-
-    # MUX
+        if rate <= 0.0 :
+            check_call("trace kdu_expand"
+                       + " -i " + image_filename + ".j2c"
+                       + " -o " + image_filename + ".rawl"
+                       , shell=True)
+        else :
+            check_call("trace kdu_expand"
+                       + " -i " + image_filename + ".j2c"
+                       + " -o " + image_filename + ".rawl"
+                       + " -rate " + str(rate)
+                       , shell=True)
+
+        #shutil.copy (image_filename + '.rawl', image_filename + '.SINdiv')    # Backs weighted components.
+        #pondComp (image_filename)
+
+    except CalledProcessError :
+        sys.exit(-1)
+
+    # The extracted codestream is not needed anymore.
+    if codestreams != None :
+        os.remove(image_filename + ".j2c")
+
+    return read_component(image_filename + ".rawl")
+
+
+
+
+## Decode a picture stored in one codestream with the three
+## components. Using Kakadu software.
+## @param image_number Filenumber textures of the current iteration.
+## @return The samples of the picture (a string).
+
+#---------------------------------------------------------------------
+def decode_YUV (image_number) :
+
+    image_filename = file + "_YUV_" + str('%04d' % image_number)
+    ## Names of the decoded components.
+    names = [file + "_" + component + "_" + str('%04d' % image_number) + ".rawl" for component in ('Y', 'U', 'V')]
+
+    if codestreams != None :
+        codestreams.extract(image_number, "YUV", image_filename + ".j2c")
+
+    if os.path.getsize(image_filename + ".j2c") == 0 :
+        # The picture was skipped (see texture_compress_fb_j2k.py).
+        os.remove(image_filename + ".j2c")
+        return neutral['Y'] + neutral['U'] + neutral['V']
+
     try:
-        check_call("trace cat " + image_filename + ".rawl >> " + file, shell=True)
-    except CalledProcessError:
+        check_call("trace kdu_expand"
+                   + " -i " + image_filename + ".j2c"
+                   + " -o " + ",".join(names)
+                   , shell=True)
+    except CalledProcessError :
         sys.exit(-1)
 
+    if codestreams != None :
+        os.remove(image_filename + ".j2c")
+
+    return "".join([read_component(name) for name in names])
+
 
 
 
@@ -194,13 +232,31 @@ def decode (component, image_number) :
 # check_call("echo file: " + str(file) + " subband: " + str(subband), shell=True)
 # raw_input("")
 
-## Current image iteration.
-image_number = 0
-while image_number < pictures :
-
-    # Decode components Y, U y V.
-    decode ('Y', image_number)
-    decode ('U', image_number)
-    decode ('V', image_number)
-
-    image_number += 1
+## Codestreams of the subband (None if there is no container).
+codestreams = container.open_subband(file)
+
+## Neutral texture of each component (shared by all the pictures
+## without codestream). 1 byte per sample (unweighted components).
+neutral = {'Y' : chr(128) * (pixels_in_x * pixels_in_y),
+           'U' : chr(128) * (pixels_in_x/2 * pixels_in_y/2),
+           'V' : chr(128) * (pixels_in_x/2 * pixels_in_y/2)}
+
+# The pictures are assembled in memory and appended to the file of
+# the subband.
+with open(file, "ab") as f :
+
+    ## Current image iteration.
+    image_number = 0
+    while image_number < pictures :
+
+        if (codestreams != None and codestreams.find(image_number, "YUV") != None) \
+           or os.path.exists(file + "_YUV_" + str('%04d' % image_number) + ".j2c") :
+            # The components Y, U y V are in one codestream.
+            f.write(decode_YUV (image_number))
+        else :
+            # Decode components Y, U y V.
+            f.write(decode ('Y', image_number)
+                    + decode ('U', image_number)
+                    + decode ('V', image_number))
+
+        image_number += 1
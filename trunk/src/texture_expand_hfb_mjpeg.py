@@ -58,9 +58,7 @@ def usage():
 ## Define the variable for options.
 opts = ""
 
-ifdef({{DEBUG}},
-display.info(str(sys.argv[0:]) + '\n')
-)
+display.log_debug(str(sys.argv[0:]) + '\n')
 
 try:
     opts, extraparams = getopt.getopt(sys.argv[1:],
@@ -105,11 +103,10 @@ command = "(ffmpeg "\
     + " " + file + ".yuv >&2) 2> /dev/null"
 
 trace.write(sys.argv[0] + ": " + command + "\n")
-ifdef({{DEBUG}},
-os.system(command)
-,
-os.system(command + " > /dev/null")
-)
+if display.log_level >= display.LOG_DEBUG:
+    os.system(command)
+else:
+    os.system(command + " > /dev/null")
 
 # YUV file to Raw file.
 command = "mv " + file + ".yuv " + file
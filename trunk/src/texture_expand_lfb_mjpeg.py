@@ -104,11 +104,10 @@ command = "(ffmpeg "\
     + " " + file + ".yuv >&2) 2> /dev/null"
 
 trace.write(sys.argv[0] + ": " + command + "\n")
-ifdef({{DEBUG}},
-os.system(command)
-,
-os.system(command + " > /dev/null")
-)
+if display.log_level >= display.LOG_DEBUG:
+    os.system(command)
+else:
+    os.system(command + " > /dev/null")
 
 # YUV file to Raw file.
 command = "mv " + file + ".yuv " + file
@@ -0,0 +1,85 @@
+/**
+ * \file threads.cpp
+ * \author Vicente Gonzalez-Ruiz.
+ * \date Last modification: 2015, January 7.
+ * \brief Runs a set of independent tasks over a pool of threads.
+ *
+ * The MCTF project has been supported by the Junta de Andalucía through
+ * the Proyecto Motriz "Codificación de Vídeo Escalable y su Streaming
+ * sobre Internet" (P10-TIC-6548).
+ */
+
+#include <pthread.h>
+
+/** \brief Maximum number of threads. */
+#define THREADS_MAX 64
+
+/** \brief A task routine.
+ * \param task Index of the task to run.
+ * \param thread Index of the thread which runs the task (useful to
+ * select the private buffers of the thread).
+ * \param arg Data shared by all the tasks.
+ */
+typedef void (*task_routine)(int task, int thread, void *arg);
+
+/** \brief Work assigned to each thread. */
+struct thread_work {
+  /** \brief Routine to run. */
+  task_routine routine;
+  /** \brief Data shared by all the tasks. */
+  void *arg;
+  /** \brief Index of the thread. */
+  int thread;
+  /** \brief Number of threads. */
+  int threads;
+  /** \brief Number of tasks. */
+  int tasks;
+};
+
+/** \brief Runs the tasks "thread", "thread+threads", "thread+2*threads", ...
+ * \param work A thread_work structure.
+ * \returns NULL.
+ */
+void *run_thread_work(void *work) {
+  struct thread_work *w = (struct thread_work *)work;
+  for(int task=w->thread; task<w->tasks; task+=w->threads) {
+    w->routine(task, w->thread, w->arg);
+  }
+  return NULL;
+}
+
+/** \brief Runs "tasks" independent tasks using (at most) "threads"
+ * threads and waits for all of them. With one thread the tasks are
+ * run in order by the calling thread.
+ * \param tasks Number of tasks.
+ * \param threads Number of threads.
+ * \param routine Routine which runs a task.
+ * \param arg Data shared by all the tasks.
+ */
+void run_tasks(int tasks, int threads, task_routine routine, void *arg) {
+  if(threads > tasks) threads = tasks;
+  if(threads > THREADS_MAX) threads = THREADS_MAX;
+  if(threads <= 1) {
+    for(int task=0; task<tasks; task++) {
+      routine(task, 0, arg);
+    }
+    return;
+  }
+
+  pthread_t thread[THREADS_MAX];
+  struct thread_work work[THREADS_MAX];
+  for(int t=0; t<threads; t++) {
+    work[t].routine = routine;
+    work[t].arg = arg;
+    work[t].thread = t;
+    work[t].threads = threads;
+    work[t].tasks = tasks;
+    if(pthread_create(&thread[t], NULL, run_thread_work, &work[t])) {
+      error("run_tasks: unable to create thread %d ... aborting!\n", t);
+      abort();
+    }
+  }
+  for(int t=0; t<threads; t++) {
+    pthread_join(thread[t], NULL);
+  }
+}
@@ -94,17 +94,25 @@
 
 
 
-import info_j2k
+import rate_accounting
 import sys
 import getopt
 import os
 import array
 import display
+import container
+import codestream
 import string
 import math
 import re
+import shutil
+import traceback
+import rd_cache
+import rd_estimate
 import subprocess as sub
 from GOP          import GOP
+from multiprocessing import Pool
+from multiprocessing import cpu_count
 from subprocess   import check_call
 from subprocess   import CalledProcessError
 from MCTF_parser  import MCTF_parser
@@ -158,6 +166,14 @@ update_factor     = 1.0/4
 algorithm         = ""
 ## Number of quality layers that are extracted for each subbband.
 combination       = ""
+## File of the cache of the rate-distortion evaluations (see rd_cache.py).
+rd_cache_file     = "rd_cache"
+## Number of truncated codestreams evaluated concurrently.
+workers           = cpu_count()
+## Number of candidates of the textures evaluated in each step of
+## FS-opt, selected by their estimated slopes (see rd_estimate.py). 0
+## = no estimation.
+estimate          = 0
 
 
 
@@ -179,6 +195,9 @@ parser.add_argument("--nLayers", help="Number of quality layers. (Default = {})"
 parser.update_factor(update_factor)
 parser.add_argument("--algorithm", help="Type sorting algorithm. (Default = {})".format(algorithm))
 parser.add_argument("--combination", help="Number of quality layers that are extracted for each subbbanda. (Default = {})".format(combination))
+parser.add_argument("--rd_cache", help="file of the cache of the rate-distortion evaluations. (Default = {})".format(rd_cache_file))
+parser.add_argument("--workers", help="number of truncated codestreams evaluated concurrently. (Default = {})".format(workers))
+parser.add_argument("--estimate", help="number of candidates of the textures which are evaluated in each step of FS-opt, selected by the estimation of their slopes in the domain of the subbands. SR-opt sorts the layers of the textures by the estimated slopes. 0 = no estimation. (Default = {})".format(estimate))
 
 ## A script may only parse a few of the command-line arguments,
 ## passing the remaining arguments on to another script or program.
@@ -213,6 +232,12 @@ if args.algorithm :
     algorithm = str(args.algorithm)
 if args.combination :
     combination = str(args.combination)
+if args.rd_cache :
+    rd_cache_file = str(args.rd_cache)
+if args.workers :
+    workers = int(args.workers)
+if args.estimate :
+    estimate = int(args.estimate)
 
 
 if BRC > MAX_VALUE :
@@ -230,17 +255,6 @@ if BRC > MAX_VALUE :
 #----------------------------------------------------
 
 
-## Determines the size of the header of a codestream.
-#  @param file_name Name of the file with the motion fields.
-#  @return Bytes of the header of a codestream.
-def header (file_name) :
-    p = sub.Popen("header_size " + str(file_name) + " 2> /dev/null | grep OUT", shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
-    out, err = p.communicate()
-    return long(out[4:])
-
-
-
-
 ## Transcode a codestream, reducing the bit-rate and quality, by
 ## extracting a given number of layers of a given subband.
 #  @param in_filename File containing a given sub-band component and the codestream. This subband is complete.
@@ -248,8 +262,9 @@ def header (file_name) :
 #  @param cLayers Number of layers, which are extracted from the entire sub-band for the truncated subband.
 #  @param reduces Number of levels of spatial resolution that will be discarded. It is a deprecated option. The optimal results are obtained by extracting layers (scalability in quality). Its default value is 0.
 #  @param rate Indicates a bit-rate, whereby the truncated codestream apply. In a scalable codestream in quality, optimal results are obtained to indicate a certain number of layers to extract. Therefore, this option is deprecated. Its default value is 0.
+#  @param path_extract Directory of the truncated codestream.
 #  @return File size without header.
-def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_transcode -usage | less
+def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate, path_extract): # kdu_transcode -usage | less
     try :
 
         # Transcode by rate.
@@ -258,7 +273,7 @@ def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_tra
 
             p = sub.Popen("trace kdu_transcode"
                           + " -i "      + in_filename
-                          + " -o "      + "extract/" + out_filename
+                          + " -o "      + path_extract + "/" + out_filename
                           + " Clayers=" + str(cLayers)
                           + " -reduce " + str(reduces)
                           , shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
@@ -271,7 +286,7 @@ def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_tra
 
             p = sub.Popen("trace kdu_transcode"
                           + " -i "      + in_filename
-                          + " -o "      + "extract/" + out_filename
+                          + " -o "      + path_extract + "/" + out_filename
                           + " Clayers=" + str(cLayers)
                           + " -reduce " + str(reduces)
                           + " -rate "   + str(rate)
@@ -286,13 +301,14 @@ def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_tra
         # Sizes
         #------
         if err != "" : # if err in locals() :
-            check_call("rm extract/" + out_filename, shell=True)
+            if os.path.exists(path_extract + "/" + out_filename) :
+                os.remove(path_extract + "/" + out_filename)
             size = 0
         else :
-            size = os.path.getsize("extract/" + out_filename) - header("extract/" + out_filename)
+            size = os.path.getsize(path_extract + "/" + out_filename) - codestream.header(path_extract + "/" + out_filename)
 
         # Displays information about the execution:
-        # check_call("echo FILE " + str("extract/" + out_filename) + " SIZE " + str(os.path.getsize("extract/" + out_filename))  + " HEADER " + str(header("extract/" + out_filename)) + " final " + str(size), shell=True) #  !!!!
+        # check_call("echo FILE " + str(path_extract + "/" + out_filename) + " SIZE " + str(os.path.getsize(path_extract + "/" + out_filename))  + " HEADER " + str(codestream.header(path_extract + "/" + out_filename)) + " final " + str(size), shell=True) #  !!!!
         # raw_input("")
 
         return size
@@ -300,9 +316,79 @@ def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_tra
     except CalledProcessError :
         sys.exit(-1)
 
+## Transcodes a codestream of a subband. The codestream is read from
+## the container of the subband and the truncated codestream is added
+## to the list of codestreams of the truncated subband. Nothing is
+## done if the subband has not the codestream (for example, the
+## components Y, U and V of a picture can be stored in one codestream
+## "YUV", see texture_compress_fb_j2k.py). The empty codestreams (of
+## the skipped pictures) are copied as they are. The quality layers
+## are extracted in this process (see codestream.truncate()) and their
+## bytes are read from the index of the container (see
+## container.entry.truncated_bytes()); kdu_transcode is only run to
+## discard spatial resolution levels, to transcode by rate or if the
+## codestream can not be truncated.
+#  @param codestreams Container of the subband (None if the codestreams are stored in files).
+#  @param picture Number of the picture (or field) in the subband.
+#  @param component Name of the component.
+#  @param in_filename File containing a given sub-band component and the codestream.
+#  @param out_filename File containing a given sub-band component and the truncated codestream.
+#  @param extracted Codestreams of the truncated subband.
+#  @param out_picture Number of the picture in the truncated subband.
+#  @param cLayers Number of layers (see kdu_transcode).
+#  @param reduces Number of levels of spatial resolution that will be discarded (see kdu_transcode).
+#  @param rate Bit-rate (see kdu_transcode).
+#  @param path_extract Directory of the truncated subband.
+#  @return File size without header.
+def transcode_codestream (codestreams, picture, component, in_filename, out_filename, out_picture, extracted, cLayers, reduces, rate, path_extract) :
+    if codestreams != None :
+        e = codestreams.find(picture, component)
+        if e == None :
+            return 0
+        if e.length == 0 :
+            # A skipped picture (see texture_compress_fb_j2k.py) is
+            # kept empty, without kdu_transcode.
+            extracted.append(container.entry(out_picture, component, data=""))
+            return 0
+        data = codestreams.read(picture, component)
+    elif not os.path.exists(in_filename) :
+        return 0
+    elif os.path.getsize(in_filename) == 0 :
+        extracted.append(container.entry(out_picture, component, data=""))
+        return 0
+    else :
+        with open(in_filename, "rb") as f :
+            data = f.read()
+    if reduces == 0 and rate <= 0.0 :
+        try :
+            truncated = codestream.truncate(data, cLayers)
+        except ValueError :
+            truncated = None
+        if truncated != None :
+            if codestreams != None and e.layer_bytes :
+                # The bytes are read from the index of the container.
+                size = e.truncated_bytes(cLayers)
+            else :
+                size = len(truncated) - codestream.header_size(truncated)
+            extracted.append(container.entry(out_picture, component,
+                                             header=len(truncated) - size, data=truncated))
+            return size
+    if codestreams != None :
+        in_filename = path_extract + "/input_" + in_filename
+        with open(in_filename, "wb") as f :
+            f.write(data)
+    size = kdu_transcode (in_filename, out_filename, cLayers, reduces, rate, path_extract)
+    if codestreams != None :
+        os.remove(in_filename)
+    if os.path.exists(path_extract + "/" + out_filename) :
+        extracted.append(container.entry(out_picture, component,
+                                         header=os.path.getsize(path_extract + "/" + out_filename) - size,
+                                         source=path_extract + "/" + out_filename))
+    return size
+
 ## transcode Select the number of layers, of which component from
 ## which subband, from which GOP (or set of GOPs) must be
-## extracted. Extraction, comes out, the kdu_transcode function.
+## extracted. Extraction, comes out, the transcode_codestream function.
 #
 #  Transcoding can be performed:
 #  - GOP to GOP.
@@ -318,7 +404,8 @@ def kdu_transcode (in_filename, out_filename, cLayers, reduces, rate): # kdu_tra
 #  @param pictures Total number of images in the sequence.
 #  @param _COMBINATION List some specific numbers of layers for each subband.
 #  @param _COMBINATION_REDUCES_normalized List certain values of spatial resolution reduction, for each subband. Its default values are zero. Not usually used because, as exploit the scalability provides better results. But it is a useful source for research tasks.
-def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized) :
+#  @param path_extract Directory of the truncated codestream.
+def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, path_extract) :
 
     # Displays information about the execution:
     # check_call("echo _COMBINATION en el transcode: " + str(_COMBINATION), shell=True)
@@ -326,9 +413,8 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
     # raw_input("")
 
 
-    check_call("  rm -rf " + str(path_extract) + "; "
-               + "mkdir "  + str(path_extract)
-               , shell=True)
+    shutil.rmtree(path_extract, ignore_errors=True)
+    os.mkdir(path_extract)
 
 
     #  Transcoding can be performed:
@@ -355,6 +441,8 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
                 # Files sizes. With the size of each component.
                 file_sizes = open (str(path_extract) + "/" + MOTION + str(subband) + ".mjc", 'w')
                 total = 0
+                codestreams = container.open_subband(MOTION + str(subband))
+                extracted = []
 
                 for campoMov_number in range (FIRST_fields, fields) : # Decode components
                     for comp_number in range (0, MOTION_COMPONENTS) :
@@ -366,11 +454,12 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
                         if transcode_unitario == True :
                             out_filename           = MOTION + str(subband) + "_comp" + str(comp_number) + "_" + str('%04d' % (campoMov_number - FIRST_fields)) + ".j2c"
 
-                        size = kdu_transcode (in_filename, out_filename, _COMBINATION[N_subbands-subband], _COMBINATION_REDUCES_normalized[N_subbands-subband], 0) #p = sub.Popen("cp " + in_filename + " extract/" + out_filename, shell=True, stdout=sub.PIPE, stderr=sub.PIPE)
+                        size = transcode_codestream (codestreams, campoMov_number, "comp" + str(comp_number), in_filename, out_filename, campoMov_number - FIRST_fields, extracted, _COMBINATION[N_subbands-subband], _COMBINATION_REDUCES_normalized[N_subbands-subband], 0, path_extract)
                         total += size
 
                     file_sizes.write(str(total) + "\n")
                 file_sizes.close()
+                container.write(str(path_extract) + "/" + container.name(MOTION + str(subband)), fields - FIRST_fields, extracted, remove=True)
 
             subband += 1
             fields /= 2
@@ -399,6 +488,8 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
             # Files sizes. With the size of each component.
             file_sizes = open (str(path_extract) + "/" + HIGH + str(subband) + ".j2c", 'w')
             total = 0
+            codestreams = container.open_subband(HIGH + str(subband))
+            extracted = []
 
             image_number = FIRST_picture_ofGOP
             while image_number < (pictures - 1) :
@@ -410,22 +501,28 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
                 out_filename = in_filename = HIGH + str(subband) + "_Y_" + str('%04d' % image_number) + ".j2c"
                 if transcode_unitario == True :
                     out_filename           = HIGH + str(subband) + "_Y_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-                Ysize = kdu_transcode (in_filename, out_filename, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_Y[TRLs-subband][int(image_number)])
+                Ysize = transcode_codestream (codestreams, image_number, "Y", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_Y[TRLs-subband][int(image_number)], path_extract)
 
                 # U
                 out_filename = in_filename = HIGH + str(subband) + "_U_" + str('%04d' % image_number) + ".j2c"
                 if transcode_unitario == True :
                     out_filename           = HIGH + str(subband) + "_U_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-                Usize = kdu_transcode (in_filename, out_filename, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_U[TRLs-subband][int(image_number)])
+                Usize = transcode_codestream (codestreams, image_number, "U", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_U[TRLs-subband][int(image_number)], path_extract)
 
                 # V
                 out_filename = in_filename = HIGH + str(subband) + "_V_" + str('%04d' % image_number) + ".j2c"
                 if transcode_unitario == True :
                     out_filename           = HIGH + str(subband) + "_V_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-                Vsize = kdu_transcode (in_filename, out_filename, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_V[TRLs-subband][int(image_number)])
+                Vsize = transcode_codestream (codestreams, image_number, "V", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_V[TRLs-subband][int(image_number)], path_extract)
+
+                # YUV (the three components in one codestream)
+                out_filename = in_filename = HIGH + str(subband) + "_YUV_" + str('%04d' % image_number) + ".j2c"
+                if transcode_unitario == True :
+                    out_filename           = HIGH + str(subband) + "_YUV_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
+                YUVsize = transcode_codestream (codestreams, image_number, "YUV", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[TRLs-subband], _COMBINATION_REDUCES_normalized[TRLs-subband], _RATES_Y[TRLs-subband][int(image_number)], path_extract)
 
                 # Total file-sizes
-                size = Ysize + Usize + Vsize
+                size = Ysize + Usize + Vsize + YUVsize
                 total += size
                 file_sizes.write(str(total) + "\n")
 
@@ -436,6 +533,7 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
                 # raw_input("Press ENTER to continue ...") # !
 
             file_sizes.close()
+            container.write(str(path_extract) + "/" + container.name(HIGH + str(subband)), pictures - 1 - FIRST_picture_ofGOP, extracted, remove=True)
         subband += 1
     subband -= 1
 
@@ -452,6 +550,8 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
         # Files sizes. With the size of each color image.
         file_sizes = open (str(path_extract) + "/" + LOW + str(subband) + ".j2c", 'w')
         total = 0
+        codestreams = container.open_subband(LOW + str(subband))
+        extracted = []
 
         image_number = FIRST_picture_ofGOP
         while image_number < pictures:
@@ -463,22 +563,28 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
             out_filename = in_filename = LOW + str(subband) + "_Y_" + str('%04d' % image_number) + ".j2c"
             if transcode_unitario == True :
                 out_filename           = LOW + str(subband) + "_Y_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-            Ysize = kdu_transcode (in_filename, out_filename, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_Y[0][0])
+            Ysize = transcode_codestream (codestreams, image_number, "Y", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_Y[0][0], path_extract)
 
             # U
             out_filename = in_filename = LOW + str(subband) + "_U_" + str('%04d' % image_number) + ".j2c"
             if transcode_unitario == True :
                 out_filename           = LOW + str(subband) + "_U_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-            Usize = kdu_transcode (in_filename, out_filename, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_U[0][0])
+            Usize = transcode_codestream (codestreams, image_number, "U", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_U[0][0], path_extract)
 
             # V
             out_filename = in_filename = LOW + str(subband) + "_V_" + str('%04d' % image_number) + ".j2c"
             if transcode_unitario == True :
                 out_filename           = LOW + str(subband) + "_V_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
-            Vsize = kdu_transcode (in_filename, out_filename, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_V[0][0])
+            Vsize = transcode_codestream (codestreams, image_number, "V", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_V[0][0], path_extract)
+
+            # YUV (the three components in one codestream)
+            out_filename = in_filename = LOW + str(subband) + "_YUV_" + str('%04d' % image_number) + ".j2c"
+            if transcode_unitario == True :
+                out_filename           = LOW + str(subband) + "_YUV_" + str('%04d' % (image_number - FIRST_picture_ofGOP)) + ".j2c"
+            YUVsize = transcode_codestream (codestreams, image_number, "YUV", in_filename, out_filename, image_number - FIRST_picture_ofGOP, extracted, _COMBINATION[0], _COMBINATION_REDUCES_normalized[0], _RATES_Y[0][0], path_extract)
 
             # Total file-sizes
-            size = Ysize + Usize + Vsize
+            size = Ysize + Usize + Vsize + YUVsize
             total += size
             file_sizes.write(str(total) + "\n")
 
@@ -489,6 +595,7 @@ def transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINA
             image_number += 1
 
         file_sizes.close()
+        container.write(str(path_extract) + "/" + container.name(LOW + str(subband)), pictures - FIRST_picture_ofGOP, extracted, remove=True)
 
 
 
@@ -513,86 +620,28 @@ def get_size (the_path, key) :
 
 
 
-## Determines between various truncated codestream, which is better, in terms of bit-rate and rmse.
+## Extracts a truncated codestream, expands it and measures its
+## bit-rate and its distortion.
 #  @param FIRST_picture_ofGOP Number of the first image of the GOP.
 #  @param iGOP GOP number of the current iteration.
-#  @param pictures Total number of images to process. It may correspond to the images of a GOP, or all images in the sequence.
-#  @param kbps_antes Kbps of a truncated codestream. These Kbps are taken as reference for future comparisons.
-#  @param rmse1D_antes Distortion of a truncated codestream. This distortion is taken as reference for future comparisons.
-#  @param radian_candidato Index linking the pair R / D (rate-distortion). The higher the index, the higher value of the codestream.
-#  @param kbps_candidato Codestream kbps from the best known so far.
-#  @param rmse1D_candidato Distorsion from the codestream best known so far.
-#  @param _CANDIDATO List the number of layers for each sub-band, best known so far codestream.
-#  @param _CANDIDATO_REDUCES List of reductions in the spatial resolution for each subband (for the best codestream). Its default value is 0. Not usually used because, as scalability gives better results.
-#  @param _CANDIDATO_REDUCES_normalized List of reductions in the spatial resolution for each subband. In which, the reduction values are tested for changes in spatial resolution, do not lead to problems with block sizes, etc. Its default value is 0. Not usually used because, as scalability gives better results.
-#  @param emptyLayer Indicates whether the codestream has empty layers.
-#  @param CANDIDATO_KBPS Codestream kbps Known from the best so far; detailed for each subband and motion field.
-#  @param _COMBINATION List the number of layers of each subband from a codestream.
-#  @param _COMBINATION_REDUCES List of reductions in the spatial resolution for each subband (for a codestream evaluation).
-#  @param snr_fileA Original sequence or part of it. This is not the video stream but a link to it.
-#  @param snr_fileB Reconstruction of a codestream or part of it. This is not the video stream but a link to it.
-#  @return List the number of layers for each sub-band, best known so far codestream, called candidate.
-def lba (FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB) : # looking the best angle
-
-    # Displays information about the execution:
-    # raw_input("_COMBINATION en lba: " + str(_COMBINATION)) # !
-    # raw_input("_REDUCES en lba: " + str(_REDUCES)) # !
-    # raw_input("ANTES TRANSCODE") # !
-    # check_call("echo lba:" + str(FIRST_picture_ofGOP) + " " + str(pictures), shell=True) # !
-    # raw_input("")
-
-
-    # Normalize reduces.
-    #-------------------
-    _COMBINATION_REDUCES_normalized = _COMBINATION_REDUCES[:]
-    for i in range (0, len(_COMBINATION_REDUCES)) :
-        if _COMBINATION_REDUCES[i] > _REDUCES_normalizer[i] :
-            _COMBINATION_REDUCES_normalized[i] = _REDUCES_normalizer[i]
-
-    # Displays information about the execution:
-    # check_call("echo " + str(_COMBINATION_REDUCES_normalized),shell=True) # !
-    # raw_input("")
-
-
-
-    # New values, resolution and block size, after applying the reduction in spatial resolution.
-    #-------------------------------------------------------------------------------------------
-    _PIXELS_IN_X = []
-    _PIXELS_IN_Y = []
-    _BLOCK_SIZES = []
-
-    # Scaling the resolution (REDUCES) affects: PIXELS_IN_XY and BLOCK_SIZES.
-    for i in range (0, TRLs) : # T
-        _PIXELS_IN_X.append(pixels_in_x/pow(2,_COMBINATION_REDUCES_normalized[i])) # RES_X_transcode=`echo "$RES_X/(2^$discard_SRLs_Tex)" | bc`
-        _PIXELS_IN_Y.append(pixels_in_y/pow(2,_COMBINATION_REDUCES_normalized[i]))
-        if i > 0 :
-            _BLOCK_SIZES.append(block_size/pow(2,_COMBINATION_REDUCES_normalized[i]))
-    for i in range (TRLs, N_subbands) : # M
-        _BLOCK_SIZES[i-TRLs] = _BLOCK_SIZES[i-TRLs]*pow(2,_COMBINATION_REDUCES_normalized[i]) # block_size_transcode=`echo "$block_size/(2^$discard_SRLs_Tex)" | bc`
-
-
- 
-    # Severability. Verify new values: resolution and block size are acceptable by the codec.
-    #----------------------------------------------------------------------------------------
-    for i in range (1, TRLs) :
-        if 0 != _PIXELS_IN_X[i] % _BLOCK_SIZES[i-1] or 0 != _PIXELS_IN_Y[i] % _BLOCK_SIZES[i-1] :
-            check_call("echo La resolucion \(" + str(_PIXELS_IN_X[i]) + "x" + str(_PIXELS_IN_Y[i]) + "\) is not divisible by the size of macroblock \(" + str(_BLOCK_SIZES[i-1]) + "\)"
-                       , shell=True)
-            exit (0)
-
-    # Displays information about the execution:
-    # check_call("echo \"\n--block_size="  + ','.join(map(str, _BLOCK_SIZES))
-    #           + "\n--pixels_in_x="       + ','.join(map(str, _PIXELS_IN_X))
-    #           + "\n--pixels_in_y="       + ','.join(map(str, _PIXELS_IN_Y))
-    #           + "\n--subpixel_accuracy=" + ','.join(map(str, _COMBINATION_REDUCES_normalized[:TRLs])) + "\""
-    #           ,shell=True)
-    # raw_input("")
-
+#  @param pictures Total number of images to process.
+#  @param _COMBINATION List the number of layers of each subband.
+#  @param _COMBINATION_REDUCES_normalized List of reductions in the spatial resolution for each subband.
+#  @param _PIXELS_IN_X Width of the pictures of each subband (after the reductions).
+#  @param _PIXELS_IN_Y Height of the pictures of each subband (after the reductions).
+#  @param _BLOCK_SIZES Size of the blocks of each field of motion (after the reductions).
+#  @param snr_fileA Original sequence or part of it.
+#  @param snr_fileB Reconstruction of a codestream or part of it.
+#  @param path_extract Directory of the truncated codestream.
+#  @param path_tmp Directory of the reconstruction. It must be in the directory of the codestream (see snr_fileB).
+#  @return The Kbps of the motion (average of each subband), the Kbps of the textures (of each subband), the Kbps of each GOP, the average Kbps and the RMSE.
+def evaluate (FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES, snr_fileA, snr_fileB, path_extract, path_tmp) :
 
+    os.chdir(path_base)
 
     # EXTRACT. Extract the folder '/extract'.
     #----------------------------------------
-    transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized)
+    transcode (N_subbands, FIRST_picture_ofGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, path_extract)
 
 
 
@@ -630,9 +679,9 @@ def lba (FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_c
     #----------------
     os.chdir(path_extract)
 
-    instancia_info_j2k                              = info_j2k.info_j2k(GOPs_to_expand, TRLs, FPS)     # Only for j2k codec.
-    kbps_M_average, kbps_T_average, kbps_TM_average = instancia_info_j2k.kbps_average()
-    kbps_M,         kbps_T,         kbps_TM         = instancia_info_j2k.kbps()                        # kbps_TM[0] = kbps del GOP0 (primera imagen L).
+    rates                                           = rate_accounting.accounting(GOPs_to_expand, TRLs, FPS, "j2k") # Only for j2k codec.
+    kbps_M_average, kbps_T_average, kbps_TM_average = rates.kbps_average()
+    kbps_M,         kbps_T,         kbps_TM         = rates.kbps()                                     # kbps_TM[0] = kbps del GOP0 (primera imagen L).
                                                                                                        # kbps_TM[1] = kbps del GOP1.
                                                                                                        # kbps_TM[2] = kbps del GOP2. (and so on)
     TO_KBPS  = 8.0 / duration / 1000
@@ -695,6 +744,271 @@ def lba (FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_c
 
     rmse1D = float(out)
 
+    return kbps_M_average, kbps_T, kbps_TM, kbps_TM_average, rmse1D
+
+
+
+
+
+## Normalizes the reductions in the spatial resolution of a truncated
+## codestream and computes the resolution and the block size of each
+## subband.
+#  @param _COMBINATION_REDUCES List of reductions in the spatial resolution for each subband.
+#  @return The normalized reductions, the width and the height of the pictures of each subband and the size of the blocks of each field of motion.
+def geometry (_COMBINATION_REDUCES) :
+
+    # Normalize reduces.
+    #-------------------
+    _COMBINATION_REDUCES_normalized = _COMBINATION_REDUCES[:]
+    for i in range (0, len(_COMBINATION_REDUCES)) :
+        if _COMBINATION_REDUCES[i] > _REDUCES_normalizer[i] :
+            _COMBINATION_REDUCES_normalized[i] = _REDUCES_normalizer[i]
+
+    # Displays information about the execution:
+    # check_call("echo " + str(_COMBINATION_REDUCES_normalized),shell=True) # !
+    # raw_input("")
+
+
+
+    # New values, resolution and block size, after applying the reduction in spatial resolution.
+    #-------------------------------------------------------------------------------------------
+    _PIXELS_IN_X = []
+    _PIXELS_IN_Y = []
+    _BLOCK_SIZES = []
+
+    # Scaling the resolution (REDUCES) affects: PIXELS_IN_XY and BLOCK_SIZES.
+    for i in range (0, TRLs) : # T
+        _PIXELS_IN_X.append(pixels_in_x/pow(2,_COMBINATION_REDUCES_normalized[i])) # RES_X_transcode=`echo "$RES_X/(2^$discard_SRLs_Tex)" | bc`
+        _PIXELS_IN_Y.append(pixels_in_y/pow(2,_COMBINATION_REDUCES_normalized[i]))
+        if i > 0 :
+            _BLOCK_SIZES.append(block_size/pow(2,_COMBINATION_REDUCES_normalized[i]))
+    for i in range (TRLs, N_subbands) : # M
+        _BLOCK_SIZES[i-TRLs] = _BLOCK_SIZES[i-TRLs]*pow(2,_COMBINATION_REDUCES_normalized[i]) # block_size_transcode=`echo "$block_size/(2^$discard_SRLs_Tex)" | bc`
+
+
+ 
+    # Severability. Verify new values: resolution and block size are acceptable by the codec.
+    #----------------------------------------------------------------------------------------
+    for i in range (1, TRLs) :
+        if 0 != _PIXELS_IN_X[i] % _BLOCK_SIZES[i-1] or 0 != _PIXELS_IN_Y[i] % _BLOCK_SIZES[i-1] :
+            check_call("echo La resolucion \(" + str(_PIXELS_IN_X[i]) + "x" + str(_PIXELS_IN_Y[i]) + "\) is not divisible by the size of macroblock \(" + str(_BLOCK_SIZES[i-1]) + "\)"
+                       , shell=True)
+            exit (0)
+
+    # Displays information about the execution:
+    # check_call("echo \"\n--block_size="  + ','.join(map(str, _BLOCK_SIZES))
+    #           + "\n--pixels_in_x="       + ','.join(map(str, _PIXELS_IN_X))
+    #           + "\n--pixels_in_y="       + ','.join(map(str, _PIXELS_IN_Y))
+    #           + "\n--subpixel_accuracy=" + ','.join(map(str, _COMBINATION_REDUCES_normalized[:TRLs])) + "\""
+    #           ,shell=True)
+    # raw_input("")
+
+    return _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES
+
+
+
+
+
+## Key of the evaluation of a truncated codestream in the cache (see
+## rd_cache.py).
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param iGOP GOP number of the current iteration.
+#  @param pictures Total number of images to process.
+#  @param _COMBINATION List the number of layers of each subband.
+#  @param _COMBINATION_REDUCES_normalized List of reductions in the spatial resolution for each subband.
+#  @param snr_fileA Original sequence or part of it.
+#  @param snr_fileB Reconstruction of a codestream or part of it.
+#  @return The key.
+def evaluation_key (FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, snr_fileA, snr_fileB) :
+    return rd_evaluations.key(TRLs, SRLs, update_factor, block_size, block_size_min, search_range, pixels_in_x, pixels_in_y, FPS, iGOP, FIRST_picture_ofGOP, pictures, GOPs_to_expand, _COMBINATION, _COMBINATION_REDUCES_normalized, snr_fileA, snr_fileB)
+
+
+
+
+
+## Evaluates a truncated codestream in a worker (see evaluate_candidates).
+#  @param task The arguments of evaluate().
+#  @return The evaluation (None if the evaluation fails, which is
+#  logged and repeated by lba() to report the error).
+def evaluate_task (task) :
+    try :
+        return evaluate (*task)
+    except (SystemExit, Exception) :
+        display.warning("transcode: the evaluation of the combination " + str(task[3])
+                        + " of the GOP " + str(task[1]) + " failed\n"
+                        + traceback.format_exc())
+        return None
+
+
+
+
+
+## Evaluates concurrently a set of truncated codestreams, which are
+## independent, and stores the evaluations in the cache. Each
+## codestream is extracted and expanded in its own directories
+## ("extract_<n>" and "tmp_<n>"). After that, the sorting algorithms
+## find the evaluations in the cache (see lba()).
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param iGOP GOP number of the current iteration.
+#  @param pictures Total number of images to process.
+#  @param candidates List of the layers, the reductions and the files of the SNR (snr_fileA and snr_fileB) of each truncated codestream.
+def evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures, candidates) :
+
+    keys  = []
+    tasks = []
+    for _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB in candidates :
+        _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES = geometry (_COMBINATION_REDUCES)
+        key = evaluation_key (FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, snr_fileA, snr_fileB)
+        if rd_evaluations.get(key) == None and key not in keys :
+            keys.append(key)
+            tasks.append((FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION[:], _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES, snr_fileA, snr_fileB,
+                          path_extract + "_" + str(len(tasks)), path_tmp + "_" + str(len(tasks))))
+
+    # With only one evaluation, lba() does it.
+    if workers < 2 or len(tasks) < 2 :
+        return
+
+    pool = Pool(min(workers, len(tasks)))
+    evaluations = pool.map(evaluate_task, tasks)
+    pool.close()
+    pool.join()
+    os.chdir(path_base)
+
+    for key, evaluation, task in zip(keys, evaluations, tasks) :
+        if evaluation != None :
+            rd_evaluations.put(key, evaluation)
+        shutil.rmtree(task[-2], ignore_errors=True)
+        shutil.rmtree(task[-1], ignore_errors=True)
+
+
+
+
+
+## Estimator of the textures (see rd_estimate.py), created the first
+## time that it is used.
+rd_estimator = None
+
+## Estimation of the Kbps and the RMSE of a GOP truncated to a
+## combination of layers (see rd_estimate.py). Only the textures are
+## estimated: the fields of motion are not taken into account.
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param pictures Total number of images to process.
+#  @param _COMBINATION List the number of layers of each subband.
+#  @return The Kbps of the textures and the RMSE of the GOP.
+def estimation (FIRST_picture_ofGOP, pictures, _COMBINATION) :
+    global rd_estimator
+    if rd_estimator == None :
+        rd_estimator = rd_estimate.estimator(TRLs, pixels_in_x, pixels_in_y, update_factor, os.environ.get("MCTF_TEXTURE_CODEC", "j2k"), path_base)
+    os.chdir(path_base)
+    texture_bytes, rmse1D = rd_estimator.estimate(FIRST_picture_ofGOP, pictures, _COMBINATION[:TRLs])
+    return texture_bytes * 8.0 / 1000 / ((pictures - FIRST_picture_ofGOP) / (FPS * 1.0)), rmse1D
+
+
+
+
+
+## Candidates of a step of FS-opt which are evaluated (see
+## --estimate): the candidates of the fields of motion and the
+## candidates of the textures with the best estimated slopes. As lba()
+## skips the empty layers, the slope of a subband is estimated with the
+## first layers which decrease the estimated RMSE.
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param pictures Total number of images to process.
+#  @param _CAPAS List the number of layers of each subband of the best truncated codestream.
+#  @param _REDUCES List of reductions in the spatial resolution for each subband of the best truncated codestream.
+#  @return The subbands (and fields of motion) of the candidates.
+def estimated_candidates (FIRST_picture_ofGOP, pictures, _CAPAS, _REDUCES) :
+
+    # The estimations do not model the reductions.
+    if estimate <= 0 or max(_REDUCES[:TRLs]) != 0 :
+        return range (0, len(_CAPAS))
+
+    kbps_antes, rmse1D_antes = estimation (FIRST_picture_ofGOP, pictures, _CAPAS)
+    slopes = []
+    for z in range (0, TRLs) :
+        _COMBINATION = _CAPAS[:]
+        while _COMBINATION[z] < Ncapas_T :
+            _COMBINATION[z] += 1
+            kbps, rmse1D = estimation (FIRST_picture_ofGOP, pictures, _COMBINATION)
+            if rmse1D < rmse1D_antes :
+                slopes.append(((rmse1D_antes - rmse1D) / max(kbps - kbps_antes, 0.001), z))
+                break
+
+    slopes.sort(reverse=True)
+    return sorted([z for slope, z in slopes[:estimate]]) + range (TRLs, len(_CAPAS))
+
+
+
+
+
+## Estimated slope (radian) between two truncated codestreams of SR-opt
+## which only differ in the layers of the textures (see estimation()).
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param iGOP GOP number of the current iteration.
+#  @param pictures Total number of images to process.
+#  @param _ANTERIOR List the number of layers of each subband of the previous codestream.
+#  @param _COMBINATION List the number of layers of each subband of the codestream.
+#  @return The radian (0 if the RMSE does not decrease).
+def estimated_radian (FIRST_picture_ofGOP, iGOP, pictures, _ANTERIOR, _COMBINATION) :
+
+    kbps_antes, rmse1D_antes = estimation (FIRST_picture_ofGOP, pictures, _ANTERIOR)
+    kbps, rmse1D = estimation (FIRST_picture_ofGOP, pictures, _COMBINATION)
+
+    radian = 0
+    if rmse1D_antes > rmse1D :
+        radian = math.atan ( (rmse1D_antes - rmse1D) / max(kbps - kbps_antes, 0.001) )
+
+    check_call("echo \"" + str(_COMBINATION) + " * estimated  T " + str(kbps) + "\tRMSE " + str(rmse1D) + "\t:: " + str("%.9f" % radian) + "\" >> " + str(INFO) + "_GOP" + str(iGOP) + "de" + str(GOPs) + "_detalle", shell=True)
+    return radian
+
+
+
+
+
+## Determines between various truncated codestream, which is better, in terms of bit-rate and rmse.
+#  @param FIRST_picture_ofGOP Number of the first image of the GOP.
+#  @param iGOP GOP number of the current iteration.
+#  @param pictures Total number of images to process. It may correspond to the images of a GOP, or all images in the sequence.
+#  @param kbps_antes Kbps of a truncated codestream. These Kbps are taken as reference for future comparisons.
+#  @param rmse1D_antes Distortion of a truncated codestream. This distortion is taken as reference for future comparisons.
+#  @param radian_candidato Index linking the pair R / D (rate-distortion). The higher the index, the higher value of the codestream.
+#  @param kbps_candidato Codestream kbps from the best known so far.
+#  @param rmse1D_candidato Distorsion from the codestream best known so far.
+#  @param _CANDIDATO List the number of layers for each sub-band, best known so far codestream.
+#  @param _CANDIDATO_REDUCES List of reductions in the spatial resolution for each subband (for the best codestream). Its default value is 0. Not usually used because, as scalability gives better results.
+#  @param _CANDIDATO_REDUCES_normalized List of reductions in the spatial resolution for each subband. In which, the reduction values are tested for changes in spatial resolution, do not lead to problems with block sizes, etc. Its default value is 0. Not usually used because, as scalability gives better results.
+#  @param emptyLayer Indicates whether the codestream has empty layers.
+#  @param CANDIDATO_KBPS Codestream kbps Known from the best so far; detailed for each subband and motion field.
+#  @param _COMBINATION List the number of layers of each subband from a codestream.
+#  @param _COMBINATION_REDUCES List of reductions in the spatial resolution for each subband (for a codestream evaluation).
+#  @param snr_fileA Original sequence or part of it. This is not the video stream but a link to it.
+#  @param snr_fileB Reconstruction of a codestream or part of it. This is not the video stream but a link to it.
+#  @return List the number of layers for each sub-band, best known so far codestream, called candidate.
+def lba (FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB) : # looking the best angle
+
+    # Displays information about the execution:
+    # raw_input("_COMBINATION en lba: " + str(_COMBINATION)) # !
+    # raw_input("_REDUCES en lba: " + str(_REDUCES)) # !
+    # raw_input("ANTES TRANSCODE") # !
+    # check_call("echo lba:" + str(FIRST_picture_ofGOP) + " " + str(pictures), shell=True) # !
+    # raw_input("")
+
+
+    # Normalize reduces and new values, resolution and block size.
+    #--------------------------------------------------------------
+    _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES = geometry (_COMBINATION_REDUCES)
+
+
+
+    # EVALUATE. The evaluations already known are not repeated (see rd_cache.py).
+    #------------------------------------------------------------------------------
+    key = evaluation_key (FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, snr_fileA, snr_fileB)
+    evaluation = rd_evaluations.get(key)
+    if evaluation == None :
+        evaluation = evaluate (FIRST_picture_ofGOP, iGOP, pictures, _COMBINATION, _COMBINATION_REDUCES_normalized, _PIXELS_IN_X, _PIXELS_IN_Y, _BLOCK_SIZES, snr_fileA, snr_fileB, path_extract, path_tmp)
+        rd_evaluations.put(key, evaluation)
+    kbps_M_average, kbps_T, kbps_TM, kbps_TM_average, rmse1D = evaluation
+
 
 
     # KBPS y RMSE.
@@ -1287,6 +1601,54 @@ def averages_file (AVERAGES, RMSEs) :
 # 4) Full Search.
 #----------------
 
+## Candidate of the Full-Search algorithm for a subband: the best
+## truncated codestream found so far, with one more layer (or one
+## reduction less) of the subband.
+#  @param z The subband (or field of motion).
+#  @param _CAPAS List the number of layers of each subband of the best truncated codestream.
+#  @param _REDUCES List of reductions in the spatial resolution for each subband of the best truncated codestream.
+#  @param emptyLayer Number of empty layers of the subband found so far.
+#  @return The number of layers and the reductions of each subband of the candidate, and if the candidate exists.
+def brute_force_candidate (z, _CAPAS, _REDUCES, emptyLayer) :
+
+    _COMBINATION = _CAPAS[:] # Initializes _COMBINATION
+    _COMBINATION_REDUCES = _REDUCES[:]
+    available = False
+
+    if z < TRLs : # TEXTURES
+
+        if _REDUCES[z] > 0 : # reduces available
+            _COMBINATION_REDUCES[:TRLs] = [_REDUCES[z] - 1] * TRLs
+            if _COMBINATION[z] == 0 :
+                _COMBINATION[z] = 1 # At least one layer.
+            available = True
+
+        elif (_CAPAS[z] + emptyLayer) < Ncapas_T : # T available layers.
+            _COMBINATION[z] = _CAPAS[z] + 1 + emptyLayer
+            if _COMBINATION[z] < Ncapas_T :
+                _COMBINATION_REDUCES[:TRLs] = [Nclevels_T] * TRLs # Equally all subbands.
+            available = True
+
+    else : # MOTION
+
+        if _REDUCES[z] > 0 : # reduces available
+            _COMBINATION_REDUCES[z] = _REDUCES[z] - 1 # Each field of motion independently.
+            if _COMBINATION[z] == 0 :
+                _COMBINATION[z] = 1 # Al menos una capa
+            available = True
+
+        elif (_CAPAS[z] + emptyLayer) < Ncapas_M : # M available layers.
+            _COMBINATION[z] = _CAPAS[z] + 1 + emptyLayer
+            if _COMBINATION[z] < Ncapas_M :
+                _COMBINATION_REDUCES[z] = Nclevels_M # Each field of motion independently.
+            available = True
+
+    return _COMBINATION, _COMBINATION_REDUCES, available
+
+
+
+
+
 ## Sorting algorithm: Full Search R/D optimization (FS-opt): This
 ## technique is based on the idea that the optimal order of subbands
 ## and quality layers of a compressed video can be determined by
@@ -1325,6 +1687,7 @@ def BRC_BruteForce (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLETAS, AVERA
     radian           = 0
 
     emptyLayer       = 0
+    exhaustive       = False
 
     _CEROS           = [0] * N_subbands
     _CAPAS           = [0] * N_subbands
@@ -1389,46 +1752,35 @@ def BRC_BruteForce (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLETAS, AVERA
         # raw_input("actualiza _CAPAS: " + str(_CAPAS)) # !
         check_call("echo \"-> " + str(_CANDIDATO) + " * " + str(_CANDIDATO_REDUCES_normalized) + "\" >> " + str(INFO) + "_GOP" + str(iGOP) + "de" + str(GOPs) + "_detalle ; echo >> " + str(INFO) + "_GOP" + str(iGOP) + "de" + str(GOPs) + "_detalle", shell=True)
 
+        # With --estimate, only the candidates with the best estimated
+        # slopes are evaluated. After a step without a better
+        # candidate, all of them are evaluated.
+        if exhaustive :
+            _SELECTED = range (0, len(_CAPAS))
+        else :
+            _SELECTED = estimated_candidates (FIRST_picture_ofGOP, pictures, _CAPAS, _REDUCES)
+
+        # The candidates of each subband (without empty layers) are
+        # evaluated concurrently.
+        evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures,
+                             [(c[0], c[1], snr_fileA, snr_fileB) for c in [brute_force_candidate (z, _CAPAS, _REDUCES, 0) for z in _SELECTED] if c[2]])
+
         emptyLayer = 0
         z = 0
         while z < len(_CAPAS) : # Walk each subband # In python, the 'For' can not change Z for emptyLayer.
-            _COMBINATION = _CAPAS[:] # Initializes _COMBINATION
-            _COMBINATION_REDUCES = _REDUCES[:]
+            _COMBINATION, _COMBINATION_REDUCES, available = brute_force_candidate (z, _CAPAS, _REDUCES, emptyLayer)
             # raw_input("Initializes _COMBINATION: " + str(_COMBINATION) + "con REDUCES: " + str(_REDUCES)) # !
             # check_call("echo " + str(_COMBINATION_REDUCES),shell=True) # !
             # raw_input("") # !
 
-            if z < TRLs : # TEXTURES
-
-                if _REDUCES[z] > 0 : # reduces available
-                    _COMBINATION_REDUCES[:TRLs] = [_REDUCES[z] - 1] * TRLs
-                    if _COMBINATION[z] == 0 :
-                        _COMBINATION[z] = 1 # At least one layer.
-                    kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
-
-                elif (_CAPAS[z] + emptyLayer) < Ncapas_T : # T available layers.
-                    _COMBINATION[z] = _CAPAS[z] + 1 + emptyLayer
-                    if _COMBINATION[z] < Ncapas_T :
-                        _COMBINATION_REDUCES[:TRLs] = [Nclevels_T] * TRLs # Equally all subbands.
-                    kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
+            if available and z in _SELECTED :
+                kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
 
+            if z < TRLs : # TEXTURES
                 if _COMBINATION[z] == Ncapas_T :
                     emptyLayer = 0
 
             else : # MOTION
-
-                if _REDUCES[z] > 0 : # reduces available
-                    _COMBINATION_REDUCES[z] = _REDUCES[z] - 1 # Each field of motion independently.
-                    if _COMBINATION[z] == 0 :
-                        _COMBINATION[z] = 1 # Al menos una capa
-                    kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
-
-                elif (_CAPAS[z] + emptyLayer) < Ncapas_M : # M available layers.
-                    _COMBINATION[z] = _CAPAS[z] + 1 + emptyLayer
-                    if _COMBINATION[z] < Ncapas_M :
-                        _COMBINATION_REDUCES[z] = Nclevels_M # Each field of motion independently.
-                    kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
-
                 if _COMBINATION[z] == Ncapas_M :
                     emptyLayer = 0
 
@@ -1448,8 +1800,11 @@ def BRC_BruteForce (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLETAS, AVERA
 
             rmse1D_antes = rmse1D_first
             check_call("echo \"" + "\nLa distorsion ha aumentado.\" >> " + str(INFO) + "_GOP" + str(iGOP) + "de" + str(GOPs) + "_detalle", shell=True)
+            exhaustive = len(_SELECTED) < len(_CAPAS)
 
         else :
+            exhaustive = False
+
             # Save AVERAGES
             AVERAGES, RMSEs = save_AVERAGES (iGOP, AVERAGES, RMSEs, kbps_candidato, rmse1D_candidato)
 
@@ -1519,13 +1874,24 @@ def OneSub_ForAll_PtAnterior (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLE
 
 
     # 2. It tests ASSESSMENTS (extraction + reconstruction) resulting slopes (radian).
+    # With --estimate, the slope of a shipment which only adds layers
+    # of textures to the previous one (with all the fields of motion)
+    # is estimated (see estimated_radian()). The CHECK below evaluates
+    # the sorted shipments.
+    _ESTIMADAS = [estimate > 0 and u > 0 and max(_COMBINATION_REDUCES[:TRLs]) == 0
+                  and _ENVIOS[u-1][TRLs:] == _CAPAS_COMPLETAS[TRLs:] and _ENVIOS[u][TRLs:] == _CAPAS_COMPLETAS[TRLs:]
+                  for u in range (0, len(_ENVIOS))]
+    evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures, [(_ENVIOS[u], _COMBINATION_REDUCES, snr_fileA, snr_fileB) for u in range (0, len(_ENVIOS)) if not _ESTIMADAS[u]])
     for u in range (0, len(_ENVIOS)) :
         _COMBINATION = _ENVIOS[u][:]
-        kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
+        if _ESTIMADAS[u] :
+            radian = estimated_radian (FIRST_picture_ofGOP, iGOP, pictures, _ENVIOS[u-1], _COMBINATION)
+        else :
+            kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
 
-        # RESPECT THE PREVIOUS ITEM, not referred to starting point.
-        rmse1D_antes = rmse1D
-        kbps_antes   = kbps_TM[1] # kbps @@@
+            # RESPECT THE PREVIOUS ITEM, not referred to starting point.
+            rmse1D_antes = rmse1D
+            kbps_antes   = kbps_TM[1] # kbps @@@
 
         # Collect the results of evaluations: sending his radian.
         _EVALUACIONES.append([_ENVIOS[u][:], _SUB_EVALUADA[u][:], radian])
@@ -1583,6 +1949,7 @@ def OneSub_ForAll_PtAnterior (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLE
 
     # . CHECK THE SHIPPING OPTIMIZADO. This code is not required, only serves to research tasks.
     _ENVIOS = _ENVIOS[1:][:]
+    evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures, [(e, _COMBINATION_REDUCES, snr_fileA, snr_fileB) for e in _ENVIOS])
     for u in range (0, len(_ENVIOS)) :
         _COMBINATION = _ENVIOS[u][:]
         kbps_TM, kbps_TM_average, rmse1D, kbps_antes, rmse1D_antes, radian, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, KBPS_DATA, CANDIDATO_KBPS = lba(FIRST_picture_ofGOP, iGOP, pictures, kbps_antes, rmse1D_antes, radian_candidato, kbps_candidato, rmse1D_candidato, _CANDIDATO, _CANDIDATO_REDUCES, _CANDIDATO_REDUCES_normalized, emptyLayer, CANDIDATO_KBPS, _COMBINATION, _COMBINATION_REDUCES, snr_fileA, snr_fileB)
@@ -1601,6 +1968,26 @@ def OneSub_ForAll_PtAnterior (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLE
 # 6) 10. Isolated Subband Removing.
 #----------------------------------
 
+## Files of the SNR of an evaluation of the ISR-opt algorithm: the
+## subband which is sent and its reconstruction.
+#  @param _ENVIO The number of layers of each subband (only one subband has layers).
+#  @return The files snr_fileA and snr_fileB.
+def isolated_snr_files (_ENVIO) :
+
+    # snr_fileA=low_4 snr_fileB=../low_4 ; snr_fileA=high_4 snr_fileB=../high_4 ; snr_fileA=high_3 snr_fileB=../high_3 ; snr_fileA=high_2 snr_fileB=../high_2 ; snr_fileA=high_1 snr_fileB=../high_1
+    _sub_sent = [[i for i, x in enumerate(_ENVIO) if x != e] for e in [0]]
+    if _sub_sent[0][0] == 0 :
+        snr_fileA = "low_" + str(TRLs-1)
+    else :
+        snr_fileA = "high_" + str(TRLs-_sub_sent[0][0])
+    snr_fileB = "../" + snr_fileA
+    #print str(_sub_sent[0][0]) + " " + str(snr_fileA) + " " + str(snr_fileB)
+    return snr_fileA, snr_fileB
+
+
+
+
+
 ## Sorting algorithm: Isolated Subband Removing R/D optimization
 ## (ISR-opt). The computational cost of Algorithm SR-opt can be reduced
 ## if the contribution of a set of quality layers of a subband can be
@@ -1654,18 +2041,12 @@ def Sub_Independents (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLETAS, AVE
 
 
     # 2. It tests ASSESSMENTS (extraction + reconstruction) resulting slopes (radian).
+    evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures, [(e, _COMBINATION_REDUCES) + isolated_snr_files (e) for e in _ENVIOS])
 
     for u in range (0, len(_ENVIOS)) :
 
         # UPDATE the comparison of SNR, each time you change the lba subband (between _ENVIO_VACIO)
-        # snr_fileA=low_4 snr_fileB=../low_4 ; snr_fileA=high_4 snr_fileB=../high_4 ; snr_fileA=high_3 snr_fileB=../high_3 ; snr_fileA=high_2 snr_fileB=../high_2 ; snr_fileA=high_1 snr_fileB=../high_1
-        _sub_sent = [[i for i, x in enumerate(_ENVIOS[u]) if x != e] for e in [0]]
-        if _sub_sent[0][0] == 0 :
-            snr_fileA = "low_" + str(TRLs-1)
-        else :
-            snr_fileA = "high_" + str(TRLs-_sub_sent[0][0])
-        snr_fileB = "../" + snr_fileA
-        #print str(_sub_sent[0][0]) + " " + str(snr_fileA) + " " + str(snr_fileB)
+        snr_fileA, snr_fileB = isolated_snr_files (_ENVIOS[u])
 
         # CHECK
         _COMBINATION = _ENVIOS[u][:]
@@ -1746,6 +2127,7 @@ def Sub_Independents (iGOP, FIRST_picture_ofGOP, pictures, _CAPAS_COMPLETAS, AVE
     snr_fileA = "low_0"
     snr_fileB = "../low_0" + str(iGOP) # Each GOP is independent of the others.
     _ENVIOS = _ENVIOS[1:][:]
+    evaluate_candidates (FIRST_picture_ofGOP, iGOP, pictures, [(e, _COMBINATION_REDUCES, snr_fileA, snr_fileB) for e in _ENVIOS])
 
     for u in range (0, len(_ENVIOS)) :
         _COMBINATION = _ENVIOS[u][:]
@@ -1868,6 +2250,15 @@ path_extract = path_base + "/extract"
 ## Reconstruction path.
 path_tmp     = path_base + "/tmp"
 
+## Files of the codestream (the subbands, the fields of motion and the
+## types of the frames), which identify the evaluations of the cache.
+codestream_files = [str(path_base) + "/" + f for f in os.listdir(path_base)
+                    if re.match("(" + HIGH + "|" + LOW + "|" + MOTION + ")[0-9]+(_\\w+)?\\.(" + container.EXTENSION + "|j2c|mjc)$", f)
+                    or re.match("frame_types_[0-9]+$", f)]
+## Cache of the rate-distortion evaluations. An interrupted
+## optimization is resumed from it.
+rd_evaluations   = rd_cache.cache(os.path.join(path_base, rd_cache_file), rd_cache.digest(codestream_files))
+
 
 # Inicialization
 #--------------------
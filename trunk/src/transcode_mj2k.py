@@ -83,9 +83,7 @@ def usage():
 ## Define the variable for options.
 opts = ""
 
-ifdef({{DEBUG}},
-display.info(str(sys.argv[0:]) + '\n')
-)
+display.log_debug(str(sys.argv[0:]) + '\n')
 
 try:
     opts, extraparams = getopt.getopt(sys.argv[1:],"l:p:x:y:t:h",
@@ -106,29 +104,19 @@ params = ""
 for o, a in opts:
     if o in ("-l", "--layers"):
         layers = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": layers=" + str(layers) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": layers=" + str(layers) + '\n')
     if o in ("-p", "--pictures"):
         pictures = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pictures=" + str(pictures) + '\n')
     if o in ("-x", "--pixels_in_x"):
         pixels_in_x = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_x=" + str(pixels_in_x) + '\n')
     if o in ("-y", "--pixels_in_y"):
         pixels_in_y = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": pixels_in_y=" + str(pixels_in_y) + '\n')
     if o in ("-t", "--temporal_levels"):
         temporal_levels = int(a)
-        ifdef({{DEBUG}},
-        display.info(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
-        )
+        display.log_debug(sys.argv[0] + ": temporal_levels=" + str(temporal_levels) + '\n')
     if o in ("-h", "--help"):
 	usage()
 	sys.exit()
@@ -139,9 +127,7 @@ subband = 1
 
 ## Extracts a number of quality layers.
 command = "mkdir extract"
-ifdef({{DEBUG}},
-display.info(sys.argv[0] + ": " + command + "\n")
-)
+display.log_debug(sys.argv[0] + ": " + command + "\n")
 os.system(command)
 
 
@@ -150,9 +136,7 @@ os.system(command)
 #-------------------------------------
 while subband < temporal_levels:
 
-    ifdef({{DEBUG}},
-    display.info(sys.argv[0] + ": processing high-pass subband " + str(subband) + " of " + str(temporal_levels) + "\n")
-    )
+    display.log_debug(sys.argv[0] + ": processing high-pass subband " + str(subband) + " of " + str(temporal_levels) + "\n")
 
     ## Name of the input file.
     entrada = HIGH + "_" + str(subband) + ".mj2"
@@ -162,9 +146,7 @@ while subband < temporal_levels:
 
     # Copy the file header '.mj2'.
     command = "dd if=" + entrada + " of=" + salida + " skip=0 ibs=1 count=20"
-    ifdef({{DEBUG}},
-    display.info(sys.argv[0] + ": " + command + "\n")
-    )
+    display.log_debug(sys.argv[0] + ": " + command + "\n")
     os.system(command)
 
     ## Open the input file, now to find the EOC (0xFFD9) of each
@@ -186,35 +168,25 @@ while subband < temporal_levels:
 
                 # Extract the image.
                 command = "dd if=" + entrada + " of=image_Aux.j2c skip=" + str(startImage) + " ibs=1 count=" + str(endImage - startImage)
-                ifdef({{DEBUG}},
-                display.info(sys.argv[0] + ": " + command + "\n")
-                )
+                display.log_debug(sys.argv[0] + ": " + command + "\n")
                 os.system(command)
 
                 # Extracts the first layer (s) of quality.
                 command = "kdu_transcode -i image_Aux.j2c -o image_Out.j2c Clayers=" + str(layers)
-                ifdef({{DEBUG}},
-                display.info(sys.argv[0] + ": " + command + "\n")
-                )
+                display.log_debug(sys.argv[0] + ": " + command + "\n")
                 os.system(command)
 
                 # Add the generated image.
                 command = "cat image_Out.j2c >> " + salida
-                ifdef({{DEBUG}},
-                display.info(sys.argv[0] + ": " + command + "\n")
-                )
+                display.log_debug(sys.argv[0] + ": " + command + "\n")
                 os.system(command)
             
                 # Concatenate '0x0000179A' at the end of "exit".
                 command = "dd if=" + entrada + " of=/tmp/extract.tmp skip=" + str(endImage) + " bs=1 count=4" 
-                ifdef({{DEBUG}},
-                display.info(sys.argv[0] + ": " + command + "\n")
-                )
+                display.log_debug(sys.argv[0] + ": " + command + "\n")
                 os.system(command)
                 command = "cat /tmp/extract.tmp >> " + salida
-                ifdef({{DEBUG}},
-                display.info(sys.argv[0] + ": " + command + "\n")
-                )
+                display.log_debug(sys.argv[0] + ": " + command + "\n")
                 os.system(command)
 
                 # Skip the last 4 bytes of padding.
@@ -231,9 +203,7 @@ subband -= 1
 
 # Handles the LOW frequency subbands.
 #-------------------------------------
-ifdef({{DEBUG}},
-display.info(sys.argv[0] + ": processing low-pass subband " + str(subband) + " of " + str(temporal_levels) + "\n")
-)
+display.log_debug(sys.argv[0] + ": processing low-pass subband " + str(subband) + " of " + str(temporal_levels) + "\n")
 
 # Name of the input file.
 entrada = LOW + "_" + str(subband) + ".mj2"
@@ -243,9 +213,7 @@ salida = "extract/" + entrada
 
 # Copy the file header '.mj2'.
 command = "dd if=" + entrada + " of=" + salida + " skip=0 ibs=1 count=20"
-ifdef({{DEBUG}},
-display.info(sys.argv[0] + ": " + command + "\n")
-)
+display.log_debug(sys.argv[0] + ": " + command + "\n")
 os.system(command)
 
 # Open the input file, now to find the EOC (0xFFD9) of each
@@ -266,35 +234,25 @@ while byte != '':
 
             # Extract the image.
             command = "dd if=" + entrada + " of=image_Aux.j2c skip=" + str(startImage) + " ibs=1 count=" + str(endImage - startImage)
-            ifdef({{DEBUG}},
-            display.info(sys.argv[0] + ": " + command + "\n")
-            )
+            display.log_debug(sys.argv[0] + ": " + command + "\n")
             os.system(command)
 
             # Extracts the first layer (s) of quality.
             command = "kdu_transcode -i image_Aux.j2c -o image_Out.j2c Clayers=" + str(layers)
-            ifdef({{DEBUG}},
-            display.info(sys.argv[0] + ": " + command + "\n")
-            )
+            display.log_debug(sys.argv[0] + ": " + command + "\n")
             os.system(command)
 
             # Add the generated image.
             command = "cat image_Out.j2c >> " + salida
-            ifdef({{DEBUG}},
-            display.info(sys.argv[0] + ": " + command + "\n")
-            )
+            display.log_debug(sys.argv[0] + ": " + command + "\n")
             os.system(command)
 
             # Concatenate '0x0000179A' at the end of "exit".
             command = "dd if=" + entrada + " of=/tmp/extract.tmp skip=" + str(endImage) + " bs=1 count=4" 
-            ifdef({{DEBUG}},
-            display.info(sys.argv[0] + ": " + command + "\n")
-            )
+            display.log_debug(sys.argv[0] + ": " + command + "\n")
             os.system(command)
             command = "cat /tmp/extract.tmp >> " + salida
-            ifdef({{DEBUG}},
-            display.info(sys.argv[0] + ": " + command + "\n")
-            )
+            display.log_debug(sys.argv[0] + ": " + command + "\n")
             os.system(command)
 
             # Skip the last 4 bytes of padding.
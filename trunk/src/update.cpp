@@ -16,8 +16,11 @@
 //#include "SP.cpp"
 #include "dwt2d.cpp"
 #include "texture.cpp"
-#include "motion.cpp"
 #include "display.cpp"
+#include "motion.cpp"
+#include "profile.cpp"
+#include "threads.cpp"
+#include "lazy.cpp"
 
 /** \brief TC = Texture Component; IO = Input Output. */
 #define TC_IO_TYPE unsigned char
@@ -39,8 +42,21 @@
 #define PIXELS_IN_X 352
 /** \brief Dimension 'Y' of a picture. */
 #define PIXELS_IN_Y 288
-/* \brief If defined, shows information about the execution. */
-//#define DEBUG
+
+/** \brief Time spent reading the pictures and the motion fields. */
+static int read_timer = profile_timer("read");
+/** \brief Time spent writing the pictures. */
+static int write_timer = profile_timer("write");
+/** \brief Time spent updating the pictures. */
+static int update_timer = profile_timer("update");
+/** \brief Number of updated pictures. */
+static int pictures_counter = profile_counter("pictures");
+/** \brief Number of updates (one per reference of a B picture). */
+static int updates_counter = profile_counter("updates");
+/** \brief Number of bytes read. */
+static int bytes_read_counter = profile_counter("bytes_read");
+/** \brief Number of bytes written. */
+static int bytes_written_counter = profile_counter("bytes_written");
 
 /** \brief Clipping.
  * \param x Element to clip.
@@ -53,10 +69,15 @@ int clip(int x, int dim) {
   return x;   
 }
 
-/** \brief Add the pairs images (S_ {2t}) to the prediction error. 
- * This should reduce the aliasing and therefore improve cornering 
- * R/D for maximum frame-rate. A lower frame-rate, should be improved 
- * visual quality.
+/** \brief Add the pairs images (S_ {2t}) to the prediction error.
+ * This should reduce the aliasing and therefore improve cornering
+ * R/D for maximum frame-rate. A lower frame-rate, should be improved
+ * visual quality.\n
+ * Only the reference "ref" (PREV or NEXT) of the residue picture is
+ * updated. Each even picture is updated first as the NEXT reference
+ * of the previous residue and then as the PREV reference of the
+ * following one.
+ * \param ref Reference to update (PREV or NEXT).
  * \param block_size Size block.
  * \param blocks_in_y Dimension 'Y' of blocks in a picture.
  * \param blocks_in_x Dimension 'X' of blocks in a picture.
@@ -70,6 +91,7 @@ int clip(int x, int dim) {
  */
 void update
 (
+ int ref,
  int block_size,
  int blocks_in_y,
  int blocks_in_x,
@@ -77,7 +99,7 @@ void update
  MVC_TYPE ****mv,
  int *pixels_in_y,
  int *pixels_in_x,
- TC_CPU_TYPE ****reference_picture,
+ TC_CPU_TYPE ***reference_picture,
  TEC_CPU_TYPE ***residue_picture,
  float update_factor
 ) {
@@ -89,16 +111,16 @@ void update
 	  for(int x=0; x<block_size; x++) {
 	    float aux;
 
-	      /* Updates the previous image. */
-	      aux = reference_picture[PREV][c]
-		[clip(by*block_size+y+mv[PREV][Y_FIELD][by][bx],pixels_in_y[c])]
-		[clip(bx*block_size+x+mv[PREV][X_FIELD][by][bx],pixels_in_x[c])];
+	      /* Updates the reference image. */
+	      aux = reference_picture[c]
+		[clip(by*block_size+y+mv[ref][Y_FIELD][by][bx],pixels_in_y[c])]
+		[clip(bx*block_size+x+mv[ref][X_FIELD][by][bx],pixels_in_x[c])];
 
 	      //aux *= update_factor /* 1<<iteration */;
 
 	      aux
 #ifdef ANALYZE
-		+= 
+		+=
 #else
 		-=
 #endif
@@ -109,37 +131,12 @@ void update
 	      if(aux > MAX_TC_VAL) aux = MAX_TC_VAL;
 	      else if(aux < MIN_TC_VAL) aux = MIN_TC_VAL;
 
-	      reference_picture[PREV][c]
-		[clip(by*block_size+y+mv[PREV][Y_FIELD][by][bx],pixels_in_y[c])]
-		[clip(bx*block_size+x+mv[PREV][X_FIELD][by][bx],pixels_in_x[c])]
+	      reference_picture[c]
+		[clip(by*block_size+y+mv[ref][Y_FIELD][by][bx],pixels_in_y[c])]
+		[clip(bx*block_size+x+mv[ref][X_FIELD][by][bx],pixels_in_x[c])]
 		= aux;
-	      
-	      /* Updates the afterimage. */
-	      aux = reference_picture[NEXT][c]
-		[clip(by*block_size+y+mv[NEXT][Y_FIELD][by][bx],pixels_in_y[c])]
-		[clip(bx*block_size+x+mv[NEXT][X_FIELD][by][bx],pixels_in_x[c])];
-	      
-	      //aux *= update_factor;
 
-	      aux
-#ifdef ANALYZE
-		+= 
-#else
-		-=
-#endif
-		residue_picture[c][by*block_size+y][bx*block_size+x] * update_factor;
-
-	      //aux /= update_factor;
-	      
-	      if(aux > MAX_TC_VAL) aux = MAX_TC_VAL;
-	      else if(aux < MIN_TC_VAL) aux = MIN_TC_VAL;
-
-	      reference_picture[NEXT][c]
-		[clip(by*block_size+y+mv[NEXT][Y_FIELD][by][bx],pixels_in_y[c])]
-		[clip(bx*block_size+x+mv[NEXT][X_FIELD][by][bx],pixels_in_x[c])]
-		= aux;
-
-	  }	    
+	  }
 	}
       }
     }
@@ -147,6 +144,118 @@ void update
   // }}}
 }
 
+/** \brief A window of even pictures which are updated concurrently.\n
+ * The even picture "j" of the window depends only on the residues
+ * (and motion fields and frame types) "j" and "j+1" of the window,
+ * where the residue "0" is the last residue of the previous window.
+ */
+struct window {
+  /** \brief Size block. */
+  int block_size;
+  /** \brief Dimension 'Y' of blocks in a picture. */
+  int blocks_in_y;
+  /** \brief Dimension 'X' of blocks in a picture. */
+  int blocks_in_x;
+  /** \brief Dimension 'Y' of the components (as they are stored). */
+  int *pixels_in_y;
+  /** \brief Dimension 'X' of the components (as they are stored). */
+  int *pixels_in_x;
+  /** \brief Dimension 'Y' of the components (in memory). */
+  int *piy;
+  /** \brief Dimension 'X' of the components (in memory). */
+  int *pix;
+  /** \brief Level update. */
+  float update_factor;
+  /** \brief Index (in the sequence) of the first even picture of the window. */
+  int first;
+  /** \brief Number of residue pictures of the sequence. */
+  int residues;
+  /** \brief A texture interpolation filter per thread. */
+  class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > **image_dwt;
+  /** \brief The even pictures. */
+  TC_CPU_TYPE ****reference;
+  /** \brief The residue pictures (one more than even pictures). */
+  TEC_CPU_TYPE ****residue;
+  /** \brief The motion fields (one more than even pictures). */
+  MVC_TYPE *****mv;
+  /** \brief The frame types (one more than even pictures). */
+  char *frame_type;
+};
+
+/** \brief Interpolates the chroma of the even picture "task" of a
+ * window, updates it with its previous and next residues and
+ * sub-samples the chroma again.
+ * \param task Index of the even picture.
+ * \param thread Index of the thread.
+ * \param arg A window.
+ */
+void update_task(int task, int thread, void *arg) {
+  struct window *w = (struct window *)arg;
+  int *pixels_in_y = w->pixels_in_y;
+  int *pixels_in_x = w->pixels_in_x;
+  class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > *image_dwt = w->image_dwt[thread];
+  TC_CPU_TYPE ***reference = w->reference[task];
+  int picture = w->first + task;
+
+  profile_count(pictures_counter, 1);
+
+  for(int y=0; y<pixels_in_y[0]/2; y++) {
+    for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
+      reference[1][y][x] = 0;
+      reference[2][y][x] = 0;
+    }
+  }
+  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
+    for(int x=0; x<pixels_in_x[0]/2; x++) {
+      reference[1][y][x] = 0;
+      reference[2][y][x] = 0;
+    }
+  }
+  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
+    for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
+      reference[1][y][x] = 0;
+      reference[2][y][x] = 0;
+    }
+  }
+  image_dwt->synthesize(reference[1], pixels_in_y[0], pixels_in_x[0], 1);
+  image_dwt->synthesize(reference[2], pixels_in_y[0], pixels_in_x[0], 1);
+
+  /* The picture is the next reference of the previous residue ... */
+  if((picture > 0) && (w->frame_type[task] == 'B')) {
+    profile_count(updates_counter, 1);
+    update(NEXT,
+	   w->block_size,
+	   w->blocks_in_y,
+	   w->blocks_in_x,
+	   COMPONENTS,
+	   w->mv[task],
+	   w->piy,
+	   w->pix,
+	   reference,
+	   w->residue[task],
+	   w->update_factor);
+  }
+
+  /* ... and the previous reference of the next one. */
+  if((picture < w->residues) && (w->frame_type[task+1] == 'B')) {
+    profile_count(updates_counter, 1);
+    update(PREV,
+	   w->block_size,
+	   w->blocks_in_y,
+	   w->blocks_in_x,
+	   COMPONENTS,
+	   w->mv[task+1],
+	   w->piy,
+	   w->pix,
+	   reference,
+	   w->residue[task+1],
+	   w->update_factor);
+  }
+
+  image_dwt->analyze(reference[1], pixels_in_y[0], pixels_in_x[0], 1);
+  image_dwt->analyze(reference[2], pixels_in_y[0], pixels_in_x[0], 1);
+}
+
 
 #include <getopt.h>
 
@@ -160,13 +269,8 @@ int main(int argc, char *argv[]) {
 
   // {{{ Command line support
 
-#if defined DEBUG
-  info("%s ", argv[0]);
-  for(int i=1; i<argc; i++) {
-    info("%s ", argv[i]);
-  }
-  info("\n");
-#endif
+  log_command_line(argc, argv);
+  profile_init(argv[0]);
   int block_size = 16;
   int components = COMPONENTS;
   char *even_fn = (char *)"even";
@@ -182,6 +286,9 @@ int main(int argc, char *argv[]) {
   float update_factor = 1.0/4; /*  This means that the high-frequency
 				   subband is 4 times less important
 				   than the low-frequency subband */
+  int threads = 1;
+  int window_size = 0; /* By default, as many pictures as threads */
+  int interleaved = 0; /* By default, the even pictures are not interleaved with the odd ones */
 
   
   int c;
@@ -201,12 +308,15 @@ int main(int argc, char *argv[]) {
       {"subpixel_accuracy", required_argument, 0, 'a'},
       {"help", no_argument, 0, '?'},
       {"update_factor", required_argument, 0, 'u'},
+      {"threads", required_argument, 0, 'T'},
+      {"window_size", required_argument, 0, 'w'},
+      {"interleaved", required_argument, 0, 'I'},
       {0, 0, 0, 0}
     };
 
     int option_index = 0;
 
-    c = getopt_long(argc, argv, "b:e:f:h:l:m:x:y:a:u:?", long_options, &option_index);
+    c = getopt_long(argc, argv, "b:e:f:h:l:m:x:y:a:u:T:w:I:?", long_options, &option_index);
 
     if(c==-1) {
       /* There are no more options. */
@@ -270,6 +380,18 @@ int main(int argc, char *argv[]) {
       update_factor = atof(optarg);
       break;
       
+    case 'T':
+      threads = atoi(optarg);
+      break;
+      
+    case 'w':
+      window_size = atoi(optarg);
+      break;
+
+    case 'I':
+      interleaved = atoi(optarg);
+      break;
+      
     case '?':
 #if defined ANALYZE
       printf("+-------------+\n");
@@ -300,6 +422,9 @@ int main(int argc, char *argv[]) {
       printf("   -[-]pixels_in_[y] = size of the Y dimension of the pictures (%d)\n", pixels_in_y[0]);
       printf("   -[-]subpixel_[a]ccuracy = sub-pixel accuracy of the motion estimation (%d)\n", subpixel_accuracy);
       printf("   -[-u]pdate_factor = weight of the update step (%f)\n", update_factor);
+      printf("   -[-T]hreads = number of pictures processed concurrently (%d)\n", threads);
+      printf("   -[-w]indow_size = number of pictures read ahead, 0 = as many as threads (%d)\n", window_size);
+      printf("   -[-I]nterleaved = 1 if the even pictures are the even pictures of even_fn (%d)\n", interleaved);
       printf("\n");
       exit(1);
       break;
@@ -374,19 +499,6 @@ int main(int argc, char *argv[]) {
   }
 
 
-  FILE *motion_fd; {
-    // {{{
-
-    motion_fd = fopen(motion_fn, "r");
-    if(!motion_fd) {
-      error("%s: unable to read \"%s\" ... aborting!\n",
-	    argv[0], motion_fn);
-      abort();
-    }
-
-    // }}}
-  }
-
   FILE *frame_types_fd; {
     // {{{
 
@@ -401,15 +513,6 @@ int main(int argc, char *argv[]) {
   }
 
 
-  class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > *image_dwt; {
-    // {{{
-
-    image_dwt = new class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > >;
-    image_dwt->set_max_line_size(PIXELS_IN_X_MAX);
-
-    // }}}
-  }
-  
   class dwt2d < TEC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TEC_CPU_TYPE > > *error_dwt; {
     // {{{
 
@@ -419,266 +522,239 @@ int main(int argc, char *argv[]) {
     // }}}
   }
 
+  if(threads < 1) threads = 1;
+  if(threads > THREADS_MAX) threads = THREADS_MAX;
+  if(window_size < 1) window_size = threads;
+
   int blocks_in_y = pixels_in_y[0]/block_size;
   int blocks_in_x = pixels_in_x[0]/block_size;
-#if defined DEBUG
-  info("%s: blocks in Y=%d\n", argv[0], blocks_in_y);
-  info("%s: blocks in X=%d\n", argv[0], blocks_in_x);
-#endif
+  log_debug("%s: blocks in Y=%d\n", argv[0], blocks_in_y);
+  log_debug("%s: blocks in X=%d\n", argv[0], blocks_in_x);
+  log_debug("%s: threads=%d\n", argv[0], threads);
+  log_debug("%s: window size=%d\n", argv[0], window_size);
 
   /** \tparam MVC_TYPE Motion vector component type. */
   motion < MVC_TYPE > motion;
 
-  MVC_TYPE ****mv; {
-    mv = motion.alloc(blocks_in_y, blocks_in_x);
+  motion_file motion_fields;
+  if(!motion_fields.open_read(motion_fn, blocks_in_y, blocks_in_x)) {
+    error("%s: unable to read \"%s\" ... aborting!\n",
+	  argv[0], motion_fn);
+    abort();
   }
 
   texture < TC_IO_TYPE, TC_CPU_TYPE > image;
   texture < TEC_IO_TYPE, TEC_CPU_TYPE > error;
 
-  TC_CPU_TYPE ***reference[2] /* In (5/3) we have 2 references */; {
+  piy[0] = piy[1] = piy[2] = pixels_in_y[0];
+  pix[0] = pix[1] = pix[2] = pixels_in_x[0];
+
+  struct window w;
+  w.block_size = block_size;
+  w.blocks_in_y = blocks_in_y;
+  w.blocks_in_x = blocks_in_x;
+  w.pixels_in_y = pixels_in_y;
+  w.pixels_in_x = pixels_in_x;
+  w.piy = piy;
+  w.pix = pix;
+  w.update_factor = update_factor;
+  w.residues = pictures/2;
+
+  w.image_dwt = new class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > > * [threads]; {
+    // {{{
+
+    for(int t=0; t<threads; t++) {
+      w.image_dwt[t] = new class dwt2d < TC_CPU_TYPE, TEXTURE_INTERPOLATION_FILTER < TC_CPU_TYPE > >;
+      w.image_dwt[t]->set_max_line_size(PIXELS_IN_X_MAX);
+    }
+
+    // }}}
+  }
+
+  w.reference = new TC_CPU_TYPE *** [window_size]; {
     // {{{
 
-    for(int i=0; i<2; i++) {
-      reference[i] = new TC_CPU_TYPE ** [COMPONENTS];
+    for(int i=0; i<window_size; i++) {
+      w.reference[i] = new TC_CPU_TYPE ** [COMPONENTS];
       for(int c=0; c<COMPONENTS; c++) {
-	reference[i][c] = image.alloc(pixels_in_y[0], pixels_in_x[0], 0);
+	w.reference[i][c] = image.alloc(pixels_in_y[0], pixels_in_x[0], 0);
       }
     }
 
     // }}}
   }
-  TEC_CPU_TYPE ***residue; {
-    residue = new TEC_CPU_TYPE ** [COMPONENTS];
-    for (int c=0; c<COMPONENTS; c++) {
-      residue[c] = error.alloc(pixels_in_y[0], pixels_in_x[0], 0);
+
+  w.residue = new TEC_CPU_TYPE *** [window_size + 1];
+  w.mv = new MVC_TYPE **** [window_size + 1];
+  w.frame_type = new char [window_size + 1]; {
+    // {{{
+
+    for(int i=0; i<=window_size; i++) {
+      w.residue[i] = new TEC_CPU_TYPE ** [COMPONENTS];
+      for (int c=0; c<COMPONENTS; c++) {
+	w.residue[i][c] = error.alloc(pixels_in_y[0], pixels_in_x[0], 0);
+	/* Only the first quarter of the chroma is read. The rest
+	   must be the same for every residue buffer. */
+	for(int y=0; y<pixels_in_y[0]; y++) {
+	  memset(w.residue[i][c][y], 0, pixels_in_x[0]*sizeof(TEC_CPU_TYPE));
+	}
+      }
+      w.mv[i] = motion.alloc(blocks_in_y, blocks_in_x);
+      w.frame_type[i] = 'I';
     }
 
     // }}}
   }
 
-  piy[0] = piy[1] = piy[2] = pixels_in_y[0];
-  pix[0] = pix[1] = pix[2] = pixels_in_x[0];
+  /* The even pictures are processed "window_size" pictures at a
+     time. Each window reads its even pictures and the residues
+     between them, updates the pictures concurrently and writes them
+     in order. */
+  /* Bytes of a picture and of a motion field. */
+  int picture_bytes = 0;
+  for(int c=0; c<COMPONENTS; c++) {
+    picture_bytes += pixels_in_y[c] * pixels_in_x[c] * sizeof(TC_IO_TYPE);
+  }
+  int motion_bytes = 4 * blocks_in_y * blocks_in_x * sizeof(MVC_TYPE);
 
-  // {{{ Read reference[0] de even_? 
+  /* Without split (merge), the even pictures are read (written) in
+     the sequence which also stores the odd pictures. */
+  int stride = interleaved ? 2 : 1;
+
+  int i=0;
+  for(i; i<=pictures/2; i+=window_size) {
+
+    int n = pictures/2 + 1 - i;
+    if(n > window_size) n = window_size;
+    w.first = i;
+
+    for(int j=0; j<n; j++) {
+
+      profile_scope timer(read_timer);
+
+      // {{{ Read reference[j] de even_?
 
-#if defined DEBUG
 #ifdef ANALYZE
-  info("%s: reading picture 0 from \"%s\".\n", argv[0], even_fn);
+      log_info("%s: reading picture %d from \"%s\".\n", argv[0], i+j, even_fn);
 #else
-  info("%s: reading picture 0 from \"%s\".\n", argv[0], low_fn);
+      log_info("%s: reading picture %d from \"%s\".\n", argv[0], i+j, low_fn);
 #endif
+#ifdef ANALYZE
+      seek_picture(even_fd, i+j, stride, EVEN_OFFSET, picture_bytes);
 #endif
-  for(int c=0; c<COMPONENTS; c++) {
-    image.read(
+      for(int c=0; c<COMPONENTS; c++) {
+	image.read(
 #ifdef ANALYZE
-	       even_fd,
+		   even_fd,
 #else
-	       low_fd,
+		   low_fd,
 #endif
-	       reference[0][c], pixels_in_y[c], pixels_in_x[c]);
-  }
+		   w.reference[j][c], pixels_in_y[c], pixels_in_x[c]);
+      }
+      profile_count(bytes_read_counter, picture_bytes);
 
-  for(int y=0; y<pixels_in_y[0]/2; y++) {
-    for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-      reference[0][1][y][x] = 0;
-      reference[0][2][y][x] = 0;
-    }
-  }
-  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-    for(int x=0; x<pixels_in_x[0]/2; x++) {
-      reference[0][1][y][x] = 0;
-      reference[0][2][y][x] = 0;
-    }
-  }
-  for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-    for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-      reference[0][1][y][x] = 0;
-      reference[0][2][y][x] = 0;
-    }
-  }
-  image_dwt->synthesize(reference[0][1], pixels_in_y[0], pixels_in_x[0], 1);
-  image_dwt->synthesize(reference[0][2], pixels_in_y[0], pixels_in_x[0], 1);
-  
-  // }}}
+      // }}}
 
-  int i=0;
-  for(i; i<pictures/2; i++) {
+      if(i+j >= pictures/2) continue;
 
-    // {{{ Read residue de high_? 
-#if defined DEBUG
-    info("%s: reading picture %d from \"%s\".\n", argv[0], i, high_fn);
-#endif
-    for(int c=0; c<COMPONENTS; c++) {
-      error.read(high_fd, residue[c], pixels_in_y[c], pixels_in_x[c]);
-      // We recover the original dynamic range of the residue.
-      for(int y=0; y<pixels_in_y[c]; y++) {
-	for(int x=0; x<pixels_in_x[c]; x++) {
-	  residue[c][y][x] -= 128;
+      // {{{ Read residue[j+1] de high_?
+      log_info("%s: reading picture %d from \"%s\".\n", argv[0], i+j, high_fn);
+      TEC_CPU_TYPE ***residue = w.residue[j+1];
+      for(int c=0; c<COMPONENTS; c++) {
+	error.read(high_fd, residue[c], pixels_in_y[c], pixels_in_x[c]);
+	// We recover the original dynamic range of the residue.
+	for(int y=0; y<pixels_in_y[c]; y++) {
+	  for(int x=0; x<pixels_in_x[c]; x++) {
+	    residue[c][y][x] -= 128;
+	  }
 	}
       }
-    }
-    
+
 #if defined UPDATE_STEP
-    for(int y=0; y<pixels_in_y[0]/2; y++) {
-      for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-	residue[1][y][x] = 0;
-	residue[2][y][x] = 0;
+      for(int y=0; y<pixels_in_y[0]/2; y++) {
+	for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
+	  residue[1][y][x] = 0;
+	  residue[2][y][x] = 0;
+	}
       }
-    }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      for(int x=0; x<pixels_in_x[0]/2; x++) {
-	residue[1][y][x] = 0;
-	residue[2][y][x] = 0;
+      for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
+	for(int x=0; x<pixels_in_x[0]/2; x++) {
+	  residue[1][y][x] = 0;
+	  residue[2][y][x] = 0;
+	}
       }
-    }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-	residue[1][y][x] = 0;
-	residue[2][y][x] = 0;
+      for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
+	for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
+	  residue[1][y][x] = 0;
+	  residue[2][y][x] = 0;
+	}
       }
-    }
-    error_dwt->synthesize(residue[1], pixels_in_y[0], pixels_in_x[0], 1);
-    error_dwt->synthesize(residue[2], pixels_in_y[0], pixels_in_x[0], 1);
-#endif
-    
-    // }}}
-    
-    // {{{ Read reference[1] de even_? 
-    
-#if defined DEBUG
-#ifdef ANALYZE 
-    info("%s: reading picture %d from \"%s\".\n", argv[0], i, even_fn);
-#else
-    info("%s: reading picture %d from \"%s\".\n", argv[0], i, low_fn);
-#endif
-#endif
-    for(int c=0; c<COMPONENTS; c++) {
-      image.read(
-#ifdef ANALYZE 
-		 even_fd,
-#else
-		 low_fd,
+      error_dwt->synthesize(residue[1], pixels_in_y[0], pixels_in_x[0], 1);
+      error_dwt->synthesize(residue[2], pixels_in_y[0], pixels_in_x[0], 1);
 #endif
-		 reference[1][c], pixels_in_y[c], pixels_in_x[c]);
-    }
 
+      // }}}
 
-    //fprintf(stderr, "(read_1) reference[0][0][0][0]=%d reference[1][0][0][0]=%d\n", reference[0][0][0][0], reference[1][0][0][0]);
+      // {{{ Reading the motion fields and the frame type
 
+      motion_fields.read(w.mv[j+1]);
+      w.frame_type[j+1] = fgetc(frame_types_fd);
+      profile_count(bytes_read_counter, picture_bytes + motion_bytes + 1);
 
-    for(int y=0; y<pixels_in_y[0]/2; y++) {
-      for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-	reference[1][1][y][x] = 0;
-	reference[1][2][y][x] = 0;
-      }
+      // }}}
     }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      for(int x=0; x<pixels_in_x[0]/2; x++) {
-	reference[1][1][y][x] = 0;
-	reference[1][2][y][x] = 0;
-      }
-    }
-    for(int y=pixels_in_y[0]/2; y<pixels_in_y[0]; y++) {
-      for(int x=pixels_in_x[0]/2; x<pixels_in_x[0]; x++) {
-	reference[1][1][y][x] = 0;
-	reference[1][2][y][x] = 0;
-      }
-    }
-    image_dwt->synthesize(reference[1][1], pixels_in_y[0], pixels_in_x[0], 1);
-    image_dwt->synthesize(reference[1][2], pixels_in_y[0], pixels_in_x[0], 1);
-    
-    // }}}
-    
-    // {{{ Reading the motion fields
-
-    motion.read(motion_fd, mv, blocks_in_y, blocks_in_x);
 
-    // }}}
-					    
     // {{{ Update
 
-    if(fgetc(frame_types_fd) == 'B') {
-
-      //fprintf(stderr, "(before) reference[0][0][0][0]=%d reference[1][0][0][0]=%d\n", reference[0][0][0][0], reference[1][0][0][0]);
-      
-      update(block_size,
-	     blocks_in_y,
-	     blocks_in_x,
-	     COMPONENTS,
-	     mv,
-	     piy,
-	     pix,
-	     reference,
-	     residue,
-	     update_factor);
-
-      //fprintf(stderr,"(after) reference[0][0][0][0]=%d reference[1][0][0][0]=%d\n", reference[0][0][0][0], reference[1][0][0][0]);
-
+    {
+      profile_scope timer(update_timer);
+      run_tasks(n, threads, update_task, &w);
     }
-    
+
     // }}}
-    
-    // {{{ Write reference[0] en low_? 
 
-#if defined DEBUG
-#ifdef ANALYZE 
-    info("%s: writing picture %d from \"%s\".\n", argv[0], i, low_fn);
+    // {{{ Write reference[j] en low_?
+
+    for(int j=0; j<n; j++) {
+      profile_scope timer(write_timer);
+#ifdef ANALYZE
+      log_info("%s: writing picture %d from \"%s\".\n", argv[0], i+j, low_fn);
 #else
-    info("%s: writing picture %d from \"%s\".\n", argv[0], i, even_fn);
+      log_info("%s: writing picture %d from \"%s\".\n", argv[0], i+j, even_fn);
 #endif
+#ifndef ANALYZE
+      seek_picture(even_fd, i+j, stride, EVEN_OFFSET, picture_bytes);
 #endif
-    
-    image_dwt->analyze(reference[0][1], pixels_in_y[0], pixels_in_x[0], 1);
-    image_dwt->analyze(reference[0][2], pixels_in_y[0], pixels_in_x[0], 1);
-     
-    for(int c=0; c<COMPONENTS; c++) {
-      image.write(
+      for(int c=0; c<COMPONENTS; c++) {
+	image.write(
 #ifdef ANALYZE
-		  low_fd,
+		    low_fd,
 #else
-		  even_fd,
+		    even_fd,
 #endif
-		  reference[0][c], pixels_in_y[c], pixels_in_x[c]);
+		    w.reference[j][c], pixels_in_y[c], pixels_in_x[c]);
+      }
+      profile_count(bytes_written_counter, picture_bytes);
     }
 
     // }}}
 
-    // {{{ SWAP(&reference_picture[0], &reference_picture[1])
+    // {{{ The last residue of the window is the first of the next one
 
     {
-      TC_CPU_TYPE ***tmp = reference[0];
-      reference[0] = reference[1];
-      reference[1] = tmp;
-    }    
+      TEC_CPU_TYPE ***tmp = w.residue[0];
+      w.residue[0] = w.residue[n];
+      w.residue[n] = tmp;
+      MVC_TYPE ****tmp_mv = w.mv[0];
+      w.mv[0] = w.mv[n];
+      w.mv[n] = tmp_mv;
+      w.frame_type[0] = w.frame_type[n];
+    }
 
     // }}}
   }
 
-  // {{{ Write reference[0] in low_? 
-
-#if defined DEBUG
-#ifdef ANALYZE 
-  info("%s: writing picture %d from \"%s\".\n", argv[0], i, low_fn);
-#else
-  info("%s: writing picture %d from \"%s\".\n", argv[0], i, even_fn);
-#endif
-#endif
-  
-  image_dwt->analyze(reference[0][1], pixels_in_y[0], pixels_in_x[0], 1);
-  image_dwt->analyze(reference[0][2], pixels_in_y[0], pixels_in_x[0], 1);
-  
-  for(int c=0; c<COMPONENTS; c++) {
-    image.write(
-#ifdef ANALYZE
-		low_fd,
-#else
-		even_fd,
-#endif
-		reference[0][c], pixels_in_y[c], pixels_in_x[c]);
-  }
-
-  // }}}
+  motion_fields.close();
 
   // }}}
 }
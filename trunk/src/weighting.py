@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: iso-8859-15 -*-
+
+# The MCTF project has been supported by the Junta de Andaluca through
+# the Proyecto Motriz "Codificacin de Vdeo Escalable y su Streaming
+# sobre Internet" (P10-TIC-6548).
+
+## @file weighting.py
+#  Weighting of the components of the textures (see pondComp() in
+#  texture_compress_fb_j2k.py and texture_expand_fb_j2k.py).
+#
+#  Before the compression, the samples (1 byte) are multiplied by the
+#  gain of the subband and written with 1 or 2 bytes (little
+#  endian). After the decompression, they are divided by the gain and
+#  written with 1 byte. The samples are rounded and clipped to the
+#  range of the output. A whole plane is processed at once.
+#  @authors Jose Carmelo Maturana-Espinosa\n Vicente Gonzalez-Ruiz.
+#  @date Last modification: 2015, January 7.
+
+## @package weighting
+#  Weighting of the components of the textures.
+
+import os
+
+try:
+    import numpy
+except ImportError:
+    ## NumPy is not available.
+    numpy = None
+
+## Weighting coefficients for subband. For an example of 5TRLs ([H1,
+#  H2, H3, H4, L4]).
+COEFFICIENTS = [1, 1.4921569843, 2.7304234608, 5.3339326679, 5.8022196044]
+
+## Type of the samples written with a number of bytes.
+TYPES = {1: "u1", 2: "<u2"}
+
+## Weights a plane.
+#  @param samples The samples (a NumPy array).
+#  @param gain The gain.
+#  @param bytes_per_component Bytes of the weighted samples (1 or 2).
+#  @return The weighted samples.
+def weight(samples, gain, bytes_per_component=2):
+    top = (1 << (8 * bytes_per_component)) - 1
+    weighted = numpy.rint(samples * float(gain))
+    return numpy.clip(weighted, 0, top).astype(TYPES[bytes_per_component])
+
+## Reverses the weighting of a plane.
+#  @param samples The weighted samples (a NumPy array).
+#  @param gain The gain.
+#  @return The samples (bytes).
+def unweight(samples, gain):
+    unweighted = numpy.rint(samples / float(gain))
+    return numpy.clip(unweighted, 0, 255).astype(numpy.uint8)
+
+## Weights a file of samples (of 1 byte), which is replaced.
+#  @param file_name Name of the file.
+#  @param gain The gain.
+#  @param bytes_per_component Bytes of the weighted samples (1 or 2).
+def weight_file(file_name, gain, bytes_per_component=2):
+    samples = numpy.fromfile(file_name, dtype=numpy.uint8)
+    weight(samples, gain, bytes_per_component).tofile(file_name + "_multCOM")
+    os.rename(file_name + "_multCOM", file_name)
+
+## Reverses the weighting of a file of samples, which is replaced.
+#  @param file_name Name of the file.
+#  @param gain The gain.
+#  @param bytes_per_component Bytes of the weighted samples (1 or 2).
+def unweight_file(file_name, gain, bytes_per_component=2):
+    samples = numpy.fromfile(file_name, dtype=TYPES[bytes_per_component])
+    unweight(samples, gain).tofile(file_name + "_desmultCOM")
+    os.rename(file_name + "_desmultCOM", file_name)
@@ -8,6 +8,7 @@ import sys
 import math
 import statistics
 import random
+import numpy
 from subprocess import check_call
 from subprocess import CalledProcessError
 #from MCTF_parser import MCTF_parser
@@ -31,29 +32,14 @@ def grades_variance(grades):
 # Variance signal
 #----------------
 def variance_signal (file_name) :
-    data = []
-    file = open (file_name, 'rb')
-
-    byte = file.read(1)
-    while str(byte) != "b''" :
-        #print ("\nAAAAAA: " + str(byte))
-        data.append(ord(byte))
-        #print ("\nBBBBBB: " + str(data[len(data)-1]))
-        byte = file.read(1)
-
-    file.close()
-    return statistics.pvariance(data)
-    #return grades_variance(data, mean(data))
+    return float(numpy.fromfile(file_name, dtype=numpy.uint8).var())
 
 
 
 # Geometric mean
 #---------------
 def geomean(num_list):
-    productorio = 1
-    for num in num_list :
-        productorio *= num
-    return productorio ** (1.0/len(num_list))
+    return float(numpy.exp(numpy.mean(numpy.log(num_list))))
 
 
 
@@ -1,37 +1,18 @@
-# int to ascii : unichr()
-# ascii to int : ord()
+# Divides the samples of an image by sqrt(2) (see weighting.py).
 import math
+import numpy
 
-f_raw = open ("imagen.raw", 'rb')
-f_rawDIV = open ("imagenDIV.raw", 'w')
-
-
-try:
-    byte = f_raw.read(1)
-    while byte != "" :
-        out = ord(byte) / math.sqrt(2)
-        print "byte: " + str(ord(byte)) + " -> " + str(int(out))
-        #f_rawDIV.write(str(int(out)))
-        f_rawDIV.write('%c' % int(out))
-        byte = f_raw.read(1)
-
-finally:
-    f_raw.close()
-    f_rawDIV.close()
+imagen = numpy.fromfile ("imagen.raw", dtype=numpy.uint8)
+imagenDIV = numpy.floor (imagen / math.sqrt(2)).astype(numpy.uint8)
+imagenDIV.tofile ("imagenDIV.raw")
+print "bytes: " + str(imagen.size) + " max: " + str(imagen.max()) + " -> " + str(imagenDIV.max())
 
 
 raw_input("")
 # COMPROBAR
 
-f_rawDIV = open ("imagenDIV.raw", 'rb')
-
-try:
-    byte = f_rawDIV.read(1)
-    while byte != "" :
-        print "byte: " + str(ord(byte))
-        byte = f_rawDIV.read(1)
-finally:
-    f_rawDIV.close()
+imagenDIV = numpy.fromfile ("imagenDIV.raw", dtype=numpy.uint8)
+print "bytes: " + str(imagenDIV.size) + " min: " + str(imagenDIV.min()) + " max: " + str(imagenDIV.max())
 
 
 